@@ -31,13 +31,62 @@ class Settings(BaseSettings):
     # Impostazioni per simulazione
     MAX_SIMULATION_TIME: float = 1000.0  # Tempo massimo di simulazione in secondi
     MAX_SIMULATION_NODES: int = 100  # Numero massimo di nodi in un circuito
+    DESIGN_GRAPH_CACHE_SIZE: int = 256  # Numero di versioni di design con indice del grafo in cache
     
     # Opzioni per ottimizzazioni
     MAX_SEQUENCE_LENGTH: int = 50000  # Lunghezza massima per l'ottimizzazione dei codoni
+    SEQUENCE_ANALYSIS_TIME_BUDGET_MS: float = 2000.0  # Budget di default per ogni analisi di sequenza (ORF, ripetizioni, palindromi)
+    VALIDATION_SESSION_MAX_COUNT: int = 512  # Sessioni di validazione incrementale mantenute in memoria
+    VALIDATION_SESSION_TTL_SECONDS: int = 1800  # Scadenza di una sessione inattiva
+    BATCH_VALIDATION_MAX_SEQUENCES: int = 10000  # Sequenze accettate al massimo in una validazione batch
+    SEQUENCE_WORKER_PROCESSES: int = 0  # Processi del pool per le analisi CPU-bound (0: numero di CPU)
+    STREAM_ANALYSIS_WINDOW: int = 200000  # Finestra (basi) per ripetizioni e palindromi nell'analisi in streaming
+    STREAM_ANALYSIS_OVERLAP: int = 10000  # Sovrapposizione tra finestre consecutive
+    STREAM_ORF_HISTORY: int = 100000  # Basi mantenute in memoria per estrarre la sequenza degli ORF
+    STREAM_MAX_FEATURES: int = 1000  # Elementi riportati al massimo per tipo di analisi in streaming
+    LOCAL_GC_WINDOW: int = 50  # Finestra (basi) per il controllo del GC locale
+    LOCAL_GC_MIN: float = 25.0  # GC minimo ammesso in ogni finestra (%)
+    LOCAL_GC_MAX: float = 75.0  # GC massimo ammesso in ogni finestra (%)
+    COMPLEXITY_WINDOW: int = 64  # Finestra (basi) per il controllo della complessità
+    COMPLEXITY_MAX_K: int = 6  # Lunghezza massima dei k-mer per la complessità linguistica
+    COMPLEXITY_MIN_LINGUISTIC: float = 0.5  # Complessità linguistica minima (finestre casuali: ~0.77-1)
+    COMPLEXITY_MIN_ENTROPY: float = 1.0  # Entropia minima della composizione (bit, massimo 2)
+    MOTIF_DEFAULT_LIBRARY: str = "common"  # Libreria di enzimi usata dall'analisi motifs se non specificata
+    VALIDATION_CACHE_ENABLED: bool = True  # Cache dei risultati di validazione per hash della sequenza e opzioni
+    VALIDATION_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Dimensione massima della cache in processo (JSON dei risultati)
+    VALIDATION_CACHE_MONGO_ENABLED: bool = True  # Secondo livello persistente della cache su MongoDB
+    VALIDATION_CACHE_MONGO_TIMEOUT_MS: float = 200.0  # Attesa massima per una lettura/scrittura della cache su MongoDB
+    VALIDATION_CACHE_MONGO_RETRY_SECONDS: int = 60  # Sospensione del livello MongoDB dopo un errore
+    VALIDATION_CACHE_TTL_DAYS: int = 30  # Scadenza dei risultati persistenti (0: nessuna scadenza)
+    FOLDING_MAX_SPAN: int = 100  # Distanza massima tra le basi di una coppia nel ripiegamento
+    FOLDING_FLANK: int = 30  # Basi di contesto per lato attorno alle regioni ripiegate
+    FOLDING_START_UPSTREAM: int = 20  # Basi a monte dello start considerate regione dell'RBS
+    FOLDING_START_DOWNSTREAM: int = 15  # Basi dallo start (incluso) considerate regione di inizio della traduzione
+    FOLDING_HAIRPIN_MAX_ENERGY: float = -10.0  # Energia (kcal/mol) sotto la quale una forcina è considerata stabile
+    FOLDING_MAX_START_REGIONS: int = 20  # Codoni di start esaminati al massimo per sequenza
+    FOLDING_MAX_LENGTH: int = 5000  # Lunghezza massima per il ripiegamento di una sequenza intera
+    FOLDING_OPTIMIZER_CODONS: int = 16  # Codoni iniziali (5') controllati dall'ottimizzatore per strutture secondarie
+    CODON_OPTIMIZER_BEAM_WIDTH: int = 32  # Ipotesi mantenute dall'ottimizzatore con vincoli di GC per finestra
+    GC_WINDOW_SOFT_PENALTY: float = 0.1  # Penalità per base fuori dai limiti di GC in una finestra (vincolo morbido)
+    CODON_VARIANT_MAX_ATTEMPTS: int = 100  # Correzioni tentate al massimo per ogni variante di una libreria
+    REPEAT_BACKTRACK_CODONS: int = 4  # Codoni precedenti ricercati di nuovo quando un omopolimero o una ripetizione sono inevitabili
+    REPEAT_BACKTRACK_BUDGET: int = 512  # Tentativi massimi di quella ricerca, per posizione
+    PARETO_ISLANDS: int = 0  # Popolazioni dell'ottimizzatore multi-obiettivo evolute in parallelo (0: processi del pool)
+    PARETO_REPEAT_KMER: int = 12  # Lunghezza dei k-mer contati dall'obiettivo delle ripetizioni
+    PARETO_MUTATION_RATE: float = 0.02  # Probabilità di mutazione di ogni codone ricodificabile
+    RARE_CODON_MAX_WEIGHT: float = 0.3  # Adattamento relativo sotto il quale un codone è raro (armonizzazione)
+    RARE_CLUSTER_WINDOW: int = 5  # Codoni consecutivi esaminati per riconoscere un gruppo di codoni rari
+    RARE_CLUSTER_MIN_CODONS: int = 3  # Codoni rari minimi nella finestra perché formino un gruppo
+    CODON_TABLE_MONGO_ENABLED: bool = True  # Copia condivisa su MongoDB delle tabelle dei codoni caricate
+    CODON_TABLE_MONGO_TIMEOUT_MS: float = 2000.0  # Attesa massima per una lettura/scrittura delle tabelle su MongoDB
+    CODON_TABLE_REVISION_TTL_SECONDS: float = 30.0  # Validità della copia su disco prima di riconfrontarne la revisione con MongoDB
+    CODON_TABLE_MAX_UPLOAD_BYTES: int = 256 * 1024 * 1024  # Dimensione massima di un file caricato (FASTA di CDS di riferimento)
+    CODON_TABLE_MIN_CODONS: int = 1000  # Codoni contati minimi perché una tabella sia affidabile
     
     # Percorsi file
     STATIC_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "static")
     TEMP_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "temp")
+    CODON_TABLE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(__file__)), "temp", "codon_tables")  # Cache su disco delle tabelle dei codoni caricate
     
     class Config:
         env_file = ".env"
@@ -51,6 +51,22 @@ class MongoRepository:
         result = await collection.insert_one(data)
         return str(result.inserted_id)
 
+    async def create_many(self, documents: List[Dict[str, Any]]) -> List[str]:
+        """
+        Crea più documenti con un solo insert_many.
+        """
+        if not documents:
+            return []
+        collection = get_collection(self.collection_name)
+        
+        now = datetime.utcnow()
+        for data in documents:
+            data["created_at"] = now
+            data["updated_at"] = now
+        
+        result = await collection.insert_many(documents, ordered=False)
+        return [str(inserted_id) for inserted_id in result.inserted_ids]
+
     async def get_by_id(self, id: str) -> Optional[Dict[str, Any]]:
         """
         Recupera un documento per ID.
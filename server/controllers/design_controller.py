@@ -7,9 +7,11 @@ from server.models.genetic_design import (
     GeneticDesignCreate,
     GeneticDesignResponse,
     GeneticDesignUpdate,
-    GeneticDesignSummary
+    GeneticDesignSummary,
+    DesignGraphAnalysis
 )
 from server.repositories.design_repository import DesignRepository
+from server.services.design_graph import get_design_graph
 
 router = APIRouter(prefix="/api/designs", tags=["designs"])
 logger = logging.getLogger(__name__)
@@ -49,6 +51,22 @@ async def get_design(
     return design
 
 
+@router.get("/{design_id}/analysis", response_model=DesignGraphAnalysis)
+async def get_design_analysis(
+    design_id: str = Path(..., description="ID del design genetico"),
+    repository: DesignRepository = Depends(lambda: DesignRepository())
+):
+    """
+    Analizza la topologia del design: anelli di retroazione, ordine topologico,
+    nodi orfani, geni non raggiungibili e promotori pendenti.
+    """
+    design = await repository.get_design(design_id)
+    if not design:
+        raise HTTPException(status_code=404, detail=f"Design con ID {design_id} non trovato")
+    
+    return get_design_graph(design).to_analysis()
+
+
 @router.get("/", response_model=List[GeneticDesignSummary])
 async def get_designs(
     skip: int = Query(0, ge=0, description="Numero di design da saltare"),
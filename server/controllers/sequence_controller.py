@@ -1,6 +1,8 @@
-from typing import List, Optional, Dict, Any
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path, BackgroundTasks
-from fastapi.responses import JSONResponse
+from typing import AsyncIterator, List, Optional, Dict, Any
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path, BackgroundTasks, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+import codecs
 import logging
 # import re # Non più necessario qui se tutta la validazione è nel servizio
 
@@ -13,11 +15,55 @@ from server.models.sequence_analysis import (
     SequenceStatistics,    # Importato per il caso di sequenza vuota
     CodonOptimizationRequest,
     CodonOptimizationResult,
-    SequenceAnalysisDB
+    SequenceAnalysisDB,
+    ValidationSessionEditRequest,
+    ValidationSessionResponse,
+    BatchSequenceItem,
+    BatchValidationRequest,
+    SequenceAnalysis,
+    SequenceProfileRequest,
+    SequenceProfile,
+    MotifScanRequest,
+    MotifScanResult,
+    RnaFoldRequest,
+    RnaFoldResult,
+    GeneticCodeInfo,
+    TranslationRequest,
+    TranslationResult,
+    ProteinAnalysisRequest,
+    BatchProteinAnalysisRequest,
+    ProteinProperties,
+    CodonUsageFormat,
+    CodonTableInfo,
+    CodonTableDetail,
+    BatchCodonOptimizationRequest,
+    BatchCodonOptimizationResult,
+    CodonVariantRequest,
+    CodonVariantLibrary,
+    ParetoOptimizationRequest,
+    ParetoFront
 )
 from server.repositories.sequence_repository import SequenceRepository
 from server.services.sequence_validator import SequenceValidator # Importa il servizio di validazione
 from server.services.codon_optimizer import CodonOptimizer # Importa il servizio
+from server.services.codon_variants import CodonVariantSampler
+from server.services import validation_session
+from server.services import validation_cache
+from server.services.validation_cache import validation_cache_key
+from server.services.batch_validation import stream_batch_validation
+from server.services.batch_optimization import optimize_batch
+from server.services.pareto_optimizer import optimize_pareto
+from server.services.sequence_io import FastaParser, iter_mapped_text
+from server.services.stream_analyzer import stream_sequence_analysis
+from server.services.sequence_profile import SequenceProfiler
+from server.services.motif_scanner import MotifScanner, ENZYME_LIBRARIES
+from server.services.rna_folding import RnaFolder
+from server.services.genetic_code import GENETIC_CODES, get_genetic_code
+from server.services.protein_analysis import ProteinAnalyzer
+from server.services.codon_model import CODON_TABLES, TRNA_GENE_COPIES, get_codon_model, is_builtin_organism
+from server.services.codon_usage import CodonCounter, parse_codon_usage, counts_to_fractions
+from server.services import codon_table_store
+from app.core.config import settings
 
 router = APIRouter(prefix="/api/sequences", tags=["sequences"])
 logger = logging.getLogger(__name__)
@@ -32,8 +78,8 @@ logger = logging.getLogger(__name__)
 @router.post("/validate", response_model=SequenceValidationResult)
 async def validate_sequence_route(
     request: SequenceValidationRequest,
-    # repository: SequenceRepository = Depends(lambda: SequenceRepository()), # Opzionale
-    # save_result: bool = Query(True, description="Salva il risultato della validazione nel database")
+    background_tasks: BackgroundTasks,
+    use_cache: bool = Query(True, description="Usa la cache dei risultati (per hash della sequenza e opzioni di analisi)")
 ):
     logger.info(f"Richiesta di validazione per sequenza: {request.sequence[:30] if request.sequence else 'EMPTY'}, tipo: {request.sequence_type}, componente: {request.component_type}")
     
@@ -43,22 +89,39 @@ async def validate_sequence_route(
         return SequenceValidationResult(is_valid=False, errors=[error], warnings=[], info=[], stats=empty_stats)
 
     try:
+        cache_key = None
+        if use_cache and settings.VALIDATION_CACHE_ENABLED:
+            cache_key = validation_cache_key(
+                request.sequence,
+                request.sequence_type,
+                request.component_type,
+                request.analyses,
+                inverted_repeat_max_spacer=request.inverted_repeat_max_spacer,
+                motif_library=request.motif_library,
+                genetic_code=request.genetic_code,
+                alternative_starts=request.alternative_starts
+            )
+            cached_result = await validation_cache.get_cached_result(cache_key)
+            if cached_result is not None:
+                logger.info(f"Risultato validazione dalla cache ({cache_key[:12]})")
+                return cached_result
+
         validation_result = SequenceValidator.validate_sequence(
             sequence=request.sequence, 
             sequence_type=request.sequence_type, 
-            component_type=request.component_type
+            component_type=request.component_type,
+            analyses=request.analyses,
+            time_budgets_ms=request.analysis_time_budgets_ms,
+            inverted_repeat_max_spacer=request.inverted_repeat_max_spacer,
+            motif_library=request.motif_library,
+            genetic_code=request.genetic_code,
+            alternative_starts=request.alternative_starts
         )
         logger.info(f"Risultato validazione da SequenceValidator: isValid={validation_result.is_valid}, Errors: {len(validation_result.errors)}, Warnings: {len(validation_result.warnings)}")
         
-        # TODO: Gestire opzionalmente il salvataggio del risultato se `save_result` è True e `repository` è fornito.
-        # if save_result and repository:
-        #     try:
-        #         user_id_placeholder = "guest_user" # Sostituire con auth
-        #         # Si potrebbe creare un nuovo record o aggiornarne uno esistente.
-        #         # await repository.save_validation_result(user_id_placeholder, request, validation_result)
-        #         logger.info(f"Risultato validazione salvato per {user_id_placeholder}")
-        #     except Exception as e_save:
-        #         logger.error(f"Errore nel salvare il risultato della validazione: {str(e_save)}", exc_info=True)
+        if cache_key is not None:
+            # Il salvataggio (anche su MongoDB) avviene dopo l'invio della risposta
+            background_tasks.add_task(validation_cache.store_result, cache_key, validation_result)
 
         return validation_result
     except ValueError as ve: # Errori specifici di validazione o logica dal servizio
@@ -68,6 +131,479 @@ async def validate_sequence_route(
         logger.error(f"Errore imprevisto durante la validazione della sequenza: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Errore interno del server durante la validazione: {str(e)}")
 
+def _check_batch_size(count: int) -> None:
+    if count == 0:
+        raise HTTPException(status_code=400, detail="Il lotto non contiene sequenze.")
+    if count > settings.BATCH_VALIDATION_MAX_SEQUENCES:
+        raise HTTPException(status_code=400, detail=f"Il lotto contiene {count} sequenze, il massimo è {settings.BATCH_VALIDATION_MAX_SEQUENCES}.")
+
+
+def _check_batch_options(motif_library: str, genetic_code: int) -> None:
+    """Verifica le opzioni comuni al lotto prima di distribuirlo ai worker (400 se non valide)."""
+    try:
+        MotifScanner.resolve_library(motif_library)
+        get_genetic_code(genetic_code)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+
+@router.post("/validate/batch")
+async def validate_sequences_batch_route(request: BatchValidationRequest):
+    """
+    Valida molte sequenze in parallelo nel pool di processi. La risposta è NDJSON:
+    una riga per sequenza, emessa appena la sua validazione è completata.
+    """
+    _check_batch_size(len(request.sequences))
+    _check_batch_options(request.motif_library, request.genetic_code)
+    return StreamingResponse(
+        stream_batch_validation(
+            request.sequences,
+            request.sequence_type,
+            analyses=request.analyses,
+            time_budgets_ms=request.analysis_time_budgets_ms,
+            inverted_repeat_max_spacer=request.inverted_repeat_max_spacer,
+            motif_library=request.motif_library,
+            genetic_code=request.genetic_code,
+            alternative_starts=request.alternative_starts
+        ),
+        media_type="application/x-ndjson"
+    )
+
+
+def _parse_analyses(analyses: Optional[str]) -> Optional[List[SequenceAnalysis]]:
+    """Analisi separate da virgola; None (parametro assente) significa tutte."""
+    try:
+        return None if analyses is None else [SequenceAnalysis(a.strip()) for a in analyses.split(",") if a.strip()]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=f"Analisi non valida: {str(ve)}")
+
+
+@router.post("/validate/batch/fasta")
+async def validate_fasta_batch_route(
+    file: UploadFile = File(..., description="File FASTA con le sequenze da validare"),
+    sequence_type: SequenceType = Form(SequenceType.DNA),
+    component_type: Optional[str] = Form(None),
+    analyses: Optional[str] = Form(None, description="Analisi separate da virgola (orfs,repeats,palindromes,local_gc,complexity,motifs,secondary_structure); vuoto: nessuna, assente: tutte"),
+    motif_library: str = Form("common", description="Libreria di enzimi/motivi per l'analisi motifs"),
+    genetic_code: int = Form(1, description="Tabella di traduzione NCBI"),
+    alternative_starts: bool = Form(False, description="Considera tutti i codoni di inizio della tabella oltre ad ATG")
+):
+    """Come /validate/batch, ma con le sequenze lette da un file FASTA caricato."""
+    requested = _parse_analyses(analyses)
+    _check_batch_options(motif_library, genetic_code)
+
+    parser = FastaParser()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    records = []
+    while True:
+        chunk = await file.read(1 << 20)
+        if not chunk:
+            break
+        records.extend(parser.feed(decoder.decode(chunk)))
+        if len(records) > settings.BATCH_VALIDATION_MAX_SEQUENCES:
+            break
+    records.extend(parser.feed(decoder.decode(b"", final=True)))
+    records.extend(parser.close())
+    _check_batch_size(len(records))
+
+    items = [BatchSequenceItem(sequence=seq, sequence_name=name, component_type=component_type) for name, seq in records]
+    return StreamingResponse(
+        stream_batch_validation(
+            items,
+            sequence_type,
+            analyses=requested,
+            motif_library=motif_library,
+            genetic_code=genetic_code,
+            alternative_starts=alternative_starts
+        ),
+        media_type="application/x-ndjson"
+    )
+
+
+async def _stream_validation_response(
+    chunks: AsyncIterator[str],
+    fmt: str,
+    sequence_type: SequenceType,
+    analyses: Optional[List[SequenceAnalysis]],
+    min_protein_len_orf: int
+) -> Response:
+    """
+    Esegue la validazione in streaming e restituisce i riepiloghi NDJSON.
+    L'input viene consumato per intero prima di rispondere: leggere il corpo o il
+    file caricato dal generatore di una StreamingResponse entrerebbe in conflitto
+    con l'ascolto della disconnessione e con la chiusura dell'upload. I riepiloghi
+    hanno comunque dimensione limitata.
+    """
+    try:
+        lines = [
+            line async for line in stream_sequence_analysis(chunks, fmt, sequence_type, analyses, min_protein_len_orf)
+        ]
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore nella validazione in streaming: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+    return Response(content="".join(lines), media_type="application/x-ndjson")
+
+
+async def _decoded_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    async for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+@router.post("/validate/stream")
+async def validate_stream_route(
+    request: Request,
+    format: str = Query("auto", description="Formato dell'input: auto, fasta o genbank"),
+    sequence_type: SequenceType = Query(SequenceType.DNA),
+    analyses: Optional[str] = Query(None, description="Analisi separate da virgola (orfs,repeats,palindromes); vuoto: nessuna, assente: tutte"),
+    min_protein_len_orf: int = Query(25, ge=1)
+):
+    """
+    Validazione in streaming di sequenze molto lunghe (FASTA o GenBank) inviate
+    come corpo grezzo della richiesta. Il corpo viene analizzato man mano che
+    arriva, con memoria limitata; la risposta è NDJSON con un
+    StreamedSequenceSummary per record.
+    """
+    if format not in ("auto", "fasta", "genbank"):
+        raise HTTPException(status_code=400, detail=f"Formato non supportato: {format}")
+    return await _stream_validation_response(
+        _decoded_chunks(request.stream()), format, sequence_type, _parse_analyses(analyses), min_protein_len_orf
+    )
+
+
+@router.post("/validate/stream/file")
+async def validate_stream_file_route(
+    file: UploadFile = File(..., description="File FASTA o GenBank"),
+    format: str = Form("auto"),
+    sequence_type: SequenceType = Form(SequenceType.DNA),
+    analyses: Optional[str] = Form(None, description="Analisi separate da virgola (orfs,repeats,palindromes); vuoto: nessuna, assente: tutte"),
+    min_protein_len_orf: int = Form(25, ge=1)
+):
+    """Come /validate/stream, con il file caricato letto tramite memory map."""
+    if format not in ("auto", "fasta", "genbank"):
+        raise HTTPException(status_code=400, detail=f"Formato non supportato: {format}")
+    return await _stream_validation_response(
+        iterate_in_threadpool(iter_mapped_text(file.file)), format, sequence_type, _parse_analyses(analyses), min_protein_len_orf
+    )
+
+
+@router.post("/sessions", response_model=ValidationSessionResponse)
+async def create_validation_session_route(request: SequenceValidationRequest):
+    """
+    Apre una sessione di validazione incrementale: la sequenza viene analizzata una
+    volta e le modifiche successive aggiornano solo le regioni interessate.
+    """
+    try:
+        session = validation_session.create_session(
+            sequence=request.sequence,
+            sequence_type=request.sequence_type,
+            component_type=request.component_type,
+            analyses=request.analyses,
+            time_budgets_ms=request.analysis_time_budgets_ms,
+            inverted_repeat_max_spacer=request.inverted_repeat_max_spacer,
+            motif_library=request.motif_library,
+            genetic_code=request.genetic_code,
+            alternative_starts=request.alternative_starts
+        )
+        return ValidationSessionResponse(session_id=session.session_id, version=session.version, result=session.result)
+    except ValueError as ve:
+        logger.warning(f"Errore di validazione in create_validation_session_route: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante la creazione della sessione di validazione: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server durante la validazione: {str(e)}")
+
+
+@router.get("/sessions/{session_id}", response_model=ValidationSessionResponse)
+async def get_validation_session_route(session_id: str = Path(..., description="ID della sessione di validazione")):
+    session = validation_session.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Sessione di validazione non trovata o scaduta.")
+    return ValidationSessionResponse(session_id=session.session_id, version=session.version, result=session.result)
+
+
+@router.post("/sessions/{session_id}/edits", response_model=ValidationSessionResponse)
+async def edit_validation_session_route(
+    request: ValidationSessionEditRequest,
+    session_id: str = Path(..., description="ID della sessione di validazione")
+):
+    """Applica modifiche (insert/delete/replace) alla sequenza della sessione e la rivalida."""
+    session = validation_session.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Sessione di validazione non trovata o scaduta.")
+    try:
+        with session.lock:
+            result = session.apply_edits(request.edits)
+            return ValidationSessionResponse(session_id=session.session_id, version=session.version, result=result)
+    except ValueError as ve:
+        logger.warning(f"Modifica non valida nella sessione {session_id}: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore imprevisto durante la rivalidazione incrementale: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server durante la validazione: {str(e)}")
+
+
+@router.delete("/sessions/{session_id}")
+async def delete_validation_session_route(session_id: str = Path(..., description="ID della sessione di validazione")):
+    if not validation_session.delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Sessione di validazione non trovata o scaduta.")
+    return JSONResponse(content={"message": f"Sessione {session_id} chiusa"})
+
+
+@router.post("/profile", response_model=SequenceProfile)
+async def sequence_profile_route(request: SequenceProfileRequest):
+    """
+    Profili a finestra scorrevole (GC, entropia, complessità linguistica) di una
+    sequenza nucleotidica, con finestra e passo arbitrari.
+    """
+    try:
+        sequence = request.sequence.strip().upper()
+        return SequenceProfiler.profile(sequence, window=request.window, step=request.step, max_k=request.max_k)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante il calcolo del profilo: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.post("/motifs/scan", response_model=MotifScanResult)
+async def scan_motifs_route(request: MotifScanRequest):
+    """
+    Cerca tutti i siti di una libreria di enzimi e/o di motivi personalizzati
+    (codici IUPAC) su entrambi i filamenti, con un automa di Aho–Corasick.
+    """
+    try:
+        hits = MotifScanner.scan(request.sequence.strip(), library=request.library, motifs=request.motifs, both_strands=request.both_strands)
+        counts: Dict[str, int] = {}
+        for hit in hits:
+            counts[hit.name] = counts.get(hit.name, 0) + 1
+        return MotifScanResult(hits=hits, counts=counts)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante la ricerca dei motivi: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.get("/motifs/libraries", response_model=Dict[str, Dict[str, str]])
+async def list_motif_libraries_route():
+    """Librerie di enzimi disponibili (nome enzima -> sito IUPAC)."""
+    return ENZYME_LIBRARIES
+
+
+@router.post("/fold", response_model=RnaFoldResult)
+async def fold_sequence_route(request: RnaFoldRequest):
+    """
+    Struttura secondaria a energia minima (MFE) di una sequenza di RNA o del
+    trascritto di una sequenza di DNA, con le forcine stabili.
+    """
+    sequence = request.sequence.strip()
+    if not sequence:
+        raise HTTPException(status_code=400, detail="La sequenza fornita è vuota.")
+    if len(sequence) > settings.FOLDING_MAX_LENGTH:
+        raise HTTPException(status_code=400, detail=f"La sequenza ({len(sequence)} basi) supera la lunghezza massima per il ripiegamento ({settings.FOLDING_MAX_LENGTH}).")
+    try:
+        return RnaFolder.fold(sequence, max_span=request.max_span, hairpin_max_energy=request.hairpin_max_energy)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante il ripiegamento della sequenza: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.get("/genetic-codes", response_model=List[GeneticCodeInfo])
+async def list_genetic_codes_route():
+    """Tabelle di traduzione NCBI disponibili, con codoni di inizio e di stop."""
+    return [
+        GeneticCodeInfo(id=code.table_id, name=code.name, start_codons=code.start_codons, stop_codons=code.stop_codons, codon_table=code.codon_table)
+        for code in GENETIC_CODES.values()
+    ]
+
+
+@router.post("/translate", response_model=TranslationResult)
+async def translate_sequence_route(request: TranslationRequest):
+    """Traduce una sequenza di DNA/RNA con la tabella NCBI richiesta."""
+    try:
+        code = get_genetic_code(request.genetic_code)
+        protein = code.translate(
+            request.sequence.strip(),
+            frame=request.frame,
+            to_stop=request.to_stop,
+            initiator_methionine=request.initiator_methionine
+        )
+        codons = max(len(request.sequence.strip()) - request.frame, 0) // 3
+        return TranslationResult(protein=protein, genetic_code=code.table_id, frame=request.frame, codons=codons)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante la traduzione della sequenza: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.post("/protein/analyze", response_model=ProteinProperties)
+async def analyze_protein_route(request: ProteinAnalysisRequest):
+    """
+    Proprietà fisico-chimiche di una proteina: massa molecolare, punto
+    isoelettrico, GRAVY, indice di instabilità, coefficiente di estinzione e
+    profilo di idropatia.
+    """
+    if not request.sequence.strip():
+        raise HTTPException(status_code=400, detail="La sequenza fornita è vuota.")
+    try:
+        return ProteinAnalyzer.analyze(request.sequence, hydropathy_window=request.hydropathy_window)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante l'analisi della proteina: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.post("/protein/analyze/batch", response_model=List[ProteinProperties])
+async def analyze_proteins_batch_route(request: BatchProteinAnalysisRequest):
+    """
+    Proprietà di un lotto di proteine (es. candidati anticorpali o costrutti di
+    espressione), calcolate in un'unica passata vettorizzata; risultati nell'ordine
+    delle sequenze.
+    """
+    _check_batch_size(len(request.sequences))
+    try:
+        return ProteinAnalyzer.analyze_batch(request.sequences, hydropathy_window=request.hydropathy_window)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante l'analisi del lotto di proteine: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.get("/codon-tables", response_model=List[CodonTableInfo])
+async def list_codon_tables_route():
+    """
+    Tabelle d'uso dei codoni disponibili come target_organism: quelle predefinite
+    e quelle caricate (su questa istanza o, tramite MongoDB, su altre).
+    """
+    tables = {
+        key: CodonTableInfo(
+            key=key, name=table["name"], builtin=True, total_codons=round(sum(table["codons"].values()), 4),
+            trna_genes=key in TRNA_GENE_COPIES
+        )
+        for key, table in CODON_TABLES.items()
+    }
+    for info in await codon_table_store.list_shared_tables():
+        tables.setdefault(info.key, info)
+    for info in codon_table_store.list_tables():
+        tables[info.key] = info
+    return list(tables.values())
+
+
+@router.get("/codon-tables/{organism}", response_model=CodonTableDetail)
+async def get_codon_table_route(organism: str = Path(..., description="Chiave dell'organismo")):
+    """Frazioni d'uso dei codoni di una tabella (predefinita o caricata)."""
+    key = organism.lower()
+    if is_builtin_organism(key):
+        table = CODON_TABLES[key]
+        return CodonTableDetail(
+            key=key, name=table["name"], builtin=True, total_codons=round(sum(table["codons"].values()), 4),
+            trna_genes=key in TRNA_GENE_COPIES, codons=table["codons"]
+        )
+    if not await codon_table_store.ensure_table(key):
+        raise HTTPException(status_code=404, detail=f"Tabella dei codoni '{organism}' non trovata.")
+    info, counts = codon_table_store.load_table(key)
+    return CodonTableDetail(**info.model_dump(), codons=counts_to_fractions(counts))
+
+
+@router.post("/codon-tables", response_model=CodonTableInfo)
+async def upload_codon_table_route(
+    file: UploadFile = File(..., description="Tabella Kazusa (testo), export CoCoPUTs (TSV/CSV) o FASTA di CDS di riferimento"),
+    organism: str = Form(..., description="Chiave dell'organismo, usata poi come target_organism (es. cho, pichia)"),
+    name: Optional[str] = Form(None, description="Nome esteso dell'organismo"),
+    format: CodonUsageFormat = Form(CodonUsageFormat.KAZUSA)
+):
+    """
+    Carica una tabella d'uso dei codoni e la rende subito disponibile
+    all'ottimizzatore: i conteggi vengono salvati in forma compatta nella cache su
+    disco e su MongoDB, e il modello viene compilato una volta per revisione. Un
+    nuovo caricamento per la stessa chiave sostituisce la tabella precedente.
+    """
+    try:
+        key = codon_table_store.normalize_table_key(organism)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if is_builtin_organism(key):
+        raise HTTPException(status_code=400, detail=f"'{key}' è una tabella predefinita e non può essere sostituita.")
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    size = 0
+    try:
+        if format == CodonUsageFormat.FASTA:
+            # Le CDS vengono contate man mano, senza tenere in memoria il file
+            parser = FastaParser()
+            counter = CodonCounter()
+            while True:
+                chunk = await file.read(1 << 20)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > settings.CODON_TABLE_MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=400, detail=f"Il file supera la dimensione massima ({settings.CODON_TABLE_MAX_UPLOAD_BYTES} byte).")
+                counter.add_records(parser.feed(decoder.decode(chunk)))
+            counter.add_records(parser.feed(decoder.decode(b"", final=True)))
+            counter.add_records(parser.close())
+            counts, pair_counts = counter.counts, counter.pair_counts
+            if counts.sum() < settings.CODON_TABLE_MIN_CODONS:
+                raise ValueError(f"Le CDS di riferimento contengono {int(counts.sum())} codoni, il minimo è {settings.CODON_TABLE_MIN_CODONS}.")
+        else:
+            content = await file.read(settings.CODON_TABLE_MAX_UPLOAD_BYTES + 1)
+            if len(content) > settings.CODON_TABLE_MAX_UPLOAD_BYTES:
+                raise HTTPException(status_code=400, detail=f"Il file supera la dimensione massima ({settings.CODON_TABLE_MAX_UPLOAD_BYTES} byte).")
+            counts = parse_codon_usage(decoder.decode(content, final=True), format.value)
+            # Le tabelle Kazusa e CoCoPUTs non contengono le coppie di codoni
+            pair_counts = None
+        if counts.sum() <= 0:
+            raise ValueError("La tabella non contiene conteggi positivi.")
+
+        info = codon_table_store.build_table_info(key, name or key, counts, format, pair_counts)
+        codon_table_store.save_table(info, counts, pair_counts)
+        await codon_table_store.publish_table(info, counts, pair_counts)
+        get_codon_model(key)
+        return info
+    except HTTPException:
+        raise
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore durante il caricamento della tabella dei codoni: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Errore interno del server: {str(e)}")
+
+
+@router.delete("/codon-tables/{organism}")
+async def delete_codon_table_route(organism: str = Path(..., description="Chiave dell'organismo")):
+    """
+    Rimuove una tabella caricata da MongoDB e dalla cache su disco di questa
+    istanza; le altre istanze rimuovono la propria copia al successivo confronto
+    della revisione (entro CODON_TABLE_REVISION_TTL_SECONDS). Le tabelle
+    predefinite non possono essere rimosse.
+    """
+    key = organism.lower()
+    if is_builtin_organism(key):
+        raise HTTPException(status_code=400, detail=f"'{key}' è una tabella predefinita e non può essere rimossa.")
+    try:
+        key = codon_table_store.normalize_table_key(organism)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    deleted_shared = await codon_table_store.delete_shared_table(key)
+    deleted_local = codon_table_store.delete_table(key)
+    if not (deleted_shared or deleted_local):
+        raise HTTPException(status_code=404, detail=f"Tabella dei codoni '{organism}' non trovata.")
+    return {"deleted": key}
+
+
 @router.post("/optimize-codons", response_model=CodonOptimizationResult)
 async def optimize_codons_route(
     request: CodonOptimizationRequest,
@@ -79,7 +615,12 @@ async def optimize_codons_route(
         raise HTTPException(status_code=400, detail="La sequenza per l'ottimizzazione non può essere vuota.")
 
     try:
-        optimization_result = CodonOptimizer.optimize_sequence(request)
+        # Le tabelle caricate su altre istanze vengono scaricate nella cache su disco
+        for organism in filter(None, (request.target_organism, request.source_organism)):
+            if not is_builtin_organism(organism):
+                await codon_table_store.ensure_table(organism.lower())
+        # Ottimizzazione CPU-bound fuori dal ciclo degli eventi
+        optimization_result = await run_in_threadpool(CodonOptimizer.optimize_sequence, request)
 
         if save_result and repository:
             try:
@@ -99,6 +640,78 @@ async def optimize_codons_route(
         raise HTTPException(status_code=500, detail="Errore interno del server durante l'ottimizzazione dei codoni.")
 
 
+@router.post("/optimize-codons/batch", response_model=BatchCodonOptimizationResult)
+async def optimize_codons_batch_route(
+    request: BatchCodonOptimizationRequest,
+    repository: SequenceRepository = Depends(lambda: SequenceRepository()),
+    save_result: bool = Query(True, description="Salva i risultati delle ottimizzazioni nel database")
+):
+    """
+    Ottimizza un lotto di CDS (ognuna con il proprio organismo target o quello
+    del lotto) in parallelo nel pool di processi, con le stesse opzioni per
+    tutte. Le coppie sequenza/organismo ripetute sono ottimizzate una sola
+    volta; gli errori sono riportati per sequenza. I risultati vengono salvati
+    con un solo inserimento.
+    """
+    _check_batch_size(len(request.sequences))
+    try:
+        batch_result, completed = await optimize_batch(request)
+    except ValueError as ve:
+        logger.warning(f"Errore durante l'ottimizzazione batch dei codoni: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore imprevisto durante l'ottimizzazione batch dei codoni: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Errore interno del server durante l'ottimizzazione dei codoni.")
+
+    if save_result and repository and completed:
+        try:
+            user_id_placeholder = "guest_user"
+            batch_result.saved = len(await repository.save_codon_optimizations(user_id_placeholder, completed))
+        except Exception as e_save:
+            logger.error(f"Errore nel salvare i risultati dell'ottimizzazione batch: {str(e_save)}", exc_info=True)
+    return batch_result
+
+
+@router.post("/optimize-codons/variants", response_model=CodonVariantLibrary)
+async def codon_variants_route(request: CodonVariantRequest):
+    """
+    Libreria di varianti sinonime della stessa proteina, campionate con
+    temperatura data da optimization_strength, a due a due distanti almeno
+    min_hamming_distance basi e senza sottosequenze comuni più lunghe di
+    max_shared_kmer (per parti ripetute che non devono ricombinare).
+    """
+    try:
+        if not is_builtin_organism(request.target_organism):
+            await codon_table_store.ensure_table(request.target_organism.lower())
+        return await run_in_threadpool(CodonVariantSampler.generate, request)
+    except ValueError as ve:
+        logger.warning(f"Errore nella generazione delle varianti: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore imprevisto nella generazione delle varianti: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Errore interno del server durante la generazione delle varianti.")
+
+
+@router.post("/optimize-codons/pareto", response_model=ParetoFront)
+async def codon_pareto_route(request: ParetoOptimizationRequest):
+    """
+    Fronte di Pareto delle scelte di codoni per più obiettivi insieme (CAI,
+    uniformità del GC, siti da evitare, ripetizioni, struttura al 5'): ogni
+    soluzione restituita non è peggiorabile in un obiettivo senza guadagnare in
+    un altro. Le popolazioni NSGA-II evolvono in parallelo nel pool di processi.
+    """
+    try:
+        if not is_builtin_organism(request.target_organism):
+            await codon_table_store.ensure_table(request.target_organism.lower())
+        return await optimize_pareto(request)
+    except ValueError as ve:
+        logger.warning(f"Errore nell'ottimizzazione multi-obiettivo: {str(ve)}")
+        raise HTTPException(status_code=400, detail=str(ve))
+    except Exception as e:
+        logger.error(f"Errore imprevisto nell'ottimizzazione multi-obiettivo: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Errore interno del server durante l'ottimizzazione multi-obiettivo.")
+
+
 @router.get("/analyses", response_model=List[SequenceAnalysisResponse])
 async def get_user_analyses_route(
     skip: int = Query(0, ge=0, description="Numero di analisi da saltare"),
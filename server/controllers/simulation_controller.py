@@ -16,6 +16,7 @@ from server.models.simulation import (
 from server.repositories.simulation_repository import SimulationRepository
 from server.repositories.design_repository import DesignRepository
 from server.services.simulation_engine import SimulationEngine
+from server.services.design_graph import DesignGraph, get_design_graph
 
 router = APIRouter(prefix="/api/simulations", tags=["simulations"])
 logger = logging.getLogger(__name__)
@@ -33,7 +34,8 @@ class SimulationManager:
         edges: List[Dict],
         method: SimulationMethod,
         parameters: List[SimulationParameter],
-        repository: SimulationRepository
+        repository: SimulationRepository,
+        graph: Optional[DesignGraph] = None
     ):
         """
         Esegue una simulazione di un circuito genetico.
@@ -45,7 +47,7 @@ class SimulationManager:
             await repository.update_simulation_status(simulation_id, SimulationStatus.RUNNING)
             
             # Esegui la simulazione
-            results = SimulationEngine.simulate_circuit(nodes, edges, method, parameters)
+            results = SimulationEngine.simulate_circuit(nodes, edges, method, parameters, graph=graph)
             
             # Aggiorna i risultati della simulazione
             await repository.update_simulation_results(simulation_id, results)
@@ -88,7 +90,8 @@ async def create_simulation(
             design.edges,
             simulation.method,
             simulation.parameters,
-            simulation_repository
+            simulation_repository,
+            get_design_graph(design)
         )
         
         return await simulation_repository.get_simulation(simulation_id)
@@ -223,7 +226,8 @@ async def rerun_simulation(
             design.edges,
             simulation.method,
             simulation.parameters,
-            simulation_repository
+            simulation_repository,
+            get_design_graph(design)
         )
         
         return await simulation_repository.get_simulation(simulation_id)
@@ -14,6 +14,7 @@ from server.controllers import (
     antibody_controller,
     protein_expression_controller
 )
+from server.services.worker_pool import shutdown_process_pool
 from app.core.config import settings
 
 # Configurazione del logger
@@ -89,6 +90,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Arresto del server BioDesigner")
+    shutdown_process_pool()
 
 if __name__ == "__main__":
     import uvicorn
@@ -78,4 +78,16 @@ class GeneticDesignSummary(BaseModel):
     component_count: int
     status: str
     created_at: datetime
-    updated_at: datetime 
\ No newline at end of file
+    updated_at: datetime 
+
+class DesignGraphAnalysis(BaseModel):
+    node_count: int
+    edge_count: int
+    is_acyclic: bool
+    topological_order: List[str]
+    strongly_connected_components: List[List[str]]
+    feedback_cycles: List[List[str]]
+    orphan_nodes: List[str]
+    unreachable_genes: List[str]
+    dangling_promoters: List[str]
+    dangling_edges: List[str] = Field(default_factory=list)
@@ -10,6 +10,17 @@ class SequenceType(str, Enum):
     PROTEIN = "protein"
 
 
+class SequenceAnalysis(str, Enum):
+    """Analisi opzionali (costose) richiedibili in fase di validazione."""
+    ORFS = "orfs"
+    REPEATS = "repeats"
+    PALINDROMES = "palindromes"
+    LOCAL_GC = "local_gc"  # GC a finestra scorrevole
+    COMPLEXITY = "complexity"  # Regioni a bassa complessità (entropia / complessità linguistica)
+    MOTIFS = "motifs"  # Siti di restrizione e motivi della libreria richiesta
+    SECONDARY_STRUCTURE = "secondary_structure"  # Forcine stabili vicino ai codoni di start / RBS
+
+
 class SequenceValidationIssue(BaseModel):
     type: str
     message: str
@@ -23,6 +34,9 @@ class ORF(BaseModel):
     frame: int
     length: int
     sequence: str
+    direction: Optional[str] = None  # "forward" or "reverse"
+    protein_sequence: Optional[str] = None
+    protein_length: Optional[int] = None
 
 
 class RepeatSequence(BaseModel):
@@ -36,6 +50,40 @@ class PalindromicSequence(BaseModel):
     sequence: str
     position: int
     length: int
+    arm_length: Optional[int] = None  # Solo per ripetizioni invertite con spaziatore
+    spacer_length: Optional[int] = None
+
+
+class MotifHit(BaseModel):
+    """Occorrenza di un motivo; position è 0-based sul filamento forward."""
+    name: str
+    site: str  # Motivo IUPAC della libreria
+    sequence: str  # Sequenza effettivamente trovata
+    position: int
+    length: int
+    strand: str  # "+" oppure "-" (reverse complement del motivo; i motivi palindromici sono riportati solo come "+")
+
+
+class RnaHairpin(BaseModel):
+    start: int  # 0-based, prima base della coppia di chiusura
+    end: int  # 0-based, inclusivo
+    energy: float  # kcal/mol
+    sequence: str
+    structure: str  # Notazione a parentesi del dominio
+
+
+class ProteinProperties(BaseModel):
+    length: int  # Residui standard
+    unknown_residues: int = 0  # Caratteri non standard ignorati (X, B, Z, ...)
+    molecular_weight: float  # Da, masse medie
+    isoelectric_point: float
+    gravy: float  # Idropatia media (Kyte-Doolittle)
+    instability_index: float
+    is_stable: bool  # Indice di instabilità <= 40
+    extinction_coefficient_reduced: int  # M^-1 cm^-1 a 280 nm, cisteine ridotte
+    extinction_coefficient_oxidized: int  # Tutte le coppie di cisteine come cistine
+    hydropathy_window: Optional[int] = None
+    hydropathy_profile: Optional[List[float]] = None  # Idropatia media per finestra (una per inizio)
 
 
 class SequenceStatistics(BaseModel):
@@ -47,6 +95,10 @@ class SequenceStatistics(BaseModel):
     open_reading_frames: Optional[List[ORF]] = None
     repeats: Optional[List[RepeatSequence]] = None
     palindromes: Optional[List[PalindromicSequence]] = None
+    partial_analyses: Optional[List[SequenceAnalysis]] = None  # Analisi interrotte per budget di tempo
+    motif_hits: Optional[List[MotifHit]] = None
+    start_hairpins: Optional[List[RnaHairpin]] = None  # Forcine stabili che coinvolgono start codon / RBS
+    protein_properties: Optional[ProteinProperties] = None  # Solo per le sequenze proteiche
 
 
 class CodonChangeDetail(BaseModel):
@@ -64,16 +116,115 @@ class SequenceValidationResult(BaseModel):
     stats: SequenceStatistics
 
 
+class StreamedSequenceSummary(BaseModel):
+    """Riepilogo di un record analizzato in streaming (una riga NDJSON per record)."""
+    sequence_name: str
+    is_valid: bool
+    stats: SequenceStatistics
+    invalid_positions: List[int]  # 1-based, limitate a STREAM_MAX_FEATURES
+    truncated_features: List[SequenceAnalysis] = []  # Analisi che hanno raggiunto il limite di elementi
+
+
+class MotifScanRequest(BaseModel):
+    sequence: str
+    library: Optional[str] = Field(default="common", description="Libreria predefinita di enzimi (None: solo i motivi personalizzati)")
+    motifs: Optional[Dict[str, str]] = Field(default=None, description="Motivi personalizzati: nome -> sito IUPAC")
+    both_strands: bool = True
+
+
+class MotifScanResult(BaseModel):
+    hits: List[MotifHit]
+    counts: Dict[str, int]  # Occorrenze per motivo
+
+
+class RnaFoldRequest(BaseModel):
+    sequence: str
+    max_span: int = Field(default=100, ge=10, le=400, description="Distanza massima tra le basi di una coppia")
+    hairpin_max_energy: float = Field(default=-5.0, le=0.0, description="Energia massima (kcal/mol) delle forcine riportate")
+
+
+class RnaFoldResult(BaseModel):
+    sequence: str
+    mfe: float  # kcal/mol
+    structure: str  # Notazione a parentesi
+    hairpins: List[RnaHairpin]
+
+
+class GeneticCodeInfo(BaseModel):
+    id: int
+    name: str
+    start_codons: List[str]
+    stop_codons: List[str]
+    codon_table: Dict[str, str]
+
+
+class TranslationRequest(BaseModel):
+    sequence: str
+    genetic_code: int = 1
+    frame: int = Field(default=0, ge=0, le=2)
+    to_stop: bool = Field(default=False, description="Interrompe la traduzione al primo codone di stop")
+    initiator_methionine: bool = Field(default=False, description="Traduce un primo codone di inizio alternativo come M")
+
+
+class TranslationResult(BaseModel):
+    protein: str
+    genetic_code: int
+    frame: int
+    codons: int
+
+
+class ProteinAnalysisRequest(BaseModel):
+    sequence: str
+    hydropathy_window: Optional[int] = Field(default=9, ge=1, le=101, description="Finestra del profilo di idropatia (None: nessun profilo)")
+
+
+class BatchProteinAnalysisRequest(BaseModel):
+    sequences: List[str]
+    hydropathy_window: Optional[int] = Field(default=None, ge=1, le=101, description="Finestra del profilo di idropatia (None: nessun profilo)")
+
+
+class SequenceRegion(BaseModel):
+    """Regione (0-based, estremi inclusi) in cui un profilo a finestra viola una soglia."""
+    start: int
+    end: int
+    min_value: float
+    max_value: float
+
+
+class SequenceProfileRequest(BaseModel):
+    sequence: str
+    window: int = Field(50, ge=2, le=100000)
+    step: int = Field(1, ge=1)
+    max_k: int = Field(6, ge=1, le=7, description="Lunghezza massima dei k-mer per la complessità linguistica")
+
+
+class SequenceProfile(BaseModel):
+    """Profili a finestra scorrevole; positions sono gli inizi (0-based) delle finestre."""
+    window: int
+    step: int
+    positions: List[int]
+    gc_content: List[float]
+    entropy: List[float]  # Entropia di Shannon in bit (massimo 2)
+    linguistic_complexity: List[float]  # Da 0 a 1
+
+
 class CodonOptimizationResult(BaseModel):
     original_sequence: str
     optimized_sequence: str
     cai_before: float
     cai_after: float
+    tai_before: Optional[float] = None  # None se l'organismo non ha le copie dei geni dei tRNA
+    tai_after: Optional[float] = None
+    cpb_before: Optional[float] = None  # None se l'organismo non ha i conteggi delle coppie di codoni
+    cpb_after: Optional[float] = None
     gc_content_before: float
     gc_content_after: float
     changes_made: int
     organism: str
     codon_change_details: List[CodonChangeDetail] = Field(default_factory=list)
+    gc_window_violations: Optional[int] = None  # Finestre con il GC fuori dai limiti richiesti
+    harmonized_from: Optional[str] = None  # Organismo di origine, per l'armonizzazione
+    repeat_violations: Optional[int] = None  # Basi in omopolimeri o ripetizioni oltre i limiti richiesti (inevitabili)
 
 
 class PrimerDesignRequest(BaseModel):
@@ -123,14 +274,200 @@ class SequenceValidationRequest(BaseModel):
     sequence_type: SequenceType = SequenceType.DNA
     component_type: Optional[str] = None
     sequence_name: Optional[str] = None
+    analyses: Optional[List[SequenceAnalysis]] = Field(default=None, description="Analisi da eseguire oltre ai controlli rapidi (None: tutte, lista vuota: solo controlli rapidi)")
+    analysis_time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = Field(default=None, description="Budget di tempo in millisecondi per singola analisi; i risultati oltre il budget sono parziali")
+    inverted_repeat_max_spacer: int = Field(default=0, ge=0, le=50, description="Spaziatore massimo per le ripetizioni invertite (0: solo palindromi)")
+    motif_library: str = Field(default="common", description="Libreria di enzimi/motivi per l'analisi motifs")
+    genetic_code: int = Field(default=1, description="Tabella di traduzione NCBI (1: standard, 2: mitocondriale dei vertebrati, 11: batterica, ...)")
+    alternative_starts: bool = Field(default=False, description="Considera tutti i codoni di inizio della tabella (es. GTG, TTG) oltre ad ATG")
 
 
-class CodonOptimizationRequest(BaseModel):
+class BatchSequenceItem(BaseModel):
     sequence: str
-    target_organism: str
+    sequence_name: Optional[str] = None
+    component_type: Optional[str] = None
+
+
+class BatchValidationRequest(BaseModel):
+    sequences: List[BatchSequenceItem]
+    sequence_type: SequenceType = SequenceType.DNA
+    analyses: Optional[List[SequenceAnalysis]] = Field(default=None, description="Analisi da eseguire per ogni sequenza (None: tutte)")
+    analysis_time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None
+    inverted_repeat_max_spacer: int = Field(default=0, ge=0, le=50)
+    motif_library: str = Field(default="common", description="Libreria di enzimi/motivi per l'analisi motifs")
+    genetic_code: int = Field(default=1, description="Tabella di traduzione NCBI usata per codoni di stop e ORF")
+    alternative_starts: bool = Field(default=False, description="Considera tutti i codoni di inizio della tabella oltre ad ATG")
+
+
+class SequenceEditOperation(str, Enum):
+    INSERT = "insert"
+    DELETE = "delete"
+    REPLACE = "replace"
+
+
+class SequenceEdit(BaseModel):
+    """Modifica di un intervallo [start, end) della sequenza (coordinate 0-based)."""
+    operation: SequenceEditOperation
+    start: int = Field(..., ge=0)
+    end: Optional[int] = Field(default=None, ge=0, description="Fine esclusiva dell'intervallo (ignorata per insert)")
+    sequence: str = Field(default="", description="Basi da inserire (insert/replace)")
+
+
+class ValidationSessionEditRequest(BaseModel):
+    edits: List[SequenceEdit]
+
+
+class ValidationSessionResponse(BaseModel):
+    session_id: str
+    version: int
+    result: SequenceValidationResult
+
+
+class CodonOptimizationStrategy(str, Enum):
+    MAXIMIZE = "maximize"  # Massimizza l'obiettivo (CAI, tAI, CPB pesati)
+    HARMONIZE = "harmonize"  # Riproduce i percentili d'uso dei codoni dell'organismo di origine
+
+
+class CodonOptimizationOptions(BaseModel):
     restriction_sites_to_avoid: Optional[List[str]] = Field(default_factory=list, description="Lista di sequenze di siti di restrizione da evitare (es. GAATTC)")
     optimization_strength: float = Field(default=0.8, ge=0, le=1, description="Livello di aggressività dell'ottimizzazione (0: minima, 1: massima preferenza per codoni ottimali)")
     avoid_rna_secondary_structures: bool = Field(default=True, description="Tenta di minimizzare strutture secondarie dell'RNA")
+    genetic_code: int = Field(default=1, description="Tabella di traduzione NCBI usata per tradurre e scegliere i codoni sinonimi")
+    gc_content_min: Optional[float] = Field(default=None, ge=0, le=100, description="Contenuto GC minimo (%) della sequenza ottimizzata")
+    gc_content_max: Optional[float] = Field(default=None, ge=0, le=100, description="Contenuto GC massimo (%) della sequenza ottimizzata")
+    gc_window: Optional[int] = Field(default=None, ge=10, le=1000, description="Finestra scorrevole (basi) per i limiti di GC locale (predefinita: LOCAL_GC_WINDOW)")
+    gc_window_min: Optional[float] = Field(default=None, ge=0, le=100, description="Contenuto GC minimo (%) in ogni finestra")
+    gc_window_max: Optional[float] = Field(default=None, ge=0, le=100, description="Contenuto GC massimo (%) in ogni finestra")
+    gc_window_hard: bool = Field(default=True, description="Vincolo stretto (prevale sul CAI) o morbido (bilanciato con il CAI)")
+    cai_weight: float = Field(default=1.0, ge=0, description="Peso del CAI nell'obiettivo")
+    tai_weight: float = Field(default=0.0, ge=0, description="Peso del tAI nell'obiettivo (richiede le copie dei geni dei tRNA dell'organismo)")
+    cpb_weight: float = Field(default=0.0, ge=0, description="Peso del CPB nell'obiettivo (richiede i conteggi delle coppie di codoni dell'organismo)")
+    strategy: CodonOptimizationStrategy = Field(default=CodonOptimizationStrategy.MAXIMIZE, description="Massimizzazione dell'obiettivo o armonizzazione (i pesi dell'obiettivo sono ignorati)")
+    source_organism: Optional[str] = Field(default=None, description="Organismo di origine della sequenza, richiesto per l'armonizzazione")
+    preserve_rare_clusters: bool = Field(default=False, description="Nell'armonizzazione, i gruppi di codoni rari nell'origine diventano i sinonimi più rari nel target")
+    max_homopolymer: Optional[int] = Field(default=None, ge=2, le=50, description="Lunghezza massima delle corse di una stessa base")
+    max_repeat_length: Optional[int] = Field(default=None, ge=8, le=1000, description="Lunghezza massima di una ripetizione diretta (9 per non avere ripetizioni segnalate dalla validazione)")
+
+
+class CodonOptimizationRequest(CodonOptimizationOptions):
+    sequence: str
+    target_organism: str
+
+
+class BatchCodonOptimizationItem(BaseModel):
+    sequence: str
+    sequence_name: Optional[str] = None
+    target_organism: Optional[str] = None  # Se assente: target_organism del lotto
+
+
+class BatchCodonOptimizationRequest(CodonOptimizationOptions):
+    sequences: List[BatchCodonOptimizationItem]
+    target_organism: Optional[str] = Field(default=None, description="Organismo target delle sequenze che non ne indicano uno")
+
+
+class BatchCodonOptimizationItemResult(BaseModel):
+    index: int
+    sequence_name: Optional[str] = None
+    sequence_hash: str
+    target_organism: str
+    duplicate_of: Optional[int] = None  # Indice della prima occorrenza della stessa coppia sequenza/organismo
+    result: Optional[CodonOptimizationResult] = None
+    error: Optional[str] = None
+
+
+class BatchCodonOptimizationResult(BaseModel):
+    results: List[BatchCodonOptimizationItemResult]
+    unique_sequences: int  # Ottimizzazioni effettivamente eseguite
+    saved: int = 0  # Risultati salvati nel database
+
+
+class CodonVariantRequest(BaseModel):
+    sequence: str
+    target_organism: str
+    variant_count: int = Field(default=10, ge=1, le=1000, description="Numero di varianti da generare")
+    optimization_strength: float = Field(default=0.8, ge=0, le=1, description="Temperatura del campionamento (0: sinonimi equiprobabili, 1: sempre il codone migliore)")
+    min_hamming_distance: int = Field(default=1, ge=1, description="Basi diverse minime tra due varianti qualsiasi")
+    max_shared_kmer: Optional[int] = Field(default=None, ge=8, le=1000, description="Lunghezza massima di una sottosequenza comune a due varianti")
+    restriction_sites_to_avoid: Optional[List[str]] = Field(default_factory=list, description="Siti da evitare in ogni variante")
+    genetic_code: int = Field(default=1, description="Tabella di traduzione NCBI")
+    seed: Optional[int] = Field(default=None, description="Seme del generatore casuale, per risultati riproducibili")
+
+
+class CodonVariant(BaseModel):
+    sequence: str
+    cai: float
+    tai: Optional[float] = None
+    cpb: Optional[float] = None
+    gc_content: float
+    min_distance: Optional[int] = None  # Distanza di Hamming dalla variante più vicina
+
+
+class CodonVariantLibrary(BaseModel):
+    organism: str
+    requested: int
+    variants: List[CodonVariant]
+    min_pairwise_distance: Optional[int] = None
+
+
+class ParetoObjective(str, Enum):
+    CAI = "cai"  # CAI più alto
+    GC_UNIFORMITY = "gc_uniformity"  # Deviazione standard del GC per finestra più bassa
+    SITES = "sites"  # Meno basi su cui termina un sito da evitare
+    REPEATS = "repeats"  # Meno k-mer ripetuti
+    FIVE_PRIME_STRUCTURE = "five_prime_structure"  # Struttura meno stabile (energia più alta) all'estremità 5'
+
+
+class ParetoOptimizationRequest(BaseModel):
+    sequence: str
+    target_organism: str
+    objectives: List[ParetoObjective] = Field(default_factory=lambda: list(ParetoObjective), min_length=2, description="Obiettivi ottimizzati insieme")
+    restriction_sites_to_avoid: Optional[List[str]] = Field(default_factory=list, description="Siti contati dall'obiettivo 'sites'")
+    population_size: int = Field(default=100, ge=8, le=1000, description="Individui per isola")
+    generations: int = Field(default=50, ge=1, le=1000, description="Generazioni per isola")
+    islands: Optional[int] = Field(default=None, ge=1, le=64, description="Popolazioni indipendenti evolute in parallelo (default: PARETO_ISLANDS)")
+    front_size: int = Field(default=50, ge=1, le=1000, description="Soluzioni del fronte restituite al massimo")
+    genetic_code: int = Field(default=1, description="Tabella di traduzione NCBI")
+    seed: Optional[int] = Field(default=None, description="Seme del generatore casuale, per risultati riproducibili")
+
+
+class ParetoSolution(BaseModel):
+    sequence: str
+    cai: float
+    gc_content: float
+    gc_window_std: float  # Deviazione standard del GC (%) sulle finestre di LOCAL_GC_WINDOW basi
+    site_hits: int  # Basi su cui termina un sito da evitare
+    repeated_kmers: int  # k-mer (PARETO_REPEAT_KMER basi) già presenti più a monte
+    five_prime_mfe: Optional[float] = None  # Energia minima (kcal/mol) dei primi FOLDING_OPTIMIZER_CODONS codoni
+
+
+class ParetoFront(BaseModel):
+    organism: str
+    objectives: List[ParetoObjective]
+    solutions: List[ParetoSolution]  # Soluzioni non dominate, per CAI decrescente
+    islands: int
+    evaluated: int  # Candidati valutati in totale
+
+
+class CodonUsageFormat(str, Enum):
+    KAZUSA = "kazusa"
+    COCOPUTS = "cocoputs"
+    FASTA = "fasta"  # CDS di riferimento da cui contare i codoni
+
+
+class CodonTableInfo(BaseModel):
+    key: str  # Identificativo usato come target_organism
+    name: str
+    builtin: bool = False
+    source_format: Optional[CodonUsageFormat] = None
+    total_codons: Optional[float] = None  # Codoni contati (o somma delle frequenze per le tabelle predefinite)
+    revision: Optional[str] = None  # Impronta dei conteggi, cambia a ogni nuovo caricamento
+    codon_pairs: bool = False  # Conteggi delle coppie di codoni disponibili (CPB)
+    trna_genes: bool = False  # Copie dei geni dei tRNA disponibili (tAI)
+    created_at: Optional[datetime] = None
+
+
+class CodonTableDetail(CodonTableInfo):
+    codons: Dict[str, float]  # Frazione d'uso di ogni codone tra i sinonimi
 
 
 class SequenceAnalysisResponse(BaseModel):
@@ -0,0 +1,53 @@
+from typing import List, Optional, Tuple
+
+from server.config.database import MongoRepository, get_collection
+from server.models.sequence_analysis import CodonTableInfo
+
+
+class CodonTableRepository(MongoRepository):
+    """
+    Repository delle tabelle d'uso dei codoni caricate dagli utenti: conteggi dei
+    64 codoni e metadati, indicizzati per chiave dell'organismo. È la copia
+    condivisa tra le istanze; ogni istanza ne mantiene una cache su disco.
+    """
+    collection_name = "codon_tables"
+
+    async def save_table(
+        self, info: CodonTableInfo, counts: List[float], format_version: int, pair_counts: Optional[List[float]] = None
+    ) -> None:
+        """Salva (o sostituisce) la tabella di un organismo."""
+        collection = get_collection(self.collection_name)
+        await collection.create_index("key", unique=True)
+        await collection.replace_one(
+            {"key": info.key},
+            {**info.model_dump(mode="json"), "counts": counts, "pair_counts": pair_counts, "format_version": format_version},
+            upsert=True
+        )
+
+    async def get_table(self, key: str) -> Optional[Tuple[CodonTableInfo, List[float], int, Optional[List[float]]]]:
+        """Tabella di un organismo: metadati, conteggi, versione del formato e conteggi delle coppie."""
+        collection = get_collection(self.collection_name)
+        document = await collection.find_one({"key": key}, {"_id": 0})
+        if not document:
+            return None
+        counts = document.pop("counts")
+        pair_counts = document.pop("pair_counts", None)
+        format_version = document.pop("format_version", 0)
+        return CodonTableInfo.model_validate(document), counts, format_version, pair_counts
+
+    async def get_revision(self, key: str) -> Optional[str]:
+        """Revisione della tabella di un organismo (None se non esiste), senza i conteggi."""
+        collection = get_collection(self.collection_name)
+        document = await collection.find_one({"key": key}, {"_id": 0, "revision": 1})
+        return document.get("revision") if document else None
+
+    async def list_tables(self) -> List[CodonTableInfo]:
+        """Metadati di tutte le tabelle caricate."""
+        collection = get_collection(self.collection_name)
+        cursor = collection.find({}, {"_id": 0, "counts": 0, "pair_counts": 0, "format_version": 0}).sort("key", 1)
+        return [CodonTableInfo.model_validate(document) async for document in cursor]
+
+    async def delete_table(self, key: str) -> bool:
+        collection = get_collection(self.collection_name)
+        result = await collection.delete_one({"key": key})
+        return result.deleted_count > 0
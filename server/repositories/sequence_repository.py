@@ -1,4 +1,4 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from bson import ObjectId
 
@@ -105,15 +105,29 @@ class SequenceRepository(MongoRepository):
         """
         Salva i risultati dell'ottimizzazione dei codoni.
         """
-        analysis_data = {
+        return await self.create(self._codon_optimization_document(user_id, request, result))
+
+    async def save_codon_optimizations(
+        self, user_id: Optional[str], optimizations: List[Tuple[CodonOptimizationRequest, CodonOptimizationResult]]
+    ) -> List[str]:
+        """
+        Salva i risultati di un lotto di ottimizzazioni con un solo inserimento.
+        """
+        return await self.create_many([
+            self._codon_optimization_document(user_id, request, result) for request, result in optimizations
+        ])
+
+    @staticmethod
+    def _codon_optimization_document(
+        user_id: Optional[str], request: CodonOptimizationRequest, result: CodonOptimizationResult
+    ) -> Dict[str, Any]:
+        return {
             "user_id": user_id,
             "sequence": request.sequence,
             "sequence_type": SequenceType.DNA,
             "sequence_name": f"Optimized for {request.target_organism}",
             "optimization_result": result.dict()
         }
-        
-        return await self.create(analysis_data)
 
     async def search_sequences(
         self, query: str, skip: int = 0, limit: int = 20, sequence_type: Optional[SequenceType] = None
@@ -0,0 +1,51 @@
+from typing import Optional
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from server.config.database import MongoRepository, get_collection
+from server.models.sequence_analysis import SequenceValidationResult
+from app.core.config import settings
+
+
+class ValidationCacheRepository(MongoRepository):
+    """
+    Repository per la cache persistente dei risultati di validazione,
+    indicizzata dalla chiave calcolata da `validation_cache_key`.
+    """
+    collection_name = "validation_cache"
+
+    async def ensure_indexes(self) -> None:
+        """
+        Crea l'indice univoco sulla chiave e, se configurata, la scadenza
+        automatica dei risultati tramite indice TTL su created_at.
+        """
+        collection = get_collection(self.collection_name)
+        await collection.create_index("key", unique=True)
+        if settings.VALIDATION_CACHE_TTL_DAYS > 0:
+            await collection.create_index("created_at", expireAfterSeconds=settings.VALIDATION_CACHE_TTL_DAYS * 86400)
+
+    async def get_result(self, key: str) -> Optional[SequenceValidationResult]:
+        """
+        Recupera un risultato in cache per chiave.
+        """
+        collection = get_collection(self.collection_name)
+        document = await collection.find_one({"key": key}, {"result": 1})
+        if not document:
+            return None
+        return SequenceValidationResult.model_validate(document["result"])
+
+    async def save_result(self, key: str, result: SequenceValidationResult) -> None:
+        """
+        Salva un risultato; se la chiave esiste già (anche per un inserimento
+        concorrente) il documento esistente viene mantenuto.
+        """
+        collection = get_collection(self.collection_name)
+        try:
+            await collection.update_one(
+                {"key": key},
+                {"$setOnInsert": {"key": key, "result": result.model_dump(mode="json"), "created_at": datetime.utcnow()}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
@@ -0,0 +1,28 @@
+from typing import Optional
+import time
+
+
+class TimeBudget:
+    """
+    Budget di tempo per una singola analisi di sequenza.
+
+    Gli algoritmi controllano `expired()` a intervalli regolari e, se il budget
+    è esaurito, interrompono il lavoro restituendo i risultati parziali ottenuti
+    fino a quel momento. `exhausted` resta True per segnalare la troncatura.
+    """
+
+    def __init__(self, seconds: Optional[float] = None):
+        self.deadline: Optional[float] = time.perf_counter() + seconds if seconds is not None else None
+        self.exhausted: bool = False
+
+    @classmethod
+    def from_ms(cls, milliseconds: Optional[float]) -> "TimeBudget":
+        return cls(milliseconds / 1000.0 if milliseconds is not None else None)
+
+    def expired(self) -> bool:
+        """True se il tempo a disposizione è terminato."""
+        if self.exhausted:
+            return True
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            self.exhausted = True
+        return self.exhausted
@@ -0,0 +1,99 @@
+from typing import Dict, List, Tuple
+import asyncio
+import functools
+import logging
+
+from server.models.sequence_analysis import (
+    BatchCodonOptimizationRequest,
+    BatchCodonOptimizationItemResult,
+    BatchCodonOptimizationResult,
+    CodonOptimizationOptions,
+    CodonOptimizationRequest,
+    CodonOptimizationResult
+)
+from server.services.batch_validation import sequence_hash
+from server.services.codon_model import is_builtin_organism
+from server.services.codon_optimizer import CodonOptimizer
+from server.services import codon_table_store
+from server.services.worker_pool import get_process_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+def optimize_for_batch(request: CodonOptimizationRequest) -> dict:
+    """
+    Punto di ingresso eseguito nei processi worker: ottimizza una sequenza e
+    restituisce il risultato già serializzabile in JSON.
+    """
+    return CodonOptimizer.optimize_sequence(request).model_dump(mode="json")
+
+
+async def optimize_batch(
+    request: BatchCodonOptimizationRequest
+) -> Tuple[BatchCodonOptimizationResult, List[Tuple[CodonOptimizationRequest, CodonOptimizationResult]]]:
+    """
+    Ottimizza un lotto di sequenze in parallelo nel pool di processi, con le
+    stesse opzioni per tutte. Le coppie sequenza/organismo identiche vengono
+    ottimizzate una sola volta; le copie riportano in `duplicate_of` l'indice
+    della prima occorrenza. Restituisce il riepilogo per elemento e le coppie
+    (richiesta, risultato) delle ottimizzazioni riuscite, da salvare.
+    """
+    options = request.model_dump(include=set(CodonOptimizationOptions.model_fields))
+    groups: Dict[Tuple[str, str], List[int]] = {}
+    hashes: List[str] = []
+    organisms: List[str] = []
+    for index, item in enumerate(request.sequences):
+        digest = sequence_hash(item.sequence)
+        organism = (item.target_organism or request.target_organism or "").strip().lower()
+        hashes.append(digest)
+        organisms.append(organism)
+        groups.setdefault((digest, organism), []).append(index)
+
+    # Le tabelle caricate su altre istanze vengono scaricate nella cache su disco,
+    # da cui le leggono i processi worker
+    source_organism = (request.source_organism or "").strip().lower()
+    for organism in {organism for _, organism in groups} | {source_organism}:
+        if organism and not is_builtin_organism(organism):
+            await codon_table_store.ensure_table(organism)
+
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    unique_requests: List[CodonOptimizationRequest] = []
+    futures = []
+    for (_, organism), indices in groups.items():
+        item = request.sequences[indices[0]]
+        item_request = CodonOptimizationRequest(**options, sequence=item.sequence, target_organism=organism)
+        unique_requests.append(item_request)
+        if not organism:
+            futures.append(loop.create_future())
+            futures[-1].set_exception(ValueError("Organismo target non indicato (né per la sequenza né per il lotto)."))
+            continue
+        futures.append(loop.run_in_executor(pool, functools.partial(optimize_for_batch, item_request)))
+    logger.info(f"Ottimizzazione batch: {len(request.sequences)} sequenze, {len(futures)} uniche")
+    outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+    results: List[BatchCodonOptimizationItemResult] = [None] * len(request.sequences)
+    completed: List[Tuple[CodonOptimizationRequest, CodonOptimizationResult]] = []
+    for indices, item_request, outcome in zip(groups.values(), unique_requests, outcomes):
+        result, error = None, None
+        if isinstance(outcome, BaseException):
+            if isinstance(outcome, ValueError):
+                logger.warning(f"Sequenza {indices[0]} del lotto non ottimizzabile: {str(outcome)}")
+            else:
+                logger.error(f"Errore nell'ottimizzazione batch della sequenza {indices[0]}: {str(outcome)}", exc_info=outcome)
+            error = str(outcome)
+        else:
+            result = CodonOptimizationResult.model_validate(outcome)
+            completed.append((item_request, result))
+        for index in indices:
+            results[index] = BatchCodonOptimizationItemResult(
+                index=index,
+                sequence_name=request.sequences[index].sequence_name,
+                sequence_hash=hashes[index],
+                target_organism=organisms[index],
+                duplicate_of=indices[0] if index != indices[0] else None,
+                result=result,
+                error=error
+            )
+    return BatchCodonOptimizationResult(results=results, unique_sequences=len(groups)), completed
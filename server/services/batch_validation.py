@@ -0,0 +1,122 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+
+from server.models.sequence_analysis import SequenceType, SequenceAnalysis, BatchSequenceItem
+from server.services.sequence_validator import SequenceValidator
+from server.services.worker_pool import get_process_pool
+
+
+logger = logging.getLogger(__name__)
+
+
+def sequence_hash(sequence: str) -> str:
+    """Hash SHA-256 della sequenza normalizzata (senza spazi esterni, maiuscola)."""
+    return hashlib.sha256(sequence.strip().upper().encode("utf-8", errors="replace")).hexdigest()
+
+
+def validate_for_batch(
+    sequence: str,
+    sequence_type: SequenceType,
+    component_type: Optional[str],
+    analyses: Optional[List[SequenceAnalysis]],
+    time_budgets_ms: Optional[Dict[SequenceAnalysis, float]],
+    inverted_repeat_max_spacer: int,
+    motif_library: Optional[str] = None,
+    genetic_code: int = 1,
+    alternative_starts: bool = False
+) -> dict:
+    """
+    Punto di ingresso eseguito nei processi worker: valida una sequenza e
+    restituisce il risultato già serializzabile in JSON.
+    """
+    result = SequenceValidator.validate_sequence(
+        sequence=sequence,
+        sequence_type=sequence_type,
+        component_type=component_type,
+        analyses=analyses,
+        time_budgets_ms=time_budgets_ms,
+        inverted_repeat_max_spacer=inverted_repeat_max_spacer,
+        motif_library=motif_library,
+        genetic_code=genetic_code,
+        alternative_starts=alternative_starts
+    )
+    return result.model_dump(mode="json")
+
+
+async def stream_batch_validation(
+    items: List[BatchSequenceItem],
+    sequence_type: SequenceType,
+    analyses: Optional[List[SequenceAnalysis]] = None,
+    time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None,
+    inverted_repeat_max_spacer: int = 0,
+    motif_library: Optional[str] = None,
+    genetic_code: int = 1,
+    alternative_starts: bool = False
+) -> AsyncIterator[str]:
+    """
+    Valida un lotto di sequenze nel pool di processi e produce una riga NDJSON
+    per ogni sequenza, nell'ordine in cui le validazioni terminano.
+
+    Le sequenze identiche (stesso hash e stesso tipo di componente) vengono
+    validate una sola volta; le copie riportano in `duplicate_of` l'indice della
+    prima occorrenza. Ogni riga contiene index, sequence_name, sequence_hash,
+    duplicate_of e result (oppure error). Libreria di motivi, tabella di
+    traduzione e codoni di inizio alternativi valgono per tutto il lotto.
+    """
+    groups: Dict[Tuple[str, Optional[str]], List[int]] = {}
+    hashes: List[str] = []
+    for index, item in enumerate(items):
+        digest = sequence_hash(item.sequence)
+        hashes.append(digest)
+        groups.setdefault((digest, item.component_type), []).append(index)
+
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    futures: Dict[asyncio.Future, List[int]] = {}
+    for indices in groups.values():
+        item = items[indices[0]]
+        future = loop.run_in_executor(pool, functools.partial(
+            validate_for_batch,
+            item.sequence,
+            sequence_type,
+            item.component_type,
+            analyses,
+            time_budgets_ms,
+            inverted_repeat_max_spacer,
+            motif_library,
+            genetic_code,
+            alternative_starts
+        ))
+        futures[future] = indices
+    logger.info(f"Validazione batch: {len(items)} sequenze, {len(futures)} uniche")
+
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                indices = futures[future]
+                result, error = None, None
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Errore nella validazione batch della sequenza {indices[0]}: {str(e)}", exc_info=True)
+                    error = str(e)
+                for index in indices:
+                    line = {
+                        "index": index,
+                        "sequence_name": items[index].sequence_name,
+                        "sequence_hash": hashes[index],
+                        "duplicate_of": indices[0] if index != indices[0] else None,
+                        "result": result,
+                        "error": error
+                    }
+                    yield json.dumps(line) + "\n"
+    finally:
+        # Se il client si disconnette non ha senso completare le validazioni rimaste
+        for future in pending:
+            future.cancel()
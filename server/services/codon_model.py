@@ -0,0 +1,385 @@
+from typing import Dict, Mapping, Optional, Tuple, Union
+from functools import lru_cache
+from types import MappingProxyType
+import math
+
+import numpy as np
+
+from server.services.packed_sequence import PackedSequence
+from server.services.genetic_code import GeneticCode, CODONS, STANDARD_TABLE_ID, get_genetic_code
+from server.services import codon_table_store
+
+
+# Tabelle di utilizzo dei codoni per diversi organismi
+CODON_TABLES = {
+    "ecoli": {
+        "name": "Escherichia coli",
+        "codons": {
+            "GCA": 0.21, "GCC": 0.27, "GCG": 0.36, "GCT": 0.16, "AGA": 0.04, "AGG": 0.02, "CGA": 0.06, "CGC": 0.4, "CGG": 0.1, "CGT": 0.38,
+            "AAC": 0.55, "AAT": 0.45, "GAC": 0.37, "GAT": 0.63, "TGC": 0.55, "TGT": 0.45, "GAA": 0.68, "GAG": 0.32, "CAA": 0.34, "CAG": 0.66,
+            "GGA": 0.11, "GGC": 0.4, "GGG": 0.15, "GGT": 0.34, "CAC": 0.43, "CAT": 0.57, "ATA": 0.07, "ATC": 0.42, "ATT": 0.51,
+            "CTA": 0.04, "CTC": 0.1, "CTG": 0.5, "CTT": 0.1, "TTA": 0.13, "TTG": 0.13, "AAA": 0.74, "AAG": 0.26, "ATG": 1.0,
+            "TTC": 0.43, "TTT": 0.57, "CCA": 0.19, "CCC": 0.12, "CCG": 0.52, "CCT": 0.16, "AGC": 0.28, "AGT": 0.15, "TCA": 0.12,
+            "TCC": 0.15, "TCG": 0.15, "TCT": 0.15, "ACA": 0.13, "ACC": 0.4, "ACG": 0.27, "ACT": 0.19, "TGG": 1.0, "TAC": 0.43,
+            "TAT": 0.57, "GTA": 0.15, "GTC": 0.22, "GTG": 0.37, "GTT": 0.26, "TAA": 0.61, "TAG": 0.09, "TGA": 0.3,
+        }
+    },
+    "yeast": {
+        "name": "Saccharomyces cerevisiae",
+        "codons": {
+            "GCA":0.21,"GCC":0.26,"GCG":0.11,"GCT":0.42,"AGA":0.48,"AGG":0.21,"CGA":0.07,"CGC":0.06,"CGG":0.04,"CGT":0.14,
+            "AAC":0.41,"AAT":0.59,"GAC":0.35,"GAT":0.65,"TGC":0.37,"TGT":0.63,"GAA":0.7,"GAG":0.3,"CAA":0.69,"CAG":0.31,
+            "GGA":0.22,"GGC":0.19,"GGG":0.12,"GGT":0.47,"CAC":0.35,"CAT":0.65,"ATA":0.27,"ATC":0.26,"ATT":0.47,
+            "CTA":0.14,"CTC":0.06,"CTG":0.11,"CTT":0.13,"TTA":0.28,"TTG":0.29,"AAA":0.58,"AAG":0.42,"ATG":1.0,
+            "TTC":0.4,"TTT":0.6,"CCA":0.42,"CCC":0.15,"CCG":0.12,"CCT":0.31,"AGC":0.11,"AGT":0.16,"TCA":0.21,
+            "TCC":0.16,"TCG":0.1,"TCT":0.26,"ACA":0.3,"ACC":0.22,"ACG":0.13,"ACT":0.35,"TGG":1.0,"TAC":0.43,
+            "TAT":0.57,"GTA":0.21,"GTC":0.18,"GTG":0.19,"GTT":0.42,"TAA":0.47,"TAG":0.23,"TGA":0.3,
+        }
+    },
+    "human": {
+        "name": "Homo sapiens",
+        "codons": {
+            "GCA":0.23,"GCC":0.4,"GCG":0.11,"GCT":0.26,"AGA":0.2,"AGG":0.2,"CGA":0.11,"CGC":0.19,"CGG":0.21,"CGT":0.08,
+            "AAC":0.53,"AAT":0.47,"GAC":0.54,"GAT":0.46,"TGC":0.55,"TGT":0.45,"GAA":0.42,"GAG":0.58,"CAA":0.27,"CAG":0.73,
+            "GGA":0.25,"GGC":0.34,"GGG":0.25,"GGT":0.16,"CAC":0.58,"CAT":0.42,"ATA":0.16,"ATC":0.48,"ATT":0.36,
+            "CTA":0.07,"CTC":0.2,"CTG":0.41,"CTT":0.13,"TTA":0.07,"TTG":0.13,"AAA":0.42,"AAG":0.58,"ATG":1.0,
+            "TTC":0.54,"TTT":0.46,"CCA":0.27,"CCC":0.33,"CCG":0.11,"CCT":0.29,"AGC":0.24,"AGT":0.15,"TCA":0.15,
+            "TCC":0.22,"TCG":0.06,"TCT":0.18,"ACA":0.28,"ACC":0.36,"ACG":0.12,"ACT":0.24,"TGG":1.0,"TAC":0.56,
+            "TAT":0.44,"GTA":0.11,"GTC":0.24,"GTG":0.47,"GTT":0.18,"TAA":0.28,"TAG":0.2,"TGA":0.52,
+        }
+    },
+}
+
+
+# Copie dei geni dei tRNA per anticodone (5'->3'), per il tAI. Conteggi da GtRNAdb
+# (E. coli K-12 MG1655, S. cerevisiae S288C; per H. sapiens valori approssimati dei
+# geni ad alta confidenza). I tRNA con lisidina (Ile2, anticodone CAT) non sono inclusi:
+# il codone ATA in E. coli riceve il peso medio, come gli altri codoni senza tRNA.
+TRNA_GENE_COPIES: Dict[str, Dict[str, int]] = {
+    "ecoli": {
+        "GGC": 2, "TGC": 3, "ACG": 4, "CCG": 1, "TCT": 1, "CCT": 1, "GTT": 4, "GTC": 3, "GCA": 1, "TTG": 2,
+        "CTG": 2, "TTC": 4, "GCC": 4, "TCC": 1, "CCC": 1, "GTG": 1, "GAT": 3, "CAG": 4, "GAG": 1, "TAG": 1,
+        "CAA": 1, "TAA": 1, "TTT": 6, "CAT": 6, "GAA": 2, "GGG": 1, "TGG": 1, "CGG": 1, "GGA": 2, "TGA": 1,
+        "CGA": 1, "GCT": 1, "GGT": 2, "TGT": 1, "CGT": 1, "CCA": 1, "GTA": 3, "TAC": 5, "GAC": 2,
+    },
+    "yeast": {
+        "AGC": 11, "TGC": 5, "ACG": 6, "CCG": 1, "TCT": 11, "CCT": 1, "GTT": 10, "GTC": 15, "GCA": 4, "TTG": 9,
+        "CTG": 1, "TTC": 14, "CTC": 2, "GCC": 16, "TCC": 3, "CCC": 2, "GTG": 7, "AAT": 13, "TAT": 2, "TAA": 7,
+        "CAA": 10, "GAG": 1, "TAG": 3, "CTT": 14, "TTT": 7, "CAT": 10, "GAA": 10, "AGG": 2, "TGG": 10, "AGA": 11,
+        "GCT": 4, "TGA": 3, "CGA": 1, "AGT": 11, "TGT": 4, "CGT": 1, "CCA": 6, "GTA": 8, "AAC": 14, "TAC": 2,
+        "CAC": 2,
+    },
+    "human": {
+        "AGC": 29, "CGC": 4, "TGC": 8, "ACG": 7, "CCG": 4, "CCT": 5, "TCG": 6, "TCT": 6, "GTT": 33, "GTC": 19,
+        "GCA": 30, "CTG": 20, "TTG": 11, "CTC": 14, "TTC": 13, "CCC": 8, "GCC": 15, "TCC": 9, "GTG": 11, "AAT": 14,
+        "GAT": 3, "TAT": 5, "AAG": 10, "CAA": 6, "CAG": 10, "TAA": 4, "TAG": 3, "CTT": 17, "TTT": 16, "CAT": 20,
+        "GAA": 12, "AGG": 10, "CGG": 4, "TGG": 7, "AGA": 10, "CGA": 4, "GCT": 8, "TGA": 4, "AGT": 10, "CGT": 6,
+        "TGT": 6, "CCA": 9, "GTA": 14, "AAC": 11, "CAC": 16, "TAC": 5,
+    },
+}
+# Vincoli di appaiamento (s) tra la base 34 dell'anticodone e la terza base del
+# codone (dos Reis et al. 2004); A34 è deamminata a inosina (I)
+TRNA_WOBBLE_PENALTIES: Dict[str, Dict[str, float]] = {
+    "A": {"T": 0.0, "C": 0.28, "A": 0.9999},
+    "G": {"C": 0.0, "T": 0.41},
+    "T": {"A": 0.0, "G": 0.68},
+    "C": {"G": 0.0},
+}
+# Pseudoconteggio delle coppie di codoni mai osservate, per il punteggio delle coppie
+CODON_PAIR_PSEUDOCOUNT = 0.5
+_BASE_COMPLEMENT = str.maketrans("ACGT", "TGCA")
+
+# Amminoacidi esclusi dal CAI e mai ricodificati (stop, Met, Trp)
+FIXED_AMINO_ACIDS = ("*", "M", "W")
+# Frequenza usata al posto di zero per i codoni assenti dalla tabella (evita log(0))
+MIN_CODON_FREQUENCY = 1e-9
+# Decremento per rango tra sinonimi nei punteggi di scelta, per scegliere in modo
+# deterministico a parità di frequenza (il primo in ordine NCBI)
+TIE_BREAK = 1e-9
+
+# Indice a 2 bit (0-63) di ogni codone
+CODON_INDEX: Dict[str, int] = {codon: index for index, codon in enumerate(CODONS)}
+# Basi G/C di ogni codone (indice 0-63)
+CODON_GC_COUNT = np.array([sum(base in "GC" for base in codon) for codon in CODONS], dtype=np.int64)
+CODON_GC_COUNT.setflags(write=False)
+
+
+def _frozen(array: np.ndarray) -> np.ndarray:
+    array.setflags(write=False)
+    return array
+
+
+def _mean_of_defined(values: np.ndarray) -> np.ndarray:
+    """Media lungo l'ultimo asse ignorando i NaN; NaN dove non ci sono valori."""
+    defined = ~np.isnan(values)
+    counts = defined.sum(axis=-1)
+    totals = np.where(defined, values, 0.0).sum(axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, totals / np.maximum(counts, 1), np.nan)
+
+
+def trna_adaptation_log_weights(copies: Dict[str, int], code: GeneticCode) -> np.ndarray:
+    """
+    Log dei pesi del tAI (dos Reis et al. 2004) per i 64 codoni: W = Σ (1 - s)·copie
+    sui tRNA che leggono il codone (appaiamento Watson–Crick o wobble, solo se il
+    codone codifica lo stesso amminoacido), normalizzato sul massimo. I codoni senza
+    tRNA ricevono la media geometrica degli altri pesi; NaN per stop, Met e Trp.
+    """
+    absolute = np.zeros(64)
+    for anticodon, count in copies.items():
+        matched = anticodon[::-1].translate(_BASE_COMPLEMENT)
+        amino_acid = code.amino_acids[CODON_INDEX[matched]]
+        for third, penalty in TRNA_WOBBLE_PENALTIES[anticodon[0]].items():
+            index = CODON_INDEX[matched[:2] + third]
+            if code.amino_acids[index] == amino_acid:
+                absolute[index] += (1.0 - penalty) * count
+    excluded = np.isin(code.amino_acids[:64], [ord(aa) for aa in FIXED_AMINO_ACIDS])
+    log_weights = np.full(64, np.nan)
+    if absolute[~excluded].max(initial=0.0) <= 0:
+        return log_weights
+    weights = absolute / absolute[~excluded].max()
+    observed = ~excluded & (weights > 0)
+    weights[~excluded & ~observed] = math.exp(np.log(weights[observed]).mean())
+    log_weights[~excluded] = np.log(weights[~excluded])
+    return log_weights
+
+
+def codon_pair_scores(pair_counts: np.ndarray, code: GeneticCode) -> np.ndarray:
+    """
+    Punteggi delle coppie di codoni (CPS, Coleman et al. 2008) come matrice 64 x 64:
+    ln(N_AB / (N_A·N_B / (N_X·N_Y) · N_XY)), con N_AB le occorrenze della coppia
+    adiacente A-B, N_A e N_B quelle dei codoni e N_X, N_Y, N_XY quelle dei rispettivi
+    amminoacidi, tutte contate sulle coppie. NaN per le coppie con uno stop e per
+    quelle di amminoacidi mai osservati in coppia.
+    """
+    observed = np.asarray(pair_counts, dtype=np.float64).reshape(64, 64)
+    amino_acids = code.amino_acids[:64]
+    labels, amino_acid_ids = np.unique(amino_acids, return_inverse=True)
+    first_codon, second_codon = observed.sum(axis=1), observed.sum(axis=0)
+    first_aa = np.bincount(amino_acid_ids, weights=first_codon, minlength=labels.size)
+    second_aa = np.bincount(amino_acid_ids, weights=second_codon, minlength=labels.size)
+    aa_pairs = np.zeros((labels.size, labels.size))
+    np.add.at(aa_pairs, (amino_acid_ids[:, None], amino_acid_ids[None, :]), observed)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = (
+            first_codon[:, None] * second_codon[None, :]
+            / (first_aa[amino_acid_ids][:, None] * second_aa[amino_acid_ids][None, :])
+            * aa_pairs[amino_acid_ids[:, None], amino_acid_ids[None, :]]
+        )
+        scores = np.log(np.maximum(observed, CODON_PAIR_PSEUDOCOUNT) / expected)
+    stop = amino_acids == ord("*")
+    scores[~np.isfinite(scores) | (expected <= 0) | stop[:, None] | stop[None, :]] = np.nan
+    return scores
+
+
+class CodonModel:
+    """
+    Modello d'uso dei codoni di un organismo, compilato una sola volta per coppia
+    (organismo, codice genetico) in tabelle immutabili di 64 elementi indicizzate
+    dal codone a 2 bit: frequenze, adattamento relativo (w) e suo logaritmo,
+    sinonimi ordinati per frequenza con i punteggi di scelta. Il CAI di una
+    sequenza è un gather sui log-pesi seguito da una media.
+    """
+
+    def __init__(
+        self,
+        key: str,
+        name: str,
+        frequencies: Dict[str, float],
+        code: GeneticCode,
+        trna_copies: Optional[Dict[str, int]] = None,
+        pair_counts: Optional[np.ndarray] = None
+    ):
+        self.key = key
+        self.name = name
+        self.code = code
+        self._frequency_table = dict(frequencies)
+        self._trna_copies = trna_copies
+        self._pair_counts = pair_counts
+        self.frequencies = _frozen(np.array([frequencies.get(codon, 0.0) for codon in CODONS], dtype=np.float64))
+
+        # Log dell'adattamento relativo rispetto al sinonimo più frequente; NaN per i
+        # codoni esclusi dal CAI (stop, Met, Trp, amminoacidi senza frequenze positive)
+        log_weights = np.full(64, np.nan)
+        # Punteggi di scelta: come i log-pesi, 0 per i codoni esclusi dal CAI e un
+        # valore molto negativo per i sinonimi mai osservati nell'organismo
+        choice_log_weights = np.zeros(64)
+        ranked: Dict[str, Tuple[int, ...]] = {}
+        for aa, codons in code.synonymous_codons.items():
+            # Ordinamento stabile: a parità di frequenza resta l'ordine NCBI
+            ranked[aa] = tuple(CODON_INDEX[c] for c in sorted(codons, key=lambda c: frequencies.get(c, 0.0), reverse=True))
+            if aa in FIXED_AMINO_ACIDS:
+                continue
+            max_frequency = max((frequencies.get(c, 0.0) for c in codons), default=0.0)
+            if max_frequency <= 0:
+                continue
+            for codon in codons:
+                frequency = frequencies.get(codon, MIN_CODON_FREQUENCY)
+                if frequency > 0:
+                    log_weights[CODON_INDEX[codon]] = math.log(frequency / max_frequency)
+                choice_log_weights[CODON_INDEX[codon]] = math.log(max(frequency, MIN_CODON_FREQUENCY) / max_frequency)
+        self.log_weights = _frozen(log_weights)
+        self.weights = _frozen(np.exp(log_weights))
+        self.choice_log_weights = _frozen(choice_log_weights)
+        self.gc_counts = CODON_GC_COUNT
+        # Percentile d'uso di ogni codone tra i sinonimi (frequenza cumulata dei sinonimi
+        # meno usati più metà della propria), per l'armonizzazione; NaN per stop, Met, Trp
+        usage_percentiles = np.full(64, np.nan)
+        for aa, codons in code.synonymous_codons.items():
+            if aa in FIXED_AMINO_ACIDS:
+                continue
+            indices = np.array([CODON_INDEX[c] for c in codons])
+            usage = self.frequencies[indices]
+            total = usage.sum()
+            if total <= 0:
+                usage_percentiles[indices] = 0.5
+                continue
+            below = (usage[None, :] * (usage[None, :] < usage[:, None])).sum(axis=1)
+            ties = (usage[None, :] == usage[:, None]).sum(axis=1)
+            usage_percentiles[indices] = (below + usage * ties / 2.0) / total
+        self.usage_percentiles = _frozen(usage_percentiles)
+
+        # Sinonimi per amminoacido in ordine di frequenza decrescente e relativi punteggi
+        self.ranked_synonyms: Mapping[str, Tuple[int, ...]] = MappingProxyType(ranked)
+        self.ranked_codons: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {aa: tuple(CODONS[index] for index in indices) for aa, indices in ranked.items()}
+        )
+        # Log dei pesi del tAI (se sono note le copie dei tRNA) e punteggi delle coppie
+        # di codoni (se sono noti i conteggi delle coppie)
+        self.tai_log_weights: Optional[np.ndarray] = (
+            _frozen(trna_adaptation_log_weights(trna_copies, code)) if trna_copies else None
+        )
+        self.pair_scores: Optional[np.ndarray] = (
+            _frozen(codon_pair_scores(pair_counts, code)) if pair_counts is not None else None
+        )
+        self._ranked_arrays: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for aa, indices in ranked.items():
+            array = np.array(indices, dtype=np.int64)
+            self._ranked_arrays[aa] = (
+                _frozen(array),
+                _frozen(self.choice_log_weights[array] - TIE_BREAK * np.arange(array.size))
+            )
+
+    def is_recodable(self, aa: str) -> bool:
+        """True se l'amminoacido ammette una scelta tra più codoni."""
+        return aa not in FIXED_AMINO_ACIDS and len(self.ranked_synonyms.get(aa, ())) > 1
+
+    def ranked_options(self, aa: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Indici dei sinonimi di un amminoacido (frequenza decrescente) e punteggi di scelta."""
+        return self._ranked_arrays[aa]
+
+    def cai_of_indices(self, indices: np.ndarray) -> float:
+        """CAI dati gli indici dei codoni (gli indici negativi, codoni non validi, sono ignorati)."""
+        logs = self.log_weights[indices[indices >= 0]]
+        logs = logs[~np.isnan(logs)]
+        if logs.size == 0:
+            return 1.0
+        return math.exp(logs.mean())
+
+    def cai(self, sequence: Union[str, PackedSequence]) -> float:
+        """Indice di Adattamento dei Codoni (CAI) di una sequenza codificante."""
+        if not len(sequence) or len(sequence) % 3 != 0:
+            return 0.0
+        return self.cai_of_indices(PackedSequence.coerce(sequence).codon_indices())
+
+    def expression_scores(self, indices: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        """
+        CAI, tAI e CPB (media dei punteggi delle coppie adiacenti) in una sola
+        passata di gather: `indices` contiene i codoni di una sequenza (vettore) o di
+        più sequenze della stessa lunghezza (una per riga), tutti validi (0-63). Il
+        tAI e il CPB sono None se il modello non ha i dati necessari; NaN per le
+        sequenze senza codoni valutabili.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        cai = np.exp(_mean_of_defined(self.log_weights[indices]))
+        cai = np.where(np.isnan(cai), 1.0, cai)
+        tai = np.exp(_mean_of_defined(self.tai_log_weights[indices])) if self.tai_log_weights is not None else None
+        cpb = (
+            _mean_of_defined(self.pair_scores[indices[..., :-1], indices[..., 1:]])
+            if self.pair_scores is not None and indices.shape[-1] > 1 else None
+        )
+        return cai, tai, cpb
+
+    def __reduce__(self):
+        # Serializzato come tabelle di conteggi e ricompilato: per l'invio ai worker
+        return (CodonModel, (self.key, self.name, self._frequency_table, self.code, self._trna_copies, self._pair_counts))
+
+    def __repr__(self) -> str:
+        return f"CodonModel({self.key!r}, genetic_code={self.code.table_id})"
+
+
+@lru_cache(maxsize=128)
+def _compile_codon_model(key: str, genetic_code: int) -> CodonModel:
+    organism = CODON_TABLES[key]
+    return CodonModel(key, organism["name"], organism["codons"], get_genetic_code(genetic_code), TRNA_GENE_COPIES.get(key))
+
+
+@lru_cache(maxsize=128)
+def _compile_custom_codon_model(key: str, revision: str, genetic_code: int) -> CodonModel:
+    # La revisione fa parte della chiave: una tabella ricaricata viene ricompilata
+    info, counts = codon_table_store.load_table(key)
+    frequencies = {codon: float(count) for codon, count in zip(CODONS, counts)}
+    return CodonModel(key, info.name, frequencies, get_genetic_code(genetic_code), pair_counts=codon_table_store.load_pair_counts(key))
+
+
+def get_codon_model(organism: str, genetic_code: int = STANDARD_TABLE_ID) -> CodonModel:
+    """
+    Modello compilato per un organismo, senza distinzione tra maiuscole e
+    minuscole: prima le tabelle predefinite (CODON_TABLES), poi quelle caricate
+    dagli utenti nella cache su disco. I modelli sono condivisi tra le richieste;
+    ValueError se l'organismo o il codice genetico non esistono o se la chiave
+    non è valida.
+    """
+    key = organism.lower()
+    if key in CODON_TABLES:
+        return _compile_codon_model(key, genetic_code)
+    # La chiave entra nel percorso del file su disco: va normalizzata prima di cercarla
+    key = codon_table_store.normalize_table_key(organism)
+    custom = codon_table_store.load_table(key)
+    if custom is None:
+        available_organisms = ", ".join(list(CODON_TABLES.keys()) + [info.key for info in codon_table_store.list_tables()])
+        raise ValueError(f"Organismo target '{organism}' non supportato. Disponibili: {available_organisms}")
+    # I conteggi grezzi vanno bene come frequenze: il peso di ogni codone è relativo
+    # al sinonimo più usato, quindi conteggi e frazioni danno lo stesso modello
+    return _compile_custom_codon_model(key, custom[0].revision, genetic_code)
+
+
+@lru_cache(maxsize=256)
+def harmonization_map(source: CodonModel, target: CodonModel) -> np.ndarray:
+    """
+    Codone del target (indice 0-63) per ogni codone dell'organismo di origine: il
+    sinonimo osservato nel target con il percentile d'uso più vicino (a parità, il
+    più frequente). Stop, Met e Trp restano invariati. Calcolata una volta per coppia
+    di modelli: l'armonizzazione di una sequenza è un solo gather.
+    """
+    mapping = np.arange(64)
+    for aa, ranked in target.ranked_synonyms.items():
+        if aa in FIXED_AMINO_ACIDS:
+            continue
+        candidates = np.array([index for index in ranked if target.frequencies[index] > 0] or ranked)
+        for index in ranked:
+            distances = np.abs(target.usage_percentiles[candidates] - source.usage_percentiles[index])
+            mapping[index] = candidates[int(np.argmin(distances))]
+    return _frozen(mapping)
+
+
+@lru_cache(maxsize=128)
+def rarest_synonym_map(model: CodonModel) -> np.ndarray:
+    """Sinonimo osservato meno frequente nell'organismo per ogni codone (stop, Met, Trp invariati)."""
+    mapping = np.arange(64)
+    for aa, ranked in model.ranked_synonyms.items():
+        if aa in FIXED_AMINO_ACIDS:
+            continue
+        observed = [index for index in ranked if model.frequencies[index] > 0] or list(ranked)
+        mapping[list(ranked)] = observed[-1]
+    return _frozen(mapping)
+
+
+def is_builtin_organism(organism: str) -> bool:
+    """True per gli organismi con tabella predefinita (non sostituibile)."""
+    return organism.lower() in CODON_TABLES
+
+
+# Modelli del codice standard compilati all'importazione: ogni processo (anche i
+# worker del pool, avviati con "spawn") li costruisce una volta sola
+CODON_MODELS: Dict[str, CodonModel] = {key: get_codon_model(key) for key in CODON_TABLES}
@@ -1,11 +1,15 @@
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Any, Optional, Tuple, Union
+import math
 import re
 # Biopython non è attualmente disponibile nell'ambiente di esecuzione, quindi le sue funzioni verranno simulate o implementate manualmente.
 # from Bio.Seq import Seq 
 # from Bio.SeqUtils import GC
-import math
+
+import numpy as np
 
 from server.models.sequence_analysis import (
+    CodonOptimizationOptions,
+    CodonOptimizationStrategy,
     CodonOptimizationRequest,
     CodonOptimizationResult,
     CodonChangeDetail # Assicurati che sia importato
@@ -19,65 +23,179 @@ from server.models.sequence_analysis import (
     #     ...
     #     codon_change_details: List[CodonChangeDetail] = []
 )
+from server.services.packed_sequence import PackedSequence, encode_sequence
+from server.services.genetic_code import GeneticCode, STANDARD_CODE, CODONS
+from server.services.codon_model import (
+    CODON_INDEX, CODON_GC_COUNT, TIE_BREAK, CodonModel, get_codon_model, harmonization_map, rarest_synonym_map
+)
+from server.services.motif_scanner import MotifScanner, MotifAutomaton
+from server.services.rna_folding import RnaFolder
+from server.services.sequence_profile import SequenceProfiler
+from server.services.repeat_finder import HASH_BASE
+from app.core.config import settings
 
 
-# Tabelle di utilizzo dei codoni per diversi organismi
-CODON_TABLES = {
-    "ecoli": {
-        "name": "Escherichia coli",
-        "codons": {
-            "GCA": 0.21, "GCC": 0.27, "GCG": 0.36, "GCT": 0.16, "AGA": 0.04, "AGG": 0.02, "CGA": 0.06, "CGC": 0.4, "CGG": 0.1, "CGT": 0.38,
-            "AAC": 0.55, "AAT": 0.45, "GAC": 0.37, "GAT": 0.63, "TGC": 0.55, "TGT": 0.45, "GAA": 0.68, "GAG": 0.32, "CAA": 0.34, "CAG": 0.66,
-            "GGA": 0.11, "GGC": 0.4, "GGG": 0.15, "GGT": 0.34, "CAC": 0.43, "CAT": 0.57, "ATA": 0.07, "ATC": 0.42, "ATT": 0.51,
-            "CTA": 0.04, "CTC": 0.1, "CTG": 0.5, "CTT": 0.1, "TTA": 0.13, "TTG": 0.13, "AAA": 0.74, "AAG": 0.26, "ATG": 1.0,
-            "TTC": 0.43, "TTT": 0.57, "CCA": 0.19, "CCC": 0.12, "CCG": 0.52, "CCT": 0.16, "AGC": 0.28, "AGT": 0.15, "TCA": 0.12,
-            "TCC": 0.15, "TCG": 0.15, "TCT": 0.15, "ACA": 0.13, "ACC": 0.4, "ACG": 0.27, "ACT": 0.19, "TGG": 1.0, "TAC": 0.43,
-            "TAT": 0.57, "GTA": 0.15, "GTC": 0.22, "GTG": 0.37, "GTT": 0.26, "TAA": 0.61, "TAG": 0.09, "TGA": 0.3,
-        }
-    },
-    "yeast": {
-        "name": "Saccharomyces cerevisiae",
-        "codons": {
-            "GCA":0.21,"GCC":0.26,"GCG":0.11,"GCT":0.42,"AGA":0.48,"AGG":0.21,"CGA":0.07,"CGC":0.06,"CGG":0.04,"CGT":0.14,
-            "AAC":0.41,"AAT":0.59,"GAC":0.35,"GAT":0.65,"TGC":0.37,"TGT":0.63,"GAA":0.7,"GAG":0.3,"CAA":0.69,"CAG":0.31,
-            "GGA":0.22,"GGC":0.19,"GGG":0.12,"GGT":0.47,"CAC":0.35,"CAT":0.65,"ATA":0.27,"ATC":0.26,"ATT":0.47,
-            "CTA":0.14,"CTC":0.06,"CTG":0.11,"CTT":0.13,"TTA":0.28,"TTG":0.29,"AAA":0.58,"AAG":0.42,"ATG":1.0,
-            "TTC":0.4,"TTT":0.6,"CCA":0.42,"CCC":0.15,"CCG":0.12,"CCT":0.31,"AGC":0.11,"AGT":0.16,"TCA":0.21,
-            "TCC":0.16,"TCG":0.1,"TCT":0.26,"ACA":0.3,"ACC":0.22,"ACG":0.13,"ACT":0.35,"TGG":1.0,"TAC":0.43,
-            "TAT":0.57,"GTA":0.21,"GTC":0.18,"GTG":0.19,"GTT":0.42,"TAA":0.47,"TAG":0.23,"TGA":0.3,
-        }
-    },
-    "human": {
-        "name": "Homo sapiens",
-        "codons": {
-            "GCA":0.23,"GCC":0.4,"GCG":0.11,"GCT":0.26,"AGA":0.2,"AGG":0.2,"CGA":0.11,"CGC":0.19,"CGG":0.21,"CGT":0.08,
-            "AAC":0.53,"AAT":0.47,"GAC":0.54,"GAT":0.46,"TGC":0.55,"TGT":0.45,"GAA":0.42,"GAG":0.58,"CAA":0.27,"CAG":0.73,
-            "GGA":0.25,"GGC":0.34,"GGG":0.25,"GGT":0.16,"CAC":0.58,"CAT":0.42,"ATA":0.16,"ATC":0.48,"ATT":0.36,
-            "CTA":0.07,"CTC":0.2,"CTG":0.41,"CTT":0.13,"TTA":0.07,"TTG":0.13,"AAA":0.42,"AAG":0.58,"ATG":1.0,
-            "TTC":0.54,"TTT":0.46,"CCA":0.27,"CCC":0.33,"CCG":0.11,"CCT":0.29,"AGC":0.24,"AGT":0.15,"TCA":0.15,
-            "TCC":0.22,"TCG":0.06,"TCT":0.18,"ACA":0.28,"ACC":0.36,"ACG":0.12,"ACT":0.24,"TGG":1.0,"TAC":0.56,
-            "TAT":0.44,"GTA":0.11,"GTC":0.24,"GTG":0.47,"GTT":0.18,"TAA":0.28,"TAG":0.2,"TGA":0.52,
-        }
-    },
-}
-
-
-# Tabella codice genetico standard
-GENETIC_CODE = {
-    "TTT":"F","TTC":"F","TTA":"L","TTG":"L", "CTT":"L","CTC":"L","CTA":"L","CTG":"L", "ATT":"I","ATC":"I","ATA":"I","ATG":"M",
-    "GTT":"V","GTC":"V","GTA":"V","GTG":"V", "TCT":"S","TCC":"S","TCA":"S","TCG":"S", "CCT":"P","CCC":"P","CCA":"P","CCG":"P",
-    "ACT":"T","ACC":"T","ACA":"T","ACG":"T", "GCT":"A","GCC":"A","GCA":"A","GCG":"A", "TAT":"Y","TAC":"Y","TAA":"*","TAG":"*",
-    "CAT":"H","CAC":"H","CAA":"Q","CAG":"Q", "AAT":"N","AAC":"N","AAA":"K","AAG":"K", "GAT":"D","GAC":"D","GAA":"E","GAG":"E",
-    "TGT":"C","TGC":"C","TGA":"*","TGG":"W", "CGT":"R","CGC":"R","CGA":"R","CGG":"R", "AGT":"S","AGC":"S","AGA":"R","AGG":"R",
-    "GGT":"G","GGC":"G","GGA":"G","GGG":"G",
-}
-
+# Tabella codice genetico standard (tabella NCBI 1)
+GENETIC_CODE = STANDARD_CODE.codon_table
 
 # Codoni inversi per ogni amminoacido
-AMINO_ACID_TO_CODONS = {}
-for codon, aa in GENETIC_CODE.items():
-    if aa not in AMINO_ACID_TO_CODONS: AMINO_ACID_TO_CODONS[aa] = []
-    AMINO_ACID_TO_CODONS[aa].append(codon)
+AMINO_ACID_TO_CODONS = STANDARD_CODE.synonymous_codons
+
+# Peso di ogni base su cui termina un sito da evitare nell'obiettivo del Viterbi:
+# domina qualsiasi differenza di CAI, così i siti inevitabili sono minimizzati per primi
+SITE_PENALTY = 1e6
+# Peso lagrangiano massimo (per base G/C) e passi di bisezione per i limiti di GC
+GC_LAGRANGE_MAX_WEIGHT = 25.0
+GC_LAGRANGE_STEPS = 20
+# Passi di bisezione quando ogni soluzione richiede la ricerca a fascio per finestra
+GC_LAGRANGE_STEPS_WINDOWED = 10
+# Peso di ogni base fuori dai limiti di GC in una finestra, per il vincolo stretto:
+# inferiore a SITE_PENALTY (i siti restano prioritari) ma superiore a ogni guadagno di CAI
+GC_WINDOW_HARD_PENALTY = 1e3
+# Basi G/C di ogni codone, per posizione (indice a 2 bit: C=1, G=2)
+CODON_GC_BITS = np.array(
+    [[(index >> shift) & 3 in (1, 2) for shift in (4, 2, 0)] for index in range(64)], dtype=np.int64
+)
+# Finestre fino a questa lunghezza sono identificate esattamente dai loro bit G/C
+# impacchettati in un intero; per quelle più lunghe si usa un hash polinomiale
+GC_RING_PACKED_MAX_WINDOW = 63
+
+
+def _first_of_groups(keys: Tuple[np.ndarray, ...]) -> np.ndarray:
+    """
+    Indice della prima occorrenza di ogni combinazione distinta di chiavi (come
+    np.unique(..., axis=0, return_index=True), ma con un solo ordinamento
+    lessicografico stabile sulle colonne).
+    """
+    permutation = np.lexsort(keys[::-1])
+    boundaries = np.ones(permutation.size, dtype=bool)
+    if permutation.size > 1:
+        boundaries[1:] = np.logical_or.reduce([key[permutation][1:] != key[permutation][:-1] for key in keys])
+    return permutation[boundaries]
+
+
+class GcWindowConstraint:
+    """
+    Limiti di GC per finestra scorrevole: basi G/C ammesse in ogni finestra di
+    `window` basi, tra `min_count` e `max_count`. Ogni base oltre i limiti, in ogni
+    finestra, costa `penalty` nell'obiettivo dell'ottimizzatore.
+    """
+
+    def __init__(self, window: int, gc_min: Optional[float], gc_max: Optional[float], hard: bool = True):
+        self.window = window
+        self.min_count = math.ceil(window * gc_min / 100.0 - 1e-9) if gc_min is not None else 0
+        self.max_count = math.floor(window * gc_max / 100.0 + 1e-9) if gc_max is not None else window
+        if self.min_count > self.max_count:
+            raise ValueError("Il GC minimo per finestra non può superare il GC massimo.")
+        self.penalty = GC_WINDOW_HARD_PENALTY if hard else settings.GC_WINDOW_SOFT_PENALTY
+
+    @classmethod
+    def from_request(cls, request: CodonOptimizationRequest) -> Optional["GcWindowConstraint"]:
+        """Vincolo richiesto (finestra predefinita: LOCAL_GC_WINDOW), o None."""
+        if request.gc_window_min is None and request.gc_window_max is None:
+            return None
+        return cls(
+            request.gc_window or settings.LOCAL_GC_WINDOW,
+            request.gc_window_min,
+            request.gc_window_max,
+            request.gc_window_hard
+        )
+
+    def violations(self, sequence: Union[str, PackedSequence]) -> int:
+        """Finestre della sequenza con il GC fuori dai limiti."""
+        codes = encode_sequence(sequence)
+        _, gc = SequenceProfiler.gc_profile(codes, self.window)
+        counts = np.rint(gc * self.window / 100.0)
+        return int(np.count_nonzero((counts < self.min_count) | (counts > self.max_count)))
+
+# Codici delle basi (A=0, C=1, G=2, T=3) di ogni codone, per il controllo incrementale delle ripetizioni
+CODON_BASE_CODES: Tuple[Tuple[int, int, int], ...] = tuple(
+    tuple((index >> shift) & 3 for shift in (4, 2, 0)) for index in range(64)
+)
+_HASH_MASK = (1 << 64) - 1
+
+
+class RepeatConstraint:
+    """
+    Omopolimeri lunghi al massimo `max_homopolymer` basi e nessuna ripetizione
+    diretta più lunga di `max_repeat_length` basi, verificati mentre la sequenza
+    viene costruita codone per codone. La lunghezza della corsa corrente e l'hash
+    polinomiale (modulo 2^64, base HASH_BASE) delle ultime k basi sono aggiornati
+    in O(1) per base; i k-mer già incontrati sono in un insieme di hash, quindi
+    una ripetizione è riconosciuta con un solo accesso. Ogni codone aggiunto può
+    essere annullato, per tornare indietro di una posizione.
+    """
+
+    def __init__(self, max_homopolymer: Optional[int], max_repeat_length: Optional[int]):
+        self.max_homopolymer = max_homopolymer
+        self.k = max_repeat_length + 1 if max_repeat_length is not None else None
+        # Peso della base uscente dalla finestra: HASH_BASE^(k-1)
+        self._outgoing_weight = pow(HASH_BASE, self.k - 1, 1 << 64) if self.k else 0
+        self.reset()
+
+    @classmethod
+    def from_request(cls, request: CodonOptimizationRequest) -> Optional["RepeatConstraint"]:
+        """Vincolo richiesto, o None."""
+        if request.max_homopolymer is None and request.max_repeat_length is None:
+            return None
+        return cls(request.max_homopolymer, request.max_repeat_length)
+
+    def reset(self) -> None:
+        self.codes: List[int] = []
+        self.run = 0
+        self.hash = 0
+        self.kmers = set()
+        self._history: List[Tuple[int, int, List[int]]] = []
+
+    def _extend(self, codon: int) -> Tuple[int, int, int, List[int]]:
+        """Violazioni (basi) che il codone aggiungerebbe, con la corsa, l'hash e i k-mer risultanti."""
+        codes, n = self.codes, len(self.codes)
+        bases = CODON_BASE_CODES[codon]
+        run, current, added, violations = self.run, self.hash, [], 0
+        for j, code in enumerate(bases):
+            position = n + j
+            previous = bases[j - 1] if j else (codes[-1] if n else -1)
+            run = run + 1 if code == previous else 1
+            if self.max_homopolymer is not None and run > self.max_homopolymer:
+                violations += 1
+            if self.k is None:
+                continue
+            if position >= self.k:
+                outgoing = position - self.k
+                current -= ((codes[outgoing] if outgoing < n else bases[outgoing - n]) + 1) * self._outgoing_weight
+            current = (current * HASH_BASE + code + 1) & _HASH_MASK
+            if position >= self.k - 1:
+                if current in self.kmers or current in added:
+                    violations += 1
+                added.append(current)
+        return violations, run, current, added
+
+    def violations(self, codon: int) -> int:
+        """Basi che violerebbero i vincoli aggiungendo il codone (indice 0-63)."""
+        return self._extend(codon)[0]
+
+    def append(self, codon: int) -> None:
+        _, run, current, added = self._extend(codon)
+        new = [value for value in dict.fromkeys(added) if value not in self.kmers]
+        self._history.append((self.run, self.hash, new))
+        self.codes.extend(CODON_BASE_CODES[codon])
+        self.run, self.hash = run, current
+        self.kmers.update(new)
+
+    def undo(self) -> None:
+        """Annulla l'ultimo codone aggiunto."""
+        self.run, self.hash, new = self._history.pop()
+        del self.codes[-3:]
+        self.kmers.difference_update(new)
+
+    def count(self, chosen: List[int]) -> int:
+        """Basi che violano i vincoli nella sequenza di codoni data (lo stato viene azzerato)."""
+        self.reset()
+        total = 0
+        for codon in chosen:
+            total += self.violations(codon)
+            self.append(codon)
+        return total
 
 
 class CodonOptimizer:
@@ -86,75 +204,595 @@ class CodonOptimizer:
     """
     
     @staticmethod
-    def _calculate_gc_content(sequence: str) -> float:
+    def _calculate_gc_content(sequence: Union[str, PackedSequence]) -> float:
         """Calcola il contenuto GC di una sequenza."""
-        if not sequence:
+        if not len(sequence):
             return 0.0
-        gc_count = sequence.upper().count("G") + sequence.upper().count("C")
-        return (gc_count / len(sequence)) * 100
+        return PackedSequence.coerce(sequence).gc_content()
 
     @staticmethod
-    def _translate_sequence(sequence: str) -> List[str]:
-        """Traduce una sequenza DNA in una lista di amminoacidi."""
-        amino_acids = []
+    def _translate_sequence(sequence: Union[str, PackedSequence], code: GeneticCode = STANDARD_CODE) -> List[str]:
+        """Traduce una sequenza DNA in una lista di amminoacidi (un solo gather sulla tabella del codice)."""
         if len(sequence) % 3 != 0:
             raise ValueError("La lunghezza della sequenza di input per la traduzione non è un multiplo di 3.")
-        for i in range(0, len(sequence), 3):
-            codon = sequence[i:i+3].upper() # Ensure codon is uppercase for GENETIC_CODE lookup
-            aa = GENETIC_CODE.get(codon)
-            if aa is None:
-                raise ValueError(f"Codone non valido '{codon}' trovato nella sequenza al nucleotide {i+1}.")
-            amino_acids.append(aa)
-        return amino_acids
+        packed = PackedSequence.coerce(sequence)
+        indices = packed.codon_indices()
+        invalid = np.flatnonzero(indices < 0)
+        if invalid.size:
+            i = 3 * int(invalid[0])
+            raise ValueError(f"Codone non valido '{str(packed[i:i + 3])}' trovato nella sequenza al nucleotide {i+1}.")
+        return list(code.translate_indices(indices))
 
     @staticmethod
-    def _calculate_cai(sequence: str, organism_codon_table: Dict[str, float]) -> float:
+    def _calculate_cai(sequence: Union[str, PackedSequence], model: CodonModel) -> float:
         """Calcola l'Indice di Adattamento dei Codoni (CAI) per una sequenza."""
-        if not sequence or len(sequence) % 3 != 0:
-            return 0.0
+        return model.cai(sequence)
 
-        optimal_codons_for_aa: Dict[str, str] = {}
-        for aa, codons in AMINO_ACID_TO_CODONS.items():
-            if aa == "*" or not codons : continue
-            valid_codons_for_aa = [c for c in codons if organism_codon_table.get(c, 0.0) > 0]
-            if not valid_codons_for_aa:
-                 continue
-            optimal_codons_for_aa[aa] = max(valid_codons_for_aa, key=lambda c: organism_codon_table.get(c, 0.0))
-        
-        log_sum_relative_adaptiveness = 0.0
-        num_codons_in_cai_calc = 0
+    @staticmethod
+    def _does_sequence_contain_site(sequence_segment: str, site: str) -> bool:
+        """Verifica se un segmento di sequenza contiene un sito (IUPAC) su uno dei due filamenti, case-insensitive."""
+        return MotifScanner.contains_any(sequence_segment, [site])
+
+    @staticmethod
+    def _relax_five_prime_structure(
+        codons: List[str],
+        amino_acids: List[str],
+        model: CodonModel,
+        sites_to_avoid: List[str],
+        gc_window: Optional[GcWindowConstraint] = None,
+        repeats: Optional[RepeatConstraint] = None,
+        gc_min: Optional[float] = None,
+        gc_max: Optional[float] = None
+    ) -> List[str]:
+        """
+        Riduce la stabilità delle strutture secondarie nella regione 5' (i primi
+        FOLDING_OPTIMIZER_CODONS codoni, che includono lo start): se l'energia minima
+        della regione è sotto FOLDING_HAIRPIN_MAX_ENERGY, ogni codone viene sostituito,
+        dal primo in poi, con il sinonimo che più alza l'energia senza creare siti da
+        evitare (né finestre con il GC fuori dai limiti, né omopolimeri o ripetizioni
+        oltre i limiti, né un GC complessivo che esce da [gc_min, gc_max]),
+        fermandosi appena la soglia è raggiunta.
+        """
+        window = min(settings.FOLDING_OPTIMIZER_CODONS, len(codons))
+        threshold = settings.FOLDING_HAIRPIN_MAX_ENERGY
+        codons = list(codons)
+        current = RnaFolder.mfe("".join(codons[:window]), max_span=settings.FOLDING_MAX_SPAN)
+        if current >= threshold:
+            return codons
+
+        site_automaton = MotifScanner.sites_automaton(sites_to_avoid)
+        length = 3 * len(codons)
+        gc_count = sum(int(CODON_GC_COUNT[CODON_INDEX[codon]]) for codon in codons)
+        # Limiti del conteggio G/C complessivo (quelli già violati non vengono peggiorati)
+        gc_low = min(math.ceil(length * gc_min / 100.0 - 1e-9), gc_count) if gc_min is not None else 0
+        gc_high = max(math.floor(length * gc_max / 100.0 + 1e-9), gc_count) if gc_max is not None else length
+        # Codoni di contesto per lato sufficienti a contenere il sito più lungo
+        margin = max((len(site) for site in sites_to_avoid if site), default=0) // 3 + 1
+        for k in range(window):
+            aa = amino_acids[k]
+            if not model.is_recodable(aa):
+                continue
+            context_start = max(k - margin, 0)
+            context_before = "".join(codons[context_start:k + margin + 1])
+            existing_site = site_automaton is not None and site_automaton.advance(0, context_before)[1]
+            best_codon, best_energy = codons[k], current
+            for candidate in model.ranked_codons[aa]:
+                # I sinonimi mai osservati nell'organismo non vengono introdotti
+                if candidate == codons[k] or model.frequencies[CODON_INDEX[candidate]] <= 0:
+                    continue
+                trial_gc = gc_count + int(CODON_GC_COUNT[CODON_INDEX[candidate]]) - int(CODON_GC_COUNT[CODON_INDEX[codons[k]]])
+                if not gc_low <= trial_gc <= gc_high:
+                    continue
+                trial = codons[:k] + [candidate] + codons[k + 1:]
+                if site_automaton is not None and not existing_site:
+                    if site_automaton.advance(0, "".join(trial[context_start:k + margin + 1]))[1]:
+                        continue
+                if gc_window is not None:
+                    # Le finestre che contengono il codone k terminano entro questo prefisso
+                    reach = k + gc_window.window // 3 + 2
+                    if gc_window.violations("".join(trial[:reach])) > gc_window.violations("".join(codons[:reach])):
+                        continue
+                if repeats is not None:
+                    if repeats.count([CODON_INDEX[c] for c in trial]) > repeats.count([CODON_INDEX[c] for c in codons]):
+                        continue
+                energy = RnaFolder.mfe("".join(trial[:window]), max_span=settings.FOLDING_MAX_SPAN)
+                if energy > best_energy:
+                    best_codon, best_energy = candidate, energy
+            gc_count += int(CODON_GC_COUNT[CODON_INDEX[best_codon]]) - int(CODON_GC_COUNT[CODON_INDEX[codons[k]]])
+            codons[k], current = best_codon, best_energy
+            if current >= threshold:
+                break
+        return codons
+
+    @staticmethod
+    def _codon_options(
+        amino_acids: List[str],
+        packed_sequence: PackedSequence,
+        model: CodonModel
+    ) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+        """
+        Codoni ammessi (indici 0-63) e punteggio di ciascuno per ogni posizione. Stop,
+        Met, Trp e amminoacidi con un solo codone mantengono il codone originale; gli
+        altri ammettono tutti i sinonimi, ordinati per frequenza decrescente, con
+        punteggio pari al log dell'adattamento relativo (il termine del CAI). Le
+        tabelle vengono dal modello compilato e sono condivise tra le posizioni.
+        """
+        original_indices = packed_sequence.codon_indices()
+        options: List[np.ndarray] = []
+        scores: List[np.ndarray] = []
+        for i, aa in enumerate(amino_acids):
+            if model.is_recodable(aa):
+                indices, aa_scores = model.ranked_options(aa)
+            else:
+                indices = original_indices[i:i + 1]
+                aa_scores = model.choice_log_weights[indices]
+            options.append(indices)
+            scores.append(aa_scores)
+        return options, scores
+
+    @staticmethod
+    def _harmonized_codons(
+        original_indices: np.ndarray,
+        source: CodonModel,
+        target: CodonModel,
+        preserve_rare_clusters: bool = False
+    ) -> np.ndarray:
+        """
+        Armonizzazione: ogni codone originale diventa il sinonimo del target con il
+        percentile d'uso più vicino a quello che ha nell'organismo di origine (un
+        gather sulla tabella precompilata per la coppia di modelli). Con
+        `preserve_rare_clusters`, i codoni rari nell'origine che cadono in un gruppo
+        (almeno RARE_CLUSTER_MIN_CODONS rari in RARE_CLUSTER_WINDOW codoni
+        consecutivi) diventano il sinonimo più raro del target, per conservare le
+        pause di traduzione.
+        """
+        harmonized = harmonization_map(source, target)[original_indices]
+        window = settings.RARE_CLUSTER_WINDOW
+        if preserve_rare_clusters and original_indices.size >= window:
+            rare = source.weights[original_indices] < settings.RARE_CODON_MAX_WEIGHT
+            clustered = np.convolve(rare.astype(np.int64), np.ones(window, dtype=np.int64), mode="valid") >= settings.RARE_CLUSTER_MIN_CODONS
+            # Codoni coperti da almeno una finestra con un gruppo
+            covered = np.convolve(clustered.astype(np.int64), np.ones(window, dtype=np.int64), mode="full")[:original_indices.size] > 0
+            in_cluster = rare & covered
+            harmonized[in_cluster] = rarest_synonym_map(target)[original_indices[in_cluster]]
+        return harmonized
+
+    @staticmethod
+    def _harmonization_scores(options: List[np.ndarray], harmonized: np.ndarray, model: CodonModel) -> List[np.ndarray]:
+        """
+        Punteggi per la ricerca vincolata in modalità armonizzazione: 0 per il codone
+        armonizzato, meno la distanza di percentile d'uso nel target per gli altri.
+        """
+        percentiles = np.nan_to_num(model.usage_percentiles)
+        scores: List[np.ndarray] = []
+        for indices, codon in zip(options, harmonized.tolist()):
+            values = -np.abs(percentiles[indices] - percentiles[codon]) - TIE_BREAK * np.arange(1, indices.size + 1)
+            values[indices == codon] = 0.0
+            scores.append(values)
+        return scores
 
-        for i in range(0, len(sequence), 3):
-            codon = sequence[i:i+3].upper() # Ensure codon is uppercase
-            aa = GENETIC_CODE.get(codon)
+    @staticmethod
+    def _objective_scores(
+        options: List[np.ndarray],
+        scores: List[np.ndarray],
+        model: CodonModel,
+        request: CodonOptimizationOptions
+    ) -> Tuple[List[np.ndarray], Optional[np.ndarray]]:
+        """
+        Obiettivo dell'ottimizzatore come punteggi per codone (cai_weight·log w +
+        tai_weight·log w_tAI) e per coppia di codoni adiacenti (cpb_weight·CPS, None
+        se il CPB non è richiesto). ValueError se il modello dell'organismo non ha i
+        dati per una delle metriche richieste.
+        """
+        if request.tai_weight > 0 and model.tai_log_weights is None:
+            raise ValueError(f"tAI non disponibile per '{model.name}': mancano le copie dei geni dei tRNA.")
+        if request.cpb_weight > 0 and model.pair_scores is None:
+            raise ValueError(f"CPB non disponibile per '{model.name}': caricare la tabella come FASTA di CDS di riferimento.")
+        weighted = [request.cai_weight * values for values in scores]
+        if request.tai_weight > 0:
+            tai_log_weights = np.nan_to_num(model.tai_log_weights)
+            weighted = [values + request.tai_weight * tai_log_weights[indices] for indices, values in zip(options, weighted)]
+        pair_scores = request.cpb_weight * np.nan_to_num(model.pair_scores) if request.cpb_weight > 0 else None
+        return weighted, pair_scores
+
+    @staticmethod
+    def _expression_scores(sequence: Union[str, PackedSequence], model: CodonModel) -> Tuple[Optional[float], Optional[float]]:
+        """tAI e CPB di una sequenza codificante (None se il modello non li supporta)."""
+        _, tai, cpb = model.expression_scores(PackedSequence.coerce(sequence).codon_indices())
+        return tuple(
+            float(value) if value is not None and not np.isnan(value) else None
+            for value in (tai, cpb)
+        )
+
+    @staticmethod
+    def _site_transitions(site_automaton: Optional[MotifAutomaton]) -> Tuple[np.ndarray, np.ndarray]:
+        """Transizioni per codone dell'automa dei siti; un solo stato senza occorrenze se non ci sono siti."""
+        if site_automaton is None:
+            return np.zeros((1, 64), dtype=np.int64), np.zeros((1, 64), dtype=np.int64)
+        return site_automaton.codon_transitions()
+
+    @staticmethod
+    def _pair_table(pair_scores: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """Punteggi delle coppie con una riga di zeri (indice 64) per il primo codone."""
+        return np.vstack((pair_scores, np.zeros((1, 64)))) if pair_scores is not None else None
+
+    @staticmethod
+    def _optimal_codons(
+        options: List[np.ndarray],
+        scores: List[np.ndarray],
+        site_automaton: Optional[MotifAutomaton],
+        gc_window: Optional[GcWindowConstraint] = None,
+        pair_scores: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """
+        Viterbi sui codoni: sceglie un codone per posizione massimizzando la somma dei
+        punteggi, meno SITE_PENALTY per ogni base su cui termina un sito da evitare.
+        Lo stato è quello dell'automa dei siti, che riassume le ultime k-1 basi
+        rilevanti (k: sito più lungo); le transizioni per codone sono precalcolate,
+        quindi il costo è lineare nella lunghezza della proteina. La soluzione non
+        contiene siti se ne esiste una, altrimenti ne contiene il minimo possibile.
+        Con `pair_scores` (matrice 64 x 64) ogni coppia di codoni adiacenti aggiunge il
+        proprio punteggio e lo stato comprende anche l'ultimo codone scelto.
+        Con un vincolo di GC per finestra la ricerca passa a `_optimal_codons_windowed`.
+        """
+        if gc_window is not None:
+            return CodonOptimizer._optimal_codons_windowed(options, scores, site_automaton, gc_window, pair_scores)
+        if site_automaton is None and pair_scores is None:
+            return [int(indices[np.argmax(values)]) for indices, values in zip(options, scores)]
+
+        next_state, site_hits = CodonOptimizer._site_transitions(site_automaton)
+        pair_table = CodonOptimizer._pair_table(pair_scores)
+        states = np.zeros(1, dtype=np.int64)
+        last_codons = np.full(1, 64, dtype=np.int64)
+        totals = np.zeros(1)
+        backpointers: List[Tuple[np.ndarray, np.ndarray]] = []
+        for indices, values in zip(options, scores):
+            candidates = indices.size
+            successors = next_state[states[:, None], indices[None, :]].ravel()
+            path_totals = (totals[:, None] + values[None, :] - SITE_PENALTY * site_hits[states[:, None], indices[None, :]]).ravel()
+            codons = np.tile(indices, states.size)
+            if pair_table is not None:
+                path_totals += pair_table[last_codons[:, None], indices[None, :]].ravel()
+                keys = successors * 64 + codons
+            else:
+                keys = successors
+            # Per ogni stato successivo il percorso migliore (a parità, il primo)
+            order = np.lexsort((-path_totals, keys))
+            best = order[np.r_[True, keys[order][1:] != keys[order][:-1]]]
+            backpointers.append((best // candidates, best % candidates))
+            states, last_codons, totals = successors[best], codons[best], path_totals[best]
 
-            if not aa or aa in ("*", "M", "W"): 
-                continue 
-            
-            current_codon_freq = organism_codon_table.get(codon, 1e-9) # Use 1e-9 to avoid log(0)
+        chosen: List[int] = []
+        position = int(np.argmax(totals))
+        for indices, (previous, candidate) in zip(reversed(options), reversed(backpointers)):
+            chosen.append(int(indices[candidate[position]]))
+            position = int(previous[position])
+        chosen.reverse()
+        return chosen
+
+    @staticmethod
+    def _optimal_codons_windowed(
+        options: List[np.ndarray],
+        scores: List[np.ndarray],
+        site_automaton: Optional[MotifAutomaton],
+        gc_window: GcWindowConstraint,
+        pair_scores: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """
+        Ricerca a fascio (beam search) sui codoni con i limiti di GC per finestra.
+        Ogni ipotesi porta lo stato dell'automa dei siti, le basi G/C delle ultime
+        `window` posizioni (buffer circolare) e il loro conteggio corrente: ogni base
+        aggiorna il conteggio con la base che entra e quella che esce dalla finestra,
+        e ogni finestra completa fuori dai limiti costa subito la sua penalità, senza
+        riscandire la sequenza. Il contenuto della finestra è riassunto da una chiave
+        intera aggiornata in O(1) per base (i bit impacchettati, o un hash
+        polinomiale per finestre più lunghe di GC_RING_PACKED_MAX_WINDOW). Le
+        ipotesi con stato e finestra identici hanno lo stesso futuro e ne resta solo
+        la migliore; delle altre si tengono le
+        CODON_OPTIMIZER_BEAM_WIDTH con il punteggio più alto. Lo spazio degli stati
+        (2^window) non permette un Viterbi esatto: la soluzione è ottima solo entro
+        l'ampiezza del fascio. I punteggi delle coppie di codoni, se presenti, sono
+        trattati come in `_optimal_codons`.
+        """
+        next_state, site_hits = CodonOptimizer._site_transitions(site_automaton)
+        pair_table = CodonOptimizer._pair_table(pair_scores)
+        window, width = gc_window.window, settings.CODON_OPTIMIZER_BEAM_WIDTH
+        states = np.zeros(1, dtype=np.int64)
+        last_codons = np.full(1, 64, dtype=np.int64)
+        totals = np.zeros(1)
+        gc_counts = np.zeros(1, dtype=np.int64)
+        ring = np.zeros((1, window), dtype=np.int8)
+        ring_keys = np.zeros(1, dtype=np.uint64)
+        # Chiave della finestra: k' = k·B + bit entrante - bit uscente·B^window (mod 2^64)
+        ring_base = np.uint64(2 if window <= GC_RING_PACKED_MAX_WINDOW else HASH_BASE)
+        outgoing_weight = np.uint64(pow(int(ring_base), window, 1 << 64))
+        backpointers: List[Tuple[np.ndarray, np.ndarray]] = []
+        bases = 0
+        for indices, values in zip(options, scores):
+            parents = np.repeat(np.arange(states.size), indices.size)
+            candidates = np.tile(np.arange(indices.size), states.size)
+            codons = indices[candidates]
+            successors = next_state[states[parents], codons]
+            path_totals = totals[parents] + values[candidates] - SITE_PENALTY * site_hits[states[parents], codons]
+            if pair_table is not None:
+                path_totals += pair_table[last_codons[parents], codons]
+            path_counts = gc_counts[parents]
+            path_ring = ring[parents]
+            path_keys = ring_keys[parents]
+            for offset in range(3):
+                slot = (bases + offset) % window
+                bits = CODON_GC_BITS[codons, offset]
+                outgoing = path_ring[:, slot]
+                path_counts += bits - outgoing
+                path_keys = path_keys * ring_base + bits.astype(np.uint64) - outgoing.astype(np.uint64) * outgoing_weight
+                path_ring[:, slot] = bits
+                if bases + offset >= window - 1:
+                    excess = np.maximum(path_counts - gc_window.max_count, 0) + np.maximum(gc_window.min_count - path_counts, 0)
+                    path_totals -= gc_window.penalty * excess
+            bases += 3
+
+            # Migliore ipotesi per (stato, finestra); tra queste hanno la precedenza le
+            # migliori per (stato, conteggio G/C), poi si completa il fascio per punteggio
+            order = np.argsort(-path_totals, kind="stable")
+            identity = (successors[order], path_keys[order]) + ((codons[order],) if pair_table is not None else ())
+            unique = order[np.sort(_first_of_groups(identity))]
+            leaders = _first_of_groups((successors[unique], path_counts[unique]))
+            leading = np.zeros(unique.size, dtype=bool)
+            leading[leaders] = True
+            kept = unique[np.argsort(~leading, kind="stable")[:width]]
+            backpointers.append((parents[kept], candidates[kept]))
+            states, last_codons, totals = successors[kept], codons[kept], path_totals[kept]
+            gc_counts, ring, ring_keys = path_counts[kept], path_ring[kept], path_keys[kept]
+
+        chosen: List[int] = []
+        position = int(np.argmax(totals))
+        for indices, (previous, candidate) in zip(reversed(options), reversed(backpointers)):
+            chosen.append(int(indices[candidate[position]]))
+            position = int(previous[position])
+        chosen.reverse()
+        return chosen
+
+    @staticmethod
+    def _optimal_codons_with_gc(
+        options: List[np.ndarray],
+        scores: List[np.ndarray],
+        site_automaton: Optional[MotifAutomaton],
+        gc_min: Optional[float] = None,
+        gc_max: Optional[float] = None,
+        gc_window: Optional[GcWindowConstraint] = None,
+        pair_scores: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """
+        Come `_optimal_codons`, con il contenuto GC complessivo entro [gc_min, gc_max].
+        Il vincolo globale è gestito per rilassamento lagrangiano: ogni base G/C del
+        codone aggiunge un peso λ al punteggio, e λ è cercato per bisezione come il più
+        piccolo (in valore assoluto) che riporta il GC nei limiti. Se i limiti non
+        sono raggiungibili viene restituita la soluzione con il GC più vicino.
+        L'eventuale vincolo di GC per finestra è applicato a ogni soluzione.
+        """
+        chosen = CodonOptimizer._optimal_codons(options, scores, site_automaton, gc_window, pair_scores)
+        length = 3 * len(options)
+        if not length or (gc_min is None and gc_max is None):
+            return chosen
+
+        def gc_content(indices: List[int]) -> float:
+            return float(CODON_GC_COUNT[indices].sum()) * 100.0 / length
+
+        gc = gc_content(chosen)
+        if gc_min is not None and gc < gc_min:
+            direction, satisfied = 1.0, lambda value: value >= gc_min
+        elif gc_max is not None and gc > gc_max:
+            direction, satisfied = -1.0, lambda value: value <= gc_max
+        else:
+            return chosen
+
+        def solve(weight: float) -> List[int]:
+            return CodonOptimizer._optimal_codons(
+                options,
+                [values + direction * weight * CODON_GC_COUNT[indices] for indices, values in zip(options, scores)],
+                site_automaton,
+                gc_window,
+                pair_scores
+            )
 
-            optimal_codon_for_this_aa = optimal_codons_for_aa.get(aa)
-            if not optimal_codon_for_this_aa:
+        low, high = 0.0, GC_LAGRANGE_MAX_WEIGHT
+        best = solve(high)
+        if not satisfied(gc_content(best)):
+            return best
+        closest = chosen
+        for _ in range(GC_LAGRANGE_STEPS if gc_window is None else GC_LAGRANGE_STEPS_WINDOWED):
+            middle = (low + high) / 2.0
+            candidate = solve(middle)
+            if satisfied(gc_content(candidate)):
+                high, best = middle, candidate
+            else:
+                low, closest = middle, candidate
+
+        # Le posizioni dello stesso amminoacido cambiano codone tutte allo stesso λ:
+        # si parte dalla soluzione appena fuori dai limiti e si adottano i codoni di
+        # quella nei limiti una posizione alla volta, finché il GC non rientra,
+        # purché la combinazione non aggiunga siti da evitare né finestre fuori dai limiti
+        mixed = list(closest)
+        for position in range(len(mixed)):
+            if satisfied(gc_content(mixed)):
+                break
+            mixed[position] = best[position]
+        if CodonOptimizer._count_site_hits(mixed, site_automaton) > CodonOptimizer._count_site_hits(best, site_automaton):
+            return best
+        if gc_window is not None and (
+            gc_window.violations("".join(CODONS[index] for index in mixed))
+            > gc_window.violations("".join(CODONS[index] for index in best))
+        ):
+            return best
+        return mixed
+
+    @staticmethod
+    def _avoid_repeats(
+        chosen: List[int],
+        options: List[np.ndarray],
+        scores: List[np.ndarray],
+        site_automaton: Optional[MotifAutomaton],
+        repeats: RepeatConstraint,
+        gc_min: Optional[float] = None,
+        gc_max: Optional[float] = None,
+        gc_window: Optional[GcWindowConstraint] = None
+    ) -> List[int]:
+        """
+        Applica i vincoli su omopolimeri e ripetizioni alla soluzione ottimale,
+        ricostruendola da 5' a 3': in ogni posizione viene tenuto il codone scelto se
+        non crea violazioni, altrimenti il primo sinonimo che non ne crea (prima quelli
+        con le stesse basi G/C, poi per punteggio) senza completare siti da evitare.
+        Un codone è ammesso solo se i codoni restanti possono ancora riportare il GC
+        complessivo entro [gc_min, gc_max] e se la sequenza, completata con i codoni
+        della soluzione ottimale, non ha più finestre di GC fuori dai limiti di
+        questa (i limiti che la soluzione ottimale non rispetta non vengono
+        peggiorati); il conteggio G/C del prefisso è tenuto in somme cumulative,
+        quindi ogni verifica riguarda solo le finestre che contengono il codone.
+        Se nessun sinonimo va bene si ricercano insieme gli ultimi
+        REPEAT_BACKTRACK_CODONS codoni (ricerca in profondità con al massimo
+        REPEAT_BACKTRACK_BUDGET tentativi); se le violazioni restano inevitabili si
+        sceglie il codone che ne crea meno, dando la precedenza a siti e GC.
+        """
+        next_state, site_hits = CodonOptimizer._site_transitions(site_automaton)
+        preferences: List[List[int]] = []
+        for codon, indices, values in zip(chosen, options, scores):
+            alternatives = [
+                (
+                    int(CODON_GC_COUNT[index] != CODON_GC_COUNT[codon]),
+                    int(not np.array_equal(CODON_GC_BITS[index], CODON_GC_BITS[codon])),
+                    -float(value),
+                    int(index)
+                )
+                for index, value in zip(indices, values) if index != codon
+            ]
+            preferences.append([codon] + [entry[-1] for entry in sorted(alternatives)])
+
+        length = 3 * len(chosen)
+        chosen_bits = CODON_GC_BITS[chosen].ravel() if chosen else np.zeros(0, dtype=np.int64)
+        # G/C minimi e massimi ottenibili da ogni posizione in poi, e limiti del conteggio complessivo
+        suffix_low = np.zeros(len(chosen) + 1, dtype=np.int64)
+        suffix_high = np.zeros(len(chosen) + 1, dtype=np.int64)
+        for position in range(len(chosen) - 1, -1, -1):
+            counts = CODON_GC_COUNT[options[position]]
+            suffix_low[position] = suffix_low[position + 1] + counts.min()
+            suffix_high[position] = suffix_high[position + 1] + counts.max()
+        chosen_gc = int(CODON_GC_COUNT[chosen].sum())
+        gc_low = min(math.ceil(length * gc_min / 100.0 - 1e-9), chosen_gc) if gc_min is not None else 0
+        gc_high = max(math.floor(length * gc_max / 100.0 + 1e-9), chosen_gc) if gc_max is not None else length
+        if gc_window is not None and length >= gc_window.window:
+            window = gc_window.window
+            chosen_counts = np.convolve(chosen_bits, np.ones(window, dtype=np.int64), mode="valid")
+            chosen_bad = (chosen_counts < gc_window.min_count) | (chosen_counts > gc_window.max_count)
+            # Finestre fuori dai limiti, nella soluzione ottimale, che terminano alla base e o dopo
+            bad_from = np.zeros(length + window + 3, dtype=np.int64)
+            bad_from[window - 1:length] = np.cumsum(chosen_bad[::-1])[::-1]
+            window_budget = int(chosen_bad.sum())
+        else:
+            window = None
+
+        repeats.reset()
+        result: List[int] = []
+        states = [0]
+        # Somme cumulative delle basi G/C del risultato e finestre fuori dai limiti già complete
+        gc_prefix = [0]
+        bad_done = [0]
+
+        def gc_excess(codon: int) -> Tuple[int, int]:
+            """Finestre fuori dai limiti oltre quelle della soluzione ottimale, e basi G/C fuori dai limiti complessivi."""
+            start = 3 * len(result)
+            total = gc_prefix[-1] + int(CODON_GC_COUNT[codon])
+            global_excess = max(gc_low - total - int(suffix_high[len(result) + 1]), 0) + max(total + int(suffix_low[len(result) + 1]) - gc_high, 0)
+            if window is None:
+                return 0, global_excess
+            first = max(start - window + 1, 0)
+            local = np.concatenate((
+                np.diff(gc_prefix[first:]) if start > first else np.zeros(0, dtype=np.int64),
+                CODON_GC_BITS[codon],
+                chosen_bits[start + 3:start + window + 2]
+            ))
+            bad = 0
+            if local.size >= window:
+                counts = np.convolve(local, np.ones(window, dtype=np.int64), mode="valid")
+                bad = int(np.count_nonzero((counts < gc_window.min_count) | (counts > gc_window.max_count)))
+            bad += bad_done[-1] + int(bad_from[start + window + 2])
+            return max(bad - window_budget, 0), global_excess
+
+        def allowed(codon: int) -> bool:
+            if site_hits[states[-1], codon] != 0 or repeats.violations(codon) != 0:
+                return False
+            return (window is None and gc_min is None and gc_max is None) or gc_excess(codon) == (0, 0)
+
+        def push(codon: int) -> None:
+            start = 3 * len(result)
+            result.append(codon)
+            states.append(int(next_state[states[-1], codon]))
+            repeats.append(codon)
+            for bit in CODON_GC_BITS[codon]:
+                gc_prefix.append(gc_prefix[-1] + int(bit))
+            bad = bad_done[-1]
+            if window is not None:
+                for end in range(max(start, window - 1), start + 3):
+                    count = gc_prefix[end + 1] - gc_prefix[end + 1 - window]
+                    bad += int(count < gc_window.min_count or count > gc_window.max_count)
+            bad_done.append(bad)
+
+        def pop() -> int:
+            states.pop()
+            repeats.undo()
+            del gc_prefix[-3:]
+            bad_done.pop()
+            return result.pop()
+
+        for position, candidates in enumerate(preferences):
+            choice = next((codon for codon in candidates if allowed(codon)), None)
+            if choice is not None:
+                push(choice)
                 continue
-            
-            max_freq_for_aa = organism_codon_table.get(optimal_codon_for_this_aa, 1.0)
-            if max_freq_for_aa == 0: max_freq_for_aa = 1.0
-
-            relative_adaptiveness = current_codon_freq / max_freq_for_aa
-            if relative_adaptiveness > 0: 
-                log_sum_relative_adaptiveness += math.log(relative_adaptiveness)
-                num_codons_in_cai_calc += 1
-        
-        if num_codons_in_cai_calc == 0:
-            return 1.0 
-        
-        cai = math.exp(log_sum_relative_adaptiveness / num_codons_in_cai_calc)
-        return cai
+            # Ricerca in profondità sugli ultimi codoni, fino alla posizione corrente inclusa
+            first = max(position - settings.REPEAT_BACKTRACK_CODONS, 0)
+            saved = [pop() for _ in range(position - first)][::-1]
+            pointers = [0] * (position - first + 1)
+            level, budget = 0, settings.REPEAT_BACKTRACK_BUDGET
+            while 0 <= level <= position - first and budget > 0:
+                level_candidates = preferences[first + level]
+                placed = False
+                while pointers[level] < len(level_candidates) and budget > 0:
+                    codon = level_candidates[pointers[level]]
+                    pointers[level] += 1
+                    budget -= 1
+                    if allowed(codon):
+                        push(codon)
+                        placed = True
+                        break
+                if placed:
+                    level += 1
+                    if level < len(pointers):
+                        pointers[level] = 0
+                else:
+                    level -= 1
+                    if level >= 0:
+                        pop()
+            if level > position - first:
+                continue
+            # Violazioni inevitabili: si ripristinano i codoni precedenti e si minimizzano
+            while len(result) > first:
+                pop()
+            for codon in saved:
+                push(codon)
+            push(min(candidates, key=lambda codon: (int(site_hits[states[-1], codon]), gc_excess(codon), repeats.violations(codon))))
+        return result
 
     @staticmethod
-    def _does_sequence_contain_site(sequence_segment: str, site: str) -> bool:
-        """Verifica se un segmento di sequenza contiene un sito specifico, case-insensitive."""
-        return site.upper() in sequence_segment.upper()
+    def _count_site_hits(chosen: List[int], site_automaton: Optional[MotifAutomaton]) -> int:
+        """Basi su cui termina un sito da evitare nella sequenza di codoni data."""
+        if site_automaton is None:
+            return 0
+        next_state, site_hits = site_automaton.codon_transitions()
+        state, hits = 0, 0
+        for index in chosen:
+            hits += int(site_hits[state, index])
+            state = int(next_state[state, index])
+        return hits
 
     @staticmethod
     def optimize_sequence(request: CodonOptimizationRequest) -> CodonOptimizationResult:
@@ -167,113 +805,75 @@ class CodonOptimizer:
         if len(sequence) % 3 != 0:
             raise ValueError("La lunghezza della sequenza DNA deve essere un multiplo di 3.")
 
-        target_organism_key = request.target_organism.lower()
-        if target_organism_key not in CODON_TABLES:
-            available_organisms = ", ".join(CODON_TABLES.keys())
-            raise ValueError(f"Organismo target '{request.target_organism}' non supportato. Disponibili: {available_organisms}")
+        # Modello compilato (pesi, sinonimi ordinati) condiviso tra le richieste
+        model = get_codon_model(request.target_organism, request.genetic_code)
         
-        organism_data = CODON_TABLES[target_organism_key]
-        organism_codon_table = organism_data["codons"]
+        packed_sequence = PackedSequence.from_string(sequence)
+        original_amino_acids = CodonOptimizer._translate_sequence(packed_sequence, model.code)
         
-        original_amino_acids = CodonOptimizer._translate_sequence(sequence)
-        
-        cai_before = CodonOptimizer._calculate_cai(sequence, organism_codon_table)
-        gc_content_before = CodonOptimizer._calculate_gc_content(sequence)
-        sites_to_avoid_upper = [site.upper() for site in request.restriction_sites_to_avoid if site]
-
-        optimized_codons_list = []
-        codon_changes_details_list: List[CodonChangeDetail] = []
-        changes_made_count = 0
-
-        for i, aa in enumerate(original_amino_acids):
-            original_codon = sequence[i*3 : i*3+3]
-            
-            if aa == "*" or aa == "M" or aa == "W":
-                optimized_codons_list.append(original_codon)
-                continue
+        cai_before = CodonOptimizer._calculate_cai(packed_sequence, model)
+        tai_before, cpb_before = CodonOptimizer._expression_scores(packed_sequence, model)
+        gc_content_before = CodonOptimizer._calculate_gc_content(packed_sequence)
+        # Automa di Aho–Corasick dei siti da evitare (codici IUPAC, entrambi i filamenti)
+        site_automaton = MotifScanner.sites_automaton(request.restriction_sites_to_avoid or [])
 
-            synonymous_codons = AMINO_ACID_TO_CODONS.get(aa, [])
-            if not synonymous_codons or len(synonymous_codons) == 1:
-                optimized_codons_list.append(original_codon)
-                continue
-            
-            # Incorporate optimization_strength:
-            # Higher strength means stronger bias towards the most optimal codon.
-            # Lower strength allows more diversity or closer adherence to original if optimal is problematic.
-            # This can be implemented by adjusting scores or by a probabilistic choice.
-            # For now, a simpler approach: sort by frequency, then apply checks.
-            # A more advanced strength application might involve a weighted random choice from sorted_syn_codons.
-            
-            sorted_syn_codons = sorted(
-                synonymous_codons, 
-                key=lambda c: organism_codon_table.get(c, 0.0), 
-                reverse=True
+        gc_window = GcWindowConstraint.from_request(request)
+        repeats = RepeatConstraint.from_request(request)
+
+        source_model: Optional[CodonModel] = None
+        if request.strategy == CodonOptimizationStrategy.HARMONIZE:
+            if not request.source_organism:
+                raise ValueError("L'armonizzazione richiede l'organismo di origine (source_organism).")
+            source_model = get_codon_model(request.source_organism, request.genetic_code)
+            harmonized = CodonOptimizer._harmonized_codons(
+                packed_sequence.codon_indices(), source_model, model, request.preserve_rare_clusters
+            )
+            unconstrained = (
+                site_automaton is None and gc_window is None and repeats is None
+                and request.gc_content_min is None and request.gc_content_max is None
+            )
+            if unconstrained:
+                chosen_indices = harmonized.tolist()
+            else:
+                options, _ = CodonOptimizer._codon_options(original_amino_acids, packed_sequence, model)
+                scores = CodonOptimizer._harmonization_scores(options, harmonized, model)
+                chosen_indices = CodonOptimizer._optimal_codons_with_gc(
+                    options, scores, site_automaton, request.gc_content_min, request.gc_content_max, gc_window
+                )
+        else:
+            options, scores = CodonOptimizer._codon_options(original_amino_acids, packed_sequence, model)
+            scores, pair_scores = CodonOptimizer._objective_scores(options, scores, model, request)
+            chosen_indices = CodonOptimizer._optimal_codons_with_gc(
+                options, scores, site_automaton, request.gc_content_min, request.gc_content_max, gc_window, pair_scores
+            )
+        if repeats is not None:
+            chosen_indices = CodonOptimizer._avoid_repeats(
+                chosen_indices, options, scores, site_automaton, repeats,
+                request.gc_content_min, request.gc_content_max, gc_window
+            )
+        optimized_codons_list = [CODONS[index] for index in chosen_indices]
+
+        if request.avoid_rna_secondary_structures:
+            optimized_codons_list = CodonOptimizer._relax_five_prime_structure(
+                optimized_codons_list, original_amino_acids, model, request.restriction_sites_to_avoid or [], gc_window, repeats,
+                request.gc_content_min, request.gc_content_max
+            )
+
+        codon_changes_details_list: List[CodonChangeDetail] = [
+            CodonChangeDetail(
+                position=i + 1, # 1-indexed amino acid position
+                aa=aa,
+                original=sequence[i*3 : i*3+3],
+                optimized=codon
             )
-            
-            chosen_codon = original_codon 
-
-            for candidate_codon in sorted_syn_codons:
-                # Check for restriction sites
-                creates_restriction_site = False
-                if sites_to_avoid_upper:
-                    temp_optimized_sequence_prefix = "".join(optimized_codons_list)
-                    # Check if the new codon *completes* a restriction site
-                    # This requires checking a window that includes parts of the prefix and the candidate
-                    # Max length of a site to avoid.
-                    max_len_site = 0
-                    if sites_to_avoid_upper: # Ensure list is not empty
-                         max_len_site = max(len(s) for s in sites_to_avoid_upper) if sites_to_avoid_upper else 0
-                    
-                    # Construct a window around the candidate codon
-                    # (max_len_site - 1) prefix + candidate_codon + (max_len_site - 1) suffix (from original for lookahead)
-                    # For simplicity in this iterative build, we check (prefix + candidate)
-                    
-                    # Start index in the full (potential) sequence for the candidate codon
-                    candidate_start_index_in_full_seq = len(temp_optimized_sequence_prefix)
-                    
-                    for site_to_avoid in sites_to_avoid_upper:
-                        # Iterate through all possible start positions of site_to_avoid
-                        # such that it overlaps with candidate_codon
-                        for offset in range(len(site_to_avoid)):
-                            # Position where site_to_avoid would start in the temp_optimized_sequence_prefix + candidate_codon
-                            site_start_in_temp = candidate_start_index_in_full_seq + len(candidate_codon) - len(site_to_avoid) + offset
-                            
-                            if site_start_in_temp < 0 : continue # Site starts before sequence begin
-
-                            # The segment of (prefix + candidate) to check
-                            check_segment = (temp_optimized_sequence_prefix + candidate_codon)[site_start_in_temp : site_start_in_temp + len(site_to_avoid)]
-                            
-                            if len(check_segment) == len(site_to_avoid) and check_segment == site_to_avoid:
-                                # Make sure this site involves the candidate_codon
-                                # Site ends after candidate starts, site starts before candidate ends
-                                site_end_in_temp = site_start_in_temp + len(site_to_avoid)
-                                if site_end_in_temp > candidate_start_index_in_full_seq and \
-                                   site_start_in_temp < (candidate_start_index_in_full_seq + len(candidate_codon)):
-                                    creates_restriction_site = True
-                                    break
-                        if creates_restriction_site: break
-                
-                # TODO: Implement RNA secondary structure avoidance if request.avoid_rna_secondary_structures
-                # This is complex and would typically involve tools like ViennaRNA or mfold,
-                # or at least heuristics (e.g., avoiding long stable GC-rich hairpins).
-                # For now, this check is skipped.
-
-                if not creates_restriction_site:
-                    chosen_codon = candidate_codon
-                    break  # Found a suitable codon
-            
-            optimized_codons_list.append(chosen_codon)
-            if chosen_codon != original_codon:
-                changes_made_count += 1
-                codon_changes_details_list.append(CodonChangeDetail(
-                    position=(i // 3) + 1, # 1-indexed amino acid position
-                    aa=aa,
-                    original=original_codon,
-                    optimized=chosen_codon
-                ))
+            for i, (aa, codon) in enumerate(zip(original_amino_acids, optimized_codons_list))
+            if codon != sequence[i*3 : i*3+3]
+        ]
+        changes_made_count = len(codon_changes_details_list)
 
         optimized_sequence_str = "".join(optimized_codons_list)
-        cai_after = CodonOptimizer._calculate_cai(optimized_sequence_str, organism_codon_table)
+        cai_after = CodonOptimizer._calculate_cai(optimized_sequence_str, model)
+        tai_after, cpb_after = CodonOptimizer._expression_scores(optimized_sequence_str, model)
         gc_content_after = CodonOptimizer._calculate_gc_content(optimized_sequence_str)
 
         return CodonOptimizationResult(
@@ -281,9 +881,16 @@ class CodonOptimizer:
             optimized_sequence=optimized_sequence_str,
             cai_before=cai_before,
             cai_after=cai_after,
+            tai_before=tai_before,
+            tai_after=tai_after,
+            cpb_before=cpb_before,
+            cpb_after=cpb_after,
             gc_content_before=gc_content_before,
             gc_content_after=gc_content_after,
             changes_made=changes_made_count,
-            organism=organism_data["name"],
-            codon_change_details=codon_changes_details_list
+            organism=model.name,
+            codon_change_details=codon_changes_details_list,
+            gc_window_violations=gc_window.violations(optimized_sequence_str) if gc_window is not None else None,
+            harmonized_from=source_model.name if source_model is not None else None,
+            repeat_violations=repeats.count([CODON_INDEX[codon] for codon in optimized_codons_list]) if repeats is not None else None
         )
\ No newline at end of file
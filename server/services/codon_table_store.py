@@ -0,0 +1,261 @@
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from server.models.sequence_analysis import CodonTableInfo, CodonUsageFormat
+from server.repositories.codon_table_repository import CodonTableRepository
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Versione del formato dei file: i file e i documenti di una versione diversa
+# vengono ignorati (la tabella va ricaricata dal file originale)
+CODON_TABLE_FORMAT_VERSION = 1
+_KEY_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_\-]{0,63}$")
+
+# Tabelle lette dal disco (metadati, conteggi, conteggi delle coppie), con il mtime
+# del file da cui provengono
+_loaded: Dict[str, Tuple[int, CodonTableInfo, np.ndarray, Optional[np.ndarray]]] = {}
+_loaded_lock = threading.Lock()
+_repository = CodonTableRepository()
+# Ultimo confronto (time.monotonic()) della revisione su disco con quella su MongoDB, per chiave
+_revision_checked: Dict[str, float] = {}
+
+
+def normalize_table_key(key: str) -> str:
+    """Chiave in minuscolo; ValueError se contiene caratteri diversi da lettere, cifre, '_' e '-'."""
+    normalized = key.strip().lower()
+    if not _KEY_PATTERN.match(normalized):
+        raise ValueError(f"Chiave di organismo '{key}' non valida: usare da 1 a 64 lettere, cifre, '_' o '-'.")
+    return normalized
+
+
+def build_table_info(
+    key: str,
+    name: str,
+    counts: np.ndarray,
+    source_format: Optional[CodonUsageFormat],
+    pair_counts: Optional[np.ndarray] = None
+) -> CodonTableInfo:
+    """Metadati di una nuova tabella; la revisione è l'impronta dei conteggi."""
+    digest = hashlib.sha256(np.ascontiguousarray(counts, dtype=np.float64).tobytes())
+    if pair_counts is not None:
+        digest.update(np.ascontiguousarray(pair_counts, dtype=np.float64).tobytes())
+    return CodonTableInfo(
+        key=key,
+        name=name,
+        source_format=source_format,
+        total_codons=float(counts.sum()),
+        revision=digest.hexdigest()[:16],
+        codon_pairs=pair_counts is not None,
+        created_at=datetime.utcnow()
+    )
+
+
+def _table_path(key: str) -> str:
+    # La chiave entra nel percorso: solo chiavi normalizzate, mai fuori da CODON_TABLE_DIR
+    if not _KEY_PATTERN.match(key):
+        raise ValueError(f"Chiave di organismo '{key}' non valida.")
+    return os.path.join(settings.CODON_TABLE_DIR, f"{key}.npz")
+
+
+def save_table(info: CodonTableInfo, counts: np.ndarray, pair_counts: Optional[np.ndarray] = None) -> None:
+    """
+    Scrive la tabella nella cache su disco: un file .npz compresso con i 64
+    conteggi, gli eventuali 4096 conteggi delle coppie e i metadati. La scrittura
+    passa da un file temporaneo rinominato, così i lettori (anche in altri
+    processi) non vedono mai un file parziale.
+    """
+    os.makedirs(settings.CODON_TABLE_DIR, exist_ok=True)
+    meta = {**info.model_dump(mode="json"), "format_version": CODON_TABLE_FORMAT_VERSION}
+    arrays = {"counts": np.asarray(counts, dtype=np.float64), "meta": np.array(json.dumps(meta))}
+    if pair_counts is not None:
+        arrays["pair_counts"] = np.asarray(pair_counts, dtype=np.float64)
+    handle, temporary = tempfile.mkstemp(dir=settings.CODON_TABLE_DIR, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temporary, _table_path(info.key))
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _load_entry(key: str) -> Optional[Tuple[CodonTableInfo, np.ndarray, Optional[np.ndarray]]]:
+    """
+    Tabella di un organismo dalla cache su disco (metadati, conteggi e conteggi
+    delle coppie), o None. Il file viene riletto solo se è cambiato dall'ultima lettura.
+    """
+    path = _table_path(key)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        with _loaded_lock:
+            _loaded.pop(key, None)
+        return None
+    with _loaded_lock:
+        cached = _loaded.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1:]
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            counts = np.array(data["counts"], dtype=np.float64)
+            pair_counts = np.array(data["pair_counts"], dtype=np.float64) if "pair_counts" in data.files else None
+    except Exception as e:
+        logger.warning(f"Tabella dei codoni '{key}' illeggibile su disco: {e!r}")
+        return None
+    if (
+        meta.pop("format_version", 0) != CODON_TABLE_FORMAT_VERSION
+        or counts.shape != (64,)
+        or (pair_counts is not None and pair_counts.shape != (64 * 64,))
+    ):
+        logger.warning(f"Tabella dei codoni '{key}' in un formato non più supportato: va ricaricata")
+        return None
+    counts.setflags(write=False)
+    if pair_counts is not None:
+        pair_counts.setflags(write=False)
+    info = CodonTableInfo.model_validate(meta)
+    with _loaded_lock:
+        _loaded[key] = (mtime, info, counts, pair_counts)
+    return info, counts, pair_counts
+
+
+def load_table(key: str) -> Optional[Tuple[CodonTableInfo, np.ndarray]]:
+    """Metadati e conteggi della tabella di un organismo dalla cache su disco, o None."""
+    entry = _load_entry(key)
+    return entry[:2] if entry is not None else None
+
+
+def load_pair_counts(key: str) -> Optional[np.ndarray]:
+    """Conteggi delle coppie di codoni (4096, indice 64·primo + secondo), se la tabella li ha."""
+    entry = _load_entry(key)
+    return entry[2] if entry is not None else None
+
+
+def list_tables() -> List[CodonTableInfo]:
+    """Metadati delle tabelle presenti nella cache su disco."""
+    if not os.path.isdir(settings.CODON_TABLE_DIR):
+        return []
+    tables = []
+    for file_name in sorted(os.listdir(settings.CODON_TABLE_DIR)):
+        if file_name.endswith(".npz") and _KEY_PATTERN.match(file_name[:-len(".npz")]):
+            table = load_table(file_name[:-len(".npz")])
+            if table is not None:
+                tables.append(table[0])
+    return tables
+
+
+def delete_table(key: str) -> bool:
+    """Rimuove una tabella dalla cache su disco."""
+    _revision_checked.pop(key, None)
+    with _loaded_lock:
+        _loaded.pop(key, None)
+    try:
+        os.remove(_table_path(key))
+        return True
+    except FileNotFoundError:
+        return False
+
+
+async def _with_timeout(operation):
+    return await asyncio.wait_for(operation, timeout=settings.CODON_TABLE_MONGO_TIMEOUT_MS / 1000.0)
+
+
+async def publish_table(info: CodonTableInfo, counts: np.ndarray, pair_counts: Optional[np.ndarray] = None) -> bool:
+    """Copia la tabella su MongoDB, per le altre istanze; False se non è stato possibile."""
+    if not settings.CODON_TABLE_MONGO_ENABLED:
+        return False
+    try:
+        await _with_timeout(_repository.save_table(
+            info,
+            np.asarray(counts).tolist(),
+            CODON_TABLE_FORMAT_VERSION,
+            np.asarray(pair_counts).tolist() if pair_counts is not None else None
+        ))
+        _revision_checked[info.key] = time.monotonic()
+        return True
+    except Exception as e:
+        logger.warning(f"Impossibile salvare la tabella dei codoni '{info.key}' su MongoDB: {e!r}")
+        return False
+
+
+async def ensure_table(key: str) -> bool:
+    """
+    Garantisce che la tabella di un organismo sia nella cache su disco e allineata
+    alla copia su MongoDB, che è quella di riferimento tra le istanze: la
+    revisione su disco viene confrontata con quella del documento al più ogni
+    CODON_TABLE_REVISION_TTL_SECONDS; una revisione diversa (tabella ricaricata
+    su un'altra istanza) viene scaricata, una tabella non più presente su MongoDB
+    (rimossa su un'altra istanza) viene rimossa anche dal disco. Se il database non
+    è raggiungibile vale la copia su disco. True se la tabella è disponibile.
+    """
+    if not _KEY_PATTERN.match(key):
+        return False
+    local = load_table(key)
+    if not settings.CODON_TABLE_MONGO_ENABLED:
+        return local is not None
+    now = time.monotonic()
+    checked = _revision_checked.get(key)
+    if local is not None and checked is not None and now - checked < settings.CODON_TABLE_REVISION_TTL_SECONDS:
+        return True
+    try:
+        revision = await _with_timeout(_repository.get_revision(key))
+    except Exception as e:
+        logger.warning(f"Impossibile verificare la revisione della tabella dei codoni '{key}' su MongoDB: {e!r}")
+        return local is not None
+    _revision_checked[key] = now
+    if revision is None:
+        if local is not None:
+            logger.info(f"Tabella dei codoni '{key}' rimossa da MongoDB: rimossa anche dalla cache su disco")
+            delete_table(key)
+        return False
+    if local is not None and local[0].revision == revision:
+        return True
+    try:
+        document = await _with_timeout(_repository.get_table(key))
+    except Exception as e:
+        logger.warning(f"Impossibile leggere la tabella dei codoni '{key}' da MongoDB: {e!r}")
+        return local is not None
+    if document is None:
+        return local is not None
+    info, counts, format_version, pair_counts = document
+    if format_version != CODON_TABLE_FORMAT_VERSION or len(counts) != 64 or (pair_counts is not None and len(pair_counts) != 64 * 64):
+        logger.warning(f"Tabella dei codoni '{key}' su MongoDB in un formato non più supportato")
+        return False
+    save_table(info, np.array(counts, dtype=np.float64), np.array(pair_counts, dtype=np.float64) if pair_counts is not None else None)
+    return True
+
+
+async def list_shared_tables() -> List[CodonTableInfo]:
+    """Metadati delle tabelle su MongoDB (vuoto se il database non è raggiungibile)."""
+    if not settings.CODON_TABLE_MONGO_ENABLED:
+        return []
+    try:
+        return await _with_timeout(_repository.list_tables())
+    except Exception as e:
+        logger.warning(f"Impossibile elencare le tabelle dei codoni su MongoDB: {e!r}")
+        return []
+
+
+async def delete_shared_table(key: str) -> bool:
+    """Rimuove una tabella da MongoDB; False se non esiste o il database non è raggiungibile."""
+    if not settings.CODON_TABLE_MONGO_ENABLED:
+        return False
+    try:
+        return await _with_timeout(_repository.delete_table(key))
+    except Exception as e:
+        logger.warning(f"Impossibile rimuovere la tabella dei codoni '{key}' da MongoDB: {e!r}")
+        return False
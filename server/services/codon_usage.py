@@ -0,0 +1,126 @@
+from typing import Dict, Iterable, Tuple
+import re
+
+import numpy as np
+
+from server.services.packed_sequence import PackedSequence
+from server.services.genetic_code import CODONS, GeneticCode, STANDARD_CODE
+from server.services.sequence_io import iter_fasta_records
+
+
+# Formati di tabelle d'uso dei codoni accettati
+KAZUSA_FORMAT = "kazusa"
+COCOPUTS_FORMAT = "cocoputs"
+FASTA_FORMAT = "fasta"
+CODON_USAGE_FORMATS = (KAZUSA_FORMAT, COCOPUTS_FORMAT, FASTA_FORMAT)
+
+_CODON_POSITION: Dict[str, int] = {codon: index for index, codon in enumerate(CODONS)}
+# Voce Kazusa: codone, amminoacido e frazione opzionali, frequenza per mille, (conteggio).
+# Copre sia "UUU 17.6(714298)" sia "UUU F 0.46 17.6 (714298)".
+_KAZUSA_ENTRY = re.compile(r"\b([ACGTU]{3})\s+(?:[A-Z*]\s+)?(?:\d*\.\d+\s+)?(\d*\.?\d+)\s*\(\s*(\d+)\s*\)")
+
+
+def _codon_position(codon: str) -> int:
+    return _CODON_POSITION[codon.upper().replace("U", "T")]
+
+
+def parse_kazusa(text: str) -> np.ndarray:
+    """
+    Conteggi dei codoni (64 valori in ordine ACGT) da una tabella Kazusa/GCG in
+    formato testo. Se i conteggi tra parentesi sono tutti nulli vengono usate le
+    frequenze per mille.
+    """
+    counts = np.zeros(64, dtype=np.float64)
+    per_thousand = np.zeros(64, dtype=np.float64)
+    found = np.zeros(64, dtype=bool)
+    for codon, frequency, count in _KAZUSA_ENTRY.findall(text.upper()):
+        position = _codon_position(codon)
+        counts[position] += float(count)
+        per_thousand[position] += float(frequency)
+        found[position] = True
+    if not found.all():
+        missing = [CODONS[i] for i in np.flatnonzero(~found)]
+        raise ValueError(f"Tabella Kazusa incompleta: mancano {len(missing)} codoni ({', '.join(missing[:8])}{'...' if len(missing) > 8 else ''}).")
+    return counts if counts.sum() > 0 else per_thousand
+
+
+def parse_cocoputs(text: str) -> np.ndarray:
+    """
+    Conteggi dei codoni da un export CoCoPUTs (TSV o CSV): una riga di
+    intestazione con i 64 codoni come colonne e una o più righe di conteggi, che
+    vengono sommate. Le altre colonne (taxid, specie, ...) sono ignorate.
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if not lines:
+        raise ValueError("File CoCoPUTs vuoto.")
+    separator = "\t" if "\t" in lines[0] else ","
+    header = [column.strip().strip('"').upper().replace("U", "T") for column in lines[0].split(separator)]
+    columns = {index: _CODON_POSITION[column] for index, column in enumerate(header) if column in _CODON_POSITION}
+    if len(set(columns.values())) != 64:
+        raise ValueError(f"Intestazione CoCoPUTs non valida: trovati {len(set(columns.values()))} codoni su 64.")
+    counts = np.zeros(64, dtype=np.float64)
+    for row_number, line in enumerate(lines[1:], start=2):
+        fields = line.split(separator)
+        try:
+            for index, position in columns.items():
+                counts[position] += float(fields[index].strip().strip('"') or 0)
+        except (IndexError, ValueError):
+            raise ValueError(f"Riga {row_number} del file CoCoPUTs non valida.")
+    return counts
+
+
+class CodonCounter:
+    """
+    Conta i codoni (frame 0) di sequenze codificanti di riferimento, una alla
+    volta: ogni CDS costa un bincount sugli indici dei codoni, senza mantenere
+    in memoria le sequenze già contate. I codoni con basi non valide e le basi
+    finali che non formano un codone sono ignorati. Conta anche le coppie di
+    codoni adiacenti (64 x 64, indice 64·primo + secondo), per il CPB.
+    """
+
+    def __init__(self):
+        self.counts = np.zeros(64, dtype=np.float64)
+        self.pair_counts = np.zeros(64 * 64, dtype=np.float64)
+        self.sequences = 0
+
+    def add(self, sequence: str) -> None:
+        indices = PackedSequence.from_string(sequence.strip()).codon_indices().astype(np.int64)
+        self.counts += np.bincount(indices[indices >= 0], minlength=64)
+        valid_pairs = (indices[:-1] >= 0) & (indices[1:] >= 0)
+        self.pair_counts += np.bincount(64 * indices[:-1][valid_pairs] + indices[1:][valid_pairs], minlength=64 * 64)
+        self.sequences += 1
+
+    def add_records(self, records: Iterable[Tuple[str, str]]) -> None:
+        for _, sequence in records:
+            self.add(sequence)
+
+
+def count_fasta_codons(chunks: Iterable[str]) -> np.ndarray:
+    """Conteggi dei codoni di tutte le CDS di un FASTA fornito a blocchi di testo."""
+    counter = CodonCounter()
+    counter.add_records(iter_fasta_records(chunks))
+    return counter.counts
+
+
+def parse_codon_usage(text: str, fmt: str) -> np.ndarray:
+    """Conteggi dei codoni da un file nel formato indicato (kazusa, cocoputs, fasta)."""
+    if fmt == KAZUSA_FORMAT:
+        return parse_kazusa(text)
+    if fmt == COCOPUTS_FORMAT:
+        return parse_cocoputs(text)
+    if fmt == FASTA_FORMAT:
+        return count_fasta_codons([text])
+    raise ValueError(f"Formato di tabella d'uso dei codoni '{fmt}' non supportato. Disponibili: {', '.join(CODON_USAGE_FORMATS)}")
+
+
+def counts_to_fractions(counts: np.ndarray, code: GeneticCode = STANDARD_CODE) -> Dict[str, float]:
+    """
+    Frazione d'uso di ogni codone tra i sinonimi dello stesso amminoacido (il
+    formato di CODON_TABLES); 0 per gli amminoacidi senza conteggi.
+    """
+    fractions: Dict[str, float] = {}
+    for codons in code.synonymous_codons.values():
+        total = sum(counts[_CODON_POSITION[codon]] for codon in codons)
+        for codon in codons:
+            fractions[codon] = round(float(counts[_CODON_POSITION[codon]] / total), 4) if total > 0 else 0.0
+    return fractions
@@ -0,0 +1,234 @@
+from typing import List, Optional, Tuple
+import re
+
+import numpy as np
+
+from server.models.sequence_analysis import CodonVariant, CodonVariantLibrary, CodonVariantRequest
+from server.services.packed_sequence import PackedSequence
+from server.services.genetic_code import CODONS
+from server.services.codon_model import CODON_GC_COUNT, CodonModel, get_codon_model
+from server.services.codon_optimizer import CodonOptimizer
+from server.services.motif_scanner import MotifScanner, MotifAutomaton
+from server.services.repeat_finder import HASH_BASE
+from app.core.config import settings
+
+
+# Inverso della temperatura per optimization_strength = 1 (scelta di fatto deterministica)
+MAX_INVERSE_TEMPERATURE = 1e3
+# Codici delle basi (A=0, C=1, G=2, T=3) di ogni codone, per posizione
+CODON_BASES = np.array([[(index >> shift) & 3 for shift in (4, 2, 0)] for index in range(64)], dtype=np.uint8)
+_HASH_MODULUS = 1 << 64
+
+
+def kmer_hashes(bases: np.ndarray, k: int) -> np.ndarray:
+    """
+    Hash polinomiali (modulo 2^64, base HASH_BASE) di tutti i k-mer, in O(n)
+    per qualsiasi k: dagli hash dei prefissi pesati con le potenze inverse della
+    base (dispari, quindi invertibile modulo 2^64) ogni k-mer si ottiene con una
+    sottrazione e un prodotto, senza cicli sulle posizioni.
+    """
+    n = bases.size
+    if n < k:
+        return np.empty(0, dtype=np.uint64)
+    base = np.full(n, HASH_BASE, dtype=np.uint64)
+    inverse = np.full(n, pow(HASH_BASE, -1, _HASH_MODULUS), dtype=np.uint64)
+    # Potenze B^i e B^-i per i = 0 .. n-1 (gli interi senza segno si riducono modulo 2^64)
+    one = np.ones(1, dtype=np.uint64)
+    powers = np.concatenate((one, np.cumprod(base)[:-1]))
+    inverse_powers = np.concatenate((one, np.cumprod(inverse)[:-1]))
+    prefix = np.zeros(n + 1, dtype=np.uint64)
+    np.cumsum(bases.astype(np.uint64) * inverse_powers, out=prefix[1:])
+    starts = np.arange(n - k + 1)
+    return (prefix[starts + k] - prefix[starts]) * powers[starts + k - 1]
+
+
+class CodonVariantSampler:
+    """
+    Librerie di varianti sinonime di una stessa proteina, per costrutti con
+    parti ripetute che non devono ricombinare tra loro. Ogni variante è
+    campionata codone per codone con probabilità proporzionali a w^β (w:
+    adattamento relativo del codone, β dalla optimization_strength), in modo
+    vettoriale su tutte le posizioni. Le violazioni (distanza di Hamming
+    insufficiente da una variante già accettata, k-mer in comune con una di esse,
+    siti da evitare) vengono corrette ricampionando solo i codoni coinvolti.
+    """
+
+    @staticmethod
+    def _choice_matrices(
+        options: List[np.ndarray],
+        scores: List[np.ndarray],
+        model: CodonModel,
+        strength: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Codoni ammessi per posizione (matrice posizioni x sinonimi, completata con
+        il primo sinonimo) e probabilità di ciascuno, proporzionali a exp(β·punteggio)
+        con β = strength / (1 - strength). I sinonimi mai osservati nell'organismo
+        hanno probabilità nulla.
+        """
+        width = max(indices.size for indices in options)
+        codons = np.zeros((len(options), width), dtype=np.int64)
+        logits = np.full((len(options), width), -np.inf)
+        beta = min(strength / (1.0 - strength), MAX_INVERSE_TEMPERATURE) if strength < 1 else MAX_INVERSE_TEMPERATURE
+        for i, (indices, values) in enumerate(zip(options, scores)):
+            codons[i, :indices.size] = indices
+            codons[i, indices.size:] = indices[0]
+            observed = model.frequencies[indices] > 0
+            allowed = observed if indices.size > 1 and observed.any() else np.ones(indices.size, dtype=bool)
+            logits[i, :indices.size] = np.where(allowed, beta * values, -np.inf)
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return codons, probabilities
+
+    @staticmethod
+    def _sample(
+        probabilities: np.ndarray,
+        rows: np.ndarray,
+        rng: np.random.Generator,
+        exclude: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Sinonimo (colonna) campionato per ognuna delle posizioni date; con `exclude`
+        la colonna attuale è esclusa, se la posizione ha alternative.
+        """
+        p = probabilities[rows]
+        if exclude is not None:
+            p[np.arange(rows.size), exclude] = 0.0
+            stuck = p.sum(axis=1) <= 0
+            p[stuck, exclude[stuck]] = 1.0
+        cumulative = np.cumsum(p, axis=1)
+        threshold = rng.random(rows.size) * cumulative[:, -1]
+        return np.minimum((cumulative <= threshold[:, None]).sum(axis=1), p.shape[1] - 1)
+
+    @staticmethod
+    def _pick_in_spans(spans: np.ndarray, recodable: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Un codone ricodificabile scelto a caso in ogni intervallo [inizio, fine] di
+        codoni (nessuno per gli intervalli che non ne contengono).
+        """
+        positions = np.flatnonzero(recodable)
+        counts = np.concatenate(([0], np.cumsum(recodable)))
+        available = counts[spans[:, 1] + 1] - counts[spans[:, 0]]
+        repairable = available > 0
+        offsets = (rng.random(int(repairable.sum())) * available[repairable]).astype(np.int64)
+        return positions[counts[spans[repairable, 0]] + offsets]
+
+    @staticmethod
+    def _conflicting_codons(
+        chosen: np.ndarray,
+        bases: np.ndarray,
+        hashes: Optional[np.ndarray],
+        k: Optional[int],
+        accepted_codons: np.ndarray,
+        accepted_bases: np.ndarray,
+        kmer_index: np.ndarray,
+        min_distance: int,
+        recodable: np.ndarray,
+        site_automaton: Optional[MotifAutomaton],
+        rng: np.random.Generator
+    ) -> Optional[np.ndarray]:
+        """
+        Codoni da ricampionare perché la variante rispetti i vincoli: None se li
+        rispetta già, un array vuoto se le violazioni non sono correggibili.
+        """
+        spans: List[np.ndarray] = []
+        if site_automaton is not None:
+            hits = site_automaton.scan("".join(CODONS[index] for index in chosen.tolist()))
+            if hits:
+                starts = np.array([hit.position for hit in hits])
+                ends = starts + np.array([hit.length for hit in hits]) - 1
+                spans.append(np.column_stack((starts // 3, ends // 3)))
+        if hashes is not None and kmer_index.size:
+            shared = np.flatnonzero(np.isin(hashes, kmer_index))
+            if shared.size:
+                spans.append(np.column_stack((shared // 3, (shared + k - 1) // 3)))
+        conflicts = [CodonVariantSampler._pick_in_spans(np.concatenate(spans), recodable, rng)] if spans else []
+
+        if accepted_bases.shape[0]:
+            distances = (accepted_bases != bases).sum(axis=1)
+            closest = int(np.argmin(distances))
+            missing = min_distance - int(distances[closest])
+            if missing > 0:
+                # Ogni codone cambiato aggiunge almeno una base diversa dalla variante più vicina
+                same = np.flatnonzero((accepted_codons[closest] == chosen) & recodable)
+                conflicts.append(rng.choice(same, size=min(missing, same.size), replace=False))
+
+        if not conflicts:
+            return None
+        return np.unique(np.concatenate(conflicts))
+
+    @staticmethod
+    def generate(request: CodonVariantRequest) -> CodonVariantLibrary:
+        """
+        Genera fino a `variant_count` varianti sinonime della sequenza, a due a due
+        distanti almeno `min_hamming_distance` basi e senza sottosequenze comuni più
+        lunghe di `max_shared_kmer`. Le varianti accettate sono indicizzate con gli
+        hash dei loro k-mer; se una variante non riesce a rispettare i vincoli entro
+        CODON_VARIANT_MAX_ATTEMPTS correzioni la libreria si ferma a quelle trovate.
+        """
+        sequence = request.sequence.strip().upper()
+        if not re.fullmatch(r"[ATGC]+", sequence):
+            raise ValueError("La sequenza DNA contiene caratteri non validi. Solo A, T, G, C sono permessi.")
+        if len(sequence) % 3 != 0:
+            raise ValueError("La lunghezza della sequenza DNA deve essere un multiplo di 3.")
+
+        model = get_codon_model(request.target_organism, request.genetic_code)
+        packed_sequence = PackedSequence.from_string(sequence)
+        amino_acids = CodonOptimizer._translate_sequence(packed_sequence, model.code)
+        options, scores = CodonOptimizer._codon_options(amino_acids, packed_sequence, model)
+        codons, probabilities = CodonVariantSampler._choice_matrices(options, scores, model, request.optimization_strength)
+        recodable = (probabilities > 0).sum(axis=1) > 1
+        site_automaton = MotifScanner.sites_automaton(request.restriction_sites_to_avoid or [])
+        k = request.max_shared_kmer + 1 if request.max_shared_kmer is not None else None
+        rng = np.random.default_rng(request.seed)
+
+        rows = np.arange(len(options))
+        accepted_codons = np.empty((0, len(options)), dtype=np.int64)
+        accepted_bases = np.empty((0, len(sequence)), dtype=np.uint8)
+        kmer_index = np.empty(0, dtype=np.uint64)
+        for _ in range(request.variant_count):
+            choice = CodonVariantSampler._sample(probabilities, rows, rng)
+            satisfied = False
+            for _ in range(settings.CODON_VARIANT_MAX_ATTEMPTS):
+                chosen = codons[rows, choice]
+                bases = CODON_BASES[chosen].ravel()
+                hashes = kmer_hashes(bases, k) if k is not None else None
+                conflicts = CodonVariantSampler._conflicting_codons(
+                    chosen, bases, hashes, k, accepted_codons, accepted_bases, kmer_index,
+                    request.min_hamming_distance, recodable, site_automaton, rng
+                )
+                satisfied = conflicts is None
+                if satisfied or conflicts.size == 0:
+                    break
+                choice[conflicts] = CodonVariantSampler._sample(probabilities, conflicts, rng, exclude=choice[conflicts])
+            if not satisfied:
+                break
+            accepted_codons = np.vstack((accepted_codons, chosen))
+            accepted_bases = np.vstack((accepted_bases, bases))
+            if hashes is not None:
+                kmer_index = np.union1d(kmer_index, hashes)
+
+        # CAI, tAI e CPB di tutte le varianti in una sola passata
+        cai, tai, cpb = model.expression_scores(accepted_codons)
+        variants: List[CodonVariant] = []
+        minimum: Optional[int] = None
+        for i, chosen in enumerate(accepted_codons):
+            distances = (accepted_bases != accepted_bases[i]).sum(axis=1)
+            distances[i] = len(sequence) + 1
+            closest = int(distances.min()) if accepted_bases.shape[0] > 1 else None
+            if closest is not None:
+                minimum = closest if minimum is None else min(minimum, closest)
+            variants.append(CodonVariant(
+                sequence="".join(CODONS[index] for index in chosen.tolist()),
+                cai=float(cai[i]),
+                tai=float(tai[i]) if tai is not None and not np.isnan(tai[i]) else None,
+                cpb=float(cpb[i]) if cpb is not None and not np.isnan(cpb[i]) else None,
+                gc_content=float(CODON_GC_COUNT[chosen].sum()) * 100.0 / len(sequence),
+                min_distance=closest
+            ))
+        return CodonVariantLibrary(
+            organism=model.name,
+            requested=request.variant_count,
+            variants=variants,
+            min_pairwise_distance=minimum
+        )
@@ -0,0 +1,255 @@
+from typing import List, Dict, Tuple
+from collections import OrderedDict
+from functools import cached_property
+import logging
+import threading
+
+import numpy as np
+
+from server.models.genetic_design import Node, Edge, GeneticDesignResponse, DesignGraphAnalysis
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class DesignGraph:
+    """
+    Indice del grafo di un design genetico, costruito una sola volta.
+
+    I nodi sono mappati su indici interi e gli archi sono memorizzati come
+    matrici di adiacenza CSR (successori e predecessori), in modo che simulazione,
+    validazione e UI possano interrogare la topologia in O(V+E) senza
+    ricostruire dizionari di connessioni ad ogni chiamata.
+    """
+
+    def __init__(self, nodes: List[Node], edges: List[Edge]):
+        self.nodes: List[Node] = list(nodes)
+        self.node_ids: List[str] = [node.id for node in self.nodes]
+        self.index: Dict[str, int] = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.node_types: List[str] = [node.type for node in self.nodes]
+
+        # Archi che fanno riferimento a nodi inesistenti: vengono esclusi dall'indice
+        # ma riportati nell'analisi.
+        self.dangling_edges: List[str] = []
+        sources: List[int] = []
+        targets: List[int] = []
+        for edge in edges:
+            source_idx = self.index.get(edge.source)
+            target_idx = self.index.get(edge.target)
+            if source_idx is None or target_idx is None:
+                self.dangling_edges.append(edge.id)
+                continue
+            sources.append(source_idx)
+            targets.append(target_idx)
+
+        self.edge_count = len(sources)
+        src = np.asarray(sources, dtype=np.int64)
+        dst = np.asarray(targets, dtype=np.int64)
+        self.out_indptr, self.out_indices = DesignGraph._build_csr(src, dst, len(self.nodes))
+        self.in_indptr, self.in_indices = DesignGraph._build_csr(dst, src, len(self.nodes))
+
+    @staticmethod
+    def _build_csr(rows: np.ndarray, cols: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Costruisce la coppia (indptr, indices) CSR ordinando gli archi per riga."""
+        order = np.argsort(rows, kind="stable")
+        indices = cols[order]
+        counts = np.bincount(rows, minlength=size) if rows.size else np.zeros(size, dtype=np.int64)
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, indices
+
+    def successors(self, node_idx: int) -> np.ndarray:
+        """Indici dei nodi raggiunti dagli archi uscenti (con molteplicità)."""
+        return self.out_indices[self.out_indptr[node_idx]:self.out_indptr[node_idx + 1]]
+
+    def predecessors(self, node_idx: int) -> np.ndarray:
+        """Indici dei nodi sorgente degli archi entranti (con molteplicità)."""
+        return self.in_indices[self.in_indptr[node_idx]:self.in_indptr[node_idx + 1]]
+
+    def nodes_of_type(self, node_type: str) -> List[int]:
+        """Indici dei nodi di un certo tipo, nell'ordine del design."""
+        return [i for i, t in enumerate(self.node_types) if t == node_type]
+
+    @cached_property
+    def strongly_connected_components(self) -> List[List[int]]:
+        """
+        Componenti fortemente connesse (Tarjan iterativo, O(V+E)).
+        Le componenti sono restituite in ordine topologico inverso.
+        """
+        n = len(self.nodes)
+        index_of = np.full(n, -1, dtype=np.int64)
+        lowlink = np.zeros(n, dtype=np.int64)
+        on_stack = np.zeros(n, dtype=bool)
+        stack: List[int] = []
+        components: List[List[int]] = []
+        counter = 0
+
+        for root in range(n):
+            if index_of[root] != -1:
+                continue
+            # Ogni frame è (nodo, posizione del prossimo successore da visitare)
+            work: List[Tuple[int, int]] = [(root, int(self.out_indptr[root]))]
+            index_of[root] = lowlink[root] = counter
+            counter += 1
+            stack.append(root)
+            on_stack[root] = True
+
+            while work:
+                node, edge_pos = work[-1]
+                if edge_pos < self.out_indptr[node + 1]:
+                    work[-1] = (node, edge_pos + 1)
+                    succ = int(self.out_indices[edge_pos])
+                    if index_of[succ] == -1:
+                        index_of[succ] = lowlink[succ] = counter
+                        counter += 1
+                        stack.append(succ)
+                        on_stack[succ] = True
+                        work.append((succ, int(self.out_indptr[succ])))
+                    elif on_stack[succ]:
+                        lowlink[node] = min(lowlink[node], index_of[succ])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component: List[int] = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+
+        return components
+
+    @cached_property
+    def has_self_loop(self) -> np.ndarray:
+        """Maschera booleana dei nodi con un arco verso se stessi."""
+        mask = np.zeros(len(self.nodes), dtype=bool)
+        if self.edge_count:
+            rows = np.repeat(np.arange(len(self.nodes)), np.diff(self.out_indptr))
+            mask[rows[rows == self.out_indices]] = True
+        return mask
+
+    @cached_property
+    def feedback_cycles(self) -> List[List[int]]:
+        """Anelli di retroazione: componenti con più di un nodo o con auto-anello."""
+        return [
+            component for component in self.strongly_connected_components
+            if len(component) > 1 or self.has_self_loop[component[0]]
+        ]
+
+    @cached_property
+    def topological_order(self) -> List[int]:
+        """
+        Ordine topologico dei nodi. I nodi che appartengono allo stesso anello
+        di retroazione vengono mantenuti contigui (ordine della condensazione).
+        """
+        # Tarjan restituisce le componenti in ordine topologico inverso
+        order: List[int] = []
+        for component in reversed(self.strongly_connected_components):
+            order.extend(component)
+        return order
+
+    @cached_property
+    def is_acyclic(self) -> bool:
+        return not self.feedback_cycles
+
+    @cached_property
+    def orphan_nodes(self) -> List[int]:
+        """Nodi senza archi entranti né uscenti."""
+        degree = np.diff(self.out_indptr) + np.diff(self.in_indptr)
+        return np.flatnonzero(degree == 0).tolist()
+
+    def _reachable_from(self, start_nodes: List[int]) -> np.ndarray:
+        """Visita in ampiezza sui successori; restituisce la maschera dei nodi raggiunti."""
+        visited = np.zeros(len(self.nodes), dtype=bool)
+        frontier = list(start_nodes)
+        visited[frontier] = True
+        while frontier:
+            next_frontier: List[int] = []
+            for node in frontier:
+                for succ in self.successors(node):
+                    if not visited[succ]:
+                        visited[succ] = True
+                        next_frontier.append(int(succ))
+            frontier = next_frontier
+        return visited
+
+    @cached_property
+    def unreachable_genes(self) -> List[int]:
+        """Geni non raggiungibili da nessun promotore (non verranno mai trascritti)."""
+        reachable = self._reachable_from(self.nodes_of_type("promoter"))
+        return [i for i in self.nodes_of_type("gene") if not reachable[i]]
+
+    @cached_property
+    def dangling_promoters(self) -> List[int]:
+        """Promotori da cui non è raggiungibile alcun gene."""
+        genes = self.nodes_of_type("gene")
+        if not genes:
+            return self.nodes_of_type("promoter")
+        # Un promotore è pendente se nessun gene lo ha tra i propri antenati:
+        # visita all'indietro dai geni usando la CSR dei predecessori.
+        visited = np.zeros(len(self.nodes), dtype=bool)
+        frontier = list(genes)
+        visited[frontier] = True
+        while frontier:
+            next_frontier: List[int] = []
+            for node in frontier:
+                for pred in self.predecessors(node):
+                    if not visited[pred]:
+                        visited[pred] = True
+                        next_frontier.append(int(pred))
+            frontier = next_frontier
+        return [i for i in self.nodes_of_type("promoter") if not visited[i]]
+
+    def _ids(self, indices: List[int]) -> List[str]:
+        return [self.node_ids[i] for i in indices]
+
+    def to_analysis(self) -> DesignGraphAnalysis:
+        """Esporta l'analisi del grafo nel modello usato dalle API."""
+        return DesignGraphAnalysis(
+            node_count=len(self.nodes),
+            edge_count=self.edge_count,
+            is_acyclic=self.is_acyclic,
+            topological_order=self._ids(self.topological_order),
+            strongly_connected_components=[self._ids(c) for c in self.strongly_connected_components],
+            feedback_cycles=[self._ids(c) for c in self.feedback_cycles],
+            orphan_nodes=self._ids(self.orphan_nodes),
+            unreachable_genes=self._ids(self.unreachable_genes),
+            dangling_promoters=self._ids(self.dangling_promoters),
+            dangling_edges=list(self.dangling_edges),
+        )
+
+
+_graph_cache: "OrderedDict[Tuple[str, str], DesignGraph]" = OrderedDict()
+_graph_cache_lock = threading.Lock()
+
+
+def get_design_graph(design: GeneticDesignResponse) -> DesignGraph:
+    """
+    Restituisce l'indice del grafo per una versione di un design.
+
+    La chiave di cache è (id, updated_at): ogni modifica al design produce una
+    nuova versione e quindi un nuovo indice, mentre simulazioni e richieste di
+    analisi successive sulla stessa versione riusano quello esistente.
+    """
+    key = (design.id, design.updated_at.isoformat())
+    with _graph_cache_lock:
+        graph = _graph_cache.get(key)
+        if graph is not None:
+            _graph_cache.move_to_end(key)
+            return graph
+
+    graph = DesignGraph(design.nodes, design.edges)
+    with _graph_cache_lock:
+        _graph_cache[key] = graph
+        _graph_cache.move_to_end(key)
+        while len(_graph_cache) > settings.DESIGN_GRAPH_CACHE_SIZE:
+            _graph_cache.popitem(last=False)
+    logger.debug(f"Indice del grafo costruito per il design {design.id} ({len(graph.nodes)} nodi, {graph.edge_count} archi)")
+    return graph
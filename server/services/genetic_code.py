@@ -0,0 +1,185 @@
+from typing import Dict, List, Union
+
+import numpy as np
+
+from server.services.packed_sequence import PackedSequence, encode_sequence, codon_indices
+
+
+# Tabelle di traduzione NCBI (id -> nome, amminoacidi, codoni di inizio), nel
+# formato di gc.prt: 64 caratteri per i codoni in ordine TCAG (TTT, TTC, TTA, ...),
+# "M" nella riga degli start per i codoni di inizio. Nelle tabelle 27, 28 e 31 i
+# codoni di stop sono ambigui (stop solo a fine gene): vengono tradotti come amminoacidi.
+NCBI_TABLES: Dict[int, tuple] = {
+    1: ("Standard",
+        "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+        "---M------**--*----M---------------M----------------------------"),
+    2: ("Vertebrate Mitochondrial",
+        "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSS**VVVVAAAADDEEGGGG",
+        "----------**--------------------MMMM----------**---M------------"),
+    3: ("Yeast Mitochondrial",
+        "FFLLSSSSYY**CCWWTTTTPPPPHHQQRRRRIIMMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+        "----------**----------------------MM---------------M------------"),
+    4: ("Mold, Protozoan, and Coelenterate Mitochondrial; Mycoplasma/Spiroplasma",
+        "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+        "--MM------**-------M------------MMMM---------------M------------"),
+    5: ("Invertebrate Mitochondrial",
+        "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSSSSVVVVAAAADDEEGGGG",
+        "---M------**--------------------MMMM---------------M------------"),
+    6: ("Ciliate, Dasycladacean and Hexamita Nuclear",
+        "FFLLSSSSYYQQCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+        "--------------*--------------------M----------------------------"),
+    9: ("Echinoderm and Flatworm Mitochondrial",
+        "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNNKSSSSVVVVAAAADDEEGGGG",
+        "----------**-----------------------M---------------M------------"),
+    10: ("Euplotid Nuclear",
+         "FFLLSSSSYY**CCCWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------**-----------------------M----------------------------"),
+    11: ("Bacterial, Archaeal and Plant Plastid",
+         "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "---M------**--*----M------------MMMM---------------M------------"),
+    12: ("Alternative Yeast Nuclear",
+         "FFLLSSSSYY**CC*WLLLSPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------**--*----M---------------M----------------------------"),
+    13: ("Ascidian Mitochondrial",
+         "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNKKSSGGVVVVAAAADDEEGGGG",
+         "---M------**----------------------MM---------------M------------"),
+    14: ("Alternative Flatworm Mitochondrial",
+         "FFLLSSSSYYY*CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNNKSSSSVVVVAAAADDEEGGGG",
+         "-----------*-----------------------M----------------------------"),
+    15: ("Blepharisma Macronuclear",
+         "FFLLSSSSYY*QCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------*---*--------------------M----------------------------"),
+    16: ("Chlorophycean Mitochondrial",
+         "FFLLSSSSYY*LCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------*---*--------------------M----------------------------"),
+    21: ("Trematode Mitochondrial",
+         "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIMMTTTTNNNKSSSSVVVVAAAADDEEGGGG",
+         "----------**-----------------------M---------------M------------"),
+    22: ("Scenedesmus obliquus Mitochondrial",
+         "FFLLSS*SYY*LCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "------*---*---*--------------------M----------------------------"),
+    23: ("Thraustochytrium Mitochondrial",
+         "FF*LSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "--*-------**--*-----------------M--M---------------M------------"),
+    24: ("Rhabdopleuridae Mitochondrial",
+         "FFLLSSSSYY**CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSSKVVVVAAAADDEEGGGG",
+         "---M------**-------M---------------M---------------M------------"),
+    25: ("Candidate Division SR1 and Gracilibacteria",
+         "FFLLSSSSYY**CCGWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "---M------**-----------------------M---------------M------------"),
+    26: ("Pachysolen tannophilus Nuclear",
+         "FFLLSSSSYY**CC*WLLLAPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------**--*----M---------------M----------------------------"),
+    27: ("Karyorelict Nuclear",
+         "FFLLSSSSYYQQCCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "--------------*--------------------M----------------------------"),
+    28: ("Condylostoma Nuclear",
+         "FFLLSSSSYYQQCCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------**--*--------------------M----------------------------"),
+    29: ("Mesodinium Nuclear",
+         "FFLLSSSSYYYYCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "--------------*--------------------M----------------------------"),
+    30: ("Peritrich Nuclear",
+         "FFLLSSSSYYEECC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "--------------*--------------------M----------------------------"),
+    31: ("Blastocrithidia Nuclear",
+         "FFLLSSSSYYEECCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "----------**-----------------------M----------------------------"),
+    32: ("Balanophoraceae Plastid",
+         "FFLLSSSSYY*WCC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG",
+         "---M------*---*----M------------MMMM---------------M------------"),
+    33: ("Cephalodiscidae Mitochondrial",
+         "FFLLSSSSYYY*CCWWLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSSKVVVVAAAADDEEGGGG",
+         "---M-------*-------M---------------M---------------M------------"),
+}
+
+STANDARD_TABLE_ID = 1
+UNKNOWN_AMINO_ACID = "X"  # Traduzione dei codoni con basi non valide
+
+# Codone (stringa) per ogni indice a 2 bit (16*b1 + 4*b2 + b3, ordine ACGT)
+CODONS: List[str] = [a + b + c for a in "ACGT" for b in "ACGT" for c in "ACGT"]
+ATG_INDEX = CODONS.index("ATG")
+TCAG_CODONS: List[str] = [a + b + c for a in "TCAG" for b in "TCAG" for c in "TCAG"]
+# Posizione nel formato NCBI (ordine TCAG) di ogni codone in ordine ACGT
+_NCBI_POSITION = np.array(["TCAG".index(c[0]) * 16 + "TCAG".index(c[1]) * 4 + "TCAG".index(c[2]) for c in CODONS])
+# Indice del reverse complement di ogni codone (per leggere il filamento reverse sul forward)
+REVERSE_COMPLEMENT_CODON = np.array(
+    [16 * (3 - i % 4) + 4 * (3 - (i // 4) % 4) + (3 - i // 16) for i in range(64)], dtype=np.int64
+)
+
+
+class GeneticCode:
+    """
+    Codice genetico precompilato in tabelle di 64 elementi indicizzate dal codone
+    a 2 bit: la traduzione di un'intera sequenza è un solo gather NumPy. La
+    posizione 64 (indice -1, codoni con basi non valide) vale X.
+    """
+
+    def __init__(self, table_id: int, name: str, amino_acids_tcag: str, starts_tcag: str):
+        self.table_id = table_id
+        self.name = name
+        amino_acids = np.frombuffer(amino_acids_tcag.encode("ascii"), dtype=np.uint8)[_NCBI_POSITION]
+        starts = np.frombuffer(starts_tcag.encode("ascii"), dtype=np.uint8)[_NCBI_POSITION]
+        # Amminoacido per indice di codone (0-63), più X per l'indice -1
+        self.amino_acids = np.append(amino_acids, np.uint8(ord(UNKNOWN_AMINO_ACID)))
+        self.is_stop = amino_acids == ord("*")
+        self.is_start = starts == ord("M")
+        self.is_reverse_stop = self.is_stop[REVERSE_COMPLEMENT_CODON]
+        self.is_reverse_start = self.is_start[REVERSE_COMPLEMENT_CODON]
+        # Dizionari ed elenchi in ordine NCBI (TTT, TTC, ...): a parità di frequenza
+        # l'ottimizzatore sceglie i sinonimi in quest'ordine
+        self.codon_table: Dict[str, str] = {codon: amino_acids_tcag[i] for i, codon in enumerate(TCAG_CODONS)}
+        self.start_codons: List[str] = [codon for codon, start in zip(TCAG_CODONS, starts_tcag) if start == "M"]
+        self.stop_codons: List[str] = [codon for codon, aa in self.codon_table.items() if aa == "*"]
+        # Codoni sinonimi per amminoacido (stop compresi, come "*")
+        self.synonymous_codons: Dict[str, List[str]] = {}
+        for codon, aa in self.codon_table.items():
+            self.synonymous_codons.setdefault(aa, []).append(codon)
+
+    def translate_indices(self, indices: np.ndarray) -> str:
+        """Traduce un array di indici di codone (-1: X) con un solo gather."""
+        return self.amino_acids[indices].tobytes().decode("ascii")
+
+    def translate(
+        self,
+        sequence: Union[str, PackedSequence],
+        frame: int = 0,
+        to_stop: bool = False,
+        initiator_methionine: bool = False
+    ) -> str:
+        """
+        Traduce i codoni completi a partire da `frame` (0-2). Con `to_stop` la
+        traduzione si ferma al primo stop (escluso); con `initiator_methionine`
+        un primo codone di inizio alternativo (es. GTG) viene tradotto come M.
+        """
+        if isinstance(sequence, PackedSequence):
+            indices = sequence.codon_indices(frame)
+        else:
+            indices = codon_indices(encode_sequence(sequence)[frame:])[::3]
+        if to_stop:
+            stops = np.flatnonzero(self.is_stop[indices] & (indices >= 0))
+            if stops.size:
+                indices = indices[:stops[0]]
+        protein = self.translate_indices(indices)
+        if initiator_methionine and indices.size and indices[0] >= 0 and self.is_start[indices[0]]:
+            protein = "M" + protein[1:]
+        return protein
+
+    def __repr__(self) -> str:
+        return f"GeneticCode({self.table_id}, {self.name!r})"
+
+
+GENETIC_CODES: Dict[int, GeneticCode] = {
+    table_id: GeneticCode(table_id, name, amino_acids, starts)
+    for table_id, (name, amino_acids, starts) in NCBI_TABLES.items()
+}
+STANDARD_CODE = GENETIC_CODES[STANDARD_TABLE_ID]
+
+
+def get_genetic_code(table_id: int = STANDARD_TABLE_ID) -> GeneticCode:
+    """Codice genetico per id di tabella NCBI; ValueError se non esiste."""
+    code = GENETIC_CODES.get(table_id)
+    if code is None:
+        available = ", ".join(str(i) for i in GENETIC_CODES)
+        raise ValueError(f"Tabella di traduzione NCBI {table_id} non disponibile. Disponibili: {available}")
+    return code
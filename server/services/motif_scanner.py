@@ -0,0 +1,254 @@
+from typing import Dict, List, Optional, Tuple, Union
+from collections import deque
+from functools import lru_cache
+from itertools import product
+
+import numpy as np
+
+from server.models.sequence_analysis import MotifHit
+from server.services.packed_sequence import PackedSequence, INVALID_BASE_CODE, encode_sequence
+
+
+# Codici IUPAC e basi corrispondenti
+IUPAC_BASES: Dict[str, str] = {
+    "A": "A", "C": "C", "G": "G", "T": "T", "U": "T",
+    "R": "AG", "Y": "CT", "S": "CG", "W": "AT", "K": "GT", "M": "AC",
+    "B": "CGT", "D": "AGT", "H": "ACT", "V": "ACG", "N": "ACGT",
+}
+IUPAC_COMPLEMENT: Dict[str, str] = {
+    "A": "T", "C": "G", "G": "C", "T": "A", "U": "A",
+    "R": "Y", "Y": "R", "S": "S", "W": "W", "K": "M", "M": "K",
+    "B": "V", "V": "B", "D": "H", "H": "D", "N": "N",
+}
+# Varianti massime generate dall'espansione di un singolo motivo degenerato
+MAX_MOTIF_EXPANSIONS = 4096
+
+# Librerie di enzimi di restrizione (sito di riconoscimento in codici IUPAC)
+ENZYME_LIBRARIES: Dict[str, Dict[str, str]] = {
+    "common": {
+        "AgeI": "ACCGGT", "ApaI": "GGGCCC", "AscI": "GGCGCGCC", "AvaI": "CYCGRG", "AvrII": "CCTAGG",
+        "BamHI": "GGATCC", "BglII": "AGATCT", "BsrGI": "TGTACA", "ClaI": "ATCGAT", "EcoRI": "GAATTC",
+        "EcoRV": "GATATC", "HincII": "GTYRAC", "HindIII": "AAGCTT", "KpnI": "GGTACC", "MluI": "ACGCGT",
+        "NcoI": "CCATGG", "NdeI": "CATATG", "NheI": "GCTAGC", "NotI": "GCGGCCGC", "PacI": "TTAATTAA",
+        "PstI": "CTGCAG", "SacI": "GAGCTC", "SalI": "GTCGAC", "SfiI": "GGCCNNNNNGGCC", "SmaI": "CCCGGG",
+        "SpeI": "ACTAGT", "SphI": "GCATGC", "StyI": "CCWWGG", "XbaI": "TCTAGA", "XhoI": "CTCGAG",
+    },
+    "biobrick": {
+        "EcoRI": "GAATTC", "XbaI": "TCTAGA", "SpeI": "ACTAGT", "PstI": "CTGCAG", "NotI": "GCGGCCGC",
+    },
+    "golden_gate": {
+        "BsaI": "GGTCTC", "BsmBI": "CGTCTC", "BbsI": "GAAGAC", "SapI": "GCTCTTC", "BtgZI": "GCGATG",
+    },
+}
+
+MotifLibrary = Tuple[Tuple[str, str], ...]
+
+
+def normalize_motif(site: str) -> str:
+    """Motivo in maiuscolo (U come T); solleva ValueError per caratteri non IUPAC."""
+    site = site.strip().upper().replace("U", "T")
+    if not site:
+        raise ValueError("Motivo vuoto.")
+    invalid = sorted(set(site) - set(IUPAC_BASES))
+    if invalid:
+        raise ValueError(f"Il motivo '{site}' contiene caratteri non IUPAC: {', '.join(invalid)}")
+    return site
+
+
+def reverse_complement_motif(site: str) -> str:
+    """Reverse complement di un motivo IUPAC (es. GTYRAC -> GTYRAC)."""
+    return "".join(IUPAC_COMPLEMENT[base] for base in reversed(site))
+
+
+def expand_motif(site: str) -> List[str]:
+    """Tutte le sequenze concrete (ACGT) descritte da un motivo IUPAC."""
+    choices = [IUPAC_BASES[base] for base in site]
+    count = 1
+    for options in choices:
+        count *= len(options)
+    if count > MAX_MOTIF_EXPANSIONS:
+        raise ValueError(f"Il motivo '{site}' è troppo degenerato ({count} varianti, massimo {MAX_MOTIF_EXPANSIONS}).")
+    return ["".join(variant) for variant in product(*choices)]
+
+
+class MotifAutomaton:
+    """
+    Automa di Aho–Corasick compilato in una tabella di transizione completa
+    (DFA): ogni base costa un solo accesso alla tabella, qualunque sia il numero
+    di motivi. I motivi sono espansi dai codici IUPAC e, se non coincidono con il
+    proprio reverse complement, aggiunti anche come reverse complement: una sola
+    passata sul filamento forward trova le occorrenze su entrambi i filamenti.
+    Le basi non valide riportano l'automa allo stato iniziale.
+    """
+
+    def __init__(self, motifs: MotifLibrary, both_strands: bool = True):
+        self.motifs = motifs
+        self.both_strands = both_strands
+        # Trie: figli per stato e uscite (indice del motivo, filamento, lunghezza)
+        children: List[Dict[int, int]] = [{}]
+        outputs: List[List[Tuple[int, str, int]]] = [[]]
+        for motif_index, (_, site) in enumerate(motifs):
+            variants = [(variant, "+") for variant in expand_motif(site)]
+            if both_strands and reverse_complement_motif(site) != site:
+                variants += [(variant, "-") for variant in expand_motif(reverse_complement_motif(site))]
+            for variant, strand in variants:
+                state = 0
+                for code in encode_sequence(variant).tolist():
+                    if code not in children[state]:
+                        children[state][code] = len(children)
+                        children.append({})
+                        outputs.append([])
+                    state = children[state][code]
+                if (motif_index, strand, len(variant)) not in outputs[state]:
+                    outputs[state].append((motif_index, strand, len(variant)))
+
+        # Collegamenti di fallimento in ampiezza e tabella completa delle transizioni.
+        # La tabella è appiattita (stato * 5 + codice) e contiene già lo stato successivo
+        # moltiplicato per 5, così la scansione fa una sola addizione per base.
+        states = len(children)
+        table = [0] * (states * 5)
+        failure = [0] * states
+        queue = deque()
+        for code in range(4):
+            child = children[0].get(code)
+            if child is not None:
+                table[code] = child * 5
+                queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] = outputs[state] + outputs[failure[state]]
+            for code in range(4):
+                child = children[state].get(code)
+                if child is not None:
+                    failure[child] = table[failure[state] * 5 + code] // 5
+                    table[state * 5 + code] = child * 5
+                    queue.append(child)
+                else:
+                    table[state * 5 + code] = table[failure[state] * 5 + code]
+            table[state * 5 + INVALID_BASE_CODE] = 0
+
+        self.state_count = states
+        self._table = table
+        # Uscite indicizzate come la tabella (stato * 5), None per gli stati senza occorrenze
+        self._outputs: List[Optional[Tuple[Tuple[int, str, int], ...]]] = [None] * (states * 5)
+        for state, out in enumerate(outputs):
+            if out:
+                self._outputs[state * 5] = tuple(out)
+        self._codon_transitions: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def scan(self, sequence: Union[str, PackedSequence]) -> List[MotifHit]:
+        """Tutte le occorrenze dei motivi, in una sola passata lineare."""
+        codes = encode_sequence(sequence).tolist()
+        table, outputs = self._table, self._outputs
+        found: List[Tuple[int, int, str, int]] = []
+        state = 0
+        for position, code in enumerate(codes):
+            state = table[state + code]
+            out = outputs[state]
+            if out is not None:
+                for motif_index, strand, length in out:
+                    found.append((position - length + 1, motif_index, strand, length))
+        found.sort()
+
+        text = str(sequence).upper()
+        return [
+            MotifHit(
+                name=self.motifs[motif_index][0],
+                site=self.motifs[motif_index][1],
+                sequence=text[start:start + length],
+                position=start,
+                length=length,
+                strand=strand
+            )
+            for start, motif_index, strand, length in found
+        ]
+
+    def advance(self, state: int, bases: str) -> Tuple[int, bool]:
+        """
+        Avanza l'automa dallo stato `state` (0: stato iniziale) sulle basi date;
+        restituisce il nuovo stato e se lungo il percorso è stata completata almeno
+        un'occorrenza. Serve a verificare in modo incrementale se una sequenza in
+        costruzione contiene un motivo.
+        """
+        table, outputs = self._table, self._outputs
+        hit = False
+        for code in encode_sequence(bases).tolist():
+            state = table[state + code]
+            if outputs[state] is not None:
+                hit = True
+        return state, hit
+
+    def codon_transitions(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Transizioni dell'automa per codone, precalcolate per tutti gli stati:
+        (stato successivo, occorrenze completate) come matrici stati x 64, indicizzate
+        dallo stato (0 .. state_count - 1) e dall'indice a 2 bit del codone. Le
+        occorrenze contano le basi del codone su cui termina almeno un motivo.
+        """
+        if self._codon_transitions is None:
+            table = np.asarray(self._table, dtype=np.int64)
+            has_output = np.array([out is not None for out in self._outputs], dtype=np.int64)
+            codons = np.arange(64)
+            state = np.repeat(np.arange(self.state_count, dtype=np.int64) * 5, 64).reshape(self.state_count, 64)
+            hits = np.zeros_like(state)
+            for base in (codons // 16, (codons // 4) % 4, codons % 4):
+                state = table[state + base]
+                hits += has_output[state]
+            self._codon_transitions = (state // 5, hits)
+        return self._codon_transitions
+
+
+@lru_cache(maxsize=64)
+def get_automaton(motifs: MotifLibrary, both_strands: bool = True) -> MotifAutomaton:
+    """Automa compilato per una libreria di motivi, mantenuto in cache."""
+    return MotifAutomaton(motifs, both_strands)
+
+
+class MotifScanner:
+    """
+    Ricerca di motivi e siti di restrizione tramite automi di Aho–Corasick
+    precompilati e memorizzati per libreria.
+    """
+
+    @staticmethod
+    def resolve_library(library: Optional[str] = None, motifs: Optional[Dict[str, str]] = None) -> MotifLibrary:
+        """
+        Combina una libreria predefinita e/o motivi personalizzati (nome -> sito IUPAC)
+        in una tupla ordinata, usata come chiave della cache degli automi.
+        """
+        combined: Dict[str, str] = {}
+        if library is not None:
+            if library not in ENZYME_LIBRARIES:
+                raise ValueError(f"Libreria di motivi '{library}' non disponibile. Disponibili: {', '.join(ENZYME_LIBRARIES)}")
+            combined.update(ENZYME_LIBRARIES[library])
+        for name, site in (motifs or {}).items():
+            combined[name] = site
+        return tuple(sorted((name, normalize_motif(site)) for name, site in combined.items()))
+
+    @staticmethod
+    def scan(
+        sequence: Union[str, PackedSequence],
+        library: Optional[str] = "common",
+        motifs: Optional[Dict[str, str]] = None,
+        both_strands: bool = True
+    ) -> List[MotifHit]:
+        """Trova tutte le occorrenze dei motivi della libreria (posizioni 0-based, ordinate)."""
+        resolved = MotifScanner.resolve_library(library, motifs)
+        if not resolved or not len(sequence):
+            return []
+        return get_automaton(resolved, both_strands).scan(sequence)
+
+    @staticmethod
+    def sites_automaton(sites: List[str], both_strands: bool = True) -> Optional[MotifAutomaton]:
+        """Automa per un elenco di siti anonimi (es. siti da evitare); None se l'elenco è vuoto."""
+        resolved = tuple(sorted({(site, site) for site in (normalize_motif(s) for s in sites if s and s.strip())}))
+        return get_automaton(resolved, both_strands) if resolved else None
+
+    @staticmethod
+    def contains_any(sequence: Union[str, PackedSequence], sites: List[str], both_strands: bool = True) -> bool:
+        """True se la sequenza contiene almeno uno dei siti."""
+        automaton = MotifScanner.sites_automaton(sites, both_strands)
+        if automaton is None:
+            return False
+        _, hit = automaton.advance(0, str(sequence))
+        return hit
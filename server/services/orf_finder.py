@@ -0,0 +1,153 @@
+from typing import List, Optional, Tuple, Union
+
+import numpy as np
+
+from server.models.sequence_analysis import ORF
+from server.services.analysis_budget import TimeBudget
+from server.services.packed_sequence import (  # Riesportati: altri moduli li importano da qui
+    COMPLEMENT_CODES,
+    PackedSequence,
+    encode_sequence,
+    codon_indices
+)
+from server.services.genetic_code import GeneticCode, STANDARD_CODE, ATG_INDEX, get_genetic_code
+
+
+# Tabelle del codice genetico standard indicizzate per codone a 2 bit (16*b1 + 4*b2 + b3,
+# ordine ACGT), riesportate per i moduli che le usano direttamente
+AMINO_ACID_BY_CODON = STANDARD_CODE.amino_acids
+START_CODON_INDEX = ATG_INDEX
+IS_STOP_CODON = STANDARD_CODE.is_stop
+# Codoni che, letti sul filamento forward, sono uno stop sul filamento reverse (TTA, CTA, TCA)
+IS_REVERSE_STOP_CODON = STANDARD_CODE.is_reverse_stop
+
+
+class OrfFinder:
+    """
+    Ricerca vettorizzata di Open Reading Frame su tutti e sei i frame.
+
+    La sequenza viene codificata una sola volta; gli indici dei codoni sono
+    calcolati per ogni posizione con NumPy e ogni frame è una vista con passo 3.
+    Start e stop sono individuati con maschere booleane e vengono tradotti solo
+    gli ORF che superano la lunghezza minima della proteina.
+    """
+
+    @staticmethod
+    def _frame_orfs(
+        frame_codons: np.ndarray,
+        min_protein_len: int,
+        include_partial: bool,
+        code: GeneticCode = STANDARD_CODE,
+        alternative_starts: bool = False
+    ) -> List[Tuple[int, int, bool]]:
+        """
+        Trova gli ORF in un singolo frame, espresso come array di indici di codone.
+        Restituisce tuple (codone di start, codone terminale esclusivo, ha_stop),
+        in unità di codoni relative al frame.
+
+        Ogni segmento compreso tra due codoni terminatori (stop del codice genetico
+        o codone non valido) produce al più un ORF, che parte dal primo ATG del
+        segmento (o dal primo codone di inizio del codice, con `alternative_starts`).
+        """
+        if frame_codons.size == 0:
+            return []
+
+        valid = frame_codons >= 0
+        is_stop = np.zeros(frame_codons.size, dtype=bool)
+        is_stop[valid] = code.is_stop[frame_codons[valid]]
+        boundaries = np.flatnonzero(is_stop | ~valid)
+        if alternative_starts:
+            is_start = np.zeros(frame_codons.size, dtype=bool)
+            is_start[valid] = code.is_start[frame_codons[valid]]
+            starts = np.flatnonzero(is_start)
+        else:
+            starts = np.flatnonzero(frame_codons == ATG_INDEX)
+        if starts.size == 0:
+            return []
+
+        # Segmento di appartenenza di ogni start = indice del primo terminatore successivo
+        segment_of_start = np.searchsorted(boundaries, starts)
+        segments, first_idx = np.unique(segment_of_start, return_index=True)
+        first_starts = starts[first_idx]
+
+        has_boundary = segments < boundaries.size
+        ends = np.full(segments.size, frame_codons.size, dtype=np.int64)
+        ends[has_boundary] = boundaries[segments[has_boundary]]
+        has_stop = np.zeros(segments.size, dtype=bool)
+        has_stop[has_boundary] = is_stop[ends[has_boundary]]
+
+        # I segmenti chiusi da un codone non valido vengono scartati; quelli senza
+        # terminatore arrivano a fine sequenza e sono ORF parziali.
+        keep = (ends - first_starts) >= min_protein_len
+        keep &= has_stop | (~has_boundary & include_partial)
+        return list(zip(first_starts[keep].tolist(), ends[keep].tolist(), has_stop[keep].tolist()))
+
+    @staticmethod
+    def _translate(frame_codons: np.ndarray, start: int, end: int, code: GeneticCode = STANDARD_CODE) -> str:
+        """
+        Traduce i codoni [start, end) del frame con un'unica operazione di gather;
+        il codone di inizio è sempre tradotto come metionina.
+        """
+        return "M" + code.translate_indices(frame_codons[start + 1:end])
+
+    @staticmethod
+    def find_orfs(
+        sequence: Union[str, PackedSequence],
+        min_protein_len: int = 25,
+        include_partial: bool = True,
+        budget: Optional[TimeBudget] = None,
+        genetic_code: int = 1,
+        alternative_starts: bool = False
+    ) -> List[ORF]:
+        """
+        Trova gli ORF (ATG ... stop) in tutti e sei i frame di una sequenza di DNA,
+        data come stringa o come PackedSequence (in tal caso senza ricodifica).
+        Stop e traduzione seguono la tabella NCBI `genetic_code`; con
+        `alternative_starts` gli ORF possono iniziare da qualsiasi codone di
+        inizio della tabella (es. GTG, TTG nei batteri).
+        Le coordinate restituite sono 0-based e inclusive sul filamento forward.
+        Se il budget di tempo si esaurisce vengono restituiti gli ORF dei frame già analizzati.
+        """
+        code = get_genetic_code(genetic_code)
+        n = len(sequence)
+        if n < 3:
+            return []
+
+        codes = encode_sequence(sequence)
+        orfs: List[ORF] = []
+
+        for direction, strand_codes in (("forward", codes), ("reverse", COMPLEMENT_CODES[codes[::-1]])):
+            all_codons = codon_indices(strand_codes)
+            strand_bytes = None
+            for frame_offset in range(3):
+                if budget is not None and budget.expired():
+                    break
+                frame_codons = all_codons[frame_offset::3]
+                for start, end, has_stop in OrfFinder._frame_orfs(frame_codons, min_protein_len, include_partial, code, alternative_starts):
+                    protein = OrfFinder._translate(frame_codons, start, end, code)
+                    strand_start = frame_offset + 3 * start
+                    strand_end = frame_offset + 3 * end + 2 if has_stop else frame_offset + 3 * end - 1
+
+                    if strand_bytes is None:
+                        strand_bytes = str(sequence).upper() if direction == "forward" else \
+                            np.frombuffer(b"ACGTN", dtype=np.uint8)[strand_codes].tobytes().decode("ascii")
+                    orf_dna = strand_bytes[strand_start:strand_end + 1]
+
+                    if direction == "forward":
+                        start_abs, end_abs, frame = strand_start, strand_end, frame_offset + 1
+                    else:
+                        start_abs, end_abs, frame = n - 1 - strand_end, n - 1 - strand_start, -(frame_offset + 1)
+
+                    orfs.append(ORF(
+                        start=start_abs,
+                        end=end_abs,
+                        frame=frame,
+                        length=len(orf_dna),
+                        sequence=orf_dna,
+                        direction=direction,
+                        protein_sequence=protein,
+                        protein_length=len(protein)
+                    ))
+
+        orfs.sort(key=lambda o: (o.start, o.end))
+        return orfs
@@ -0,0 +1,230 @@
+from typing import Union
+
+import numpy as np
+
+
+# Codifica a 2 bit delle basi: A=0, C=1, G=2, T/U=3; qualsiasi altro carattere vale 4.
+INVALID_BASE_CODE = 4
+BASE_CODES = np.full(256, INVALID_BASE_CODE, dtype=np.uint8)
+for _base, _code in (("A", 0), ("C", 1), ("G", 2), ("T", 3), ("U", 3)):
+    BASE_CODES[ord(_base)] = _code
+    BASE_CODES[ord(_base.lower())] = _code
+
+# Complemento nella codifica a 2 bit (3 - codice); le basi non valide restano tali.
+COMPLEMENT_CODES = np.array([3, 2, 1, 0, INVALID_BASE_CODE], dtype=np.uint8)
+
+# Conversione in maiuscolo byte per byte
+_UPPER = np.arange(256, dtype=np.uint8)
+_UPPER[ord("a"):ord("z") + 1] -= 32
+
+# Complemento dei codici IUPAC (i caratteri non elencati restano invariati)
+_IUPAC_COMPLEMENT = np.arange(256, dtype=np.uint8)
+for _a, _b in ("AT", "CG", "RY", "KM", "BV", "DH", "UA"):
+    _IUPAC_COMPLEMENT[ord(_a)] = ord(_b)
+    if _a != "U":
+        _IUPAC_COMPLEMENT[ord(_b)] = ord(_a)
+
+# Spacchettamento: per ogni byte i quattro codici a 2 bit (il primo nei bit alti)
+_UNPACK = np.array([[(byte >> shift) & 3 for shift in (6, 4, 2, 0)] for byte in range(256)], dtype=np.uint8)
+# Numero di basi G/C (codici 1 e 2, cioè bit alto diverso dal bit basso) in ogni byte
+_GC_PER_BYTE = np.array([sum(((byte >> shift) & 3) in (1, 2) for shift in (6, 4, 2, 0)) for byte in range(256)], dtype=np.int64)
+
+_DNA_LETTERS = np.frombuffer(b"ACGT", dtype=np.uint8)
+_RNA_LETTERS = np.frombuffer(b"ACGU", dtype=np.uint8)
+
+
+def codon_indices(codes: np.ndarray) -> np.ndarray:
+    """
+    Indice del codone (0-63) che inizia in ogni posizione della sequenza codificata;
+    -1 per i codoni che contengono basi non valide.
+    """
+    if codes.size < 3:
+        return np.empty(0, dtype=np.int16)
+    b1 = codes[:-2].astype(np.int16)
+    b2 = codes[1:-1].astype(np.int16)
+    b3 = codes[2:].astype(np.int16)
+    indices = 16 * b1 + 4 * b2 + b3
+    invalid = (b1 == INVALID_BASE_CODE) | (b2 == INVALID_BASE_CODE) | (b3 == INVALID_BASE_CODE)
+    indices[invalid] = -1
+    return indices
+
+
+class PackedSequence:
+    """
+    Sequenza nucleotidica compatta a 2 bit per base (4 basi per byte).
+
+    I caratteri che non corrispondono alla lettera canonica del proprio codice
+    (N e altri codici IUPAC, U in una sequenza di DNA, T in una di RNA) sono
+    salvati a parte come eccezioni (posizione, carattere): la sequenza originale
+    in maiuscolo è ricostruibile esattamente e `codes()` restituisce per questi
+    caratteri lo stesso codice di `encode_sequence` (4 per le basi ambigue).
+
+    Lo slicing con passo 1 non copia dati: la nuova sequenza condivide il buffer
+    e restringe solo l'intervallo. Reverse complement, conteggio GC e viste per
+    codone sono vettorizzati.
+    """
+
+    __slots__ = ("_packed", "_offset", "_length", "_exception_positions", "_exception_chars", "is_rna")
+
+    def __init__(
+        self,
+        packed: np.ndarray,
+        offset: int,
+        length: int,
+        exception_positions: np.ndarray,
+        exception_chars: np.ndarray,
+        is_rna: bool = False
+    ):
+        self._packed = packed
+        self._offset = offset
+        self._length = length
+        # Posizioni assolute nel buffer (ordinate), così le viste possono condividerle
+        self._exception_positions = exception_positions
+        self._exception_chars = exception_chars
+        self.is_rna = is_rna
+
+    @classmethod
+    def from_string(cls, sequence: str) -> "PackedSequence":
+        """Comprime una sequenza (maiuscole o minuscole) in un'unica passata vettorizzata."""
+        raw = _UPPER[np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)]
+        is_rna = bool(np.any(raw == ord("U"))) and not bool(np.any(raw == ord("T")))
+        return cls._from_raw(raw, is_rna)
+
+    @classmethod
+    def coerce(cls, sequence: Union[str, "PackedSequence"]) -> "PackedSequence":
+        """Restituisce la sequenza com'è se già compressa, altrimenti la comprime."""
+        return sequence if isinstance(sequence, PackedSequence) else cls.from_string(sequence)
+
+    @classmethod
+    def _from_raw(cls, raw: np.ndarray, is_rna: bool) -> "PackedSequence":
+        codes = BASE_CODES[raw]
+        letters = _RNA_LETTERS if is_rna else _DNA_LETTERS
+        exceptions = np.flatnonzero((codes == INVALID_BASE_CODE) | (letters[codes & 3] != raw))
+        return cls._pack(codes, exceptions, raw[exceptions], is_rna)
+
+    @classmethod
+    def _pack(cls, codes: np.ndarray, exception_positions: np.ndarray, exception_chars: np.ndarray, is_rna: bool) -> "PackedSequence":
+        n = codes.size
+        padded = np.zeros((n + 3) // 4 * 4, dtype=np.uint8)
+        # Le basi non valide sono salvate come A (codice 0) nel buffer
+        padded[:n] = np.where(codes == INVALID_BASE_CODE, 0, codes)
+        quads = padded.reshape(-1, 4)
+        packed = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+        return cls(packed, 0, n, exception_positions.astype(np.int64), exception_chars.astype(np.uint8), is_rna)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            if key < 0:
+                key += self._length
+            if not 0 <= key < self._length:
+                raise IndexError("Indice fuori dalla sequenza")
+            return str(self[key:key + 1])
+        start, stop, step = key.indices(self._length)
+        if step != 1:
+            raise ValueError("Lo slicing di PackedSequence supporta solo passo 1")
+        stop = max(start, stop)
+        begin, end = self._offset + start, self._offset + stop
+        lo, hi = np.searchsorted(self._exception_positions, [begin, end])
+        return PackedSequence(
+            self._packed, begin, stop - start,
+            self._exception_positions[lo:hi], self._exception_chars[lo:hi], self.is_rna
+        )
+
+    def __str__(self) -> str:
+        letters = _RNA_LETTERS if self.is_rna else _DNA_LETTERS
+        raw = letters[self._two_bit_codes()]
+        raw[self._exception_positions - self._offset] = self._exception_chars
+        return raw.tobytes().decode("ascii")
+
+    def __repr__(self) -> str:
+        preview = str(self[:20]) + ("..." if self._length > 20 else "")
+        return f"PackedSequence({preview!r}, length={self._length})"
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PackedSequence):
+            return str(self) == str(other)
+        if isinstance(other, str):
+            return str(self) == other.upper()
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    @property
+    def nbytes(self) -> int:
+        """Memoria occupata dai dati (buffer condiviso compreso)."""
+        return self._packed.nbytes + self._exception_positions.nbytes + self._exception_chars.nbytes
+
+    def _two_bit_codes(self) -> np.ndarray:
+        """Codici a 2 bit delle basi dell'intervallo, senza tenere conto delle eccezioni."""
+        first = self._offset // 4
+        last = (self._offset + self._length + 3) // 4
+        skip = self._offset % 4
+        return _UNPACK[self._packed[first:last]].ravel()[skip:skip + self._length]
+
+    def codes(self) -> np.ndarray:
+        """Codici per base (A=0, C=1, G=2, T/U=3, non valida=4), come `encode_sequence`."""
+        codes = self._two_bit_codes()
+        codes[self._exception_positions - self._offset] = BASE_CODES[self._exception_chars]
+        return codes
+
+    def ambiguous_mask(self) -> np.ndarray:
+        """Maschera delle basi non valide/ambigue (N e codici IUPAC)."""
+        mask = np.zeros(self._length, dtype=bool)
+        ambiguous = BASE_CODES[self._exception_chars] == INVALID_BASE_CODE
+        mask[self._exception_positions[ambiguous] - self._offset] = True
+        return mask
+
+    def reverse_complement(self) -> "PackedSequence":
+        """Reverse complement (i codici IUPAC vengono complementati, es. R <-> Y)."""
+        codes = COMPLEMENT_CODES[self.codes()[::-1]]
+        positions = (self._length - 1 - (self._exception_positions - self._offset))[::-1]
+        chars = _IUPAC_COMPLEMENT[self._exception_chars][::-1]
+        if self.is_rna:
+            chars = np.where(chars == ord("T"), ord("U"), chars).astype(np.uint8)
+        return PackedSequence._pack(codes, positions, chars, self.is_rna)
+
+    def gc_count(self) -> int:
+        """Numero di basi G o C, contato sui byte interi con una tabella di lookup."""
+        start, end = self._offset, self._offset + self._length
+        first_full, last_full = (start + 3) // 4, end // 4
+        if first_full >= last_full:
+            codes = self._two_bit_codes()
+            return int(np.count_nonzero((codes == 1) | (codes == 2)))
+        count = int(_GC_PER_BYTE[self._packed[first_full:last_full]].sum())
+        # Basi nei byte parziali ai due estremi
+        for lo, hi in ((start, first_full * 4), (last_full * 4, end)):
+            if hi > lo:
+                edge = self[lo - self._offset:hi - self._offset]._two_bit_codes()
+                count += int(np.count_nonzero((edge == 1) | (edge == 2)))
+        return count
+
+    def gc_content(self) -> float:
+        """Contenuto GC in percentuale."""
+        if self._length == 0:
+            return 0.0
+        return self.gc_count() / self._length * 100
+
+    def codon_view(self, frame: int = 0) -> np.ndarray:
+        """Vista (k, 3) dei codici dei codoni completi a partire da `frame`."""
+        codes = self.codes()[frame:]
+        k = codes.size // 3
+        return codes[:3 * k].reshape(k, 3)
+
+    def codon_indices(self, frame: int = 0) -> np.ndarray:
+        """Indici (0-63) dei codoni consecutivi a partire da `frame`; -1 se contengono basi non valide."""
+        codons = self.codon_view(frame).astype(np.int16)
+        indices = 16 * codons[:, 0] + 4 * codons[:, 1] + codons[:, 2]
+        indices[(codons == INVALID_BASE_CODE).any(axis=1)] = -1
+        return indices
+
+
+def encode_sequence(sequence: Union[str, PackedSequence]) -> np.ndarray:
+    """Codifica una sequenza nucleotidica in un array di codici a 2 bit (4 = non valido)."""
+    if isinstance(sequence, PackedSequence):
+        return sequence.codes()
+    raw = np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)
+    return BASE_CODES[raw]
@@ -0,0 +1,175 @@
+from typing import List, Optional
+
+import numpy as np
+
+from server.models.sequence_analysis import PalindromicSequence
+from server.services.packed_sequence import encode_sequence, INVALID_BASE_CODE
+from server.services.analysis_budget import TimeBudget
+
+# Ogni quante iterazioni del ciclo di Manacher viene controllato il budget di tempo
+BUDGET_CHECK_INTERVAL = 8192
+
+
+class PalindromeFinder:
+    """
+    Ricerca di palindromi in senso reverse-complement (siti uguali al proprio
+    reverse complement, es. GAATTC) e di ripetizioni invertite con spaziatore.
+
+    I palindromi reverse-complement hanno sempre lunghezza pari, quindi basta
+    l'algoritmo di Manacher sui soli centri pari, con il confronto "base uguale"
+    sostituito da "base complementare": la simmetria su cui si basa Manacher vale
+    anche per questa relazione, per cui il tempo resta O(n).
+    """
+
+    @staticmethod
+    def _complement_codes(codes: np.ndarray) -> np.ndarray:
+        """Complemento dei codici a 2 bit; le basi non valide non si appaiano con nulla."""
+        complement = (3 - codes.astype(np.int16))
+        complement[codes == INVALID_BASE_CODE] = -1
+        return complement
+
+    @staticmethod
+    def palindrome_radii(codes: np.ndarray, budget: Optional[TimeBudget] = None) -> List[int]:
+        """
+        Manacher sui centri pari: radii[i] è il numero di coppie complementari
+        attorno al centro compreso tra le posizioni i-1 e i, cioè il palindromo
+        massimale [i - radii[i], i + radii[i]).
+        Se il budget si esaurisce i centri non ancora visitati restano a 0.
+        """
+        n = codes.size
+        seq = codes.tolist()
+        comp = PalindromeFinder._complement_codes(codes).tolist()
+        radii = [0] * n
+        left, right = 0, -1
+        for i in range(n):
+            if budget is not None and i % BUDGET_CHECK_INTERVAL == 0 and budget.expired():
+                break
+            k = 0 if i > right else min(radii[left + right - i + 1], right - i + 1)
+            while i + k < n and i - k - 1 >= 0 and seq[i + k] == comp[i - k - 1]:
+                k += 1
+            radii[i] = k
+            if i + k - 1 > right:
+                left = i - k
+                right = i + k - 1
+        return radii
+
+    @staticmethod
+    def find_palindromes(
+        sequence: str,
+        min_length: int = 6,
+        maximal_only: bool = True,
+        max_results: Optional[int] = None,
+        budget: Optional[TimeBudget] = None
+    ) -> List[PalindromicSequence]:
+        """
+        Trova i palindromi reverse-complement massimali di lunghezza >= min_length.
+        Con maximal_only vengono scartati quelli contenuti in un palindromo più lungo.
+        Le posizioni sono 0-based.
+        """
+        if not sequence or len(sequence) < min_length:
+            return []
+
+        codes = encode_sequence(sequence)
+        radii = PalindromeFinder.palindrome_radii(codes, budget)
+        return PalindromeFinder.palindromes_from_radii(sequence, radii, min_length, maximal_only, max_results)
+
+    @staticmethod
+    def palindromes_from_radii(
+        sequence: str,
+        radii,
+        min_length: int = 6,
+        maximal_only: bool = True,
+        max_results: Optional[int] = None
+    ) -> List[PalindromicSequence]:
+        """Estrae i palindromi di lunghezza >= min_length da un array di raggi già calcolato."""
+        radii = np.asarray(radii, dtype=np.int64)
+        min_radius = max(1, (min_length + 1) // 2)
+        centers = np.flatnonzero(radii >= min_radius)
+        starts = centers - radii[centers]
+        lengths = 2 * radii[centers]
+
+        if maximal_only and centers.size:
+            # Ordina per inizio crescente e lunghezza decrescente: un palindromo è
+            # contenuto in un altro se finisce prima della fine massima già vista.
+            order = np.lexsort((-lengths, starts))
+            starts, lengths = starts[order], lengths[order]
+            ends = starts + lengths
+            running_max = np.maximum.accumulate(ends)
+            keep = np.ones(starts.size, dtype=bool)
+            keep[1:] = ends[1:] > running_max[:-1]
+            starts, lengths = starts[keep], lengths[keep]
+
+        sequence_upper = sequence.upper()
+        palindromes = [
+            PalindromicSequence(sequence=sequence_upper[start:start + length], position=start, length=length)
+            for start, length in zip(starts.tolist(), lengths.tolist())
+        ]
+        palindromes.sort(key=lambda p: (p.position, -p.length))
+        if max_results is not None:
+            palindromes = palindromes[:max_results]
+        return palindromes
+
+    @staticmethod
+    def find_inverted_repeats(
+        sequence: str,
+        min_arm_length: int = 6,
+        min_spacer: int = 1,
+        max_spacer: int = 20,
+        max_results: Optional[int] = None,
+        budget: Optional[TimeBudget] = None
+    ) -> List[PalindromicSequence]:
+        """
+        Trova ripetizioni invertite con spaziatore: un braccio seguito, dopo
+        `spacer` basi, dal suo reverse complement (struttura a forcina).
+        Per ogni lunghezza di spaziatore i bracci vengono estesi in parallelo su
+        tutti i centri con NumPy; i centri attivi diminuiscono rapidamente, per cui
+        il costo è circa O(n) per spaziatore.
+        """
+        n = len(sequence)
+        if not sequence or n < 2 * min_arm_length + min_spacer:
+            return []
+
+        codes = encode_sequence(sequence).astype(np.int16)
+        comp = PalindromeFinder._complement_codes(codes)
+        sequence_upper = sequence.upper()
+        found: List[PalindromicSequence] = []
+
+        for spacer in range(max(1, min_spacer), max_spacer + 1):
+            if budget is not None and budget.expired():
+                break
+            # Centro i: braccio sinistro termina in i-1, braccio destro inizia in i+spacer
+            centers = np.arange(1, n - spacer, dtype=np.int64)
+            if spacer >= 2:
+                # Se le basi ai bordi dello spaziatore si appaiano la struttura è già
+                # descritta da uno spaziatore più corto con bracci più lunghi.
+                centers = centers[codes[centers] != comp[centers + spacer - 1]]
+            arms = np.zeros(centers.size, dtype=np.int64)
+            active = np.arange(centers.size)
+            step = 0
+            while active.size:
+                left = centers[active] - 1 - step
+                right = centers[active] + spacer + step
+                in_bounds = (left >= 0) & (right < n)
+                active = active[in_bounds]
+                left, right = left[in_bounds], right[in_bounds]
+                matches = codes[right] == comp[left]
+                active = active[matches]
+                arms[active] += 1
+                step += 1
+
+            hits = np.flatnonzero(arms >= min_arm_length)
+            for center, arm in zip(centers[hits].tolist(), arms[hits].tolist()):
+                start = center - arm
+                length = 2 * arm + spacer
+                found.append(PalindromicSequence(
+                    sequence=sequence_upper[start:start + length],
+                    position=start,
+                    length=length,
+                    arm_length=arm,
+                    spacer_length=spacer
+                ))
+
+        found.sort(key=lambda p: (p.position, -p.length))
+        if max_results is not None:
+            found = found[:max_results]
+        return found
@@ -0,0 +1,314 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import asyncio
+import functools
+import logging
+import os
+import re
+
+import numpy as np
+
+from server.models.sequence_analysis import ParetoFront, ParetoObjective, ParetoOptimizationRequest, ParetoSolution
+from server.services.packed_sequence import PackedSequence
+from server.services.genetic_code import CODONS
+from server.services.codon_model import CODON_GC_COUNT, get_codon_model
+from server.services.codon_optimizer import CODON_GC_BITS, CodonOptimizer
+from server.services.codon_variants import CODON_BASES, CodonVariantSampler
+from server.services.motif_scanner import MotifScanner
+from server.services.rna_folding import RnaFolder
+from server.services.worker_pool import get_process_pool
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Esponente massimo delle probabilità di campionamento della popolazione iniziale
+# (0: sinonimi equiprobabili; valori alti: quasi sempre il codone migliore)
+INITIAL_MAX_EXPONENT = 4.0
+# k-mer più lunghi non entrano in un intero a 64 bit (2 bit per base)
+MAX_REPEAT_KMER = 31
+
+
+def non_dominated_ranks(objectives: np.ndarray) -> np.ndarray:
+    """
+    Rango di Pareto di ogni soluzione (0: fronte non dominato), con tutti gli
+    obiettivi da minimizzare. La matrice di dominanza è calcolata in una sola
+    operazione vettoriale; i fronti successivi si ottengono sottraendo i
+    contributi di quelli già estratti.
+    """
+    n = objectives.shape[0]
+    less_equal = (objectives[:, None, :] <= objectives[None, :, :]).all(axis=2)
+    less = (objectives[:, None, :] < objectives[None, :, :]).any(axis=2)
+    dominates = less_equal & less
+    dominated_by = dominates.sum(axis=0)
+    ranks = np.full(n, -1, dtype=np.int64)
+    remaining = np.ones(n, dtype=bool)
+    rank = 0
+    while remaining.any():
+        front = remaining & (dominated_by == 0)
+        ranks[front] = rank
+        remaining &= ~front
+        dominated_by = dominated_by - dominates[front].sum(axis=0)
+        rank += 1
+    return ranks
+
+
+def crowding_distances(objectives: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+    """
+    Distanza di affollamento (NSGA-II) di ogni soluzione all'interno del proprio
+    fronte: somma, per obiettivo, dei lati del cuboide formato dai vicini,
+    normalizzati sull'estensione del fronte. Gli estremi hanno distanza infinita.
+    """
+    distances = np.zeros(objectives.shape[0])
+    for rank in np.unique(ranks):
+        members = np.flatnonzero(ranks == rank)
+        if members.size <= 2:
+            distances[members] = np.inf
+            continue
+        values = objectives[members]
+        order = np.argsort(values, axis=0, kind="stable")
+        sorted_values = np.take_along_axis(values, order, axis=0)
+        span = sorted_values[-1] - sorted_values[0]
+        span[span == 0] = 1.0
+        gaps = np.empty_like(values)
+        gaps[1:-1] = (sorted_values[2:] - sorted_values[:-2]) / span
+        gaps[[0, -1]] = np.inf
+        contributions = np.empty_like(values)
+        np.put_along_axis(contributions, order, gaps, axis=0)
+        distances[members] = contributions.sum(axis=1)
+    return distances
+
+
+class ParetoProblem:
+    """
+    Scelta dei codoni sinonimi come problema multi-obiettivo. Un individuo è una
+    colonna della matrice posizioni x sinonimi per ogni codone; tutti gli
+    obiettivi sono calcolati sull'intera popolazione con operazioni vettoriali
+    (CAI, GC per finestra, siti con le transizioni per codone dell'automa, k-mer
+    ripetuti codificati a 2 bit e ordinati per riga). Durante l'evoluzione
+    l'energia della regione 5' è stimata con la forcina più stabile, calcolata per
+    tutta la popolazione insieme; il ripiegamento esatto, una volta per prefisso
+    distinto, è riservato alle soluzioni del fronte finale.
+    """
+
+    def __init__(self, request: ParetoOptimizationRequest):
+        sequence = request.sequence.strip().upper()
+        if not re.fullmatch(r"[ATGC]+", sequence):
+            raise ValueError("La sequenza DNA contiene caratteri non validi. Solo A, T, G, C sono permessi.")
+        if len(sequence) % 3 != 0:
+            raise ValueError("La lunghezza della sequenza DNA deve essere un multiplo di 3.")
+
+        self.model = get_codon_model(request.target_organism, request.genetic_code)
+        self.objectives = list(dict.fromkeys(request.objectives))
+        packed_sequence = PackedSequence.from_string(sequence)
+        amino_acids = CodonOptimizer._translate_sequence(packed_sequence, self.model.code)
+        self.options, self.scores = CodonOptimizer._codon_options(amino_acids, packed_sequence, self.model)
+        # Con esponente 1 le probabilità sono proporzionali all'adattamento relativo
+        self.codons, self.probabilities = CodonVariantSampler._choice_matrices(self.options, self.scores, self.model, 0.5)
+        self.allowed = self.probabilities > 0
+        self.recodable = self.allowed.sum(axis=1) > 1
+        self.site_automaton = MotifScanner.sites_automaton(request.restriction_sites_to_avoid or [])
+        self.original = self.columns(packed_sequence.codon_indices())
+        self._five_prime_energies: Dict[bytes, float] = {}
+
+    @property
+    def length(self) -> int:
+        return len(self.options)
+
+    def columns(self, chosen: Sequence[int]) -> np.ndarray:
+        """Colonne della matrice dei sinonimi corrispondenti ai codoni dati."""
+        return np.argmax(self.codons == np.asarray(chosen, dtype=np.int64)[:, None], axis=1)
+
+    def to_codons(self, population: np.ndarray) -> np.ndarray:
+        return self.codons[np.arange(self.length), population]
+
+    def initial_population(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        """
+        Popolazione iniziale: la soluzione a CAI massimo senza siti (Viterbi), la
+        sequenza originale e individui campionati con probabilità proporzionali a
+        w^e, con esponente e diverso per ognuno (da sinonimi equiprobabili a quasi
+        sempre il codone migliore), per coprire tutto il fronte fin dall'inizio.
+        """
+        seeds = [self.columns(CodonOptimizer._optimal_codons(self.options, self.scores, self.site_automaton)), self.original]
+        sampled = size - len(seeds)
+        exponents = rng.random(sampled) * INITIAL_MAX_EXPONENT
+        weights = np.where(self.allowed[None, :, :], self.probabilities[None, :, :] ** exponents[:, None, None], 0.0)
+        cumulative = np.cumsum(weights, axis=2)
+        thresholds = rng.random((sampled, self.length)) * cumulative[:, :, -1]
+        choices = np.minimum((cumulative <= thresholds[:, :, None]).sum(axis=2), self.codons.shape[1] - 1)
+        return np.vstack([np.vstack(seeds)[:size], choices])
+
+    def offspring(self, population: np.ndarray, ranks: np.ndarray, crowding: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        Figli di una generazione: selezione a torneo binario (rango, poi distanza di
+        affollamento), crossover a due punti tra coppie di genitori e mutazione di
+        ogni codone ricodificabile con probabilità PARETO_MUTATION_RATE verso un
+        altro sinonimo osservato nell'organismo.
+        """
+        size = population.shape[0]
+        first, second = rng.integers(size, size=(2, size))
+        first_wins = (ranks[first] < ranks[second]) | ((ranks[first] == ranks[second]) & (crowding[first] >= crowding[second]))
+        parents = population[np.where(first_wins, first, second)]
+        partners = np.roll(parents, 1, axis=0)
+        cuts = np.sort(rng.integers(self.length + 1, size=(size, 2)), axis=1)
+        positions = np.arange(self.length)
+        segment = (positions[None, :] >= cuts[:, :1]) & (positions[None, :] < cuts[:, 1:])
+        children = np.where(segment, partners, parents)
+
+        rows, cols = np.nonzero((rng.random(children.shape) < settings.PARETO_MUTATION_RATE) & self.recodable[None, :])
+        if rows.size:
+            keys = rng.random((rows.size, self.codons.shape[1])) * self.allowed[cols]
+            keys[np.arange(rows.size), children[rows, cols]] = -1.0
+            children[rows, cols] = np.argmax(keys, axis=1)
+        return children
+
+    def five_prime_energies(self, codons: np.ndarray) -> np.ndarray:
+        """Energia minima dei primi FOLDING_OPTIMIZER_CODONS codoni, ripiegando solo i prefissi nuovi."""
+        window = min(settings.FOLDING_OPTIMIZER_CODONS, codons.shape[1])
+        prefixes, inverse = np.unique(codons[:, :window], axis=0, return_inverse=True)
+        energies = np.empty(prefixes.shape[0])
+        for i, prefix in enumerate(prefixes):
+            key = prefix.tobytes()
+            energy = self._five_prime_energies.get(key)
+            if energy is None:
+                energy = RnaFolder.mfe("".join(CODONS[index] for index in prefix.tolist()), max_span=settings.FOLDING_MAX_SPAN)
+                self._five_prime_energies[key] = energy
+            energies[i] = energy
+        return energies[inverse.ravel()]
+
+    def metrics(self, codons: np.ndarray, objectives: Sequence[ParetoObjective]) -> Dict[ParetoObjective, np.ndarray]:
+        """Valori degli obiettivi richiesti per una popolazione (matrice individui x codoni)."""
+        values: Dict[ParetoObjective, np.ndarray] = {}
+        size = codons.shape[0]
+        if ParetoObjective.CAI in objectives:
+            values[ParetoObjective.CAI] = self.model.expression_scores(codons)[0]
+        if ParetoObjective.GC_UNIFORMITY in objectives:
+            bits = CODON_GC_BITS[codons].reshape(size, -1)
+            window = min(settings.LOCAL_GC_WINDOW, bits.shape[1])
+            cumulative = np.zeros((size, bits.shape[1] + 1))
+            np.cumsum(bits, axis=1, out=cumulative[:, 1:])
+            gc = (cumulative[:, window:] - cumulative[:, :-window]) * 100.0 / window
+            values[ParetoObjective.GC_UNIFORMITY] = gc.std(axis=1)
+        if ParetoObjective.SITES in objectives:
+            hits = np.zeros(size, dtype=np.int64)
+            if self.site_automaton is not None:
+                next_state, site_hits = self.site_automaton.codon_transitions()
+                state = np.zeros(size, dtype=np.int64)
+                for column in codons.T:
+                    hits += site_hits[state, column]
+                    state = next_state[state, column]
+            values[ParetoObjective.SITES] = hits
+        if ParetoObjective.REPEATS in objectives:
+            bases = CODON_BASES[codons].reshape(size, -1).astype(np.uint64)
+            k = min(settings.PARETO_REPEAT_KMER, MAX_REPEAT_KMER)
+            count = bases.shape[1] - k + 1
+            repeated = np.zeros(size, dtype=np.int64)
+            if count > 1:
+                keys = np.zeros((size, count), dtype=np.uint64)
+                for offset in range(k):
+                    keys = (keys << np.uint64(2)) | bases[:, offset:offset + count]
+                keys.sort(axis=1)
+                repeated = (keys[:, 1:] == keys[:, :-1]).sum(axis=1)
+            values[ParetoObjective.REPEATS] = repeated
+        if ParetoObjective.FIVE_PRIME_STRUCTURE in objectives:
+            # Stima a forcina singola: il ripiegamento esatto di ogni prefisso nuovo costerebbe
+            # più di tutti gli altri obiettivi insieme
+            window = min(settings.FOLDING_OPTIMIZER_CODONS, codons.shape[1])
+            bases = CODON_BASES[codons[:, :window]].reshape(size, -1)
+            values[ParetoObjective.FIVE_PRIME_STRUCTURE] = RnaFolder.stem_loop_energies(bases, max_span=settings.FOLDING_MAX_SPAN)
+        return values
+
+    def evaluate(self, population: np.ndarray) -> np.ndarray:
+        """Matrice individui x obiettivi, tutti da minimizzare (CAI ed energia cambiano segno)."""
+        values = self.metrics(self.to_codons(population), self.objectives)
+        columns = []
+        for objective in self.objectives:
+            column = values[objective].astype(np.float64)
+            columns.append(-column if objective in (ParetoObjective.CAI, ParetoObjective.FIVE_PRIME_STRUCTURE) else column)
+        return np.column_stack(columns)
+
+    def evolve(self, population_size: int, generations: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        NSGA-II: a ogni generazione genitori e figli sono ordinati per rango di
+        Pareto e distanza di affollamento, e i migliori formano la popolazione
+        successiva. Restituisce il fronte non dominato finale (codoni e obiettivi).
+        """
+        population = self.initial_population(population_size, rng)
+        objectives = self.evaluate(population)
+        ranks = non_dominated_ranks(objectives)
+        crowding = crowding_distances(objectives, ranks)
+        for _ in range(generations):
+            children = self.offspring(population, ranks, crowding, rng)
+            population = np.vstack((population, children))
+            objectives = np.vstack((objectives, self.evaluate(children)))
+            ranks = non_dominated_ranks(objectives)
+            crowding = crowding_distances(objectives, ranks)
+            survivors = np.lexsort((-crowding, ranks))[:population_size]
+            population, objectives = population[survivors], objectives[survivors]
+            ranks, crowding = ranks[survivors], crowding[survivors]
+        front = ranks == 0
+        return self.to_codons(population[front]), objectives[front]
+
+
+def evolve_island(request: ParetoOptimizationRequest, seed: np.random.SeedSequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Punto di ingresso eseguito nei processi worker: evolve una popolazione
+    indipendente e ne restituisce il fronte non dominato.
+    """
+    problem = ParetoProblem(request)
+    return problem.evolve(request.population_size, request.generations, np.random.default_rng(seed))
+
+
+async def optimize_pareto(request: ParetoOptimizationRequest) -> ParetoFront:
+    """
+    Fronte di Pareto delle scelte di codoni sinonimi per gli obiettivi richiesti.
+    Più isole (popolazioni NSGA-II indipendenti, con semi derivati da `seed`)
+    evolvono in parallelo nel pool di processi; i loro fronti vengono uniti,
+    ripuliti dai duplicati e dalle soluzioni dominate e, se più numerosi di
+    `front_size`, sfoltiti per distanza di affollamento.
+    """
+    # Validazione e modello nel processo principale: gli errori emergono subito
+    problem = ParetoProblem(request)
+    islands = request.islands or settings.PARETO_ISLANDS or settings.SEQUENCE_WORKER_PROCESSES or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(request.seed).spawn(islands)
+
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    fronts = await asyncio.gather(*(
+        loop.run_in_executor(pool, functools.partial(evolve_island, request, seed)) for seed in seeds
+    ))
+    logger.info(f"Ottimizzazione multi-obiettivo: {islands} isole, {sum(codons.shape[0] for codons, _ in fronts)} soluzioni nei fronti")
+
+    codons, unique = np.unique(np.vstack([front_codons for front_codons, _ in fronts]), axis=0, return_index=True)
+    objectives = np.vstack([front_objectives for _, front_objectives in fronts])[unique]
+    front = non_dominated_ranks(objectives) == 0
+    codons, objectives = codons[front], objectives[front]
+    if codons.shape[0] > request.front_size:
+        kept = np.argsort(-crowding_distances(objectives, np.zeros(codons.shape[0], dtype=np.int64)), kind="stable")[:request.front_size]
+        codons, objectives = codons[kept], objectives[kept]
+
+    # Metriche complete delle soluzioni finali (il ripiegamento esatto solo se richiesto)
+    reported = [objective for objective in ParetoObjective if objective != ParetoObjective.FIVE_PRIME_STRUCTURE]
+    values = problem.metrics(codons, reported)
+    if ParetoObjective.FIVE_PRIME_STRUCTURE in problem.objectives:
+        values[ParetoObjective.FIVE_PRIME_STRUCTURE] = problem.five_prime_energies(codons)
+    gc_content = CODON_GC_COUNT[codons].sum(axis=1) * 100.0 / (3 * problem.length)
+
+    solutions: List[ParetoSolution] = []
+    for i in np.argsort(-values[ParetoObjective.CAI], kind="stable").tolist():
+        energy: Optional[np.ndarray] = values.get(ParetoObjective.FIVE_PRIME_STRUCTURE)
+        solutions.append(ParetoSolution(
+            sequence="".join(CODONS[index] for index in codons[i].tolist()),
+            cai=float(values[ParetoObjective.CAI][i]),
+            gc_content=float(gc_content[i]),
+            gc_window_std=float(values[ParetoObjective.GC_UNIFORMITY][i]),
+            site_hits=int(values[ParetoObjective.SITES][i]),
+            repeated_kmers=int(values[ParetoObjective.REPEATS][i]),
+            five_prime_mfe=float(energy[i]) if energy is not None else None
+        ))
+    return ParetoFront(
+        organism=problem.model.name,
+        objectives=problem.objectives,
+        solutions=solutions,
+        islands=islands,
+        evaluated=islands * request.population_size * (request.generations + 1)
+    )
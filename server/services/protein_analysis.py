@@ -0,0 +1,235 @@
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from server.models.sequence_analysis import ProteinProperties
+
+
+# Ordine dei residui nelle tabelle; l'indice 20 raccoglie i caratteri non standard
+AMINO_ACIDS = "ACDEFGHIKLMNPQRSTVWY"
+UNKNOWN_RESIDUE = len(AMINO_ACIDS)
+RESIDUE_CODES = UNKNOWN_RESIDUE + 1
+
+# Masse medie dei residui (Da, amminoacido meno una molecola d'acqua, valori ExPASy)
+RESIDUE_MASSES: Dict[str, float] = {
+    "A": 71.0788, "C": 103.1388, "D": 115.0886, "E": 129.1155, "F": 147.1766,
+    "G": 57.0519, "H": 137.1411, "I": 113.1594, "K": 128.1741, "L": 113.1594,
+    "M": 131.1926, "N": 114.1038, "P": 97.1167, "Q": 128.1307, "R": 156.1875,
+    "S": 87.0782, "T": 101.1051, "V": 99.1326, "W": 186.2132, "Y": 163.1760,
+}
+WATER_MASS = 18.01524
+
+# Scala di idropatia di Kyte-Doolittle
+KYTE_DOOLITTLE: Dict[str, float] = {
+    "A": 1.8, "C": 2.5, "D": -3.5, "E": -3.5, "F": 2.8, "G": -0.4, "H": -3.2, "I": 4.5, "K": -3.9, "L": 3.8,
+    "M": 1.9, "N": -3.5, "P": -1.6, "Q": -3.5, "R": -4.5, "S": -0.8, "T": -0.7, "V": 4.2, "W": -0.9, "Y": -1.3,
+}
+DEFAULT_HYDROPATHY_WINDOW = 9
+
+# pKa dei gruppi ionizzabili (valori EMBOSS): catene laterali e terminali
+POSITIVE_PKA: Dict[str, float] = {"K": 10.8, "R": 12.5, "H": 6.5}
+NEGATIVE_PKA: Dict[str, float] = {"D": 3.9, "E": 4.1, "C": 8.5, "Y": 10.1}
+N_TERMINAL_PKA = 8.6
+C_TERMINAL_PKA = 3.6
+PI_ITERATIONS = 40  # Bisezione su [0, 14]: precisione ~1e-11 unità di pH
+
+# Coefficienti di estinzione molare a 280 nm (Pace et al.): Trp, Tyr, cistina
+EXTINCTION_TRP = 5500
+EXTINCTION_TYR = 1490
+EXTINCTION_CYSTINE = 125
+
+# Pesi di instabilità dei dipeptidi (DIWV, Guruprasad et al. 1990): DIWV[X][Y]
+# per il dipeptide XY. Le coppie non elencate valgono 1.0.
+INSTABILITY_THRESHOLD = 40.0  # Sopra questa soglia la proteina è considerata instabile
+_DIWV_EXCEPTIONS: Dict[str, Dict[str, float]] = {
+    "A": {"C": 44.94, "D": -7.49, "H": -7.49, "P": 20.26},
+    "C": {"D": 20.26, "H": 33.60, "L": 20.26, "M": 33.60, "P": 20.26, "Q": -6.54, "T": 33.60, "V": -6.54, "W": 24.68},
+    "D": {"F": -6.54, "K": -7.49, "R": -6.54, "S": 20.26, "T": -14.03},
+    "E": {"C": 44.94, "D": 20.26, "E": 33.60, "H": -6.54, "I": 20.26, "P": 20.26, "Q": 20.26, "S": 20.26, "W": -14.03},
+    "F": {"D": 13.34, "K": -14.03, "P": 20.26, "Y": 33.601},
+    "G": {"A": -7.49, "E": -6.54, "G": 13.34, "I": -7.49, "K": -7.49, "N": -7.49, "T": -7.49, "W": 13.34, "Y": -7.49},
+    "H": {"F": -9.37, "G": -9.37, "I": 44.94, "K": 24.68, "N": 24.68, "P": -1.88, "T": -6.54, "W": -1.88, "Y": 44.94},
+    "I": {"E": 44.94, "H": 13.34, "K": -7.49, "L": 20.26, "P": -1.88, "V": -7.49},
+    "K": {"G": -7.49, "I": -7.49, "L": -7.49, "M": 33.60, "P": -6.54, "Q": 24.64, "R": 33.60, "V": -7.49},
+    "L": {"K": -7.49, "P": 20.26, "Q": 33.60, "R": 20.26, "W": 24.68},
+    "M": {"A": 13.34, "H": 58.28, "M": -1.88, "P": 44.94, "Q": -6.54, "R": -6.54, "S": 44.94, "T": -1.88, "Y": 24.68},
+    "N": {"C": -1.88, "F": -14.03, "G": -14.03, "I": 44.94, "K": 24.68, "P": -1.88, "Q": -6.54, "T": -7.49, "W": -9.37},
+    "P": {"A": 20.26, "C": -6.54, "D": -6.54, "E": 18.38, "F": 20.26, "M": -6.54, "P": 20.26, "Q": 20.26, "R": -6.54,
+          "S": 20.26, "V": 20.26, "W": -1.88},
+    "Q": {"C": -6.54, "D": 20.26, "E": 20.26, "F": -6.54, "P": 20.26, "Q": 20.26, "S": 44.94, "V": -6.54, "Y": -6.54},
+    "R": {"G": -7.49, "H": 20.26, "N": 13.34, "P": 20.26, "Q": 20.26, "R": 58.28, "S": 44.94, "W": 58.28, "Y": -6.54},
+    "S": {"C": 33.60, "E": 20.26, "P": 44.94, "Q": 20.26, "R": 20.26, "S": 20.26},
+    "T": {"E": 20.26, "F": 13.34, "G": -7.49, "N": -14.03, "Q": -6.54, "W": -14.03},
+    "V": {"D": -14.03, "G": -7.49, "K": -1.88, "P": 20.26, "T": -7.49, "Y": -6.54},
+    "W": {"A": -14.03, "G": -9.37, "H": 24.68, "L": 13.34, "M": 24.68, "N": 13.34, "T": -14.03, "V": -7.49},
+    "Y": {"A": 24.68, "D": 24.68, "E": -6.54, "G": -7.49, "H": 13.34, "M": 44.94, "P": 13.34, "R": -15.91, "T": -7.49,
+          "W": -9.37, "Y": 13.34},
+}
+
+
+def _residue_vector(values: Dict[str, float]) -> np.ndarray:
+    """Valori di una scala per codice di residuo (0 per i residui non standard)."""
+    vector = np.zeros(RESIDUE_CODES, dtype=np.float64)
+    for residue, value in values.items():
+        vector[AMINO_ACIDS.index(residue)] = value
+    return vector
+
+
+def _residue_code_table() -> np.ndarray:
+    """Tabella di lookup (256 byte) carattere -> codice di residuo, maiuscole e minuscole."""
+    table = np.full(256, UNKNOWN_RESIDUE, dtype=np.int64)
+    for code, residue in enumerate(AMINO_ACIDS):
+        table[ord(residue)] = code
+        table[ord(residue.lower())] = code
+    return table
+
+
+def _dipeptide_table() -> np.ndarray:
+    """DIWV appiattita (21 x 21, indice X * 21 + Y); 0 per i dipeptidi con residui non standard."""
+    table = np.zeros((RESIDUE_CODES, RESIDUE_CODES), dtype=np.float64)
+    table[:UNKNOWN_RESIDUE, :UNKNOWN_RESIDUE] = 1.0
+    for first, row in _DIWV_EXCEPTIONS.items():
+        for second, value in row.items():
+            table[AMINO_ACIDS.index(first), AMINO_ACIDS.index(second)] = value
+    return table.ravel()
+
+
+RESIDUE_CODE_TABLE = _residue_code_table()
+MASS_VECTOR = _residue_vector(RESIDUE_MASSES)
+HYDROPATHY_VECTOR = _residue_vector(KYTE_DOOLITTLE)
+DIPEPTIDE_INSTABILITY = _dipeptide_table()
+_POSITIVE_CODES = np.array([AMINO_ACIDS.index(r) for r in POSITIVE_PKA])
+_POSITIVE_PKA = np.array(list(POSITIVE_PKA.values()))
+_NEGATIVE_CODES = np.array([AMINO_ACIDS.index(r) for r in NEGATIVE_PKA])
+_NEGATIVE_PKA = np.array(list(NEGATIVE_PKA.values()))
+
+
+class ProteinAnalyzer:
+    """
+    Proprietà fisico-chimiche di sequenze proteiche: massa molecolare, punto
+    isoelettrico, GRAVY, indice di instabilità, coefficiente di estinzione e
+    profilo di idropatia.
+
+    Le sequenze di un lotto vengono concatenate e codificate una sola volta con
+    una tabella di lookup; conteggi dei residui e somme sui dipeptidi si
+    ottengono con un unico bincount per proteina, e il punto isoelettrico con una
+    bisezione vettorizzata su tutte le proteine insieme. I caratteri non standard
+    (X, B, Z, ...) vengono ignorati; uno stop finale ("*") viene rimosso.
+    """
+
+    @staticmethod
+    def normalize(sequence: str) -> str:
+        """Sequenza senza spazi, in maiuscolo e senza il codone di stop finale."""
+        sequence = "".join(sequence.split()).upper()
+        return sequence[:-1] if sequence.endswith("*") else sequence
+
+    @staticmethod
+    def encode(sequence: str) -> np.ndarray:
+        """Codici di residuo (0-19, 20 per i caratteri non standard)."""
+        return RESIDUE_CODE_TABLE[np.frombuffer(sequence.encode("ascii", errors="replace"), dtype=np.uint8)]
+
+    @staticmethod
+    def residue_counts(codes: np.ndarray, protein_ids: np.ndarray, proteins: int) -> np.ndarray:
+        """Matrice (proteine x 21) dei conteggi dei residui."""
+        return np.bincount(protein_ids * RESIDUE_CODES + codes, minlength=proteins * RESIDUE_CODES).reshape(proteins, RESIDUE_CODES)
+
+    @staticmethod
+    def net_charge(counts: np.ndarray, ph: np.ndarray) -> np.ndarray:
+        """
+        Carica netta (Henderson-Hasselbalch) di ogni proteina al pH corrispondente,
+        dai conteggi dei residui: una somma pesata sui gruppi ionizzabili.
+        """
+        ph = np.asarray(ph, dtype=np.float64)[:, None]
+        positive = (counts[:, _POSITIVE_CODES] / (1.0 + 10.0 ** (ph - _POSITIVE_PKA))).sum(axis=1)
+        negative = (counts[:, _NEGATIVE_CODES] / (1.0 + 10.0 ** (_NEGATIVE_PKA - ph))).sum(axis=1)
+        ph = ph[:, 0]
+        terminals = 1.0 / (1.0 + 10.0 ** (ph - N_TERMINAL_PKA)) - 1.0 / (1.0 + 10.0 ** (C_TERMINAL_PKA - ph))
+        return positive - negative + terminals
+
+    @staticmethod
+    def isoelectric_points(counts: np.ndarray) -> np.ndarray:
+        """
+        Punto isoelettrico di ogni proteina per bisezione, vettorizzata su tutte le
+        proteine: la carica netta è monotona decrescente nel pH.
+        """
+        low = np.zeros(counts.shape[0])
+        high = np.full(counts.shape[0], 14.0)
+        for _ in range(PI_ITERATIONS):
+            middle = (low + high) / 2.0
+            positive = ProteinAnalyzer.net_charge(counts, middle) > 0
+            low = np.where(positive, middle, low)
+            high = np.where(positive, high, middle)
+        return (low + high) / 2.0
+
+    @staticmethod
+    def hydropathy_profile(sequence: str, window: int = DEFAULT_HYDROPATHY_WINDOW) -> List[float]:
+        """
+        Idropatia media (Kyte-Doolittle) di ogni finestra di `window` residui,
+        tramite somme cumulative; un valore per ogni finestra completa.
+        """
+        if window <= 0:
+            raise ValueError("La finestra di idropatia deve essere positiva.")
+        values = HYDROPATHY_VECTOR[ProteinAnalyzer.encode(ProteinAnalyzer.normalize(sequence))]
+        if values.size < window:
+            return []
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return np.round((cumulative[window:] - cumulative[:-window]) / window, 3).tolist()
+
+    @staticmethod
+    def analyze_batch(sequences: List[str], hydropathy_window: Optional[int] = None) -> List[ProteinProperties]:
+        """
+        Analizza un lotto di proteine in un'unica passata vettorizzata. Con
+        `hydropathy_window` ogni risultato include anche il profilo di idropatia.
+        """
+        normalized = [ProteinAnalyzer.normalize(sequence) for sequence in sequences]
+        proteins = len(normalized)
+        if not proteins:
+            return []
+        lengths = np.array([len(sequence) for sequence in normalized], dtype=np.int64)
+        codes = ProteinAnalyzer.encode("".join(normalized))
+        protein_ids = np.repeat(np.arange(proteins), lengths)
+
+        counts = ProteinAnalyzer.residue_counts(codes, protein_ids, proteins)
+        residues = counts[:, :UNKNOWN_RESIDUE].sum(axis=1)
+        has_residues = residues > 0
+        safe_residues = np.maximum(residues, 1)
+
+        molecular_weight = np.where(has_residues, counts @ MASS_VECTOR + WATER_MASS, 0.0)
+        gravy = counts @ HYDROPATHY_VECTOR / safe_residues
+        isoelectric_point = np.where(has_residues, ProteinAnalyzer.isoelectric_points(counts), 0.0)
+
+        # Dipeptidi adiacenti nella concatenazione, esclusi quelli a cavallo di due proteine
+        same_protein = protein_ids[1:] == protein_ids[:-1]
+        dipeptides = DIPEPTIDE_INSTABILITY[codes[:-1] * RESIDUE_CODES + codes[1:]]
+        instability_sums = np.bincount(protein_ids[1:][same_protein], weights=dipeptides[same_protein], minlength=proteins)
+        instability_index = 10.0 * instability_sums / safe_residues
+
+        tryptophans = counts[:, AMINO_ACIDS.index("W")]
+        tyrosines = counts[:, AMINO_ACIDS.index("Y")]
+        cystines = counts[:, AMINO_ACIDS.index("C")] // 2
+        extinction_reduced = tryptophans * EXTINCTION_TRP + tyrosines * EXTINCTION_TYR
+        extinction_oxidized = extinction_reduced + cystines * EXTINCTION_CYSTINE
+
+        return [
+            ProteinProperties(
+                length=int(residues[i]),
+                unknown_residues=int(counts[i, UNKNOWN_RESIDUE]),
+                molecular_weight=round(float(molecular_weight[i]), 2),
+                isoelectric_point=round(float(isoelectric_point[i]), 2),
+                gravy=round(float(gravy[i]), 3),
+                instability_index=round(float(instability_index[i]), 2),
+                is_stable=bool(instability_index[i] <= INSTABILITY_THRESHOLD),
+                extinction_coefficient_reduced=int(extinction_reduced[i]),
+                extinction_coefficient_oxidized=int(extinction_oxidized[i]),
+                hydropathy_window=hydropathy_window,
+                hydropathy_profile=(
+                    ProteinAnalyzer.hydropathy_profile(normalized[i], hydropathy_window) if hydropathy_window else None
+                )
+            )
+            for i in range(proteins)
+        ]
+
+    @staticmethod
+    def analyze(sequence: str, hydropathy_window: Optional[int] = None) -> ProteinProperties:
+        """Proprietà di una singola proteina."""
+        return ProteinAnalyzer.analyze_batch([sequence], hydropathy_window)[0]
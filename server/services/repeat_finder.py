@@ -0,0 +1,201 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from server.models.sequence_analysis import RepeatSequence
+from server.services.analysis_budget import TimeBudget
+
+# Ogni quante iterazioni dei cicli Python viene controllato il budget di tempo
+BUDGET_CHECK_INTERVAL = 8192
+# Byte impacchettati nel rango iniziale del suffix array
+INITIAL_PREFIX = 8
+# Base dell'hash polinomiale (modulo 2^64) dei prefissi
+HASH_BASE = 1000003
+
+
+class RepeatFinder:
+    """
+    Ricerca di ripetizioni dirette massimali basata su suffix array e array LCP.
+
+    Il suffix array è costruito per raddoppiamento dei prefissi con ordinamenti
+    NumPy; l'array LCP (Kasai) e l'enumerazione sono limitati ai suffissi che
+    iniziano con un prefisso ripetuto di lunghezza minima. Le ripetizioni
+    massimali sono enumerate come intervalli LCP con una singola scansione a pila.
+    Una ripetizione è massimale quando non può essere estesa né a destra
+    (intervallo LCP) né a sinistra (le basi che precedono le occorrenze differiscono).
+    """
+
+    @staticmethod
+    def suffix_array(codes: np.ndarray, budget: Optional[TimeBudget] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Costruisce il suffix array per raddoppiamento dei prefissi (O(n log² n) in NumPy).
+        Il rango iniziale è dato dai primi 8 byte impacchettati in un intero (i
+        suffissi più corti sono completati con zeri e ordinati per primi); ad ogni
+        passo la coppia (rango, rango a distanza k) è combinata in un'unica chiave.
+        Restituisce (sa, rank) dove rank è l'inverso di sa, oppure None se il budget
+        di tempo si esaurisce prima del completamento.
+        """
+        n = codes.size
+        if n <= 1:
+            return np.zeros(n, dtype=np.int64), np.zeros(n, dtype=np.int64)
+
+        padded = np.zeros(n + INITIAL_PREFIX, dtype=np.uint64)
+        padded[:n] = codes
+        key = np.zeros(n, dtype=np.uint64)
+        for i in range(INITIAL_PREFIX):
+            key = (key << np.uint64(8)) | padded[i:i + n]
+
+        k = INITIAL_PREFIX
+        while True:
+            sa = np.argsort(key, kind="stable")
+            sorted_key = key[sa]
+            changed = np.empty(n, dtype=bool)
+            changed[0] = True
+            changed[1:] = sorted_key[1:] != sorted_key[:-1]
+            rank = np.empty(n, dtype=np.int64)
+            rank[sa] = np.cumsum(changed) - 1
+            if changed.all() or k >= n:
+                break
+            if budget is not None and budget.expired():
+                return None
+            second = np.zeros(n, dtype=np.int64)
+            second[:n - k] = rank[k:] + 1
+            key = rank * (n + 1) + second
+            k *= 2
+        return sa, rank
+
+    @staticmethod
+    def repeated_prefix_mask(codes: np.ndarray, sa: np.ndarray, length: int) -> np.ndarray:
+        """
+        Maschera (in ordine di testo) delle posizioni il cui prefisso di `length`
+        caratteri compare almeno due volte. I prefissi uguali sono contigui nel
+        suffix array, quindi basta confrontare gli hash polinomiali dei vicini;
+        una collisione aggiunge solo posizioni superflue, mai ne toglie.
+        """
+        n = codes.size
+        mask = np.zeros(n, dtype=bool)
+        windows = n - length + 1
+        if windows < 2:
+            return mask
+        hashes = np.zeros(windows, dtype=np.uint64)
+        for i in range(length):
+            hashes = hashes * np.uint64(HASH_BASE) + codes[i:i + windows].astype(np.uint64)
+        ordered = sa[sa < windows]
+        same = hashes[ordered[1:]] == hashes[ordered[:-1]]
+        mask[ordered[1:][same]] = True
+        mask[ordered[:-1][same]] = True
+        return mask
+
+    @staticmethod
+    def sparse_lcp_array(
+        data: bytes,
+        sparse_sa: np.ndarray,
+        min_length: int,
+        budget: Optional[TimeBudget] = None
+    ) -> Optional[List[int]]:
+        """
+        Array LCP tra suffissi consecutivi di un suffix array ristretto alle posizioni
+        con un prefisso ripetuto (lcp[0] = 0). Segue Kasai in ordine di testo, ma il
+        limite inferiore h-1 viene riusato solo tra posizioni consecutive e se
+        >= min_length: solo in quel caso anche il suffisso successivo al predecessore
+        appartiene al sottoinsieme e il limite resta valido. None se il budget si esaurisce.
+        """
+        n = len(data)
+        m = sparse_sa.size
+        sa_list = sparse_sa.tolist()
+        rank_of = dict(zip(sa_list, range(m)))
+        lcp = [0] * m
+        h = 0
+        previous = -2
+        for count, i in enumerate(sorted(sa_list)):
+            if budget is not None and count % BUDGET_CHECK_INTERVAL == 0 and budget.expired():
+                return None
+            h = h - 1 if i == previous + 1 and h - 1 >= min_length else 0
+            previous = i
+            r = rank_of[i]
+            if r == 0:
+                h = 0
+                continue
+            j = sa_list[r - 1]
+            while i + h < n and j + h < n and data[i + h] == data[j + h]:
+                h += 1
+            lcp[r] = h
+        return lcp
+
+    @staticmethod
+    def find_repeats(
+        sequence: str,
+        min_length: int = 10,
+        min_count: int = 2,
+        max_results: Optional[int] = None,
+        budget: Optional[TimeBudget] = None
+    ) -> List[RepeatSequence]:
+        """
+        Trova le ripetizioni dirette massimali di lunghezza >= min_length presenti
+        almeno min_count volte, con tutte le loro occorrenze (posizioni 0-based).
+        Il risultato è ordinato per lunghezza e numero di occorrenze decrescenti.
+        Se il budget di tempo si esaurisce durante l'enumerazione vengono
+        restituite le ripetizioni trovate fino a quel momento.
+        """
+        n = len(sequence)
+        if not sequence or n < min_length + 1 or min_count < 1:
+            return []
+
+        data = sequence.upper().encode("ascii", errors="replace")
+        codes = np.frombuffer(data, dtype=np.uint8)
+        suffixes = RepeatFinder.suffix_array(codes, budget)
+        if suffixes is None:
+            return []
+        sa, _ = suffixes
+        # Solo i suffissi che iniziano con un prefisso ripetuto di min_length
+        # caratteri possono appartenere a una ripetizione: il resto del lavoro
+        # (LCP e intervalli, in Python) scala con il loro numero invece che con n.
+        sa = sa[RepeatFinder.repeated_prefix_mask(codes, sa, min_length)[sa]]
+        n = sa.size
+        if n < 2:
+            return []
+        lcp = RepeatFinder.sparse_lcp_array(data, sa, min_length, budget)
+        if lcp is None:
+            return []
+
+        # Diversità a sinistra: carattere che precede ogni suffisso, in ordine di suffix array.
+        # La posizione 0 ha un carattere precedente fittizio (-1), unico per costruzione.
+        preceding = np.full(len(data), -1, dtype=np.int64)
+        preceding[1:] = codes[:-1]
+        preceding_sorted = preceding[sa]
+        left_changes = np.zeros(n, dtype=np.int64)
+        left_changes[1:] = preceding_sorted[1:] != preceding_sorted[:-1]
+        left_changes = np.cumsum(left_changes).tolist()
+
+        # Enumerazione degli intervalli LCP (lcp, lb, rb) con una pila
+        intervals: List[Tuple[int, int, int]] = []
+        stack: List[Tuple[int, int]] = [(0, 0)]
+        for i in range(1, n + 1):
+            if budget is not None and i % BUDGET_CHECK_INTERVAL == 0 and budget.expired():
+                break
+            current = lcp[i] if i < n else 0
+            lb = i - 1
+            while current < stack[-1][0]:
+                interval_lcp, lb = stack.pop()
+                rb = i - 1
+                if (interval_lcp >= min_length and rb - lb + 1 >= min_count
+                        and left_changes[rb] - left_changes[lb] > 0):
+                    intervals.append((interval_lcp, lb, rb))
+            if current > stack[-1][0]:
+                stack.append((current, lb))
+
+        intervals.sort(key=lambda it: (it[0], it[2] - it[1] + 1), reverse=True)
+        if max_results is not None:
+            intervals = intervals[:max_results]
+
+        sequence_upper = sequence.upper()
+        repeats: List[RepeatSequence] = []
+        for length, lb, rb in intervals:
+            positions = np.sort(sa[lb:rb + 1]).tolist()
+            repeats.append(RepeatSequence(
+                sequence=sequence_upper[positions[0]:positions[0] + length],
+                positions=positions,
+                length=length,
+                count=len(positions)
+            ))
+        return repeats
@@ -0,0 +1,396 @@
+from typing import List, Tuple, Union
+import math
+
+import numpy as np
+
+from server.models.sequence_analysis import RnaHairpin, RnaFoldResult
+from server.services.packed_sequence import PackedSequence, encode_sequence
+
+
+# Parametri del modello di energia (kcal/mol a 37 °C), semplificati dal modello
+# nearest-neighbour di Turner 2004: stacking per le coppie Watson-Crick, valori
+# medi per le coppie G-U e per i mismatch terminali, loop interni senza tabelle
+# specifiche per le singole sequenze (1x1, 1x2, 2x2).
+MIN_HAIRPIN_LOOP = 3  # Basi minime nel loop di una forcina
+MAX_INTERIOR_LOOP = 10  # Basi spaiate massime in un bulge o loop interno
+ML_CLOSING = 3.4  # Penalità di chiusura di un multiloop
+ML_BRANCH = 0.4  # Penalità per ramo di un multiloop
+TERMINAL_AU = 0.5  # Penalità per le coppie A-U/G-U alle estremità delle eliche
+INTERIOR_AU = 0.7  # Penalità per le coppie A-U/G-U che chiudono un loop interno
+HAIRPIN_MISMATCH = -0.8  # Bonus medio del mismatch terminale (loop di almeno 4 basi)
+NINIO = 0.6  # Penalità per base di asimmetria di un loop interno
+NINIO_MAX = 3.0
+_RT = 0.61632
+
+# Tipi di coppia: AU, CG, GC, UA, GU, UG; 6 = nessuna coppia
+NO_PAIR = 6
+_PAIR_NAMES = ("AU", "CG", "GC", "UA", "GU", "UG")
+_CODE = {"A": 0, "C": 1, "G": 2, "U": 3}
+PAIR_TYPE = np.full((5, 5), NO_PAIR, dtype=np.int8)
+for _index, _name in enumerate(_PAIR_NAMES):
+    PAIR_TYPE[_CODE[_name[0]], _CODE[_name[1]]] = _index
+IS_AU_PAIR = np.array([1, 0, 0, 1, 1, 1, 0], dtype=np.float64)
+TERMINAL_PENALTY = np.append(IS_AU_PAIR[:NO_PAIR] * TERMINAL_AU, np.inf)
+
+# Stacking delle coppie Watson-Crick: (coppia esterna i-j, coppia interna (i+1)-(j-1))
+_WC_STACKS = {
+    ("AU", "AU"): -0.93, ("AU", "UA"): -1.10, ("UA", "AU"): -1.33,
+    ("CG", "UA"): -2.08, ("CG", "AU"): -2.11, ("GC", "UA"): -2.24,
+    ("GC", "AU"): -2.35, ("CG", "GC"): -2.36, ("GC", "GC"): -3.26,
+    ("GC", "CG"): -3.42,
+}
+
+
+def _build_stack_table() -> np.ndarray:
+    table = np.full((7, 7), np.inf)
+    for outer, outer_name in enumerate(_PAIR_NAMES):
+        for inner, inner_name in enumerate(_PAIR_NAMES):
+            # Lo stack è simmetrico: (p1, p2) equivale a (p2 rovesciata, p1 rovesciata)
+            key = (outer_name, inner_name)
+            mirrored = (inner_name[::-1], outer_name[::-1])
+            if key in _WC_STACKS or mirrored in _WC_STACKS:
+                table[outer, inner] = _WC_STACKS.get(key, _WC_STACKS.get(mirrored))
+            else:
+                # Stack con coppie G-U (valori medi)
+                wobble = ("GU" in key[0] or "UG" in key[0]), ("GU" in key[1] or "UG" in key[1])
+                other = inner_name if wobble[0] else outer_name
+                if all(wobble):
+                    table[outer, inner] = -0.3
+                else:
+                    table[outer, inner] = -1.5 if other in ("CG", "GC") else -1.0
+    return table
+
+
+STACK_ENERGY = _build_stack_table()
+
+
+def _loop_extrapolation(table: dict, size: int) -> float:
+    largest = max(table)
+    if size <= largest:
+        return table[size]
+    return table[largest] + 1.75 * _RT * math.log(size / largest)
+
+
+_HAIRPIN_INIT = {3: 5.4, 4: 5.6, 5: 5.7, 6: 5.4, 7: 6.0, 8: 5.5, 9: 6.4}
+_BULGE_INIT = {1: 3.8, 2: 2.8, 3: 3.2, 4: 3.6, 5: 4.0, 6: 4.4, 7: 4.6, 8: 4.7, 9: 4.8, 10: 4.9}
+_INTERIOR_INIT = {2: 0.5, 3: 1.6, 4: 1.1, 5: 2.0, 6: 2.0, 7: 2.2, 8: 2.3, 9: 2.4, 10: 2.5}
+
+
+def _interior_loop_combinations() -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Tutte le combinazioni (l1, l2) di basi spaiate sui due lati di bulge e loop
+    interni, con la parte di energia che non dipende dalle coppie, il peso delle
+    penalità A-U/G-U e la maschera dei bulge di una base (che mantengono lo stacking).
+    """
+    left, right, base, au_weight, single_bulge = [], [], [], [], []
+    for l1 in range(MAX_INTERIOR_LOOP + 1):
+        for l2 in range(MAX_INTERIOR_LOOP + 1 - l1):
+            if l1 == 0 and l2 == 0:
+                continue
+            left.append(l1)
+            right.append(l2)
+            if l1 == 0 or l2 == 0:
+                size = l1 + l2
+                base.append(_loop_extrapolation(_BULGE_INIT, size))
+                au_weight.append(0.0 if size == 1 else TERMINAL_AU)
+                single_bulge.append(size == 1)
+            else:
+                base.append(_loop_extrapolation(_INTERIOR_INIT, l1 + l2) + min(NINIO * abs(l1 - l2), NINIO_MAX))
+                au_weight.append(INTERIOR_AU)
+                single_bulge.append(False)
+    return (np.array(left), np.array(right), np.array(base), np.array(au_weight), np.array(single_bulge))
+
+
+LOOP_LEFT, LOOP_RIGHT, LOOP_BASE, LOOP_AU_WEIGHT, LOOP_SINGLE_BULGE = _interior_loop_combinations()
+
+
+def hairpin_energy(loop_length: int, pair_type: np.ndarray) -> np.ndarray:
+    """Energia di chiusura di forcine con `loop_length` basi spaiate, per tipo di coppia di chiusura."""
+    if loop_length < MIN_HAIRPIN_LOOP:
+        return np.full(np.shape(pair_type), np.inf)
+    init = _loop_extrapolation(_HAIRPIN_INIT, loop_length)
+    if loop_length > 3:
+        return np.full(np.shape(pair_type), init + HAIRPIN_MISMATCH)
+    return init + TERMINAL_PENALTY[pair_type]
+
+
+def _same(a: float, b: float) -> bool:
+    return abs(a - b) < 1e-6
+
+
+class FoldingMatrices:
+    """
+    Matrici della programmazione dinamica di Zuker a banda: per ogni inizio i e
+    ogni span d <= max_span, V[i, d] è l'energia minima di una struttura chiusa
+    dalla coppia (i, i + d) e WM[i, d] quella di un segmento di multiloop con
+    almeno un ramo. Ogni span viene calcolato per tutte le posizioni in un'unica
+    operazione vettoriale, per un costo complessivo O(n · max_span²).
+    """
+
+    def __init__(self, codes: np.ndarray, max_span: int):
+        n = codes.size
+        self.n = n
+        self.max_span = span = max(min(max_span, n - 1), 0)
+        padded = np.full(n + span + 3, 4, dtype=np.uint8)
+        padded[:n] = codes
+        rows = n + span + 3
+        # Tipo di coppia (i, i + d) per ogni i e d
+        offsets = np.arange(span + 1)
+        partner = np.minimum(np.arange(rows)[:, None] + offsets[None, :], rows - 1)
+        self.pair_type = PAIR_TYPE[np.minimum(padded, 4)[:, None], np.minimum(padded[partner], 4)]
+        self.V = np.full((rows, span + 1), np.inf)
+        self.WM = np.full((rows, span + 1), np.inf)
+        self._fill()
+        self.F = self._exterior()
+
+    def _fill(self) -> None:
+        V, WM, pair_type = self.V, self.WM, self.pair_type
+        for d in range(MIN_HAIRPIN_LOOP + 1, self.max_span + 1):
+            i = np.arange(self.n - d)
+            if i.size == 0:
+                break
+            pt = pair_type[i, d]
+            paired = pt != NO_PAIR
+
+            # Forcina e stacking
+            energy = hairpin_energy(d - 1, pt)
+            energy = np.minimum(energy, V[i + 1, d - 2] + STACK_ENERGY[pt, pair_type[i + 1, d - 2]])
+
+            # Bulge e loop interni: coppia interna (i + 1 + l1, j - 1 - l2)
+            inner_span = d - 2 - LOOP_LEFT - LOOP_RIGHT
+            usable = inner_span > MIN_HAIRPIN_LOOP
+            if usable.any():
+                left = LOOP_LEFT[usable]
+                inner_rows = i[:, None] + 1 + left[None, :]
+                inner_cols = np.broadcast_to(inner_span[usable][None, :], inner_rows.shape)
+                inner_pt = pair_type[inner_rows, inner_cols]
+                closure = np.where(
+                    LOOP_SINGLE_BULGE[usable][None, :],
+                    STACK_ENERGY[pt[:, None], inner_pt],
+                    LOOP_AU_WEIGHT[usable][None, :] * (IS_AU_PAIR[pt][:, None] + IS_AU_PAIR[inner_pt])
+                )
+                loops = V[inner_rows, inner_cols] + LOOP_BASE[usable][None, :] + closure
+                energy = np.minimum(energy, loops.min(axis=1))
+
+            # Multiloop chiuso da (i, j): WM[i + 1, k] + WM[k + 1, j - 1]
+            if d - 2 > 0:
+                s = np.arange(d - 2)
+                branches = WM[i[:, None] + 1, s[None, :]] + WM[i[:, None] + 2 + s[None, :], d - 3 - s[None, :]]
+                energy = np.minimum(energy, branches.min(axis=1) + ML_CLOSING + ML_BRANCH + TERMINAL_PENALTY[pt])
+
+            V[i, d] = np.where(paired, energy, np.inf)
+
+            # Segmenti di multiloop: ramo (i, j), estremo spaiato, o unione di due segmenti
+            segment = np.minimum(V[i, d] + ML_BRANCH + TERMINAL_PENALTY[pt], np.minimum(WM[i + 1, d - 1], WM[i, d - 1]))
+            s = np.arange(d)
+            splits = WM[i[:, None], s[None, :]] + WM[i[:, None] + 1 + s[None, :], d - 1 - s[None, :]]
+            WM[i, d] = np.minimum(segment, splits.min(axis=1))
+
+    def _exterior(self) -> np.ndarray:
+        """F[j]: energia minima del prefisso di lunghezza j (coppie con span <= max_span)."""
+        F = np.zeros(self.n + 1)
+        for j in range(1, self.n + 1):
+            best = F[j - 1]
+            d = np.arange(MIN_HAIRPIN_LOOP + 1, min(self.max_span, j - 1) + 1)
+            if d.size:
+                i = j - 1 - d
+                closed = F[i] + self.V[i, d] + TERMINAL_PENALTY[self.pair_type[i, d]]
+                best = min(best, float(closed.min()))
+            F[j] = best
+        return F
+
+    @property
+    def mfe(self) -> float:
+        return float(self.F[self.n]) if self.n else 0.0
+
+    def traceback(self) -> List[Tuple[int, int]]:
+        """Coppie (i, j) della struttura a energia minima."""
+        V, F, pair_type = self.V, self.F, self.pair_type
+        pairs: List[Tuple[int, int]] = []
+        stack: List[Tuple[str, int, int]] = [("F", self.n, 0)]
+        while stack:
+            kind, i, d = stack.pop()
+            if kind == "F":
+                j = i
+                if j == 0:
+                    continue
+                if _same(F[j], F[j - 1]):
+                    stack.append(("F", j - 1, 0))
+                    continue
+                for span in range(MIN_HAIRPIN_LOOP + 1, min(self.max_span, j - 1) + 1):
+                    start = j - 1 - span
+                    if _same(F[j], F[start] + V[start, span] + TERMINAL_PENALTY[pair_type[start, span]]):
+                        stack.append(("F", start, 0))
+                        stack.append(("V", start, span))
+                        break
+            elif kind == "V":
+                pairs.append((i, i + d))
+                stack.extend(self._trace_pair(i, d))
+            else:
+                stack.extend(self._trace_segment(i, d))
+        return sorted(pairs)
+
+    def _trace_pair(self, i: int, d: int) -> List[Tuple[str, int, int]]:
+        V, WM, pair_type = self.V, self.WM, self.pair_type
+        target = V[i, d]
+        pt = pair_type[i, d]
+        if _same(target, float(hairpin_energy(d - 1, pt))):
+            return []
+        if _same(target, V[i + 1, d - 2] + STACK_ENERGY[pt, pair_type[i + 1, d - 2]]):
+            return [("V", i + 1, d - 2)]
+        for left, right, base, weight, single in zip(LOOP_LEFT, LOOP_RIGHT, LOOP_BASE, LOOP_AU_WEIGHT, LOOP_SINGLE_BULGE):
+            inner_span = d - 2 - left - right
+            if inner_span <= MIN_HAIRPIN_LOOP:
+                continue
+            row = i + 1 + left
+            inner_pt = pair_type[row, inner_span]
+            closure = STACK_ENERGY[pt, inner_pt] if single else weight * (IS_AU_PAIR[pt] + IS_AU_PAIR[inner_pt])
+            if _same(target, V[row, inner_span] + base + closure):
+                return [("V", row, inner_span)]
+        for s in range(d - 2):
+            if _same(target, WM[i + 1, s] + WM[i + 2 + s, d - 3 - s] + ML_CLOSING + ML_BRANCH + TERMINAL_PENALTY[pt]):
+                return [("WM", i + 1, s), ("WM", i + 2 + s, d - 3 - s)]
+        raise RuntimeError(f"Traceback non riuscito per la coppia ({i}, {i + d})")
+
+    def _trace_segment(self, i: int, d: int) -> List[Tuple[str, int, int]]:
+        V, WM, pair_type = self.V, self.WM, self.pair_type
+        target = WM[i, d]
+        if _same(target, V[i, d] + ML_BRANCH + TERMINAL_PENALTY[pair_type[i, d]]):
+            return [("V", i, d)]
+        if d > 0 and _same(target, WM[i + 1, d - 1]):
+            return [("WM", i + 1, d - 1)]
+        if d > 0 and _same(target, WM[i, d - 1]):
+            return [("WM", i, d - 1)]
+        for s in range(d):
+            if _same(target, WM[i, s] + WM[i + 1 + s, d - 1 - s]):
+                return [("WM", i, s), ("WM", i + 1 + s, d - 1 - s)]
+        raise RuntimeError(f"Traceback non riuscito per il segmento ({i}, {i + d})")
+
+
+def dot_bracket(length: int, pairs: List[Tuple[int, int]]) -> str:
+    """Notazione a parentesi di una struttura."""
+    structure = ["."] * length
+    for i, j in pairs:
+        structure[i] = "("
+        structure[j] = ")"
+    return "".join(structure)
+
+
+class RnaFolder:
+    """
+    Ripiegamento a energia minima (MFE) di sequenze di RNA (o del trascritto di
+    sequenze di DNA, con T letta come U) in stile Zuker, con span massimo delle
+    coppie di basi limitato per mantenere il costo O(n · span²).
+    """
+
+    @staticmethod
+    def matrices(sequence: Union[str, PackedSequence], max_span: int = 100) -> FoldingMatrices:
+        return FoldingMatrices(encode_sequence(sequence), max_span)
+
+    @staticmethod
+    def mfe(sequence: Union[str, PackedSequence], max_span: int = 100) -> float:
+        """Energia libera minima (kcal/mol) senza ricostruire la struttura."""
+        if len(sequence) <= MIN_HAIRPIN_LOOP + 1:
+            return 0.0
+        return round(RnaFolder.matrices(sequence, max_span).mfe, 2)
+
+    @staticmethod
+    def stem_loop_energies(codes: np.ndarray, max_span: int = 100) -> np.ndarray:
+        """
+        Stima rapida dell'energia minima di più sequenze della stessa lunghezza
+        (matrice sequenze x basi, codici a 2 bit): l'energia della forcina singola
+        più stabile, cioè un'elica senza bulge né loop interni chiusa da un loop
+        terminale. Ogni span è calcolato per tutte le sequenze e tutte le posizioni
+        in un'unica operazione vettoriale, per un costo O(n · max_span) per
+        sequenza. La forcina è una struttura ammessa da `mfe`, quindi la stima non è
+        mai inferiore all'energia minima esatta.
+        """
+        codes = np.atleast_2d(codes)
+        count, n = codes.shape
+        energies = np.zeros(count)
+        if n <= MIN_HAIRPIN_LOOP + 1:
+            return energies
+        span = min(max_span, n - 1)
+        rows = n + span + 3
+        padded = np.full((count, rows), 4, dtype=np.uint8)
+        padded[:, :n] = np.minimum(codes, 4)
+        partner = np.minimum(np.arange(rows)[:, None] + np.arange(span + 1)[None, :], rows - 1)
+        pair_type = PAIR_TYPE[padded[:, :, None], padded[:, partner]]
+        # H[s, i, d]: elica più stabile chiusa dalla coppia (i, i + d) della sequenza s
+        H = np.full(pair_type.shape, np.inf)
+        for d in range(MIN_HAIRPIN_LOOP + 1, span + 1):
+            i = np.arange(n - d)
+            pt = pair_type[:, i, d]
+            energy = np.minimum(hairpin_energy(d - 1, pt), H[:, i + 1, d - 2] + STACK_ENERGY[pt, pair_type[:, i + 1, d - 2]])
+            H[:, i, d] = np.where(pt != NO_PAIR, energy, np.inf)
+            energies = np.minimum(energies, (H[:, i, d] + TERMINAL_PENALTY[pt]).min(axis=1))
+        return np.round(energies, 2)
+
+    @staticmethod
+    def fold(sequence: Union[str, PackedSequence], max_span: int = 100, hairpin_max_energy: float = 0.0) -> RnaFoldResult:
+        """
+        Struttura a energia minima e forcine stabili: i domini chiusi da una coppia
+        esterna (stem-loop) con energia non superiore a `hairpin_max_energy`.
+        """
+        text = str(sequence).upper()
+        if len(text) <= MIN_HAIRPIN_LOOP + 1:
+            return RnaFoldResult(sequence=text, mfe=0.0, structure="." * len(text), hairpins=[])
+        matrices = RnaFolder.matrices(text, max_span)
+        pairs = matrices.traceback()
+        structure = dot_bracket(len(text), pairs)
+        return RnaFoldResult(
+            sequence=text,
+            mfe=round(matrices.mfe, 2),
+            structure=structure,
+            hairpins=RnaFolder._stable_domains(text, structure, pairs, matrices, hairpin_max_energy)
+        )
+
+    @staticmethod
+    def _stable_domains(
+        text: str,
+        structure: str,
+        pairs: List[Tuple[int, int]],
+        matrices: FoldingMatrices,
+        max_energy: float
+    ) -> List[RnaHairpin]:
+        hairpins: List[RnaHairpin] = []
+        enclosing_end = -1
+        for i, j in pairs:
+            if i < enclosing_end:
+                continue  # Coppia interna a un dominio già considerato
+            enclosing_end = j
+            d = j - i
+            energy = float(matrices.V[i, d] + TERMINAL_PENALTY[matrices.pair_type[i, d]])
+            if energy <= max_energy:
+                hairpins.append(RnaHairpin(
+                    start=i,
+                    end=j,
+                    energy=round(energy, 2),
+                    sequence=text[i:j + 1],
+                    structure=structure[i:j + 1]
+                ))
+        return hairpins
+
+    @staticmethod
+    def region_hairpins(
+        sequence: str,
+        start: int,
+        end: int,
+        flank: int,
+        max_span: int,
+        max_energy: float
+    ) -> List[RnaHairpin]:
+        """
+        Forcine stabili che coinvolgono la regione [start, end), ripiegando la
+        regione con `flank` basi di contesto per lato. Posizioni riferite alla sequenza intera.
+        """
+        offset = max(start - flank, 0)
+        window = sequence[offset:min(end + flank, len(sequence))]
+        result = RnaFolder.fold(window, max_span=max_span, hairpin_max_energy=max_energy)
+        hits: List[RnaHairpin] = []
+        for hairpin in result.hairpins:
+            # Il dominio deve appaiare almeno una base della regione
+            paired = [offset + k + hairpin.start for k, symbol in enumerate(hairpin.structure) if symbol != "."]
+            if any(start <= position < end for position in paired):
+                hits.append(hairpin.model_copy(update={"start": hairpin.start + offset, "end": hairpin.end + offset}))
+        return hits
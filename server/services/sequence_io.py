@@ -0,0 +1,233 @@
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Tuple
+import codecs
+import mmap
+
+
+# Eventi prodotti dal parser in streaming
+RECORD_START = "record"
+SEQUENCE_DATA = "sequence"
+RECORD_END = "end"
+
+SequenceEvent = Tuple[str, Optional[str]]
+
+_GENBANK_STRIP = str.maketrans("", "", "0123456789 \t\r")
+
+
+class SequenceStreamParser:
+    """
+    Parser incrementale per FASTA e GenBank.
+
+    Riceve il testo a blocchi di dimensione arbitraria e produce eventi
+    (RECORD_START, nome), (SEQUENCE_DATA, basi), (RECORD_END, None). Le basi
+    vengono emesse appena arrivano, anche a metà riga, quindi la memoria usata
+    non dipende dalla lunghezza delle sequenze né da quella delle righe; solo le
+    righe di intestazione/annotazione vengono accumulate fino al ritorno a capo.
+    Con fmt="auto" il formato è dedotto dalla prima riga (">" FASTA, "LOCUS" GenBank,
+    altrimenti sequenza grezza).
+    """
+
+    def __init__(self, fmt: str = "auto"):
+        if fmt not in ("auto", "fasta", "genbank"):
+            raise ValueError(f"Formato non supportato: {fmt}")
+        self.fmt = fmt
+        self._line_start = True
+        self._partial_line: Optional[str] = None
+        self._in_record = False
+        self._in_origin = False
+        self._record_count = 0
+
+    def feed(self, text: str) -> List[SequenceEvent]:
+        """Elabora un blocco di testo e restituisce gli eventi completati."""
+        events: List[SequenceEvent] = []
+        position = 0
+        length = len(text)
+        while position < length:
+            newline = text.find("\n", position)
+            complete = newline != -1
+            end = newline if complete else length
+            self._consume(text[position:end], complete, events)
+            position = end + 1 if complete else length
+        return SequenceStreamParser._merge_sequence_events(events)
+
+    def close(self) -> List[SequenceEvent]:
+        """Segnala la fine dell'input, chiudendo l'eventuale record aperto."""
+        events: List[SequenceEvent] = []
+        if self._partial_line is not None:
+            line, self._partial_line = self._partial_line, None
+            self._process_line(line, events)
+        if self._in_record:
+            self._end_record(events)
+        return SequenceStreamParser._merge_sequence_events(events)
+
+    def _consume(self, piece: str, complete: bool, events: List[SequenceEvent]) -> None:
+        if self._partial_line is not None:
+            self._partial_line += piece
+            if complete:
+                line, self._partial_line = self._partial_line, None
+                self._process_line(line, events)
+            return
+
+        if self._line_start:
+            stripped = piece.lstrip()
+            if not stripped:
+                return
+            if self.fmt == "auto" and stripped:
+                if not complete and len(stripped) < 5 and "LOCUS".startswith(stripped):
+                    # Non è ancora possibile distinguere GenBank da una sequenza grezza
+                    self._partial_line = piece
+                    return
+                self.fmt = "genbank" if stripped.startswith("LOCUS") else "fasta"
+            if self.fmt == "genbank" and self._in_origin and stripped[:1].isdigit():
+                # Riga di sequenza GenBank (inizia con la numerazione): le basi
+                # vengono emesse anche a metà riga
+                pass
+            elif self.fmt == "genbank" or stripped[:1] in (">", ";"):
+                # Righe di intestazione o annotazione: servono intere
+                if complete:
+                    self._process_line(piece, events)
+                else:
+                    self._partial_line = piece
+                return
+
+        # Basi (eventualmente la continuazione di una riga già iniziata)
+        self._emit_sequence(self._clean_bases(piece), events)
+        self._line_start = complete
+
+    def _process_line(self, line: str, events: List[SequenceEvent]) -> None:
+        self._line_start = True
+        stripped = line.strip()
+        if not stripped:
+            return
+        if self.fmt == "auto":
+            self.fmt = "genbank" if stripped.startswith("LOCUS") else "fasta"
+
+        if self.fmt == "fasta":
+            if stripped.startswith(";"):
+                return
+            if stripped.startswith(">"):
+                if self._in_record:
+                    self._end_record(events)
+                self._start_record(stripped[1:].strip() or None, events)
+                return
+            self._emit_sequence("".join(stripped.split()), events)
+            return
+
+        if stripped.startswith("LOCUS"):
+            if self._in_record:
+                self._end_record(events)
+            tokens = stripped.split()
+            self._start_record(tokens[1] if len(tokens) > 1 else None, events)
+        elif stripped.startswith("ORIGIN"):
+            self._in_origin = True
+        elif stripped.startswith("//"):
+            if self._in_record:
+                self._end_record(events)
+        elif self._in_origin:
+            self._emit_sequence(self._clean_bases(stripped), events)
+
+    def _clean_bases(self, text: str) -> str:
+        """Rimuove spazi (e in GenBank la numerazione delle righe) da un frammento di sequenza."""
+        if self.fmt == "genbank":
+            return text.translate(_GENBANK_STRIP)
+        return "".join(text.split())
+
+    def _start_record(self, name: Optional[str], events: List[SequenceEvent]) -> None:
+        self._record_count += 1
+        self._in_record = True
+        self._in_origin = False
+        events.append((RECORD_START, name or f"sequence_{self._record_count}"))
+
+    def _end_record(self, events: List[SequenceEvent]) -> None:
+        self._in_record = False
+        self._in_origin = False
+        events.append((RECORD_END, None))
+
+    def _emit_sequence(self, bases: str, events: List[SequenceEvent]) -> None:
+        if not bases:
+            return
+        if not self._in_record:
+            # Sequenza senza intestazione: viene trattata come un record anonimo
+            self._start_record(None, events)
+        events.append((SEQUENCE_DATA, bases))
+
+    @staticmethod
+    def _merge_sequence_events(events: List[SequenceEvent]) -> List[SequenceEvent]:
+        """Unisce gli eventi SEQUENCE_DATA consecutivi (una riga FASTA ciascuno) in un solo blocco."""
+        merged: List[SequenceEvent] = []
+        pending: List[str] = []
+        for kind, value in events:
+            if kind == SEQUENCE_DATA:
+                pending.append(value)
+                continue
+            if pending:
+                merged.append((SEQUENCE_DATA, "".join(pending)))
+                pending = []
+            merged.append((kind, value))
+        if pending:
+            merged.append((SEQUENCE_DATA, "".join(pending)))
+        return merged
+
+
+class FastaParser:
+    """
+    Parser FASTA incrementale a livello di record: riceve il testo a blocchi
+    (anche spezzati a metà riga) e restituisce i record completi man mano che
+    vengono chiusi dall'intestazione successiva o da `close()`.
+    """
+
+    def __init__(self):
+        self._parser = SequenceStreamParser("fasta")
+        self._name: Optional[str] = None
+        self._parts: List[str] = []
+
+    def feed(self, chunk: str) -> List[Tuple[str, str]]:
+        """Aggiunge un blocco di testo e restituisce i record (nome, sequenza) completati."""
+        return self._collect(self._parser.feed(chunk))
+
+    def close(self) -> List[Tuple[str, str]]:
+        """Segnala la fine dell'input e restituisce l'ultimo record."""
+        return self._collect(self._parser.close())
+
+    def _collect(self, events: List[SequenceEvent]) -> List[Tuple[str, str]]:
+        records: List[Tuple[str, str]] = []
+        for kind, value in events:
+            if kind == RECORD_START:
+                self._name = value
+            elif kind == SEQUENCE_DATA:
+                self._parts.append(value)
+            else:
+                records.append((self._name, "".join(self._parts)))
+                self._name = None
+                self._parts = []
+        return records
+
+
+def iter_fasta_records(chunks: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """Itera i record (nome, sequenza) di un input FASTA fornito a blocchi di testo."""
+    parser = FastaParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def parse_fasta(text: str) -> List[Tuple[str, str]]:
+    """Legge tutti i record di un testo FASTA."""
+    return list(iter_fasta_records([text]))
+
+
+def iter_mapped_text(file: BinaryIO, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Legge un file tramite memory map, restituendo blocchi di testo decodificati.
+    Le pagine vengono caricate dal sistema operativo su richiesta, per cui anche
+    file di genomi completi non vengono mai copiati interamente in memoria.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    file.seek(0, 2)
+    if file.tell() == 0:
+        return
+    with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for offset in range(0, len(mapped), chunk_size):
+            yield decoder.decode(mapped[offset:offset + chunk_size])
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
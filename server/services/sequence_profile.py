@@ -0,0 +1,151 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from server.models.sequence_analysis import SequenceProfile, SequenceRegion
+from server.services.packed_sequence import PackedSequence, INVALID_BASE_CODE
+
+
+class SequenceProfiler:
+    """
+    Profili a finestra scorrevole di una sequenza nucleotidica: contenuto GC,
+    entropia di Shannon e complessità linguistica.
+
+    Tutti i profili sono O(n) per qualsiasi finestra e passo: GC ed entropia
+    tramite somme cumulative, la complessità linguistica contando i k-mer
+    distinti per finestra con un array delle differenze (per ogni k).
+    """
+
+    @staticmethod
+    def window_starts(length: int, window: int, step: int = 1) -> np.ndarray:
+        """Posizioni di inizio (0-based) delle finestre complete."""
+        if window <= 0 or step <= 0:
+            raise ValueError("Finestra e passo devono essere positivi.")
+        if length < window:
+            return np.empty(0, dtype=np.int64)
+        return np.arange(0, length - window + 1, step, dtype=np.int64)
+
+    @staticmethod
+    def _window_sums(mask: np.ndarray, starts: np.ndarray, window: int) -> np.ndarray:
+        cumulative = np.zeros(mask.size + 1, dtype=np.int64)
+        np.cumsum(mask, out=cumulative[1:])
+        return cumulative[starts + window] - cumulative[starts]
+
+    @staticmethod
+    def gc_profile(codes: np.ndarray, window: int, step: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """Contenuto GC (%) di ogni finestra; restituisce (inizi, valori)."""
+        starts = SequenceProfiler.window_starts(codes.size, window, step)
+        gc = SequenceProfiler._window_sums((codes == 1) | (codes == 2), starts, window)
+        return starts, gc * 100.0 / window
+
+    @staticmethod
+    def entropy_profile(codes: np.ndarray, window: int, step: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Entropia di Shannon (bit, massimo 2) della composizione di ogni finestra,
+        calcolata sulle sole basi valide.
+        """
+        starts = SequenceProfiler.window_starts(codes.size, window, step)
+        counts = np.stack([SequenceProfiler._window_sums(codes == base, starts, window) for base in range(4)])
+        totals = counts.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = counts / np.maximum(totals, 1)
+            terms = np.where(p > 0, -p * np.log2(np.where(p > 0, p, 1.0)), 0.0)
+        return starts, terms.sum(axis=0)
+
+    @staticmethod
+    def _distinct_kmers_per_window(kmers: np.ndarray, invalid: np.ndarray, k: int, window: int) -> np.ndarray:
+        """
+        Numero di k-mer distinti in ogni finestra [s, s + window), per ogni s, dati
+        gli indici dei k-mer in ogni posizione e la maschera di quelli non validi.
+        Un'occorrenza in i con occorrenza precedente dello stesso k-mer in p è la
+        prima della finestra s se p < s <= i e i + k <= s + window: contribuisce
+        quindi a un intervallo contiguo di finestre, aggiunto con un array delle
+        differenze. I k-mer con basi non valide non vengono contati.
+        """
+        windows = kmers.size + k - window
+        valid = ~invalid
+        positions = np.flatnonzero(valid).astype(np.int32) if invalid.any() else np.arange(kmers.size, dtype=np.int32)
+        if positions.size == 0:
+            return np.zeros(windows, dtype=np.int64)
+        if positions.size != kmers.size:
+            kmers = kmers[valid]
+
+        # Occorrenza precedente dello stesso k-mer: nell'ordinamento stabile per
+        # valore è l'elemento precedente, se ha lo stesso k-mer. I contributi non
+        # dipendono dall'ordine, per cui si resta nell'ordine ordinato.
+        order = np.argsort(kmers, kind="stable")
+        sorted_kmers = kmers[order]
+        positions = positions[order]
+        previous = np.empty(positions.size, dtype=np.int32)
+        previous[0] = -1
+        previous[1:] = np.where(sorted_kmers[1:] == sorted_kmers[:-1], positions[:-1], -1)
+
+        # Intervallo di finestre [lo, hi] per ogni occorrenza, con hi = min(i, windows - 1).
+        # Gli intervalli vuoti diventano [hi + 1, hi]: +1 e -1 nello stesso punto si
+        # annullano, per cui la parte -1 non dipende da lo e si calcola nell'ordine del testo.
+        hi_plus_one = np.minimum(positions, windows - 1) + 1
+        lo = np.minimum(np.maximum(np.maximum(previous + 1, positions + (k - window)), 0), hi_plus_one)
+        ends = np.zeros(windows, dtype=np.int64)
+        ends[1:] = valid[:windows - 1]
+        return np.cumsum(np.bincount(lo, minlength=windows + 1)[:windows] - ends)
+
+    @staticmethod
+    def linguistic_complexity_profile(codes: np.ndarray, window: int, step: int = 1, max_k: int = 6) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Complessità linguistica di ogni finestra: somma su k = 1..max_k dei k-mer
+        distinti osservati, divisa per il massimo possibile min(4^k, window - k + 1).
+        Vale 1 per una finestra di massima varietà e tende a 0 per le ripetizioni
+        a basso contenuto informativo (omopolimeri, ripetizioni di di/trinucleotidi).
+        """
+        starts = SequenceProfiler.window_starts(codes.size, window, step)
+        if starts.size == 0:
+            return starts, np.empty(0)
+        observed = np.zeros(starts.size, dtype=np.int64)
+        possible = 0
+        # Gli indici dei k-mer sono estesi di una base per volta; con k <= 7 stanno
+        # in 16 bit e l'ordinamento stabile di NumPy diventa un radix sort.
+        kmers = (codes & 3).astype(np.int16 if max_k <= 7 else np.int64)
+        invalid = codes == INVALID_BASE_CODE
+        for k in range(1, min(max_k, window) + 1):
+            if k > 1:
+                kmers = kmers[:-1] * 4 + (codes[k - 1:] & 3)
+                invalid = invalid[:-1] | (codes[k - 1:] == INVALID_BASE_CODE)
+            observed += SequenceProfiler._distinct_kmers_per_window(kmers, invalid, k, window)[starts]
+            possible += min(4 ** k, window - k + 1)
+        return starts, observed / possible
+
+    @staticmethod
+    def profile(sequence: Union[str, PackedSequence], window: int = 50, step: int = 1, max_k: int = 6) -> SequenceProfile:
+        """Profili GC, entropia e complessità linguistica con la stessa finestra e lo stesso passo."""
+        codes = PackedSequence.coerce(sequence).codes()
+        starts, gc = SequenceProfiler.gc_profile(codes, window, step)
+        _, entropy = SequenceProfiler.entropy_profile(codes, window, step)
+        _, complexity = SequenceProfiler.linguistic_complexity_profile(codes, window, step, max_k)
+        return SequenceProfile(
+            window=window,
+            step=step,
+            positions=starts.tolist(),
+            gc_content=np.round(gc, 2).tolist(),
+            entropy=np.round(entropy, 4).tolist(),
+            linguistic_complexity=np.round(complexity, 4).tolist()
+        )
+
+    @staticmethod
+    def violating_regions(starts: np.ndarray, values: np.ndarray, window: int, violating: np.ndarray) -> List[SequenceRegion]:
+        """
+        Unisce le finestre che violano una soglia in regioni contigue (finestre
+        sovrapposte o adiacenti), riportando per ognuna il minimo e il massimo del valore.
+        """
+        hits = np.flatnonzero(violating)
+        if hits.size == 0:
+            return []
+        hit_starts = starts[hits]
+        breaks = np.flatnonzero(hit_starts[1:] > hit_starts[:-1] + window) + 1
+        group_bounds = np.concatenate(([0], breaks))
+        group_ends = np.concatenate((breaks, [hits.size])) - 1
+        minima = np.minimum.reduceat(values[hits], group_bounds)
+        maxima = np.maximum.reduceat(values[hits], group_bounds)
+        return [
+            SequenceRegion(start=int(hit_starts[b]), end=int(hit_starts[e]) + window - 1, min_value=round(float(lo), 4), max_value=round(float(hi), 4))
+            for b, e, lo, hi in zip(group_bounds.tolist(), group_ends.tolist(), minima, maxima)
+        ]
@@ -1,41 +1,283 @@
 from typing import List, Dict, Any, Optional, Tuple
+from functools import cached_property
 import re
 
+import numpy as np
+
 from server.models.sequence_analysis import (
     SequenceType,
+    SequenceAnalysis,
     SequenceValidationResult,
     SequenceValidationIssue,
     SequenceStatistics,
     ORF,
     RepeatSequence,
-    PalindromicSequence
+    PalindromicSequence,
+    SequenceRegion,
+    MotifHit,
+    RnaHairpin,
+    ProteinProperties
 )
-
-# Codice genetico standard
-GENETIC_CODE: Dict[str, str] = {
-    'TTT': 'F', 'TTC': 'F', 'TTA': 'L', 'TTG': 'L',
-    'CTT': 'L', 'CTC': 'L', 'CTA': 'L', 'CTG': 'L',
-    'ATT': 'I', 'ATC': 'I', 'ATA': 'I', 'ATG': 'M',
-    'GTT': 'V', 'GTC': 'V', 'GTA': 'V', 'GTG': 'V',
-    'TCT': 'S', 'TCC': 'S', 'TCA': 'S', 'TCG': 'S',
-    'CCT': 'P', 'CCC': 'P', 'CCA': 'P', 'CCG': 'P',
-    'ACT': 'T', 'ACC': 'T', 'ACA': 'T', 'ACG': 'T',
-    'GCT': 'A', 'GCC': 'A', 'GCA': 'A', 'GCG': 'A',
-    'TAT': 'Y', 'TAC': 'Y', 'TAA': '*', 'TAG': '*', # * = Stop codon
-    'CAT': 'H', 'CAC': 'H', 'CAA': 'Q', 'CAG': 'Q',
-    'AAT': 'N', 'AAC': 'N', 'AAA': 'K', 'AAG': 'K',
-    'GAT': 'D', 'GAC': 'D', 'GAA': 'E', 'GAG': 'E',
-    'TGT': 'C', 'TGC': 'C', 'TGA': '*', 'TGG': 'W', # * = Stop codon
-    'CGT': 'R', 'CGC': 'R', 'CGA': 'R', 'CGG': 'R',
-    'AGT': 'S', 'AGC': 'S', 'AGA': 'R', 'AGG': 'R',
-    'GGT': 'G', 'GGC': 'G', 'GGA': 'G', 'GGG': 'G',
-}
+from server.services.orf_finder import OrfFinder
+from server.services.genetic_code import STANDARD_CODE, get_genetic_code
+from server.services.packed_sequence import PackedSequence
+from server.services.sequence_profile import SequenceProfiler
+from server.services.motif_scanner import MotifScanner
+from server.services.rna_folding import RnaFolder
+from server.services.protein_analysis import ProteinAnalyzer, INSTABILITY_THRESHOLD
+from server.services.repeat_finder import RepeatFinder
+from server.services.palindrome_finder import PalindromeFinder
+from server.services.analysis_budget import TimeBudget
+from app.core.config import settings
+
+# Codice genetico standard (tabella NCBI 1)
+GENETIC_CODE: Dict[str, str] = STANDARD_CODE.codon_table
 
 STANDARD_AMINO_ACIDS: set[str] = set("ACDEFGHIKLMNPQRSTVWY")
 DNA_BASES: set[str] = set("ATGC")
 RNA_BASES: set[str] = set("AUGC")
 START_CODONS: List[str] = ["ATG"] # Per DNA
-STOP_CODONS: List[str] = ["TAA", "TAG", "TGA"] # Per DNA
+STOP_CODONS: List[str] = STANDARD_CODE.stop_codons # Per DNA (TAA, TAG, TGA)
+MAX_REPORTED_REPEATS: int = 100 # Ripetizioni riportate al massimo (le più lunghe)
+MAX_REPORTED_REGIONS: int = 100 # Regioni (GC locale, bassa complessità) riportate al massimo nei dettagli
+MAX_REPORTED_MOTIF_HITS: int = 100 # Occorrenze di motivi elencate al massimo nei dettagli
+REPEAT_MIN_LENGTH: int = 10 # Lunghezza minima delle ripetizioni riportate
+PALINDROME_MIN_LENGTH: int = 6 # Lunghezza minima dei palindromi riportati
+ALL_ANALYSES: List[SequenceAnalysis] = list(SequenceAnalysis)
+
+
+def _valid_character_table(characters: set[str]) -> np.ndarray:
+    """Tabella di lookup (256 byte) dei caratteri ammessi, per i controlli vettorizzati."""
+    table = np.zeros(256, dtype=bool)
+    for char in characters:
+        table[ord(char)] = True
+    return table
+
+
+VALID_CHARACTER_TABLES: Dict[SequenceType, np.ndarray] = {
+    SequenceType.DNA: _valid_character_table(DNA_BASES),
+    SequenceType.RNA: _valid_character_table(RNA_BASES),
+    SequenceType.PROTEIN: _valid_character_table(STANDARD_AMINO_ACIDS),
+}
+
+
+class LazySequenceStats:
+    """
+    Statistiche di una sequenza calcolate su richiesta.
+
+    I controlli rapidi (lunghezza, GC, caratteri non validi, codoni di start/stop)
+    sono operazioni vettorizzate a costo lineare; ORF, ripetizioni e palindromi
+    vengono calcolati solo al primo accesso, ognuno con il proprio budget di tempo.
+    Le analisi interrotte dal budget restituiscono risultati parziali e vengono
+    elencate in `partial_analyses`.
+    """
+
+    def __init__(
+        self,
+        sequence: str,
+        sequence_type: SequenceType,
+        min_protein_len_orf: int = 25,
+        time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None,
+        inverted_repeat_max_spacer: int = 0,
+        motif_library: Optional[str] = None,
+        genetic_code: int = 1,
+        alternative_starts: bool = False
+    ):
+        self.sequence = sequence
+        self.sequence_type = sequence_type
+        self.min_protein_len_orf = min_protein_len_orf
+        self.time_budgets_ms = time_budgets_ms or {}
+        self.inverted_repeat_max_spacer = inverted_repeat_max_spacer
+        self.motif_library = motif_library or settings.MOTIF_DEFAULT_LIBRARY
+        self.genetic_code = get_genetic_code(genetic_code)
+        self.alternative_starts = alternative_starts
+        self.partial_analyses: List[SequenceAnalysis] = []
+
+    def prime(self, **values: Any) -> None:
+        """
+        Imposta valori già noti (ad esempio aggiornati in modo incrementale),
+        che non verranno ricalcolati al primo accesso.
+        """
+        self.__dict__.update(values)
+
+    def budget_for(self, analysis: SequenceAnalysis) -> TimeBudget:
+        """Nuovo budget di tempo per un'analisi (valore della richiesta o default di configurazione)."""
+        return TimeBudget.from_ms(self.time_budgets_ms.get(analysis, settings.SEQUENCE_ANALYSIS_TIME_BUDGET_MS))
+
+    def _run_with_budget(self, analysis: SequenceAnalysis, run):
+        budget = self.budget_for(analysis)
+        result = run(budget)
+        if budget.exhausted:
+            self.partial_analyses.append(analysis)
+        return result
+
+    @property
+    def is_nucleotide(self) -> bool:
+        return self.sequence_type in [SequenceType.DNA, SequenceType.RNA]
+
+    @property
+    def length(self) -> int:
+        return len(self.sequence)
+
+    @cached_property
+    def packed(self) -> PackedSequence:
+        """Sequenza compressa a 2 bit, condivisa da GC e ORF (solo per DNA/RNA)."""
+        return PackedSequence.from_string(self.sequence)
+
+    @cached_property
+    def gc_content(self) -> float:
+        if not self.is_nucleotide:
+            return 0.0
+        return round(self.packed.gc_content(), 2)
+
+    @cached_property
+    def invalid_positions(self) -> List[int]:
+        """Posizioni (1-based) dei caratteri non validi."""
+        return SequenceValidator._find_invalid_character_positions(self.sequence, self.sequence_type)
+
+    @property
+    def invalid_bases(self) -> int:
+        return len(self.invalid_positions)
+
+    @cached_property
+    def start_codon(self) -> bool:
+        """
+        True se la sequenza inizia con un codone di start (ATG, o qualsiasi codone di
+        inizio del codice genetico con alternative_starts) o con Met per le proteine.
+        """
+        if self.sequence_type == SequenceType.PROTEIN:
+            return self.sequence.startswith("M")
+        start_codons = self.genetic_code.start_codons if self.alternative_starts else START_CODONS
+        return self.sequence.replace("U", "T")[:3] in start_codons
+
+    @cached_property
+    def stop_codon(self) -> bool:
+        """True se la sequenza termina con un codone di stop in frame."""
+        if not self.is_nucleotide or len(self.sequence) < 3 or len(self.sequence) % 3 != 0:
+            return False
+        return self.sequence[-3:].replace("U", "T") in self.genetic_code.stop_codons
+
+    @cached_property
+    def codes(self) -> np.ndarray:
+        """Codici a 2 bit per base, condivisi dai profili a finestra."""
+        return self.packed.codes()
+
+    @cached_property
+    def local_gc_regions(self) -> List[SequenceRegion]:
+        """Regioni in cui il GC di una finestra di LOCAL_GC_WINDOW basi esce dai limiti."""
+        if not self.is_nucleotide:
+            return []
+        starts, gc = SequenceProfiler.gc_profile(self.codes, settings.LOCAL_GC_WINDOW)
+        # Regioni a GC basso e alto separate, anche se adiacenti
+        regions = SequenceProfiler.violating_regions(starts, gc, settings.LOCAL_GC_WINDOW, gc < settings.LOCAL_GC_MIN)
+        regions += SequenceProfiler.violating_regions(starts, gc, settings.LOCAL_GC_WINDOW, gc > settings.LOCAL_GC_MAX)
+        return sorted(regions, key=lambda r: r.start)
+
+    @cached_property
+    def low_complexity_regions(self) -> List[SequenceRegion]:
+        """
+        Regioni a bassa complessità: finestre con complessità linguistica o entropia
+        sotto soglia. I valori riportati sono quelli della complessità linguistica.
+        """
+        if not self.is_nucleotide:
+            return []
+        window = settings.COMPLEXITY_WINDOW
+        starts, complexity = SequenceProfiler.linguistic_complexity_profile(self.codes, window, max_k=settings.COMPLEXITY_MAX_K)
+        _, entropy = SequenceProfiler.entropy_profile(self.codes, window)
+        violating = (complexity < settings.COMPLEXITY_MIN_LINGUISTIC) | (entropy < settings.COMPLEXITY_MIN_ENTROPY)
+        return SequenceProfiler.violating_regions(starts, complexity, window, violating)
+
+    @cached_property
+    def motif_hits(self) -> List[MotifHit]:
+        """Occorrenze dei motivi della libreria su entrambi i filamenti (automa in cache)."""
+        if not self.is_nucleotide:
+            return []
+        return MotifScanner.scan(self.packed, library=self.motif_library)
+
+    @cached_property
+    def start_hairpins(self) -> List[RnaHairpin]:
+        """
+        Forcine stabili (energia <= FOLDING_HAIRPIN_MAX_ENERGY) che appaiano basi
+        della regione di inizio della traduzione (RBS a monte, codone di start e
+        primi codoni), ripiegando una finestra attorno a ogni start: quello
+        iniziale se presente, altrimenti quelli degli ORF sul filamento forward.
+        Le sequenze corte senza start (RBS, 5' UTR) vengono ripiegate per intero.
+        """
+        if not self.is_nucleotide:
+            return []
+        upstream, downstream = settings.FOLDING_START_UPSTREAM, settings.FOLDING_START_DOWNSTREAM
+        if self.start_codon:
+            starts = [0]
+        else:
+            starts = sorted({orf.start for orf in self.open_reading_frames if orf.direction == "forward"})
+        regions = [(max(start - upstream, 0), min(start + downstream, self.length)) for start in starts[:settings.FOLDING_MAX_START_REGIONS]]
+        if not regions and self.length <= 2 * settings.FOLDING_FLANK:
+            regions = [(0, self.length)]
+        hairpins: Dict[Tuple[int, int], RnaHairpin] = {}
+        for start, end in regions:
+            for hairpin in RnaFolder.region_hairpins(
+                self.sequence, start, end,
+                flank=settings.FOLDING_FLANK,
+                max_span=settings.FOLDING_MAX_SPAN,
+                max_energy=settings.FOLDING_HAIRPIN_MAX_ENERGY
+            ):
+                hairpins.setdefault((hairpin.start, hairpin.end), hairpin)
+        return [hairpins[key] for key in sorted(hairpins)]
+
+    @cached_property
+    def protein_properties(self) -> Optional[ProteinProperties]:
+        """Proprietà fisico-chimiche (massa, pI, GRAVY, instabilità), solo per le proteine."""
+        if self.sequence_type != SequenceType.PROTEIN:
+            return None
+        return ProteinAnalyzer.analyze(self.sequence)
+
+    @cached_property
+    def open_reading_frames(self) -> List[ORF]:
+        if self.sequence_type != SequenceType.DNA: # ORF sono definiti per DNA
+            return []
+        return self._run_with_budget(SequenceAnalysis.ORFS, lambda budget: OrfFinder.find_orfs(
+            self.packed, min_protein_len=self.min_protein_len_orf, budget=budget,
+            genetic_code=self.genetic_code.table_id, alternative_starts=self.alternative_starts
+        ))
+
+    @cached_property
+    def repeats(self) -> List[RepeatSequence]:
+        if not self.is_nucleotide or len(self.sequence) < REPEAT_MIN_LENGTH + 1:
+            return []
+        return self._run_with_budget(SequenceAnalysis.REPEATS, lambda budget: RepeatFinder.find_repeats(
+            self.sequence, min_length=REPEAT_MIN_LENGTH, min_count=2, max_results=MAX_REPORTED_REPEATS, budget=budget
+        ))
+
+    @cached_property
+    def palindromes(self) -> List[PalindromicSequence]:
+        if not self.is_nucleotide:
+            return []
+        return self._run_with_budget(SequenceAnalysis.PALINDROMES, lambda budget: SequenceValidator._find_palindromes(
+            self.sequence, min_length=PALINDROME_MIN_LENGTH, max_spacer=self.inverted_repeat_max_spacer, budget=budget
+        ))
+
+    def to_model(self, analyses: Optional[List[SequenceAnalysis]] = None) -> SequenceStatistics:
+        """
+        Costruisce SequenceStatistics calcolando solo le analisi richieste;
+        quelle non richieste restano None.
+        """
+        requested = set(ALL_ANALYSES if analyses is None else analyses)
+        return SequenceStatistics(
+            length=self.length,
+            gc_content=self.gc_content,
+            invalid_bases=self.invalid_bases,
+            start_codon=self.start_codon,
+            stop_codon=self.stop_codon,
+            open_reading_frames=self.open_reading_frames if SequenceAnalysis.ORFS in requested else None,
+            repeats=self.repeats if SequenceAnalysis.REPEATS in requested else None,
+            palindromes=self.palindromes if SequenceAnalysis.PALINDROMES in requested else None,
+            # Calcolate prima di partial_analyses: possono richiedere gli ORF (con budget)
+            start_hairpins=self.start_hairpins if SequenceAnalysis.SECONDARY_STRUCTURE in requested else None,
+            partial_analyses=list(self.partial_analyses) or None,
+            motif_hits=self.motif_hits if SequenceAnalysis.MOTIFS in requested else None,
+            protein_properties=self.protein_properties
+        )
+
 
 class SequenceValidator:
     """
@@ -69,92 +311,26 @@ class SequenceValidator:
         """Calcola manualmente il contenuto GC di una sequenza DNA o RNA."""
         if not sequence or sequence_type not in [SequenceType.DNA, SequenceType.RNA]:
             return 0.0
-        
-        seq_upper = sequence.upper()
-        g_count = seq_upper.count('G')
-        c_count = seq_upper.count('C')
-        
-        if len(seq_upper) == 0:
-            return 0.0
-        return ((g_count + c_count) / len(seq_upper)) * 100
+        return PackedSequence.from_string(sequence).gc_content()
+
+    @staticmethod
+    def _invalid_character_mask(sequence: str, sequence_type: SequenceType) -> np.ndarray:
+        """Maschera dei caratteri non validi, calcolata con una tabella di lookup."""
+        table = VALID_CHARACTER_TABLES.get(sequence_type)
+        raw = np.frombuffer(sequence.upper().encode("ascii", errors="replace"), dtype=np.uint8)
+        if table is None:
+            return np.ones(raw.size, dtype=bool)
+        return ~table[raw]
 
     @staticmethod
     def _count_invalid_characters(sequence: str, sequence_type: SequenceType) -> int:
         """Conta i caratteri non validi in una sequenza."""
-        valid_set = set()
-        if sequence_type == SequenceType.DNA:
-            valid_set = DNA_BASES
-        elif sequence_type == SequenceType.RNA:
-            valid_set = RNA_BASES
-        elif sequence_type == SequenceType.PROTEIN:
-            valid_set = STANDARD_AMINO_ACIDS
-        
-        count = 0
-        seq_upper = sequence.upper() # Assicurati che sequence sia una stringa
-        for char in seq_upper:
-            if char not in valid_set:
-                count += 1
-        return count
+        return int(np.count_nonzero(SequenceValidator._invalid_character_mask(sequence, sequence_type)))
 
     @staticmethod
     def _find_invalid_character_positions(sequence: str, sequence_type: SequenceType) -> List[int]:
         """Trova le posizioni (1-based) dei caratteri non validi."""
-        positions: List[int] = []
-        valid_set = set()
-        if sequence_type == SequenceType.DNA:
-            valid_set = DNA_BASES
-        elif sequence_type == SequenceType.RNA:
-            valid_set = RNA_BASES
-        elif sequence_type == SequenceType.PROTEIN:
-            valid_set = STANDARD_AMINO_ACIDS
-        
-        seq_upper = sequence.upper() # Assicurati che sequence sia una stringa
-        for i, char in enumerate(seq_upper):
-            if char not in valid_set:
-                positions.append(i + 1)
-        return positions
-
-    @staticmethod
-    def _translate_sequence_to_protein(dna_sequence: str, frame: int, direction: str) -> Tuple[str, int, int]:
-        """
-        Traduce una sequenza di DNA in una proteina, partendo da un frame specifico.
-        Restituisce la proteina, l'indice di inizio (0-based) nella sequenza DNA originale,
-        e l'indice di fine (0-based) nella sequenza DNA originale.
-        Nota: la sequenza DNA in input è già orientata (forward o reverse complement).
-        """
-        protein = []
-        start_index_in_dna = -1
-        # frame è l'offset 0, 1, or 2. direction è "forward" o "reverse"
-        # La dna_sequence passata qui è già la sequenza[frame:] o il suo rev_comp[frame:]
-        
-        for i in range(0, len(dna_sequence) - 2, 3):
-            codon = dna_sequence[i:i+3]
-            # Non chiamare self._translate_codon perché siamo in un metodo statico
-            # e GENETIC_CODE è globale.
-            amino_acid = SequenceValidator._translate_codon(codon) 
-            
-            if amino_acid == 'M' and not protein: # Inizio potenziale
-                protein.append(amino_acid)
-                start_index_in_dna = i 
-            elif protein: # Continua la traduzione se abbiamo già iniziato
-                if amino_acid == '*': # Stop codon
-                    end_index_in_dna = i + 2 
-                    return "".join(protein), start_index_in_dna, end_index_in_dna
-                elif amino_acid:
-                    protein.append(amino_acid)
-                else: # Codone non valido incontrato dopo l'inizio (es. contiene N)
-                    # In questo caso, l'ORF è interrotto e non valido da questo punto.
-                    return "", -1, -1 
-        
-        # Se non c'è stop codon e l'ORF è iniziato, potrebbe essere parziale
-        if protein and start_index_in_dna != -1:
-            end_index_in_dna = i + 2 # Fine dell'ultimo codone completo tradotto
-            # Verifica che end_index_in_dna non superi la lunghezza della sequenza DNA
-            if end_index_in_dna >= len(dna_sequence):
-                end_index_in_dna = len(dna_sequence) -1 
-            return "".join(protein), start_index_in_dna, end_index_in_dna
-
-        return "", -1, -1 # Nessun ORF valido trovato
+        return (np.flatnonzero(SequenceValidator._invalid_character_mask(sequence, sequence_type)) + 1).tolist()
 
     @staticmethod
     def _find_open_reading_frames(sequence: str, min_protein_len: int = 25) -> List[ORF]:
@@ -162,283 +338,110 @@ class SequenceValidator:
         Trova Open Reading Frames (ORF) in una sequenza di DNA in tutti e 6 i frame.
         Un ORF inizia con un codone di start (ATG), termina con un codone di stop,
         e codifica per una proteina di lunghezza minima specificata.
+        La ricerca è delegata a OrfFinder, che lavora sulla sequenza codificata con NumPy.
         """
         if not sequence or len(sequence) < 3:
             return []
-        
-        orfs: List[ORF] = []
-        sequence_upper = sequence.upper()
-        
-        # Frames forward (0, 1, 2)
-        for frame_offset in range(3):
-            dna_sub_sequence_fwd = sequence_upper[frame_offset:]
-            current_pos_in_sub_fwd = 0
-            while current_pos_in_sub_fwd < len(dna_sub_sequence_fwd):
-                atg_pos = dna_sub_sequence_fwd.find("ATG", current_pos_in_sub_fwd)
-                if atg_pos == -1 or atg_pos % 3 != 0: 
-                    break 
-
-                protein, orf_start_rel_to_atg, orf_end_rel_to_atg = SequenceValidator._translate_sequence_to_protein(
-                    dna_sub_sequence_fwd[atg_pos:], frame=0, direction="forward"
-                )
-
-                if protein and len(protein) >= min_protein_len and orf_start_rel_to_atg == 0: 
-                    start_abs = frame_offset + atg_pos 
-                    end_abs = frame_offset + atg_pos + orf_end_rel_to_atg
-                    orf_dna_seq = sequence_upper[start_abs : end_abs + 1]
-                    
-                    orfs.append(ORF(
-                        start=start_abs + 1, 
-                        end=end_abs + 1,     
-                        length=len(orf_dna_seq),
-                        frame=frame_offset + 1,
-                        direction="forward",
-                        protein_sequence=protein,
-                        protein_length=len(protein)
-                    ))
-                    current_pos_in_sub_fwd = atg_pos + ( (orf_end_rel_to_atg // 3) + 1) * 3 
-                elif atg_pos != -1 :
-                    current_pos_in_sub_fwd = atg_pos + 3 
-                else: 
-                    break
-            
-        rev_comp_seq = SequenceValidator._reverse_complement(sequence_upper, SequenceType.DNA)
-        for frame_offset in range(3):
-            dna_sub_sequence_rev = rev_comp_seq[frame_offset:]
-            current_pos_in_sub_rev = 0
-            while current_pos_in_sub_rev < len(dna_sub_sequence_rev):
-                atg_pos = dna_sub_sequence_rev.find("ATG", current_pos_in_sub_rev)
-                if atg_pos == -1 or atg_pos % 3 != 0:
-                    break
-
-                protein, orf_start_rel_to_atg, orf_end_rel_to_atg = SequenceValidator._translate_sequence_to_protein(
-                    dna_sub_sequence_rev[atg_pos:], frame=0, direction="reverse" 
-                )
-
-                if protein and len(protein) >= min_protein_len and orf_start_rel_to_atg == 0:
-                    start_abs_on_forward = len(sequence_upper) - 1 - (frame_offset + atg_pos + orf_end_rel_to_atg)
-                    end_abs_on_forward = len(sequence_upper) - 1 - (frame_offset + atg_pos)
-                    
-                    orf_dna_seq = sequence_upper[start_abs_on_forward : end_abs_on_forward + 1]
-                    
-                    orfs.append(ORF(
-                        start=start_abs_on_forward + 1, 
-                        end=end_abs_on_forward + 1,     
-                        length=len(orf_dna_seq),
-                        frame=-(frame_offset + 1),
-                        direction="reverse",
-                        protein_sequence=protein,
-                        protein_length=len(protein)
-                    ))
-                    current_pos_in_sub_rev = atg_pos + ( (orf_end_rel_to_atg // 3) + 1) * 3
-                elif atg_pos != -1:
-                    current_pos_in_sub_rev = atg_pos + 3
-                else:
-                    break
-
-        orfs.sort(key=lambda o: o.start)
-        return orfs
+        return OrfFinder.find_orfs(sequence, min_protein_len=min_protein_len)
 
     @staticmethod
-    def _find_repeats(sequence: str, min_length: int = 10, min_count: int = 2) -> List[RepeatSequence]:
+    def _find_repeats(sequence: str, min_length: int = 10, min_count: int = 2, max_results: Optional[int] = MAX_REPORTED_REPEATS) -> List[RepeatSequence]:
         """
         Trova sequenze ripetute (match esatti diretti) in una sequenza.
-        Logica di base per identificare ripetizioni non sovrapposte.
-        Potrebbe essere ulteriormente raffinata per gestire ripetizioni complesse o sovrapposte.
+        Riporta le ripetizioni massimali con tutte le occorrenze, calcolate da
+        RepeatFinder tramite suffix array e array LCP in tempo quasi lineare.
         """
-        if not sequence or len(sequence) < min_length * min_count:
+        if not sequence or len(sequence) < min_length + 1:
             return []
-
-        n = len(sequence)
-        repeats_found: List[RepeatSequence] = []
-        # Mappa per tenere traccia delle sottosequenze già processate come parte di una ripetizione
-        # per evitare di aggiungere sottoripetizioni se una più grande è già stata trovata.
-        processed_indices = [False] * n 
-
-        # Itera su possibili lunghezze di ripetizione
-        for length in range(min_length, n // min_count + 1):
-            # Itera attraverso la sequenza per trovare la prima occorrenza di una potenziale unità ripetuta
-            for i in range(n - length + 1):
-                # Se l'inizio di questa potenziale ripetizione è già stato contato come parte di un'altra, salta
-                if processed_indices[i]:
-                    continue
-
-                sub_sequence = sequence[i : i + length]
-                occurrences: List[Tuple[int, int]] = []
-                current_pos = i
-                
-                temp_processed_for_this_sub = [False] * n
-                num_occurrences = 0
-
-                search_offset = i
-                while search_offset <= n - length:
-                    found_at = sequence.find(sub_sequence, search_offset)
-                    if found_at != -1:
-                        # Verifica che questa occorrenza non si sovrapponga a una già marcata come "usata"
-                        # per questa specifica sub_sequence, per contare occorrenze distinte.
-                        # Questo è un approccio semplice per evitare sovrapposizioni nel conteggio della stessa unità.
-                        is_already_covered_for_this_sub = False
-                        for start_idx in range(found_at, found_at + length):
-                            if temp_processed_for_this_sub[start_idx]:
-                                is_already_covered_for_this_sub = True
-                                break
-                        
-                        if not is_already_covered_for_this_sub:
-                            occurrences.append((found_at + 1, found_at + length)) # 1-based
-                            num_occurrences +=1
-                            # Marca questa regione come usata per *questa* sub_sequence
-                            for k_idx in range(found_at, found_at + length):
-                                temp_processed_for_this_sub[k_idx] = True
-                            search_offset = found_at + length # Cerca la prossima dopo questa
-                        else:
-                            search_offset = found_at + 1 # Continua la ricerca poco dopo
-                    else:
-                        break # sub_sequence non più trovata
-                
-                if num_occurrences >= min_count:
-                    # Verifica se questa ripetizione è una sottoripetizione di una già trovata e più lunga
-                    is_sub_repeat_of_longer = False
-                    for r_exist in repeats_found:
-                        if sub_sequence in r_exist.sequence and len(sub_sequence) < len(r_exist.sequence):
-                            # Controlla se le posizioni sono coperte
-                            is_covered = True
-                            for occ_new_start, occ_new_end in occurrences:
-                                new_is_inside_existing = False
-                                for occ_e_start, occ_e_end in r_exist.occurrences:
-                                    if occ_new_start >= occ_e_start and occ_new_end <= occ_e_end:
-                                        new_is_inside_existing = True
-                                        break
-                                if not new_is_inside_existing:
-                                    is_covered = False
-                                    break
-                            if is_covered:
-                                is_sub_repeat_of_longer = True
-                                break
-                    
-                    if not is_sub_repeat_of_longer:
-                        # Rimuovi eventuali ripetizioni più corte che sono completamente coperte da questa nuova
-                        repeats_found = [r for r in repeats_found 
-                                         if not (r.sequence in sub_sequence and len(r.sequence) < len(sub_sequence) and 
-                                                 all(any(o_r_start <= o_s_start and o_r_end >= o_s_end 
-                                                         for o_s_start, o_s_end in occurrences) 
-                                                     for o_r_start, o_r_end in r.occurrences)                                                   
-                                                )
-                                        ]
-                        
-                        repeats_found.append(RepeatSequence(
-                            sequence=sub_sequence,
-                            length=length,
-                            count=num_occurrences,
-                            occurrences=sorted(occurrences)
-                        ))
-                        # Marca gli indici globali per le occorrenze di questa ripetizione trovata
-                        # Questo aiuta a dare priorità a ripetizioni più lunghe se trovate prima.
-                        # Tuttavia, l'ordine di iterazione per `length` è crescente.
-                        # Questa logica di `processed_indices` è per evitare di ricominciare da zero
-                        # sottostringhe che sono già state identificate come parte di una ripetizione.
-                        for occ_start, occ_end in occurrences:
-                            for k_idx in range(occ_start -1, occ_end -1 +1):
-                                processed_indices[k_idx] = True 
-        
-        # Ordina per lunghezza (decrescente) e poi per conteggio (decrescente)
-        repeats_found.sort(key=lambda r: (r.length, r.count), reverse=True)
-        return repeats_found
+        return RepeatFinder.find_repeats(sequence, min_length=min_length, min_count=min_count, max_results=max_results)
 
     @staticmethod
-    def _find_palindromes(sequence: str, min_length: int = 6) -> List[PalindromicSequence]:
+    def _find_palindromes(sequence: str, min_length: int = 6, max_spacer: int = 0, budget: Optional[TimeBudget] = None) -> List[PalindromicSequence]:
         """
         Trova sequenze palindromiche (che sono uguali al loro reverse complement)
-        in una sequenza DNA o RNA.
+        in una sequenza DNA o RNA, in tempo lineare con PalindromeFinder.
+        Se max_spacer > 0 riporta anche le ripetizioni invertite separate da uno
+        spaziatore fino a max_spacer basi (bracci di almeno min_length / 2 basi).
         """
         if not sequence or len(sequence) < min_length:
             return []
 
-        palindromes_found: List[PalindromicSequence] = []
-        n = len(sequence)
-        sequence_upper = sequence.upper()
-
-        seq_type_for_rc = SequenceType.RNA if 'U' in sequence_upper else SequenceType.DNA
-        
-        valid_bases = RNA_BASES if seq_type_for_rc == SequenceType.RNA else DNA_BASES
-
-        for length in range(min_length, n + 1):
-            for i in range(n - length + 1):
-                sub_sequence = sequence_upper[i : i + length]
-                
-                if not all(base in valid_bases for base in sub_sequence):
-                    continue
-
-                rev_comp_sub = SequenceValidator._reverse_complement(sub_sequence, seq_type_for_rc)
-                if sub_sequence == rev_comp_sub:
-                    is_contained_in_longer = False
-                    for p_existing in palindromes_found:
-                        if i >= (p_existing.start -1) and (i + length) <= p_existing.end and length < p_existing.length:
-                            is_contained_in_longer = True
-                            break
-                    if not is_contained_in_longer:
-                        palindromes_found = [p for p in palindromes_found 
-                                             if not (p.start -1 >= i and p.end <= i + length and p.length < length)]
-                        
-                        palindromes_found.append(PalindromicSequence(
-                            start=i + 1, 
-                            end=i + length, 
-                            length=length,
-                            sequence=sub_sequence
-                        ))
-        
-        palindromes_found.sort(key=lambda p: (p.start, -p.length))
-        return palindromes_found
+        palindromes = PalindromeFinder.find_palindromes(sequence, min_length=min_length, budget=budget)
+        if max_spacer > 0:
+            palindromes.extend(PalindromeFinder.find_inverted_repeats(
+                sequence, min_arm_length=max(1, (min_length + 1) // 2), max_spacer=max_spacer, budget=budget
+            ))
+            palindromes.sort(key=lambda p: (p.position, -p.length))
+        return palindromes
 
     @staticmethod
     def _calculate_stats(sequence: str, sequence_type: SequenceType, component_type: Optional[str] = None, min_protein_len_orf: int = 25) -> SequenceStatistics:
         """Calcola tutte le statistiche della sequenza."""
-        length = len(sequence)
-        gc_content = SequenceValidator._calculate_gc_content_manual(sequence, sequence_type)
-        invalid_bases_count = SequenceValidator._count_invalid_characters(sequence, sequence_type)
-        
-        orfs: List[ORF] = []
-        if sequence_type == SequenceType.DNA: # ORF sono definiti per DNA
-            # Assumiamo che la sequenza passata a _find_open_reading_frames sia già uppercased e valida
-            orfs = SequenceValidator._find_open_reading_frames(sequence, min_protein_len=min_protein_len_orf)
-        
-        repeats: List[RepeatSequence] = []
-        palindromes: List[PalindromicSequence] = []
-        if sequence_type in [SequenceType.DNA, SequenceType.RNA]:
-            # Assumiamo che la sequenza passata qui sia già uppercased
-            repeats = SequenceValidator._find_repeats(sequence, min_length=10, min_count=2)
-            palindromes = SequenceValidator._find_palindromes(sequence, min_length=6)
-        
-        return SequenceStatistics(
-            length=length,
-            gc_content=round(gc_content, 2) if gc_content is not None else 0.0,
-            invalid_bases=invalid_bases_count,
-            open_reading_frames=orfs,
-            repeats=repeats,
-            palindromes=palindromes
-        )
+        return LazySequenceStats(sequence, sequence_type, min_protein_len_orf).to_model(ALL_ANALYSES)
 
     @staticmethod
-    def validate_sequence(sequence: str, sequence_type: SequenceType, component_type: Optional[str] = None, min_protein_len_orf: int = 25) -> SequenceValidationResult:
+    def validate_sequence(
+        sequence: str,
+        sequence_type: SequenceType,
+        component_type: Optional[str] = None,
+        min_protein_len_orf: int = 25,
+        analyses: Optional[List[SequenceAnalysis]] = None,
+        time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None,
+        inverted_repeat_max_spacer: int = 0,
+        motif_library: Optional[str] = None,
+        genetic_code: int = 1,
+        alternative_starts: bool = False
+    ) -> SequenceValidationResult:
         """
         Valida una sequenza, calcola statistiche e identifica potenziali problemi.
+        I controlli rapidi sono sempre eseguiti; ORF, ripetizioni e palindromi (ognuno
+        entro il proprio budget di tempo), i controlli a finestra di GC locale e
+        complessità e la ricerca dei motivi di `motif_library` solo se presenti in
+        `analyses` (None: tutte). Codoni di stop e ORF seguono la tabella NCBI `genetic_code`.
         """
         sequence_upper = sequence.strip().upper() if isinstance(sequence, str) else ""
-        
+        lazy_stats = LazySequenceStats(
+            sequence_upper,
+            sequence_type,
+            min_protein_len_orf=min_protein_len_orf,
+            time_budgets_ms=time_budgets_ms,
+            inverted_repeat_max_spacer=inverted_repeat_max_spacer,
+            motif_library=motif_library,
+            genetic_code=genetic_code,
+            alternative_starts=alternative_starts
+        )
+        return SequenceValidator.build_result(lazy_stats, component_type, analyses)
+
+    @staticmethod
+    def build_result(
+        lazy_stats: LazySequenceStats,
+        component_type: Optional[str] = None,
+        analyses: Optional[List[SequenceAnalysis]] = None
+    ) -> SequenceValidationResult:
+        """
+        Costruisce il risultato della validazione (errori, warning, info) a partire
+        dalle statistiche di una sequenza già normalizzata in maiuscolo.
+        Usato sia dalla validazione completa sia dalle sessioni incrementali.
+        """
+        requested = set(ALL_ANALYSES if analyses is None else analyses)
+        sequence_type = lazy_stats.sequence_type
+        min_protein_len_orf = lazy_stats.min_protein_len_orf
+
         is_valid_overall = True 
         errors: List[SequenceValidationIssue] = []
         warnings: List[SequenceValidationIssue] = []
         info: List[SequenceValidationIssue] = []
 
-        if not sequence_upper:
+        if not lazy_stats.sequence:
             errors.append(SequenceValidationIssue(type="empty_sequence", message="La sequenza fornita è vuota."))
-            empty_stats = SequenceStatistics(length=0, gc_content=0.0, invalid_bases=0, open_reading_frames=[], repeats=[], palindromes=[])
+            empty_stats = SequenceStatistics(length=0, gc_content=0.0, invalid_bases=0, start_codon=False, stop_codon=False, open_reading_frames=[], repeats=[], palindromes=[])
             return SequenceValidationResult(is_valid=False, errors=errors, warnings=warnings, info=info, stats=empty_stats)
-        
-        stats = SequenceValidator._calculate_stats(sequence_upper, sequence_type, component_type, min_protein_len_orf)
+
+        stats = lazy_stats.to_model(list(requested))
         
         if stats.invalid_bases > 0:
             is_valid_overall = False
-            invalid_positions = SequenceValidator._find_invalid_character_positions(sequence_upper, sequence_type)
+            invalid_positions = lazy_stats.invalid_positions
             base_type_msg = "basi/amminoacidi"
             allowed_chars_msg = "ATGC (DNA), AUGC (RNA), o ACDEFGHIKLMNPQRSTVWY (Proteina)"
             if sequence_type == SequenceType.DNA: 
@@ -478,7 +481,35 @@ class SequenceValidator:
                     SequenceValidationIssue(type="high_gc_content", message=f"Contenuto GC alto ({gc_content:.1f}%).")
                 )
         
-        if sequence_type == SequenceType.DNA:
+        if SequenceAnalysis.LOCAL_GC in requested and lazy_stats.local_gc_regions:
+            regions = lazy_stats.local_gc_regions
+            warnings.append(
+                SequenceValidationIssue(
+                    type="local_gc_out_of_range",
+                    message=f"{len(regions)} regioni con GC locale fuori dall'intervallo {settings.LOCAL_GC_MIN:.0f}-{settings.LOCAL_GC_MAX:.0f}% (finestra di {settings.LOCAL_GC_WINDOW}bp).",
+                    position=[r.start + 1 for r in regions[:MAX_REPORTED_REGIONS]],
+                    details={
+                        "window": settings.LOCAL_GC_WINDOW,
+                        "regions": [f"{r.start + 1}-{r.end + 1}: GC {r.min_value:.1f}-{r.max_value:.1f}%" for r in regions[:MAX_REPORTED_REGIONS]]
+                    }
+                )
+            )
+
+        if SequenceAnalysis.COMPLEXITY in requested and lazy_stats.low_complexity_regions:
+            regions = lazy_stats.low_complexity_regions
+            warnings.append(
+                SequenceValidationIssue(
+                    type="low_complexity_region",
+                    message=f"{len(regions)} regioni a bassa complessità (finestra di {settings.COMPLEXITY_WINDOW}bp): possibili problemi di sintesi e sequenziamento.",
+                    position=[r.start + 1 for r in regions[:MAX_REPORTED_REGIONS]],
+                    details={
+                        "window": settings.COMPLEXITY_WINDOW,
+                        "regions": [f"{r.start + 1}-{r.end + 1}: complessità {r.min_value:.2f}-{r.max_value:.2f}" for r in regions[:MAX_REPORTED_REGIONS]]
+                    }
+                )
+            )
+
+        if sequence_type == SequenceType.DNA and SequenceAnalysis.ORFS in requested:
             if component_type and "gene" in component_type.lower():
                 if not stats.open_reading_frames:
                     warnings.append(
@@ -492,7 +523,7 @@ class SequenceValidator:
                          SequenceValidationIssue(
                             type="orfs_analysis",
                             message=f"Trovati {len(stats.open_reading_frames)} ORF(s) con proteina >= {min_protein_len_orf}aa.",
-                            details={"orf_summary": [f"ORF frame {orf.frame} ({orf.direction}): {orf.start}-{orf.end} ({orf.length}nt), proteina {orf.protein_length}aa" for orf in stats.open_reading_frames]}
+                            details={"orf_summary": [f"ORF frame {orf.frame} ({orf.direction}): {orf.start + 1}-{orf.end + 1} ({orf.length}nt), proteina {orf.protein_length}aa" for orf in stats.open_reading_frames]}
                         )
                     )
             elif stats.open_reading_frames: 
@@ -509,7 +540,7 @@ class SequenceValidator:
                 SequenceValidationIssue(
                     type="repeats_found",
                     message=f"Trovate {len(stats.repeats)} tipologie di sequenze ripetute (dettagli in statistiche).",
-                    details={"repeat_summary": [f"{r.count}x '{r.sequence}' (len {r.length}) at {r.occurrences}" for r in stats.repeats]}
+                    details={"repeat_summary": [f"{r.count}x '{r.sequence}' (len {r.length}) at {[p + 1 for p in r.positions]}" for r in stats.repeats]}
                 )
             )
         
@@ -518,7 +549,66 @@ class SequenceValidator:
                 SequenceValidationIssue(
                     type="palindromes_found",
                     message=f"Trovate {len(stats.palindromes)} sequenze palindromiche (dettagli in statistiche).",
-                     details={"palindrome_summary": [f"'{p.sequence}' (pos {p.start}-{p.end}, len {p.length})" for p in stats.palindromes]}
+                     details={"palindrome_summary": [f"'{p.sequence}' (pos {p.position + 1}-{p.position + p.length}, len {p.length})" for p in stats.palindromes]}
+                )
+            )
+
+        if stats.motif_hits:
+            counts: Dict[str, int] = {}
+            for hit in stats.motif_hits:
+                counts[hit.name] = counts.get(hit.name, 0) + 1
+            info.append(
+                SequenceValidationIssue(
+                    type="motifs_found",
+                    message=f"Trovate {len(stats.motif_hits)} occorrenze di {len(counts)} siti/motivi della libreria '{lazy_stats.motif_library}' (dettagli in statistiche).",
+                    position=[hit.position + 1 for hit in stats.motif_hits[:MAX_REPORTED_MOTIF_HITS]],
+                    details={
+                        "counts": counts,
+                        "motif_summary": [f"{hit.name} ({hit.strand}) {hit.position + 1}-{hit.position + hit.length}" for hit in stats.motif_hits[:MAX_REPORTED_MOTIF_HITS]]
+                    }
+                )
+            )
+
+        if stats.start_hairpins:
+            warnings.append(
+                SequenceValidationIssue(
+                    type="start_region_hairpin",
+                    message=f"{len(stats.start_hairpins)} forcine stabili (<= {settings.FOLDING_HAIRPIN_MAX_ENERGY:.1f} kcal/mol) coinvolgono codoni di start o RBS: possibile riduzione dell'inizio della traduzione.",
+                    position=[h.start + 1 for h in stats.start_hairpins],
+                    details={"hairpin_summary": [f"{h.start + 1}-{h.end + 1}: {h.energy:.1f} kcal/mol {h.structure}" for h in stats.start_hairpins]}
+                )
+            )
+
+        properties = stats.protein_properties
+        if properties is not None and properties.length > 0:
+            info.append(
+                SequenceValidationIssue(
+                    type="protein_properties",
+                    message=f"Proteina di {properties.length}aa: {properties.molecular_weight / 1000:.1f} kDa, pI {properties.isoelectric_point:.2f}, GRAVY {properties.gravy:.3f}.",
+                    details={
+                        "molecular_weight": properties.molecular_weight,
+                        "isoelectric_point": properties.isoelectric_point,
+                        "gravy": properties.gravy,
+                        "instability_index": properties.instability_index,
+                        "extinction_coefficient_reduced": properties.extinction_coefficient_reduced,
+                        "extinction_coefficient_oxidized": properties.extinction_coefficient_oxidized
+                    }
+                )
+            )
+            if not properties.is_stable:
+                warnings.append(
+                    SequenceValidationIssue(
+                        type="protein_unstable",
+                        message=f"Indice di instabilità {properties.instability_index:.1f} (> {INSTABILITY_THRESHOLD:.0f}): proteina probabilmente instabile in vitro."
+                    )
+                )
+
+        if stats.partial_analyses:
+            warnings.append(
+                SequenceValidationIssue(
+                    type="analysis_truncated",
+                    message=f"Analisi interrotte per limite di tempo, risultati parziali: {', '.join(a.value for a in stats.partial_analyses)}.",
+                    details={"partial_analyses": [a.value for a in stats.partial_analyses]}
                 )
             )
 
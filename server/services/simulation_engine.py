@@ -13,10 +13,19 @@ from server.models.simulation import (
     SimulationResults
 )
 from server.models.genetic_design import Node, Edge
+from server.services.design_graph import DesignGraph
 
 
 logger = logging.getLogger(__name__)
 
+# Fattori moltiplicativi della trascrizione in base alla forza del promotore
+PROMOTER_STRENGTH_FACTORS: Dict[str, float] = {
+    "low": 0.3,
+    "medium": 1.0,
+    "high": 3.0,
+    "very high": 10.0
+}
+
 
 class SimulationEngine:
     """
@@ -30,7 +39,8 @@ class SimulationEngine:
         method: SimulationMethod,
         parameters: List[SimulationParameter],
         simulation_time: float = 100.0,
-        time_points: int = 1000
+        time_points: int = 1000,
+        graph: Optional[DesignGraph] = None
     ) -> SimulationResults:
         """
         Simula un circuito genetico con il metodo specificato.
@@ -42,6 +52,7 @@ class SimulationEngine:
             parameters: I parametri della simulazione
             simulation_time: Il tempo totale di simulazione
             time_points: Il numero di punti temporali da registrare
+            graph: Indice del grafo del design già costruito (opzionale, riusato dalla cache)
             
         Returns:
             I risultati della simulazione
@@ -51,15 +62,19 @@ class SimulationEngine:
         # Converti i parametri in un dizionario
         param_dict = {p.name: p.value for p in parameters}
         
+        # Costruisci l'indice del grafo una sola volta per tutta la simulazione
+        if graph is None:
+            graph = DesignGraph(nodes, edges)
+        
         # Seleziona il metodo di simulazione appropriato
         if method == SimulationMethod.ODE:
-            time_series = SimulationEngine._simulate_ode(nodes, edges, param_dict, simulation_time, time_points)
+            time_series = SimulationEngine._simulate_ode(nodes, edges, param_dict, simulation_time, time_points, graph)
         elif method == SimulationMethod.SSA:
-            time_series = SimulationEngine._simulate_ssa(nodes, edges, param_dict, simulation_time, time_points)
+            time_series = SimulationEngine._simulate_ssa(nodes, edges, param_dict, simulation_time, time_points, graph)
         elif method == SimulationMethod.HYBRID:
-            time_series = SimulationEngine._simulate_hybrid(nodes, edges, param_dict, simulation_time, time_points)
+            time_series = SimulationEngine._simulate_hybrid(nodes, edges, param_dict, simulation_time, time_points, graph)
         elif method == SimulationMethod.FBA:
-            time_series = SimulationEngine._simulate_fba(nodes, edges, param_dict, simulation_time, time_points)
+            time_series = SimulationEngine._simulate_fba(nodes, edges, param_dict, simulation_time, time_points, graph)
         else:
             raise ValueError(f"Metodo di simulazione non supportato: {method}")
         
@@ -73,7 +88,7 @@ class SimulationEngine:
                 steady_states[species] = float(np.mean(values[-n_steady:]))
         
         # Calcola metriche aggiuntive
-        metrics = SimulationEngine._calculate_metrics(time_series, nodes, edges)
+        metrics = SimulationEngine._calculate_metrics(time_series, nodes, edges, graph)
         
         return SimulationResults(
             time_series=time_series,
@@ -87,22 +102,17 @@ class SimulationEngine:
         edges: List[Edge],
         parameters: Dict[str, float],
         simulation_time: float,
-        time_points: int
+        time_points: int,
+        graph: Optional[DesignGraph] = None
     ) -> TimeSeries:
         """
         Simula il circuito utilizzando equazioni differenziali ordinarie.
         """
-        # Estrai i componenti principali dal circuito
-        promoters = [node for node in nodes if node.type == "promoter"]
-        genes = [node for node in nodes if node.type == "gene"]
-        regulators = [node for node in nodes if node.type == "regulatory"]
-        
-        # Crea un dizionario per tenere traccia delle connessioni
-        connections = {}
-        for edge in edges:
-            if edge.target not in connections:
-                connections[edge.target] = []
-            connections[edge.target].append(edge.source)
+        # L'indice del grafo viene costruito una sola volta (o riusato dalla cache del design)
+        if graph is None:
+            graph = DesignGraph(nodes, edges)
+        
+        genes = [graph.nodes[i] for i in graph.nodes_of_type("gene")]
         
         # Crea un elenco di specie per la simulazione
         species = []
@@ -122,70 +132,28 @@ class SimulationEngine:
         # Applica i parametri forniti, usando i valori di default per quelli mancanti
         sim_params = {**default_params, **parameters}
         
+        # Il tasso di trascrizione di ogni gene dipende solo dalla topologia e dai dati
+        # dei nodi, quindi viene calcolato una volta sola fuori dalla funzione delle derivate.
+        production = SimulationEngine._transcription_rates(graph, sim_params)
+        
         # Stato iniziale (concentrazioni iniziali di tutte le specie)
         y0 = np.zeros(len(species))
         
-        # Funzione per calcolare le derivate
+        translation_rate = sim_params["translation_rate"]
+        mrna_degradation = sim_params["mrna_degradation"]
+        protein_degradation = sim_params["protein_degradation"]
+        
+        # Funzione per calcolare le derivate: le specie sono intercalate (mRNA, proteina)
         def circuit_ode(t, y):
-            dydt = np.zeros_like(y)
+            dydt = np.empty_like(y)
+            mrna_conc = y[0::2]
+            protein_conc = y[1::2]
             
-            species_dict = {species[i]: y[i] for i in range(len(species))}
+            # Equazione per mRNA: produzione - degradazione
+            dydt[0::2] = production - mrna_degradation * mrna_conc
             
-            # Calcola le derivate per ogni specie
-            species_index = 0
-            for gene in genes:
-                # Indici per mRNA e proteina di questo gene
-                mrna_idx = species_index
-                protein_idx = species_index + 1
-                
-                # Calcola il tasso di trascrizione in base ai promotori e regolatori collegati
-                transcription_rate = sim_params["transcription_rate"]
-                
-                # Verifica se il gene è connesso a un promotore
-                if gene.id in connections:
-                    for source_id in connections[gene.id]:
-                        # Trova il nodo sorgente
-                        source_node = next((n for n in nodes if n.id == source_id), None)
-                        
-                        if source_node and source_node.type == "promoter":
-                            # Moltiplica il tasso di trascrizione per la forza del promotore
-                            promoter_strength = {
-                                "low": 0.3,
-                                "medium": 1.0,
-                                "high": 3.0,
-                                "very high": 10.0
-                            }.get(source_node.data.get("strength", "medium"), 1.0)
-                            
-                            transcription_rate *= promoter_strength
-                            
-                            # Se il promotore è inducibile, verifica la presenza di induttori
-                            if source_node.data.get("inducible", False):
-                                # Qui si potrebbe aggiungere la logica per gli induttori
-                                pass
-                
-                # Calcola l'effetto dei regolatori
-                regulation_factor = 1.0
-                for regulator in regulators:
-                    if gene.id in connections and regulator.id in connections[gene.id]:
-                        regulator_type = regulator.data.get("function", "")
-                        strength = regulator.data.get("strengthValue", 50) / 100.0
-                        
-                        if regulator_type == "activation":
-                            # Attivatore: aumenta la trascrizione
-                            regulation_factor *= (1.0 + strength)
-                        elif regulator_type == "repression":
-                            # Repressore: diminuisce la trascrizione
-                            regulation_factor *= (1.0 - strength)
-                
-                # Equazione per mRNA: produzione - degradazione
-                mrna_conc = y[mrna_idx]
-                dydt[mrna_idx] = transcription_rate * regulation_factor - sim_params["mrna_degradation"] * mrna_conc
-                
-                # Equazione per proteina: traduzione di mRNA - degradazione
-                protein_conc = y[protein_idx]
-                dydt[protein_idx] = sim_params["translation_rate"] * mrna_conc - sim_params["protein_degradation"] * protein_conc
-                
-                species_index += 2
+            # Equazione per proteina: traduzione di mRNA - degradazione
+            dydt[1::2] = translation_rate * mrna_conc - protein_degradation * protein_conc
             
             return dydt
         
@@ -217,19 +185,65 @@ class SimulationEngine:
         
         return TimeSeries(time=time_values, values=values_dict)
     
+    @staticmethod
+    def _transcription_rates(graph: DesignGraph, sim_params: Dict[str, float]) -> np.ndarray:
+        """
+        Calcola il tasso di trascrizione effettivo di ogni gene a partire dai
+        promotori e dai regolatori collegati, visitando una sola volta la CSR
+        dei predecessori (O(V+E)).
+        """
+        gene_indices = graph.nodes_of_type("gene")
+        rates = np.full(len(gene_indices), sim_params["transcription_rate"], dtype=float)
+        
+        for k, gene_idx in enumerate(gene_indices):
+            sources = graph.predecessors(gene_idx)
+            
+            # Moltiplica il tasso di trascrizione per la forza di ogni promotore collegato
+            for source_idx in sources:
+                source_node = graph.nodes[source_idx]
+                if source_node.type == "promoter":
+                    promoter_strength = PROMOTER_STRENGTH_FACTORS.get(source_node.data.get("strength", "medium"), 1.0)
+                    rates[k] *= promoter_strength
+                    
+                    # Se il promotore è inducibile, verifica la presenza di induttori
+                    if source_node.data.get("inducible", False):
+                        # Qui si potrebbe aggiungere la logica per gli induttori
+                        pass
+            
+            # Calcola l'effetto dei regolatori (ogni regolatore conta una sola volta)
+            regulation_factor = 1.0
+            for source_idx in np.unique(sources):
+                regulator = graph.nodes[source_idx]
+                if regulator.type != "regulatory":
+                    continue
+                regulator_type = regulator.data.get("function", "")
+                strength = regulator.data.get("strengthValue", 50) / 100.0
+                
+                if regulator_type == "activation":
+                    # Attivatore: aumenta la trascrizione
+                    regulation_factor *= (1.0 + strength)
+                elif regulator_type == "repression":
+                    # Repressore: diminuisce la trascrizione
+                    regulation_factor *= (1.0 - strength)
+            
+            rates[k] *= regulation_factor
+        
+        return rates
+    
     @staticmethod
     def _simulate_ssa(
         nodes: List[Node],
         edges: List[Edge],
         parameters: Dict[str, float],
         simulation_time: float,
-        time_points: int
+        time_points: int,
+        graph: Optional[DesignGraph] = None
     ) -> TimeSeries:
         """
         Simula il circuito utilizzando l'algoritmo di simulazione stocastica (Gillespie).
         """
         # Per ora utilizziamo una versione semplificata che aggiunge rumore alla simulazione ODE
-        ode_result = SimulationEngine._simulate_ode(nodes, edges, parameters, simulation_time, time_points)
+        ode_result = SimulationEngine._simulate_ode(nodes, edges, parameters, simulation_time, time_points, graph)
         
         # Aggiungi rumore alle traiettorie
         noisy_values = {}
@@ -252,14 +266,15 @@ class SimulationEngine:
         edges: List[Edge],
         parameters: Dict[str, float],
         simulation_time: float,
-        time_points: int
+        time_points: int,
+        graph: Optional[DesignGraph] = None
     ) -> TimeSeries:
         """
         Simula il circuito utilizzando un approccio ibrido (ODE per specie abbondanti, SSA per specie rare).
         """
         # Per semplicità, per ora utilizziamo una combinazione delle simulazioni ODE e SSA
-        ode_result = SimulationEngine._simulate_ode(nodes, edges, parameters, simulation_time, time_points)
-        ssa_result = SimulationEngine._simulate_ssa(nodes, edges, parameters, simulation_time, time_points)
+        ode_result = SimulationEngine._simulate_ode(nodes, edges, parameters, simulation_time, time_points, graph)
+        ssa_result = SimulationEngine._simulate_ssa(nodes, edges, parameters, simulation_time, time_points, graph)
         
         # Combina i risultati per creare un effetto ibrido
         hybrid_values = {}
@@ -283,7 +298,8 @@ class SimulationEngine:
         edges: List[Edge],
         parameters: Dict[str, float],
         simulation_time: float,
-        time_points: int
+        time_points: int,
+        graph: Optional[DesignGraph] = None
     ) -> TimeSeries:
         """
         Simula il circuito utilizzando l'analisi del bilancio dei flussi (FBA).
@@ -292,7 +308,7 @@ class SimulationEngine:
         # che simula uno stato stazionario con piccole variazioni
         
         # Simula uno stato stazionario con ODE
-        ode_result = SimulationEngine._simulate_ode(nodes, edges, parameters, simulation_time, time_points // 10)
+        ode_result = SimulationEngine._simulate_ode(nodes, edges, parameters, simulation_time, time_points // 10, graph)
         
         # Estendi il risultato per coprire tutti i punti temporali richiesti
         time_values = np.linspace(0, simulation_time, time_points).tolist()
@@ -311,7 +327,7 @@ class SimulationEngine:
         return TimeSeries(time=time_values, values=extended_values)
     
     @staticmethod
-    def _calculate_metrics(time_series: TimeSeries, nodes: List[Node], edges: List[Edge]) -> Dict[str, Any]:
+    def _calculate_metrics(time_series: TimeSeries, nodes: List[Node], edges: List[Edge], graph: Optional[DesignGraph] = None) -> Dict[str, Any]:
         """
         Calcola metriche aggiuntive dai risultati della simulazione.
         """
@@ -352,6 +368,15 @@ class SimulationEngine:
             "regulatory_count": len([n for n in nodes if n.type == "regulatory"]),
         }
         
+        # Metriche topologiche dall'indice del grafo
+        if graph is not None:
+            metrics["circuit_topology"] = {
+                "feedback_loops": len(graph.feedback_cycles),
+                "orphan_nodes": len(graph.orphan_nodes),
+                "unreachable_genes": len(graph.unreachable_genes),
+                "dangling_promoters": len(graph.dangling_promoters),
+            }
+        
         return metrics
     
     @staticmethod
@@ -0,0 +1,425 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import json
+import logging
+
+import numpy as np
+from starlette.concurrency import run_in_threadpool
+
+from server.models.sequence_analysis import (
+    SequenceType,
+    SequenceAnalysis,
+    SequenceStatistics,
+    StreamedSequenceSummary,
+    ORF,
+    RepeatSequence,
+    PalindromicSequence
+)
+from server.services.orf_finder import (
+    encode_sequence,
+    codon_indices,
+    AMINO_ACID_BY_CODON,
+    COMPLEMENT_CODES,
+    IS_STOP_CODON,
+    IS_REVERSE_STOP_CODON,
+    START_CODON_INDEX
+)
+from server.services.repeat_finder import RepeatFinder
+from server.services.palindrome_finder import PalindromeFinder
+from server.services.sequence_validator import (
+    VALID_CHARACTER_TABLES,
+    ALL_ANALYSES,
+    REPEAT_MIN_LENGTH,
+    PALINDROME_MIN_LENGTH,
+    START_CODONS,
+    STOP_CODONS
+)
+from server.services.sequence_io import SequenceStreamParser, RECORD_START, SEQUENCE_DATA, RECORD_END
+from server.services.analysis_budget import TimeBudget
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# CAT sul filamento forward = ATG sul filamento reverse
+REVERSE_START_CODON_INDEX = 16 * 1 + 4 * 0 + 3
+
+# ORF grezzo: (inizio, fine inclusiva, direzione, lunghezza della proteina in codoni)
+RawOrf = Tuple[int, int, str, int]
+
+# Analisi disponibili in streaming; le altre richiedono la sequenza intera
+STREAMING_ANALYSES: List[SequenceAnalysis] = [SequenceAnalysis.ORFS, SequenceAnalysis.REPEATS, SequenceAnalysis.PALINDROMES]
+
+
+class StreamingOrfScanner:
+    """
+    Ricerca degli ORF su una sequenza ricevuta a blocchi, con lo stesso risultato
+    di OrfFinder sulla sequenza intera.
+
+    Per ognuno dei tre frame (posizione del codone mod 3) si conserva solo lo stato
+    del segmento aperto: sul filamento forward il primo ATG dopo l'ultimo
+    terminatore, sul reverse l'ultimo terminatore (stop reverse o codone non
+    valido) e l'ultimo CAT visto dopo di esso. Gli ORF vengono emessi appena il
+    terminatore che li chiude arriva; le due basi finali di ogni blocco vengono
+    riportate in testa al successivo per i codoni a cavallo.
+    """
+
+    def __init__(self, min_protein_len: int = 25, include_partial: bool = True):
+        self.min_protein_len = min_protein_len
+        self.include_partial = include_partial
+        self.length = 0
+        self._tail = np.empty(0, dtype=np.uint8)
+        self._forward_start: List[Optional[int]] = [None, None, None]
+        self._reverse_left: List[Optional[Tuple[int, bool]]] = [None, None, None]
+        self._reverse_start: List[Optional[int]] = [None, None, None]
+
+    def feed(self, codes: np.ndarray) -> List[RawOrf]:
+        """Elabora un blocco di basi codificate e restituisce gli ORF chiusi al suo interno."""
+        block = np.concatenate((self._tail, codes))
+        base = self.length - self._tail.size
+        self.length += codes.size
+        self._tail = block[-2:].copy()
+        codons = codon_indices(block)
+        found: List[RawOrf] = []
+        for phase in range(3):
+            offset = (phase - base) % 3
+            frame = codons[offset::3]
+            if frame.size == 0:
+                continue
+            positions = base + offset + 3 * np.arange(frame.size, dtype=np.int64)
+            valid = frame >= 0
+            safe = np.where(valid, frame, 0)
+            self._scan_forward(phase, frame, positions, valid, IS_STOP_CODON[safe] & valid, found)
+            self._scan_reverse(phase, frame, positions, valid, IS_REVERSE_STOP_CODON[safe] & valid, found)
+        return found
+
+    def _scan_forward(self, phase: int, frame: np.ndarray, positions: np.ndarray, valid: np.ndarray, stop: np.ndarray, found: List[RawOrf]) -> None:
+        boundaries = np.flatnonzero(stop | ~valid)
+        starts = np.flatnonzero(frame == START_CODON_INDEX)
+        first_start = np.full(boundaries.size + 1, -1, dtype=np.int64)
+        if starts.size:
+            segments, first = np.unique(np.searchsorted(boundaries, starts), return_index=True)
+            first_start[segments] = positions[starts[first]]
+        if self._forward_start[phase] is not None:
+            first_start[0] = self._forward_start[phase]
+
+        boundary_pos = positions[boundaries]
+        codons = (boundary_pos - first_start[:-1]) // 3
+        emit = (first_start[:-1] >= 0) & stop[boundaries] & (codons >= self.min_protein_len)
+        for k in np.flatnonzero(emit).tolist():
+            found.append((int(first_start[k]), int(boundary_pos[k]) + 2, "forward", int(codons[k])))
+        self._forward_start[phase] = int(first_start[-1]) if first_start[-1] >= 0 else None
+
+    def _scan_reverse(self, phase: int, frame: np.ndarray, positions: np.ndarray, valid: np.ndarray, stop: np.ndarray, found: List[RawOrf]) -> None:
+        boundaries = np.flatnonzero(stop | ~valid)
+        starts = np.flatnonzero(frame == REVERSE_START_CODON_INDEX)
+        last_start = np.full(boundaries.size + 1, -1, dtype=np.int64)
+        if starts.size:
+            np.maximum.at(last_start, np.searchsorted(boundaries, starts), positions[starts])
+        if last_start[0] < 0 and self._reverse_start[phase] is not None:
+            last_start[0] = self._reverse_start[phase]
+
+        boundary_pos = positions[boundaries]
+        boundary_stop = stop[boundaries]
+        for k in np.flatnonzero(last_start[:-1] >= 0).tolist():
+            left = self._reverse_left[phase] if k == 0 else (int(boundary_pos[k - 1]), bool(boundary_stop[k - 1]))
+            orf = self._reverse_orf(phase, left, int(last_start[k]))
+            if orf is not None:
+                found.append(orf)
+        if boundaries.size:
+            self._reverse_left[phase] = (int(boundary_pos[-1]), bool(boundary_stop[-1]))
+        self._reverse_start[phase] = int(last_start[-1]) if last_start[-1] >= 0 else None
+
+    def _reverse_orf(self, phase: int, left: Optional[Tuple[int, bool]], start_pos: int) -> Optional[RawOrf]:
+        """ORF reverse che inizia al CAT in start_pos e termina al terminatore `left`."""
+        if left is None:
+            # Nessuno stop fino all'inizio della sequenza: ORF parziale
+            codons = (start_pos - phase) // 3 + 1
+            if self.include_partial and codons >= self.min_protein_len:
+                return (phase, start_pos + 2, "reverse", codons)
+            return None
+        left_pos, is_stop = left
+        codons = (start_pos - left_pos) // 3
+        if is_stop and codons >= self.min_protein_len:
+            return (left_pos, start_pos + 2, "reverse", codons)
+        return None
+
+    def finish(self) -> List[RawOrf]:
+        """Chiude i segmenti ancora aperti alla fine della sequenza."""
+        found: List[RawOrf] = []
+        for phase in range(3):
+            last_codon = phase + 3 * ((self.length - phase) // 3) - 3
+            start = self._forward_start[phase]
+            if start is not None and self.include_partial and last_codon >= start:
+                codons = (last_codon - start) // 3 + 1
+                if codons >= self.min_protein_len:
+                    found.append((start, last_codon + 2, "forward", codons))
+            if self._reverse_start[phase] is not None:
+                orf = self._reverse_orf(phase, self._reverse_left[phase], self._reverse_start[phase])
+                if orf is not None:
+                    found.append(orf)
+        return found
+
+
+class StreamingSequenceAnalyzer:
+    """
+    Analisi di una singola sequenza ricevuta a blocchi, con memoria limitata.
+
+    - lunghezza, GC e caratteri non validi sono contati esattamente;
+    - gli ORF sono esatti (StreamingOrfScanner); la sequenza di un ORF viene
+      riportata solo se è ancora nella finestra di storia mantenuta in memoria;
+    - ripetizioni e palindromi sono cercati in finestre sovrapposte: ogni
+      finestra riporta solo ciò che inizia nella sua parte centrale, esclusa metà
+      della sovrapposizione per lato. Le parti centrali si susseguono senza buchi
+      né sovrapposizioni, quindi non ci sono duplicati e gli elementi più corti di
+      metà sovrapposizione a cavallo dei confini vengono trovati interi, senza le
+      copie troncate dai bordi della finestra. Le ripetizioni sono locali
+      (occorrenze entro la stessa finestra).
+    Ogni tipo di caratteristica è limitato a STREAM_MAX_FEATURES elementi.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        sequence_type: SequenceType,
+        analyses: Optional[List[SequenceAnalysis]] = None,
+        min_protein_len_orf: int = 25,
+        time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None
+    ):
+        self.name = name
+        self.sequence_type = sequence_type
+        self.analyses = set(STREAMING_ANALYSES if analyses is None else analyses)
+        self.min_protein_len_orf = min_protein_len_orf
+        self.time_budgets_ms = time_budgets_ms or {}
+        self.max_features = settings.STREAM_MAX_FEATURES
+        self.window_size = settings.STREAM_ANALYSIS_WINDOW
+        self.margin = min(settings.STREAM_ANALYSIS_OVERLAP, self.window_size // 2) // 2
+        self.history_size = settings.STREAM_ORF_HISTORY
+
+        nucleotide = sequence_type in [SequenceType.DNA, SequenceType.RNA]
+        self.length = 0
+        self.gc_count = 0
+        self.invalid_count = 0
+        self.invalid_positions: List[int] = []
+        self._head = ""
+        self._last = ""
+        self._valid_table = VALID_CHARACTER_TABLES[sequence_type]
+
+        self._orf_scanner = StreamingOrfScanner(min_protein_len_orf) \
+            if sequence_type == SequenceType.DNA and SequenceAnalysis.ORFS in self.analyses else None
+        self._raw_orfs: List[RawOrf] = []
+        self._history = ""
+        self._history_start = 0
+
+        self._windowed = nucleotide and bool(self.analyses & {SequenceAnalysis.REPEATS, SequenceAnalysis.PALINDROMES})
+        self._window = ""
+        self._window_start = 0
+        self.repeats: List[RepeatSequence] = []
+        self.palindromes: List[PalindromicSequence] = []
+        self.truncated: set = set()
+        self.partial: set = set()
+
+    def feed(self, bases: str) -> None:
+        bases = bases.upper()
+        if not bases:
+            return
+        raw = np.frombuffer(bases.encode("ascii", errors="replace"), dtype=np.uint8)
+        self.gc_count += int(np.count_nonzero((raw == ord("G")) | (raw == ord("C"))))
+        invalid = np.flatnonzero(~self._valid_table[raw])
+        self.invalid_count += invalid.size
+        room = self.max_features - len(self.invalid_positions)
+        if room > 0 and invalid.size:
+            self.invalid_positions.extend((invalid[:room] + self.length + 1).tolist())
+        if len(self._head) < 3:
+            self._head = (self._head + bases)[:3]
+        self._last = (self._last + bases)[-3:]
+        self.length += len(bases)
+
+        if self._orf_scanner is not None:
+            self._history += bases
+            if len(self._history) > 2 * self.history_size:
+                drop = len(self._history) - self.history_size
+                self._history = self._history[drop:]
+                self._history_start += drop
+            self._collect_orfs(self._orf_scanner.feed(encode_sequence(bases)))
+
+        if self._windowed:
+            self._window += bases
+            step = self.window_size - 2 * self.margin
+            while len(self._window) >= self.window_size:
+                self._analyze_window(self._window[:self.window_size], self._window_start, final=False)
+                self._window = self._window[step:]
+                self._window_start += step
+
+    def _collect_orfs(self, orfs: List[RawOrf]) -> None:
+        for orf in orfs:
+            if len(self._raw_orfs) >= self.max_features:
+                self.truncated.add(SequenceAnalysis.ORFS)
+                return
+            self._raw_orfs.append(orf)
+            # La sequenza viene estratta subito, finché è ancora nella storia
+            start, end, direction, _ = orf
+            if start >= self._history_start:
+                dna = self._history[start - self._history_start:end - self._history_start + 1]
+                self._raw_orfs[-1] = orf + (dna,)
+
+    def _analyze_window(self, text: str, start: int, final: bool) -> None:
+        """Analizza una finestra riportando solo ciò che inizia nella sua parte centrale [lower, upper)."""
+        lower = start + self.margin if start > 0 else start
+        upper = start + len(text) if final else start + len(text) - self.margin
+        if SequenceAnalysis.REPEATS in self.analyses and SequenceAnalysis.REPEATS not in self.truncated:
+            budget = self._budget(SequenceAnalysis.REPEATS)
+            for repeat in RepeatFinder.find_repeats(text, min_length=REPEAT_MIN_LENGTH, min_count=2, budget=budget):
+                if not lower <= repeat.positions[0] + start < upper:
+                    continue
+                if len(self.repeats) >= self.max_features:
+                    self.truncated.add(SequenceAnalysis.REPEATS)
+                    break
+                self.repeats.append(repeat.model_copy(update={"positions": [p + start for p in repeat.positions]}))
+            if budget.exhausted:
+                self.partial.add(SequenceAnalysis.REPEATS)
+        if SequenceAnalysis.PALINDROMES in self.analyses and SequenceAnalysis.PALINDROMES not in self.truncated:
+            budget = self._budget(SequenceAnalysis.PALINDROMES)
+            for palindrome in PalindromeFinder.find_palindromes(text, min_length=PALINDROME_MIN_LENGTH, budget=budget):
+                if not lower <= palindrome.position + start < upper:
+                    continue
+                if len(self.palindromes) >= self.max_features:
+                    self.truncated.add(SequenceAnalysis.PALINDROMES)
+                    break
+                self.palindromes.append(palindrome.model_copy(update={"position": palindrome.position + start}))
+            if budget.exhausted:
+                self.partial.add(SequenceAnalysis.PALINDROMES)
+
+    def _budget(self, analysis: SequenceAnalysis) -> TimeBudget:
+        return TimeBudget.from_ms(self.time_budgets_ms.get(analysis, settings.SEQUENCE_ANALYSIS_TIME_BUDGET_MS))
+
+    def _build_orfs(self) -> List[ORF]:
+        orfs: List[ORF] = []
+        n = self.length
+        for raw in self._raw_orfs:
+            start, end, direction, protein_length = raw[:4]
+            dna = raw[4] if len(raw) > 4 else ""
+            protein = None
+            if dna:
+                codes = encode_sequence(dna)
+                if direction == "reverse":
+                    codes = COMPLEMENT_CODES[codes[::-1]]
+                    dna = np.frombuffer(b"ACGTN", dtype=np.uint8)[codes].tobytes().decode("ascii")
+                protein = AMINO_ACID_BY_CODON[codon_indices(codes)[0:3 * protein_length:3]].tobytes().decode("ascii")
+            frame = start % 3 + 1 if direction == "forward" else -((n - 1 - end) % 3 + 1)
+            orfs.append(ORF(
+                start=start,
+                end=end,
+                frame=frame,
+                length=end - start + 1,
+                sequence=dna,
+                direction=direction,
+                protein_sequence=protein,
+                protein_length=protein_length
+            ))
+        orfs.sort(key=lambda o: (o.start, o.end))
+        return orfs
+
+    def finish(self) -> StreamedSequenceSummary:
+        """Chiude l'analisi della sequenza e ne restituisce il riepilogo."""
+        if self._orf_scanner is not None:
+            self._collect_orfs(self._orf_scanner.finish())
+        if self._windowed and self._window:
+            self._analyze_window(self._window, self._window_start, final=True)
+            self._window = ""
+
+        nucleotide = self.sequence_type in [SequenceType.DNA, SequenceType.RNA]
+        if self.sequence_type == SequenceType.PROTEIN:
+            start_codon, stop_codon = self._head.startswith("M"), False
+        else:
+            start_codon = self._head.replace("U", "T") in START_CODONS
+            stop_codon = self.length >= 3 and self.length % 3 == 0 and self._last.replace("U", "T") in STOP_CODONS
+        stats = SequenceStatistics(
+            length=self.length,
+            gc_content=round(self.gc_count / self.length * 100, 2) if nucleotide and self.length else 0.0,
+            invalid_bases=self.invalid_count,
+            start_codon=start_codon,
+            stop_codon=stop_codon,
+            open_reading_frames=self._build_orfs() if SequenceAnalysis.ORFS in self.analyses else None,
+            repeats=self.repeats if SequenceAnalysis.REPEATS in self.analyses else None,
+            palindromes=self.palindromes if SequenceAnalysis.PALINDROMES in self.analyses else None,
+            partial_analyses=sorted(self.partial, key=ALL_ANALYSES.index) or None
+        )
+        return StreamedSequenceSummary(
+            sequence_name=self.name,
+            is_valid=self.length > 0 and self.invalid_count == 0,
+            stats=stats,
+            invalid_positions=self.invalid_positions,
+            truncated_features=sorted(self.truncated, key=ALL_ANALYSES.index)
+        )
+
+
+class StreamingValidation:
+    """
+    Collega il parser in streaming agli analizzatori, un record alla volta.
+    ValueError se sono richieste analisi non disponibili in streaming.
+    """
+
+    def __init__(
+        self,
+        fmt: str,
+        sequence_type: SequenceType,
+        analyses: Optional[List[SequenceAnalysis]] = None,
+        min_protein_len_orf: int = 25,
+        time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None
+    ):
+        unsupported = [analysis.value for analysis in analyses or [] if analysis not in STREAMING_ANALYSES]
+        if unsupported:
+            raise ValueError(
+                f"Analisi non disponibili in streaming: {', '.join(unsupported)}. "
+                f"Disponibili: {', '.join(analysis.value for analysis in STREAMING_ANALYSES)}"
+            )
+        self.parser = SequenceStreamParser(fmt)
+        self.sequence_type = sequence_type
+        self.analyses = analyses
+        self.min_protein_len_orf = min_protein_len_orf
+        self.time_budgets_ms = time_budgets_ms
+        self._analyzer: Optional[StreamingSequenceAnalyzer] = None
+
+    def feed(self, text: str) -> List[str]:
+        """Elabora un blocco di testo e restituisce le righe NDJSON dei record completati."""
+        return self._handle(self.parser.feed(text))
+
+    def close(self) -> List[str]:
+        return self._handle(self.parser.close())
+
+    def _handle(self, events) -> List[str]:
+        lines: List[str] = []
+        for kind, value in events:
+            if kind == RECORD_START:
+                self._analyzer = StreamingSequenceAnalyzer(
+                    value, self.sequence_type, self.analyses, self.min_protein_len_orf, self.time_budgets_ms
+                )
+            elif kind == SEQUENCE_DATA:
+                self._analyzer.feed(value)
+            elif kind == RECORD_END:
+                summary = self._analyzer.finish()
+                logger.info(f"Sequenza '{summary.sequence_name}' analizzata in streaming ({summary.stats.length} basi)")
+                lines.append(json.dumps(summary.model_dump(mode="json")) + "\n")
+                self._analyzer = None
+        return lines
+
+
+async def stream_sequence_analysis(
+    chunks: AsyncIterator[str],
+    fmt: str = "auto",
+    sequence_type: SequenceType = SequenceType.DNA,
+    analyses: Optional[List[SequenceAnalysis]] = None,
+    min_protein_len_orf: int = 25,
+    time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None
+) -> AsyncIterator[str]:
+    """
+    Analizza un input FASTA/GenBank ricevuto a blocchi e produce una riga NDJSON
+    (StreamedSequenceSummary) per ogni record, appena il record è completo.
+    L'elaborazione dei blocchi avviene in un thread per non bloccare l'event loop.
+    """
+    validation = StreamingValidation(fmt, sequence_type, analyses, min_protein_len_orf, time_budgets_ms)
+    async for text in chunks:
+        for line in await run_in_threadpool(validation.feed, text):
+            yield line
+    for line in await run_in_threadpool(validation.close):
+        yield line
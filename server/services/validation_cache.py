@@ -0,0 +1,173 @@
+from typing import List, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+
+from server.models.sequence_analysis import SequenceType, SequenceAnalysis, SequenceValidationResult
+from server.repositories.validation_cache_repository import ValidationCacheRepository
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Versione delle analisi: va incrementata quando cambia il contenuto dei risultati,
+# così le voci persistenti calcolate dal codice precedente non vengono più usate
+VALIDATION_CACHE_VERSION = 3
+
+# Impostazioni che influiscono sul risultato della validazione (parte della chiave)
+_RESULT_SETTINGS = (
+    "LOCAL_GC_WINDOW", "LOCAL_GC_MIN", "LOCAL_GC_MAX",
+    "COMPLEXITY_WINDOW", "COMPLEXITY_MAX_K", "COMPLEXITY_MIN_LINGUISTIC", "COMPLEXITY_MIN_ENTROPY",
+    "MOTIF_DEFAULT_LIBRARY",
+    "FOLDING_MAX_SPAN", "FOLDING_FLANK", "FOLDING_START_UPSTREAM", "FOLDING_START_DOWNSTREAM", "FOLDING_HAIRPIN_MAX_ENERGY", "FOLDING_MAX_START_REGIONS",
+)
+
+
+def validation_cache_key(
+    sequence: str,
+    sequence_type: SequenceType,
+    component_type: Optional[str],
+    analyses: Optional[List[SequenceAnalysis]],
+    inverted_repeat_max_spacer: int = 0,
+    motif_library: Optional[str] = None,
+    genetic_code: int = 1,
+    alternative_starts: bool = False
+) -> str:
+    """
+    Chiave di cache di una validazione: hash SHA-256 della sequenza normalizzata
+    (come in `validate_sequence`) e delle opzioni che determinano il risultato.
+    I budget di tempo non fanno parte della chiave: i risultati parziali non
+    vengono mai memorizzati e quelli completi non dipendono dal budget.
+    """
+    digest = hashlib.sha256(sequence.strip().upper().encode("ascii", errors="replace"))
+    analysis_names = "all" if analyses is None else ",".join(sorted({analysis.value for analysis in analyses}))
+    options = "|".join([
+        f"v{VALIDATION_CACHE_VERSION}",
+        SequenceType(sequence_type).value,
+        component_type or "",
+        analysis_names,
+        str(inverted_repeat_max_spacer),
+        motif_library or settings.MOTIF_DEFAULT_LIBRARY,
+        f"{genetic_code}{'+alt' if alternative_starts else ''}",
+        ",".join(str(getattr(settings, name)) for name in _RESULT_SETTINGS),
+    ])
+    digest.update(b"\0" + options.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ValidationResultCache:
+    """
+    Cache LRU in processo dei risultati di validazione, con limite sulla
+    dimensione complessiva (byte del JSON dei risultati) anziché sul numero di
+    voci: una manciata di risultati di genomi non deve espellere migliaia di
+    parti standard.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[SequenceValidationResult, int]]" = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[SequenceValidationResult]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, result: SequenceValidationResult, size: Optional[int] = None) -> None:
+        if size is None:
+            size = len(result.model_dump_json())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._entries[key] = (result, size)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_memory_cache = ValidationResultCache(settings.VALIDATION_CACHE_MAX_BYTES)
+_repository = ValidationCacheRepository()
+_indexes_ready = False
+# Dopo un errore di MongoDB il secondo livello viene sospeso per un intervallo,
+# così un database irraggiungibile non rallenta ogni validazione
+_mongo_suspended_until = 0.0
+
+
+def _mongo_available() -> bool:
+    return settings.VALIDATION_CACHE_MONGO_ENABLED and time.monotonic() >= _mongo_suspended_until
+
+
+def _suspend_mongo(error: BaseException) -> None:
+    global _mongo_suspended_until
+    _mongo_suspended_until = time.monotonic() + settings.VALIDATION_CACHE_MONGO_RETRY_SECONDS
+    logger.warning(f"Cache di validazione su MongoDB non disponibile, sospesa per {settings.VALIDATION_CACHE_MONGO_RETRY_SECONDS}s: {error!r}")
+
+
+async def _with_timeout(operation):
+    return await asyncio.wait_for(operation, timeout=settings.VALIDATION_CACHE_MONGO_TIMEOUT_MS / 1000.0)
+
+
+async def get_cached_result(key: str) -> Optional[SequenceValidationResult]:
+    """
+    Cerca un risultato prima nella cache in processo e poi su MongoDB; i
+    risultati trovati su MongoDB vengono copiati nella cache in processo.
+    """
+    result = _memory_cache.get(key)
+    if result is not None or not _mongo_available():
+        return result
+    try:
+        result = await _with_timeout(_repository.get_result(key))
+    except Exception as e:
+        _suspend_mongo(e)
+        return None
+    if result is not None:
+        _memory_cache.put(key, result)
+    return result
+
+
+async def store_result(key: str, result: SequenceValidationResult) -> None:
+    """
+    Memorizza un risultato completo in entrambi i livelli. I risultati con
+    analisi interrotte dal budget di tempo non vengono memorizzati.
+    """
+    global _indexes_ready
+    if result.stats.partial_analyses:
+        return
+    _memory_cache.put(key, result)
+    if not _mongo_available():
+        return
+    try:
+        if not _indexes_ready:
+            await _with_timeout(_repository.ensure_indexes())
+            _indexes_ready = True
+        await _with_timeout(_repository.save_result(key, result))
+    except Exception as e:
+        _suspend_mongo(e)
+
+
+def clear_memory_cache() -> None:
+    """Svuota la cache in processo (il livello MongoDB non viene toccato)."""
+    _memory_cache.clear()
@@ -0,0 +1,402 @@
+from typing import List, Dict, Optional, Tuple
+from collections import OrderedDict
+import logging
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from server.models.sequence_analysis import (
+    SequenceType,
+    SequenceAnalysis,
+    SequenceEdit,
+    SequenceEditOperation,
+    SequenceValidationResult,
+    ORF,
+    RepeatSequence
+)
+from server.services.sequence_validator import (
+    SequenceValidator,
+    LazySequenceStats,
+    ALL_ANALYSES,
+    REPEAT_MIN_LENGTH,
+    PALINDROME_MIN_LENGTH
+)
+from server.services.orf_finder import OrfFinder
+from server.services.packed_sequence import encode_sequence, INVALID_BASE_CODE
+from server.services.genetic_code import GeneticCode, STANDARD_CODE, get_genetic_code
+from server.services.palindrome_finder import PalindromeFinder
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+# Codoni esaminati per blocco nella ricerca del terminatore più vicino a una modifica
+BOUNDARY_SCAN_CHUNK = 256
+
+
+def _boundary_mask(codes: np.ndarray, codon_starts: np.ndarray, reverse: bool, code: GeneticCode = STANDARD_CODE) -> np.ndarray:
+    """
+    Maschera dei codoni (indicati dalla posizione iniziale sul filamento forward)
+    che chiudono un segmento di lettura: stop del codice genetico sul filamento
+    scelto o basi non valide.
+    """
+    b1 = codes[codon_starts].astype(np.int16)
+    b2 = codes[codon_starts + 1].astype(np.int16)
+    b3 = codes[codon_starts + 2].astype(np.int16)
+    invalid = (b1 == INVALID_BASE_CODE) | (b2 == INVALID_BASE_CODE) | (b3 == INVALID_BASE_CODE)
+    indices = 16 * b1 + 4 * b2 + b3
+    indices[invalid] = 0
+    table = code.is_reverse_stop if reverse else code.is_stop
+    return invalid | table[indices]
+
+
+def _nearest_boundary(
+    codes: np.ndarray,
+    phase: int,
+    limit: int,
+    reverse: bool,
+    leftwards: bool,
+    code: GeneticCode = STANDARD_CODE
+) -> Optional[int]:
+    """
+    Posizione iniziale del codone terminatore più vicino nel frame `phase`
+    (codoni che iniziano in posizioni ≡ phase mod 3): il primo con inizio <= limit
+    procedendo verso sinistra, oppure il primo con inizio >= limit verso destra.
+    """
+    n = codes.size
+    step = 3 * BOUNDARY_SCAN_CHUNK
+    if leftwards:
+        last = limit - (limit - phase) % 3
+        while last >= 0:
+            first = max(last - step + 3, phase)
+            starts = np.arange(last, first - 1, -3)
+            hits = np.flatnonzero(_boundary_mask(codes, starts, reverse, code))
+            if hits.size:
+                return int(starts[hits[0]])
+            last = first - 3
+    else:
+        first = limit + (phase - limit) % 3
+        while first + 3 <= n:
+            last = min(first + step - 3, n - 3)
+            last -= (last - phase) % 3
+            starts = np.arange(first, last + 1, 3)
+            hits = np.flatnonzero(_boundary_mask(codes, starts, reverse, code))
+            if hits.size:
+                return int(starts[hits[0]])
+            first = last + 3
+    return None
+
+
+class ValidationSession:
+    """
+    Sessione di validazione incrementale per una sequenza modificata nell'editor.
+
+    La sessione conserva l'ultima analisi e, ad ogni modifica (insert/delete/replace
+    di un intervallo), aggiorna solo ciò che può essere cambiato:
+    - GC e caratteri non validi: differenza tra basi rimosse e inserite;
+    - ORF: per ogni filamento e frame viene ricalcolato solo il segmento compreso
+      tra i terminatori più vicini alla modifica, gli altri ORF vengono traslati;
+    - palindromi: si conservano i raggi di Manacher e si ricalcolano solo i centri
+      il cui palindromo tocca la modifica;
+    - ripetizioni: si mantiene il conteggio dei k-mer di lunghezza minima e il
+      suffix array viene ricostruito solo se un k-mer toccato compare più volte.
+    Le analisi interrotte dal budget di tempo vengono ricalcolate per intero.
+    Stop e start degli ORF seguono la tabella NCBI `genetic_code` (ValueError se
+    non esiste), come in SequenceValidator.validate_sequence.
+    """
+
+    def __init__(
+        self,
+        sequence: str,
+        sequence_type: SequenceType,
+        component_type: Optional[str] = None,
+        analyses: Optional[List[SequenceAnalysis]] = None,
+        time_budgets_ms: Optional[Dict[SequenceAnalysis, float]] = None,
+        min_protein_len_orf: int = 25,
+        inverted_repeat_max_spacer: int = 0,
+        motif_library: Optional[str] = None,
+        genetic_code: int = 1,
+        alternative_starts: bool = False
+    ):
+        self.session_id: str = uuid.uuid4().hex
+        self.version: int = 0
+        self.sequence: str = sequence.strip().upper() if isinstance(sequence, str) else ""
+        self.sequence_type = sequence_type
+        self.component_type = component_type
+        self.analyses: List[SequenceAnalysis] = list(ALL_ANALYSES if analyses is None else analyses)
+        self.time_budgets_ms = time_budgets_ms or {}
+        self.min_protein_len_orf = min_protein_len_orf
+        self.inverted_repeat_max_spacer = inverted_repeat_max_spacer
+        self.motif_library = motif_library
+        self.genetic_code = get_genetic_code(genetic_code)
+        self.alternative_starts = alternative_starts
+        self.lock = threading.Lock()
+        self.last_access = time.monotonic()
+
+        nucleotide = sequence_type in [SequenceType.DNA, SequenceType.RNA]
+        self._gc_count = self.sequence.count("G") + self.sequence.count("C")
+        self._invalid_positions = np.flatnonzero(SequenceValidator._invalid_character_mask(self.sequence, sequence_type))
+
+        # Stato incrementale delle analisi; None significa "da ricalcolare per intero"
+        self._orfs: Optional[List[ORF]] = None
+        self._repeats: Optional[List[RepeatSequence]] = None
+        self._radii: Optional[np.ndarray] = None
+        self._track_orfs = sequence_type == SequenceType.DNA and SequenceAnalysis.ORFS in self.analyses
+        self._track_repeats = nucleotide and SequenceAnalysis.REPEATS in self.analyses
+        # Le ripetizioni invertite con spaziatore non sono aggiornate in modo incrementale
+        self._track_palindromes = nucleotide and SequenceAnalysis.PALINDROMES in self.analyses and inverted_repeat_max_spacer == 0
+        self._kmer_counts: Dict[str, int] = {}
+        if self._track_repeats:
+            k = REPEAT_MIN_LENGTH
+            for start in range(len(self.sequence) - k + 1):
+                kmer = self.sequence[start:start + k]
+                self._kmer_counts[kmer] = self._kmer_counts.get(kmer, 0) + 1
+
+        self.result: SequenceValidationResult = self._refresh()
+
+    def _refresh(self) -> SequenceValidationResult:
+        """Costruisce le statistiche della versione corrente riusando i valori aggiornati."""
+        stats = LazySequenceStats(
+            self.sequence,
+            self.sequence_type,
+            min_protein_len_orf=self.min_protein_len_orf,
+            time_budgets_ms=self.time_budgets_ms,
+            inverted_repeat_max_spacer=self.inverted_repeat_max_spacer,
+            motif_library=self.motif_library,
+            genetic_code=self.genetic_code.table_id,
+            alternative_starts=self.alternative_starts
+        )
+        n = len(self.sequence)
+        primed = {"invalid_positions": (self._invalid_positions + 1).tolist()}
+        if self.sequence_type in [SequenceType.DNA, SequenceType.RNA]:
+            primed["gc_content"] = round(self._gc_count / n * 100, 2) if n else 0.0
+        if self._orfs is not None:
+            primed["open_reading_frames"] = self._orfs
+        if self._repeats is not None:
+            primed["repeats"] = self._repeats
+        if self._track_palindromes:
+            if self._radii is None or self._radii.size != n:
+                budget = stats.budget_for(SequenceAnalysis.PALINDROMES)
+                radii = np.asarray(PalindromeFinder.palindrome_radii(encode_sequence(self.sequence), budget), dtype=np.int64)
+                if budget.exhausted:
+                    stats.partial_analyses.append(SequenceAnalysis.PALINDROMES)
+                self._radii = None if budget.exhausted else radii
+            else:
+                radii = self._radii
+            primed["palindromes"] = PalindromeFinder.palindromes_from_radii(self.sequence, radii, min_length=PALINDROME_MIN_LENGTH)
+        stats.prime(**primed)
+
+        result = SequenceValidator.build_result(stats, self.component_type, self.analyses)
+        # Le analisi complete diventano la base per le modifiche successive
+        partial = set(stats.partial_analyses)
+        if self._track_orfs:
+            self._orfs = None if SequenceAnalysis.ORFS in partial else stats.open_reading_frames
+        if self._track_repeats:
+            self._repeats = None if SequenceAnalysis.REPEATS in partial else stats.repeats
+        return result
+
+    def apply_edits(self, edits: List[SequenceEdit]) -> SequenceValidationResult:
+        """
+        Applica in ordine una lista di modifiche (ognuna in coordinate della sequenza
+        prodotta dalla precedente) e restituisce la nuova validazione.
+        """
+        for index, edit in enumerate(edits):
+            try:
+                start, end, inserted = self._normalize_edit(edit)
+            except ValueError as e:
+                # Le modifiche precedenti restano applicate: la sessione riflette la versione raggiunta
+                if index:
+                    self.result = self._refresh()
+                raise ValueError(f"Modifica {index}: {e} Applicate le prime {index} modifiche (versione {self.version}).")
+            self._apply_edit(start, end, inserted)
+            self.version += 1
+        self.last_access = time.monotonic()
+        self.result = self._refresh()
+        return self.result
+
+    def _normalize_edit(self, edit: SequenceEdit) -> Tuple[int, int, str]:
+        """Converte una modifica nell'intervallo [start, end) da sostituire con `inserted`."""
+        n = len(self.sequence)
+        inserted = edit.sequence.strip().upper()
+        if edit.operation == SequenceEditOperation.INSERT:
+            end = edit.start
+        else:
+            if edit.end is None:
+                raise ValueError(f"La modifica '{edit.operation.value}' richiede il campo end.")
+            end = edit.end
+        if edit.operation == SequenceEditOperation.DELETE:
+            inserted = ""
+        elif not inserted:
+            raise ValueError(f"La modifica '{edit.operation.value}' richiede le basi da inserire.")
+        if edit.start > end or end > n:
+            raise ValueError(f"Intervallo di modifica [{edit.start}, {end}) non valido per una sequenza di {n} basi.")
+        return edit.start, end, inserted
+
+    def _apply_edit(self, a: int, b: int, inserted: str) -> None:
+        """Sostituisce [a, b) con `inserted` aggiornando lo stato incrementale."""
+        old = self.sequence
+        removed = old[a:b]
+        new = old[:a] + inserted + old[b:]
+        inserted_len = len(inserted)
+        delta = inserted_len - (b - a)
+
+        self._gc_count += inserted.count("G") + inserted.count("C") - removed.count("G") - removed.count("C")
+        positions = self._invalid_positions
+        inserted_invalid = np.flatnonzero(SequenceValidator._invalid_character_mask(inserted, self.sequence_type)) + a
+        self._invalid_positions = np.concatenate((positions[positions < a], inserted_invalid, positions[positions >= b] + delta))
+
+        codes = encode_sequence(new) if (self._orfs is not None or self._radii is not None) else None
+        if self._orfs is not None:
+            self._orfs = self._update_orfs(self._orfs, new, codes, a, b, inserted_len, delta)
+        if self._track_repeats:
+            self._update_repeats(old, new, a, b, inserted_len, delta)
+        if self._radii is not None:
+            self._radii = ValidationSession._update_radii(self._radii, codes, a, b, inserted_len)
+        self.sequence = new
+
+    def _update_orfs(self, orfs: List[ORF], new: str, codes: np.ndarray, a: int, b: int, inserted_len: int, delta: int) -> List[ORF]:
+        n = len(new)
+        edit_end = a + inserted_len
+
+        # ORF interamente a sinistra restano invariati, quelli a destra vengono traslati;
+        # quelli che toccano la modifica sono scartati e ricalcolati con il loro segmento.
+        kept: List[ORF] = []
+        for orf in orfs:
+            if orf.end < a:
+                kept.append(orf)
+            elif orf.start >= b:
+                kept.append(orf.model_copy(update={"start": orf.start + delta, "end": orf.end + delta}))
+
+        for direction in ("forward", "reverse"):
+            reverse = direction == "reverse"
+            for phase in range(3):
+                left = _nearest_boundary(codes, phase, a - 3, reverse, leftwards=True, code=self.genetic_code)
+                right = _nearest_boundary(codes, phase, edit_end, reverse, leftwards=False, code=self.genetic_code)
+                segment_start = left if left is not None else phase
+                segment_end = right + 3 if right is not None else phase + 3 * ((n - phase) // 3)
+                kept = [
+                    orf for orf in kept
+                    if not (orf.direction == direction and orf.start % 3 == phase
+                            and segment_start <= orf.start and orf.end < segment_end)
+                ]
+                if segment_end - segment_start < 3:
+                    continue
+                # Il segmento inizia e finisce su confini di codone del frame, quindi
+                # corrisponde al frame +1 (o -1) della sottosequenza.
+                target_frame = -1 if reverse else 1
+                orfs = OrfFinder.find_orfs(
+                    new[segment_start:segment_end],
+                    min_protein_len=self.min_protein_len_orf,
+                    genetic_code=self.genetic_code.table_id,
+                    alternative_starts=self.alternative_starts
+                )
+                for orf in orfs:
+                    if orf.frame == target_frame:
+                        kept.append(orf.model_copy(update={"start": orf.start + segment_start, "end": orf.end + segment_start}))
+
+        # Le etichette di frame dipendono dalla lunghezza (frame reverse) e vanno ricalcolate
+        relabeled: List[ORF] = []
+        for orf in kept:
+            frame = orf.start % 3 + 1 if orf.direction == "forward" else -((n - 1 - orf.end) % 3 + 1)
+            relabeled.append(orf if orf.frame == frame else orf.model_copy(update={"frame": frame}))
+        relabeled.sort(key=lambda o: (o.start, o.end))
+        return relabeled
+
+    def _update_repeats(self, old: str, new: str, a: int, b: int, inserted_len: int, delta: int) -> None:
+        """
+        Aggiorna il conteggio dei k-mer che toccano la modifica. Se nessuno di essi
+        compare (o compariva) più di una volta, nessuna ripetizione può essere stata
+        creata, distrutta o estesa e basta traslare le posizioni.
+        """
+        k = REPEAT_MIN_LENGTH
+        counts = self._kmer_counts
+        touches_repeat = False
+        for start in range(max(0, a - k + 1), min(b, len(old) - k + 1)):
+            kmer = old[start:start + k]
+            count = counts[kmer]
+            if count >= 2:
+                touches_repeat = True
+            if count == 1:
+                del counts[kmer]
+            else:
+                counts[kmer] = count - 1
+        for start in range(max(0, a - k + 1), min(a + inserted_len, len(new) - k + 1)):
+            kmer = new[start:start + k]
+            count = counts.get(kmer, 0) + 1
+            counts[kmer] = count
+            if count >= 2:
+                touches_repeat = True
+
+        if self._repeats is None:
+            return
+        if touches_repeat:
+            self._repeats = None
+            return
+        self._repeats = [
+            repeat.model_copy(update={"positions": [p + delta if p >= b else p for p in repeat.positions]})
+            for repeat in self._repeats
+        ]
+
+    @staticmethod
+    def _update_radii(radii: np.ndarray, codes: np.ndarray, a: int, b: int, inserted_len: int) -> np.ndarray:
+        """
+        Aggiorna i raggi di Manacher: un centro a sinistra resta valido se il suo
+        palindromo e la coppia che lo interrompe finiscono prima di `a`, un centro a
+        destra se iniziano dopo la parte inserita; gli altri vengono riestesi.
+        """
+        n = codes.size
+        edit_end = a + inserted_len
+        new_radii = np.concatenate((radii[:a], np.zeros(inserted_len, dtype=np.int64), radii[b:]))
+        left = np.flatnonzero(np.arange(a) + new_radii[:a] >= a)
+        right = edit_end + np.flatnonzero(np.arange(edit_end, n) - new_radii[edit_end:] - 1 < edit_end)
+        centers = np.concatenate((left, np.arange(a, min(edit_end, n)), right))
+
+        comp = PalindromeFinder._complement_codes(codes)
+        for i in centers.tolist():
+            k = 0
+            while i + k < n and i - k - 1 >= 0 and codes[i + k] == comp[i - k - 1]:
+                k += 1
+            new_radii[i] = k
+        return new_radii
+
+
+_sessions: "OrderedDict[str, ValidationSession]" = OrderedDict()
+_sessions_lock = threading.Lock()
+
+
+def _evict_sessions() -> None:
+    """Rimuove le sessioni scadute e quelle in eccesso (meno recenti). Richiede il lock."""
+    now = time.monotonic()
+    expired = [sid for sid, s in _sessions.items() if now - s.last_access > settings.VALIDATION_SESSION_TTL_SECONDS]
+    for session_id in expired:
+        del _sessions[session_id]
+    while len(_sessions) > settings.VALIDATION_SESSION_MAX_COUNT:
+        _sessions.popitem(last=False)
+
+
+def create_session(**kwargs) -> ValidationSession:
+    """Crea una sessione di validazione e la registra nello store in memoria."""
+    session = ValidationSession(**kwargs)
+    with _sessions_lock:
+        _sessions[session.session_id] = session
+        _evict_sessions()
+    logger.debug(f"Sessione di validazione {session.session_id} creata ({len(session.sequence)} basi)")
+    return session
+
+
+def get_session(session_id: str) -> Optional[ValidationSession]:
+    """Restituisce una sessione attiva, aggiornandone l'ultimo accesso."""
+    with _sessions_lock:
+        _evict_sessions()
+        session = _sessions.get(session_id)
+        if session is not None:
+            session.last_access = time.monotonic()
+            _sessions.move_to_end(session_id)
+        return session
+
+
+def delete_session(session_id: str) -> bool:
+    with _sessions_lock:
+        return _sessions.pop(session_id, None) is not None
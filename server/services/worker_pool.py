@@ -0,0 +1,44 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import logging
+import multiprocessing
+import os
+import threading
+
+from app.core.config import settings
+
+
+logger = logging.getLogger(__name__)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """
+    Restituisce il pool di processi condiviso per le analisi CPU-bound, creandolo
+    al primo utilizzo. I worker sono avviati con "spawn" per non ereditare lo
+    stato (thread, connessioni al database) del processo del server.
+    """
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None and getattr(_process_pool, "_broken", False):
+            # Un worker terminato in modo anomalo rende il pool inutilizzabile: lo si ricrea
+            logger.warning("Pool di processi non più utilizzabile, verrà ricreato")
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+        if _process_pool is None:
+            workers = settings.SEQUENCE_WORKER_PROCESSES or os.cpu_count() or 1
+            _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            logger.info(f"Pool di processi avviato con {workers} worker")
+        return _process_pool
+
+
+def shutdown_process_pool() -> None:
+    """Arresta il pool di processi, se è stato avviato."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
+            logger.info("Pool di processi arrestato")
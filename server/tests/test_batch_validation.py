@@ -0,0 +1,18 @@
+import asyncio
+import json
+
+from server.models.sequence_analysis import BatchSequenceItem, SequenceType
+from server.services.batch_validation import stream_batch_validation
+
+
+async def collect(items, **options):
+    return [json.loads(line) async for line in stream_batch_validation(items, SequenceType.DNA, analyses=[], **options)]
+
+
+def test_batch_uses_requested_genetic_code():
+    # AGA è un codone di stop solo nel codice mitocondriale dei vertebrati (tabella 2)
+    items = [BatchSequenceItem(sequence="ATGAAACCCAGA")]
+    standard = asyncio.run(collect(items))
+    mitochondrial = asyncio.run(collect(items, genetic_code=2))
+    assert standard[0]["result"]["stats"]["stop_codon"] is False
+    assert mitochondrial[0]["result"]["stats"]["stop_codon"] is True
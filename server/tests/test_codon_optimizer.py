@@ -0,0 +1,46 @@
+import random
+
+import numpy as np
+
+from server.models.sequence_analysis import CodonOptimizationRequest
+from server.services.codon_optimizer import CodonOptimizer, _first_of_groups
+from server.services.genetic_code import STANDARD_CODE
+
+
+def random_cds(rng: random.Random, length: int) -> str:
+    amino_acids = [aa for aa in STANDARD_CODE.synonymous_codons if aa != "*"]
+    codons = [rng.choice(STANDARD_CODE.synonymous_codons[rng.choice(amino_acids)]) for _ in range(length)]
+    return "ATG" + "".join(codons) + "TAA"
+
+
+def test_repeat_limits_keep_gc_constraints():
+    rng = random.Random(7)
+    gc_options = dict(gc_window=40, gc_window_min=40, gc_window_max=60, gc_content_min=48, gc_content_max=50)
+    for _ in range(6):
+        sequence = random_cds(rng, rng.randint(60, 150))
+        without_repeats = CodonOptimizer.optimize_sequence(
+            CodonOptimizationRequest(sequence=sequence, target_organism="ecoli", **gc_options)
+        )
+        result = CodonOptimizer.optimize_sequence(
+            CodonOptimizationRequest(sequence=sequence, target_organism="ecoli", max_homopolymer=4, max_repeat_length=9, **gc_options)
+        )
+        assert result.repeat_violations is not None
+        assert result.gc_window_violations <= without_repeats.gc_window_violations
+        if 48 <= without_repeats.gc_content_after <= 50:
+            assert 48 <= result.gc_content_after <= 50
+
+
+def test_first_of_groups_matches_unique():
+    rng = np.random.default_rng(3)
+    keys = (rng.integers(0, 4, 200), rng.integers(0, 3, 200).astype(np.uint64))
+    _, expected = np.unique(np.column_stack(keys).astype(np.int64), axis=0, return_index=True)
+    assert sorted(_first_of_groups(keys)) == sorted(expected)
+
+
+def test_long_gc_window_uses_hashed_ring():
+    rng = random.Random(11)
+    sequence = random_cds(rng, 400)
+    result = CodonOptimizer.optimize_sequence(
+        CodonOptimizationRequest(sequence=sequence, target_organism="ecoli", gc_window=90, gc_window_min=45, gc_window_max=55)
+    )
+    assert result.gc_window_violations == 0
@@ -0,0 +1,66 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.core.config import settings
+from server.services import codon_table_store
+from server.services.codon_model import get_codon_model
+
+
+@pytest.fixture
+def table_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "codon_tables"
+    monkeypatch.setattr(settings, "CODON_TABLE_DIR", str(directory))
+    monkeypatch.setattr(settings, "CODON_TABLE_MONGO_ENABLED", False)
+    return directory
+
+
+def test_organism_keys_cannot_escape_table_dir(table_dir):
+    counts = np.arange(64, dtype=np.float64) + 100
+    # Tabella valida scritta fuori dalla cartella della cache
+    outside = codon_table_store.build_table_info("outside", "outside", counts, None)
+    table_dir.mkdir()
+    codon_table_store.save_table(outside, counts)
+    (table_dir / "outside.npz").rename(table_dir.parent / "outside.npz")
+
+    with pytest.raises(ValueError):
+        get_codon_model("../outside")
+    with pytest.raises(ValueError):
+        codon_table_store.load_table("../outside")
+    assert not asyncio.run(codon_table_store.ensure_table("../outside"))
+
+
+class FakeRepository:
+    def __init__(self):
+        self.tables = {}
+
+    async def get_revision(self, key):
+        table = self.tables.get(key)
+        return table[0].revision if table else None
+
+    async def get_table(self, key):
+        info, counts = self.tables[key]
+        return info, counts.tolist(), codon_table_store.CODON_TABLE_FORMAT_VERSION, None
+
+
+def test_disk_copy_follows_shared_revision(table_dir, monkeypatch):
+    repository = FakeRepository()
+    monkeypatch.setattr(codon_table_store, "_repository", repository)
+    monkeypatch.setattr(settings, "CODON_TABLE_MONGO_ENABLED", True)
+    monkeypatch.setattr(settings, "CODON_TABLE_REVISION_TTL_SECONDS", 0.0)
+    old_counts = np.arange(64, dtype=np.float64) + 100
+    new_counts = old_counts[::-1].copy()
+    old = codon_table_store.build_table_info("cho", "CHO", old_counts, None)
+    new = codon_table_store.build_table_info("cho", "CHO", new_counts, None)
+
+    # Copia su disco di questa istanza, poi ricaricata su un'altra
+    codon_table_store.save_table(old, old_counts)
+    repository.tables["cho"] = (new, new_counts)
+    assert asyncio.run(codon_table_store.ensure_table("cho"))
+    assert codon_table_store.load_table("cho")[0].revision == new.revision
+
+    # Rimossa su un'altra istanza
+    del repository.tables["cho"]
+    assert not asyncio.run(codon_table_store.ensure_table("cho"))
+    assert codon_table_store.load_table("cho") is None
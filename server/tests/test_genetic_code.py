@@ -0,0 +1,9 @@
+from server.services.genetic_code import GENETIC_CODES, get_genetic_code
+
+
+def test_balanophoraceae_plastid_table():
+    code = get_genetic_code(32)
+    assert list(GENETIC_CODES) == sorted(GENETIC_CODES)
+    assert code.stop_codons == ["TAA", "TGA"]
+    assert code.start_codons == ["TTG", "CTG", "ATT", "ATC", "ATA", "ATG", "GTG"]
+    assert code.translate("ATGTAGTGA") == "MW*"
@@ -0,0 +1,15 @@
+from server.models.sequence_analysis import SequenceType
+from server.services.sequence_profile import SequenceProfiler
+from server.services.sequence_validator import SequenceValidator
+
+
+def test_profile_of_n_run_longer_than_window():
+    profile = SequenceProfiler.profile("N" * 60, window=50)
+    assert len(profile.positions) == 11
+    assert profile.linguistic_complexity == [0.0] * 11
+
+
+def test_validation_with_n_runs_and_no_valid_kmers():
+    for sequence in ("ACGTN" * 20, "N" * 80, "ACGT" * 20 + "N" * 80 + "ACGT" * 20):
+        result = SequenceValidator.validate_sequence(sequence, SequenceType.DNA)
+        assert result.stats.length == len(sequence)
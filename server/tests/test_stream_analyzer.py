@@ -0,0 +1,18 @@
+import pytest
+
+from server.models.sequence_analysis import SequenceAnalysis, SequenceType
+from server.services.stream_analyzer import StreamingValidation
+
+
+def test_default_analyses_cover_streaming_analyses_only():
+    validation = StreamingValidation("fasta", SequenceType.DNA)
+    lines = validation.feed(">seq\n" + "ATGGCT" * 30 + "TAA\n") + validation.close()
+    assert len(lines) == 1
+
+
+@pytest.mark.parametrize("analysis", [
+    SequenceAnalysis.LOCAL_GC, SequenceAnalysis.COMPLEXITY, SequenceAnalysis.MOTIFS, SequenceAnalysis.SECONDARY_STRUCTURE
+])
+def test_rejects_analyses_unavailable_in_streaming(analysis):
+    with pytest.raises(ValueError):
+        StreamingValidation("fasta", SequenceType.DNA, analyses=[SequenceAnalysis.ORFS, analysis])